@@ -2,6 +2,7 @@
 package main
 
 import (
+	"bufio"
 	"bytes"
 	"compress/gzip"
 	"encoding/json"
@@ -1358,12 +1359,48 @@ func allTorrentsHandler(w http.ResponseWriter, r *http.Request) {
 	for err := range errChan {
 		log.Printf("错误: %v", err)
 	}
+	if wantsNDJSON(r) {
+		writeNDJSONTorrents(w, r, allTorrentsRaw)
+		return
+	}
 	normalizedInfos := make([]NormalizedInfo, 0, len(allTorrentsRaw))
 	for _, rawTorrent := range allTorrentsRaw {
 		normalizedInfos = append(normalizedInfos, toNormalizedInfo(rawTorrent))
 	}
 	writeJSONResponse(w, r, http.StatusOK, normalizedInfos)
 }
+
+// 客户端通过 Accept: application/x-ndjson 请求逐行输出的种子列表
+func wantsNDJSON(r *http.Request) bool {
+	return strings.Contains(r.Header.Get("Accept"), "application/x-ndjson")
+}
+
+// writeNDJSONTorrents 每行输出一个种子，逐个序列化写出，不再拼出整个列表的 JSON；
+// X-Torrent-Count 给出种子总数，客户端据此判断响应是否被截断
+func writeNDJSONTorrents(w http.ResponseWriter, r *http.Request, torrents []NormalizedTorrent) {
+	w.Header().Set("Content-Type", "application/x-ndjson")
+	w.Header().Set("X-Torrent-Count", strconv.Itoa(len(torrents)))
+	var out io.Writer = w
+	if strings.Contains(r.Header.Get("Accept-Encoding"), "gzip") {
+		w.Header().Set("Content-Encoding", "gzip")
+		gz := gzip.NewWriter(w)
+		defer gz.Close()
+		out = gz
+	}
+	w.WriteHeader(http.StatusOK)
+	bw := bufio.NewWriterSize(out, 64*1024)
+	encoder := json.NewEncoder(bw)
+	for _, rawTorrent := range torrents {
+		if err := encoder.Encode(toNormalizedInfo(rawTorrent)); err != nil {
+			log.Printf("错误: 输出种子信息失败: %v", err)
+			return
+		}
+	}
+	if err := bw.Flush(); err != nil {
+		log.Printf("错误: 输出种子信息失败: %v", err)
+	}
+}
+
 func statsHandler(w http.ResponseWriter, r *http.Request) {
 	if r.Method != http.MethodPost {
 		writeJSONResponse(w, r, http.StatusMethodNotAllowed, map[string]interface{}{"success": false, "message": "仅支持 POST 方法"})
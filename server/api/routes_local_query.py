@@ -6,7 +6,7 @@ from flask import Blueprint, jsonify
 from collections import defaultdict
 from config import config_manager, DATA_DIR
 from utils import _get_downloader_proxy_config
-import requests
+from utils.proxy_client import get_proxy_client
 
 logger = logging.getLogger(__name__)
 
@@ -77,10 +77,9 @@ def check_remote_file_exists(proxy_config, remote_path):
     :return: (exists, is_file, size) 元组
     """
     try:
-        response = requests.post(
+        response = get_proxy_client().post(
             f"{proxy_config['proxy_base_url']}/api/file/check",
-            json={"remote_path": remote_path},
-            timeout=30)
+            json={"remote_path": remote_path})
         response.raise_for_status()
         result = response.json()
 
@@ -112,11 +111,9 @@ def batch_check_remote_files(proxy_config, remote_paths):
     try:
         logger.info(f"发送给代理的路径列表 ({len(remote_paths)} 个): {remote_paths}")
 
-        response = requests.post(
+        response = get_proxy_client().post(
             f"{proxy_config['proxy_base_url']}/api/file/batch-check",
-            json={"remote_paths": remote_paths},
-            timeout=180  # 批量检查可能需要更长时间
-        )
+            json={"remote_paths": remote_paths})
         response.raise_for_status()
         result = response.json()
 
@@ -3,15 +3,16 @@
 import logging
 import copy
 import cloudscraper
-import requests
 from flask import Blueprint, jsonify, request
 from urllib.parse import urlparse
 
 # 从项目根目录导入核心模块
 from core import services
 from core.ratio_speed_limiter import start_ratio_speed_limiter, stop_ratio_speed_limiter, restart_ratio_speed_limiter
+from core.torrent_index import notify_torrents_changed
 from database import reconcile_historical_data
 from utils import generate_downloader_id_from_host, validate_downloader_id
+from utils.proxy_client import get_proxy_client
 
 # 导入下载器客户端 API
 from qbittorrentapi import Client, APIConnectionError
@@ -55,8 +56,8 @@ def _get_proxy_downloader_info(client_config, config_manager):
         }
 
         # 发送请求到代理获取统计信息
-        response = requests.post(
-            f"{proxy_base_url}/api/stats/server", json=[proxy_downloader_config], timeout=30
+        response = get_proxy_client().post(
+            f"{proxy_base_url}/api/stats/server", json=[proxy_downloader_config]
         )
         response.raise_for_status()
 
@@ -510,6 +511,8 @@ def update_settings():
                                 logging.error(f"迁移表 {table_name} 失败")
                                 migration_success = False
                                 break
+                        # torrents 的 downloader_id 整体变化，种子聚合索引需要全量同步
+                        notify_torrents_changed(management_bp.db_manager)
 
                         if migration_success:
                             # 迁移 batch_enhance_records 中的JSON数据
@@ -532,6 +535,9 @@ def update_settings():
         restart_needed = True
         current_config["realtime_speed_enabled"] = bool(new_config["realtime_speed_enabled"])
 
+    if "torrent_delta_sync_enabled" in new_config:
+        current_config["torrent_delta_sync_enabled"] = bool(new_config["torrent_delta_sync_enabled"])
+
     if "cookiecloud" in new_config:
         current_config["cookiecloud"] = new_config["cookiecloud"]
 
@@ -653,65 +659,13 @@ def get_downloader_info_api():
         conn = db_manager._get_connection()
         cursor = db_manager._get_cursor(conn)
 
-        # 获取累计上传和下载量 - 使用最新的累计值
-        cursor.execute(
-            """SELECT downloader_id,
-                      MAX(cumulative_downloaded) as total_dl,
-                      MAX(cumulative_uploaded) as total_ul
-               FROM traffic_stats
-               WHERE cumulative_downloaded > 0 OR cumulative_uploaded > 0
-               GROUP BY downloader_id"""
+        # 今日流量与累计值来自写库时维护的 traffic_daily_totals，每个下载器只需一次索引查找
+        traffic_summary = db_manager.get_downloader_traffic_summary(
+            cursor, [d_id for d_id, d_info in info.items() if d_info["enabled"]]
         )
-        totals = {r["downloader_id"]: dict(r) for r in cursor.fetchall()}
-
-        # 获取今日上传和下载量 - 使用和 InfoView.vue 相同的逻辑，计算今日内的总增量
-        from datetime import datetime, timedelta
-
-        # 查询今日内每个下载器的总增量，类似于 routes_stats.py 中的 chart_data 逻辑
-        if db_manager.db_type == "postgresql":
-            today_query = """SELECT
-                                downloader_id,
-                                GREATEST(0,
-                                    (MAX(cumulative_downloaded) - MIN(cumulative_downloaded))::bigint
-                                ) as today_dl,
-                                GREATEST(0,
-                                    (MAX(cumulative_uploaded) - MIN(cumulative_uploaded))::bigint
-                                ) as today_ul
-                             FROM traffic_stats
-                             WHERE stat_datetime::date = CURRENT_DATE
-                             GROUP BY downloader_id"""
-            cursor.execute(today_query)
-        elif db_manager.db_type == "mysql":
-            today_query = """SELECT
-                                downloader_id,
-                                GREATEST(0,
-                                    MAX(cumulative_downloaded) - MIN(cumulative_downloaded)
-                                ) as today_dl,
-                                GREATEST(0,
-                                    MAX(cumulative_uploaded) - MIN(cumulative_uploaded)
-                                ) as today_ul
-                             FROM traffic_stats
-                             WHERE DATE(stat_datetime) = CURDATE()
-                             GROUP BY downloader_id"""
-            cursor.execute(today_query)
-        else:  # SQLite
-            today_query = """SELECT
-                                downloader_id,
-                                CASE WHEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) > 0 
-                                     THEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) 
-                                     ELSE 0 END as today_dl,
-                                CASE WHEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) > 0 
-                                     THEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) 
-                                     ELSE 0 END as today_ul
-                             FROM traffic_stats
-                             WHERE DATE(stat_datetime) = DATE('now', 'localtime')
-                             GROUP BY downloader_id"""
-            cursor.execute(today_query)
-
-        today_stats = {r["downloader_id"]: dict(r) for r in cursor.fetchall()}
     except Exception as e:
         logging.error(f"获取下载器统计信息时数据库出错: {e}", exc_info=True)
-        totals, today_stats = {}, {}
+        traffic_summary = {}
     finally:
         if cursor:
             cursor.close()
@@ -725,20 +679,11 @@ def get_downloader_info_api():
             continue
         client_config = next((item for item in cfg_downloaders if item["id"] == d_id), None)
 
-        # 确保从数据库获取的值是数字类型
-        today_dl = today_stats.get(d_id, {}).get("today_dl", 0)
-        today_ul = today_stats.get(d_id, {}).get("today_ul", 0)
-        total_dl = totals.get(d_id, {}).get("total_dl", 0)
-        total_ul = totals.get(d_id, {}).get("total_ul", 0)
-
-        # 转换为整数（处理可能的字符串类型）
-        try:
-            today_dl = int(float(today_dl))
-            today_ul = int(float(today_ul))
-            total_dl = int(float(total_dl))
-            total_ul = int(float(total_ul))
-        except (ValueError, TypeError):
-            today_dl = today_ul = total_dl = total_ul = 0
+        stats = traffic_summary.get(d_id, {})
+        today_dl = stats.get("today_dl", 0)
+        today_ul = stats.get("today_ul", 0)
+        total_dl = stats.get("total_dl", 0)
+        total_ul = stats.get("total_ul", 0)
 
         d_info["details"] = {
             "今日下载量": format_bytes(today_dl),
@@ -14,7 +14,6 @@ import json
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, jsonify, request, Response, stream_with_context
-from bs4 import BeautifulSoup
 from utils import (
     upload_data_title,
     upload_data_screenshot,
@@ -23,6 +22,7 @@ from utils import (
     extract_tags_from_mediainfo,
     extract_origin_from_description,
     extract_resolution_from_mediainfo,
+    make_soup,
 )
 from utils.downloader_selector import select_best_downloader
 from core.migrator import TorrentMigrator
@@ -1353,7 +1353,7 @@ def _migrate_publish_impl(db_manager, data):
                                 response.raise_for_status()
                                 response.encoding = "utf-8"
 
-                                soup = BeautifulSoup(response.text, "html.parser")
+                                soup = make_soup(response.text)
                                 download_link_tag = soup.select_one(
                                     f'a.index[href^="download.php?id={source_torrent_id}"]'
                                 )
@@ -2002,9 +2002,7 @@ def migrate_publish():
                         response.raise_for_status()
                         response.encoding = "utf-8"
 
-                        from bs4 import BeautifulSoup
-
-                        soup = BeautifulSoup(response.text, "html.parser")
+                        soup = make_soup(response.text)
                         download_link_tag = soup.select_one(
                             f'a.index[href^="download.php?id={source_torrent_id}"]'
                         )
@@ -3312,12 +3310,10 @@ def update_preview_data():
 
             # 创建一个模拟的HTML soup对象用于提取器
             # 由于我们已经有提取的数据，我们可以创建一个简单的soup对象
-            from bs4 import BeautifulSoup
-
             mock_html = (
                 f"<html><body><h1 id='top'>{review_data.get('title', '')}</h1></body></html>"
             )
-            mock_soup = BeautifulSoup(mock_html, "html.parser")
+            mock_soup = make_soup(mock_html)
 
             # 初始化提取器
             from core.extractors.extractor import Extractor, ParameterMapper
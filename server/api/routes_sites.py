@@ -6,6 +6,7 @@ from collections import defaultdict
 
 # 从项目根目录导入核心模块
 from core import services
+from core.torrent_index import notify_torrents_changed
 
 # --- Blueprint Setup ---
 sites_bp = Blueprint("sites_api", __name__, url_prefix="/api/sites")
@@ -29,6 +30,13 @@ def set_site_not_exist():
             
             placeholder = "%s" if db_manager.db_type in ["mysql", "postgresql"] else "?"
             
+            # 先取出受影响种子的 hash，提交后只通知这些种子的索引变化
+            cursor.execute(
+                f"SELECT hash FROM torrents WHERE name = {placeholder} AND sites = {placeholder}",
+                (torrent_name, site_name)
+            )
+            changed_hashes = {row["hash"] for row in cursor.fetchall()}
+
             # 更新数据库中的状态
             cursor.execute(
                 f"UPDATE torrents SET state = {placeholder} WHERE name = {placeholder} AND sites = {placeholder}",
@@ -36,6 +44,7 @@ def set_site_not_exist():
             )
             
             conn.commit()
+            notify_torrents_changed(db_manager, changed_hashes)
             
             if cursor.rowcount > 0:
                 return jsonify({"message": "站点状态已成功设置为不存在"}), 200
@@ -76,6 +85,13 @@ def update_site_comment():
             
             placeholder = "%s" if db_manager.db_type in ["mysql", "postgresql"] else "?"
             
+            # 先取出受影响种子的 hash，提交后只通知这些种子的索引变化
+            cursor.execute(
+                f"SELECT hash FROM torrents WHERE name = {placeholder} AND sites = {placeholder}",
+                (torrent_name, site_name)
+            )
+            changed_hashes = {row["hash"] for row in cursor.fetchall()}
+
             # 更新数据库中的 details 字段（即 comment）
             cursor.execute(
                 f"UPDATE torrents SET details = {placeholder} WHERE name = {placeholder} AND sites = {placeholder}",
@@ -83,6 +99,7 @@ def update_site_comment():
             )
             
             conn.commit()
+            notify_torrents_changed(db_manager, changed_hashes)
             
             if cursor.rowcount > 0:
                 return jsonify({
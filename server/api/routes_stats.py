@@ -8,6 +8,11 @@ from collections import defaultdict
 
 # 从项目根目录导入核心模块
 from core import services
+from core.scraper_pool import get_scraper_pool
+from utils.image_url_validator import get_image_url_validator
+from utils.proxy_client import get_proxy_client
+from utils.speed_ring import get_speed_ring_reader
+from utils.tracker_metrics import get_tracker_metrics_reader
 
 # --- Blueprint Setup ---
 stats_bp = Blueprint("stats_api", __name__, url_prefix="/api")
@@ -63,28 +68,105 @@ def get_date_range_and_grouping(time_range_str, for_speed=False):
     return start_dt, end_dt, group_by_format
 
 
-def get_time_group_fn(db_type, format_str):
-    if db_type == "mysql":
-        return f"DATE_FORMAT(stat_datetime, '{format_str.replace('%M', '%i')}')"
-    elif db_type == "postgresql":
-        # Convert strftime format to PostgreSQL TO_CHAR format
-        pg_format = format_str.replace('%Y', 'YYYY').replace(
-            '%m', 'MM').replace('%d',
-                                'DD').replace('%H',
-                                              'HH24').replace('%M', 'MI')
-        return f"TO_CHAR(stat_datetime, '{pg_format}')"
-    else:  # sqlite
-        return f"STRFTIME('{format_str}', stat_datetime)"
+# 图表分组粒度：(名称, 时段长度(秒), 标签格式)，月份长度不固定记为 None
+CHART_BUCKETS = (
+    ("minute", 60, "%Y-%m-%d %H:%M"),
+    ("5minute", 300, "%Y-%m-%d %H:%M"),
+    ("hourly", 3600, "%Y-%m-%d %H:00"),
+    ("daily", 86400, "%Y-%m-%d"),
+    ("monthly", None, "%Y-%m"),
+)
+# 单个下载器最多返回的数据点数，可通过 points 参数调整
+DEFAULT_CHART_MAX_POINTS = 1500
+
+
+def _choose_chart_bucket(group_by_format, start_dt, end_dt, max_points):
+    """按时间范围对应的分组格式选择粒度，点数超过 max_points 时逐级放粗。"""
+    idx = next((i for i, b in enumerate(CHART_BUCKETS) if b[2] == group_by_format), len(CHART_BUCKETS) - 1)
+    span = (end_dt - start_dt).total_seconds()
+    while idx < len(CHART_BUCKETS) - 1 and span / CHART_BUCKETS[idx][1] > max_points:
+        idx += 1
+    return CHART_BUCKETS[idx]
+
+
+def _bucket_label(db_manager, dt, bucket):
+    _name, seconds, label_format = bucket
+    if seconds == 300:
+        dt = db_manager.floor_period(dt, seconds)
+    return dt.strftime(label_format)
+
+
+def _collect_chart_series(db_manager, cursor, downloader_ids, start_dt, end_dt, bucket):
+    """从预先汇总的各层读取 [start_dt, end_dt) 的数据。
+
+    从不细于分组粒度的最粗一层开始，每层只读取与该层时段对齐、且不晚于该层水位线（取启用下载器中最小的，
+    保证各下载器都已汇总完整）的部分；首尾不足一个时段的部分以及水位线之后的部分交给下一层，
+    直到尚未汇总的最近几分钟读原始表。已汇总时段的结果由 get_rollup_series 按对齐的分段缓存。
+    某层没有水位线的下载器（例如新启用、还没有完整的小时/天）在该层没有任何数据，该层只能读到
+    它在更细层中最早的数据之前；完全没有数据的下载器不影响各层的读取范围。
+    """
+    bucket_seconds = bucket[1]
+    watermarks = db_manager.get_rollup_watermarks(cursor, downloader_ids)
+    tiers = [t for t in db_manager.ROLLUP_TIERS if bucket_seconds is None or t[2] <= bucket_seconds]
+
+    limits = {}
+    for tier, _table, seconds, _retention in tiers:
+        marks = []
+        for downloader_id in downloader_ids:
+            mark = watermarks[tier].get(downloader_id)
+            if mark is None:
+                first_seen = db_manager.get_unrolled_first_time(cursor, downloader_id, tier)
+                if first_seen is None:
+                    continue
+                # 与水位线一样按该层时段对齐，避免读入跨过该时间的汇总行
+                mark = db_manager.floor_period(first_seen, seconds)
+            marks.append(mark)
+        limits[tier] = min(marks) if marks else None
+
+    def collect(lo, hi, level):
+        if lo >= hi:
+            return []
+        if level < 0:
+            return db_manager.get_raw_minute_series(cursor, downloader_ids, lo, hi)
+        tier, _table, seconds, _retention = tiers[level]
+        limit = limits[tier]
+        if limit is not None:
+            body_lo = db_manager.floor_period(lo, seconds)
+            if body_lo < lo:
+                body_lo += timedelta(seconds=seconds)
+            body_hi = db_manager.floor_period(min(hi, limit), seconds)
+            if body_lo < body_hi:
+                return (
+                    collect(lo, body_lo, level - 1)
+                    + db_manager.get_rollup_series(cursor, tier, downloader_ids, body_lo, body_hi)
+                    + collect(body_hi, hi, level - 1)
+                )
+        return collect(lo, hi, level - 1)
+
+    return collect(start_dt, end_dt, len(tiers) - 1)
+
+
+def _chart_params(time_range, for_speed=False):
+    """解析时间范围与点数上限，返回 (start_dt, end_dt, bucket)。"""
+    start_dt, end_dt, group_by_format = get_date_range_and_grouping(time_range, for_speed=for_speed)
+    if not start_dt:
+        return None, None, None
+    max_points = request.args.get("points", DEFAULT_CHART_MAX_POINTS, type=int)
+    max_points = min(max(max_points, 10), 10000)
+    return start_dt, end_dt, _choose_chart_bucket(group_by_format, start_dt, end_dt, max_points)
 
 
 @stats_bp.route("/chart_data")
 def get_chart_data_api():
-    """获取历史流量图表数据，按下载器分组。"""
+    """获取历史流量图表数据，按下载器分组。
+
+    数据来自 DataTracker 维护的分钟/5 分钟/小时/天汇总表，按时间范围和点数上限选择粒度。
+    """
     db_manager = stats_bp.db_manager
     config_manager = stats_bp.config_manager  # 需要 config_manager 来获取下载器名称
 
     time_range = request.args.get("range", "this_week")
-    start_dt, end_dt, group_by_format = get_date_range_and_grouping(time_range)
+    start_dt, end_dt, bucket = _chart_params(time_range)
 
     # 获取下载器信息
     enabled_downloaders = [{
@@ -93,225 +175,29 @@ def get_chart_data_api():
     } for d in config_manager.get().get("downloaders", []) if d.get("enabled")]
     downloader_ids = {d['id'] for d in enabled_downloaders}
 
-    # 设定决策边界：48小时
-    from datetime import datetime, timedelta
-    long_period_threshold = datetime.now() - timedelta(hours=48)
-
-    # 判断是否为长周期查询
-    is_long_period_query = start_dt and start_dt < long_period_threshold
+    if not start_dt:
+        logging.info("No params for chart data query, returning empty data")
+        return jsonify({
+            "labels": [],
+            "datasets": {},
+            "downloaders": enabled_downloaders
+        })
 
     conn, cursor = None, None
     try:
         conn = db_manager._get_connection()
         cursor = db_manager._get_cursor(conn)
+        rows = _collect_chart_series(db_manager, cursor, downloader_ids, start_dt, end_dt, bucket)
 
-        if is_long_period_query:
-            # 长周期查询：同时查询聚合表 traffic_stats_hourly 和原始表 traffic_stats
-            logging.info(f"使用聚合表和原始表查询长时间范围数据: {time_range}")
-
-            # 对于长周期查询，使用更粗的分组粒度（按天或月）
-            if "%H" in group_by_format:
-                coarse_group_format = group_by_format.split(" %H")[0]  # 去掉小时部分
-            else:
-                coarse_group_format = group_by_format
-
-            time_group_fn = get_time_group_fn(db_manager.db_type,
-                                              coarse_group_format)
-            ph = db_manager.get_placeholder()
-
-            # 查询聚合表 traffic_stats_hourly - 使用累计字段计算差值
-            # 修改逻辑：使用更简单的方法计算时间段内的累计差值
-            if db_manager.db_type == "postgresql":
-                query_hourly = f"""
-                    SELECT
-                        {time_group_fn} AS time_group,
-                        downloader_id,
-                        GREATEST(0, (MAX(cumulative_uploaded) - MIN(cumulative_uploaded))::bigint) AS total_ul,
-                        GREATEST(0, (MAX(cumulative_downloaded) - MIN(cumulative_downloaded))::bigint) AS total_dl
-                    FROM traffic_stats_hourly
-                    WHERE stat_datetime >= {ph}
-                """
-            elif db_manager.db_type == "mysql":
-                query_hourly = f"""
-                    SELECT
-                        {time_group_fn} AS time_group,
-                        downloader_id,
-                        GREATEST(0, MAX(cumulative_uploaded) - MIN(cumulative_uploaded)) AS total_ul,
-                        GREATEST(0, MAX(cumulative_downloaded) - MIN(cumulative_downloaded)) AS total_dl
-                    FROM traffic_stats_hourly
-                    WHERE stat_datetime >= {ph}
-                """
-            else:  # SQLite
-                query_hourly = f"""
-                    SELECT
-                        {time_group_fn} AS time_group,
-                        downloader_id,
-                        CASE WHEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) > 0 
-                             THEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) 
-                             ELSE 0 END AS total_ul,
-                        CASE WHEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) > 0 
-                             THEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) 
-                             ELSE 0 END AS total_dl
-                    FROM traffic_stats_hourly
-                    WHERE stat_datetime >= {ph}
-                """
-            params_hourly = [start_dt.strftime("%Y-%m-%d %H:%M:%S")
-                             ] if start_dt else []
-            if end_dt and start_dt:
-                query_hourly += f" AND stat_datetime < {ph}"
-                params_hourly.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-            query_hourly += """
-                    GROUP BY time_group, downloader_id
-                    ORDER BY time_group
-            """
-
-            cursor.execute(query_hourly, tuple(params_hourly))
-            rows_hourly = cursor.fetchall()
-
-            # 计算最近3天的开始时间（这部分数据可能在聚合表中不完整）
-            from datetime import datetime, timedelta
-            recent_threshold = datetime.now() - timedelta(days=3)
-            recent_start = max(
-                start_dt, recent_threshold
-            ) if start_dt > recent_threshold else recent_threshold
-
-            # 查询原始表 traffic_stats 中最近3天的数据 - 使用累计字段计算差值
-            if recent_start < end_dt:
-                time_group_fn_fine = get_time_group_fn(db_manager.db_type,
-                                                       group_by_format)
-
-                if db_manager.db_type == "postgresql":
-                    query_fine = f"""
-                        SELECT
-                            {time_group_fn_fine} AS time_group,
-                            downloader_id,
-                            GREATEST(0, (MAX(cumulative_uploaded) - MIN(cumulative_uploaded))::bigint) AS total_ul,
-                            GREATEST(0, (MAX(cumulative_downloaded) - MIN(cumulative_downloaded))::bigint) AS total_dl
-                        FROM traffic_stats
-                        WHERE stat_datetime >= {ph}
-                    """
-                elif db_manager.db_type == "mysql":
-                    query_fine = f"""
-                        SELECT
-                            {time_group_fn_fine} AS time_group,
-                            downloader_id,
-                            GREATEST(0, MAX(cumulative_uploaded) - MIN(cumulative_uploaded)) AS total_ul,
-                            GREATEST(0, MAX(cumulative_downloaded) - MIN(cumulative_downloaded)) AS total_dl
-                        FROM traffic_stats
-                        WHERE stat_datetime >= {ph}
-                    """
-                else:  # SQLite
-                    query_fine = f"""
-                        SELECT
-                            {time_group_fn_fine} AS time_group,
-                            downloader_id,
-                            CASE WHEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) > 0 
-                                 THEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) 
-                                 ELSE 0 END AS total_ul,
-                            CASE WHEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) > 0 
-                                 THEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) 
-                                 ELSE 0 END AS total_dl
-                        FROM traffic_stats
-                        WHERE stat_datetime >= {ph}
-                    """
-                params_fine = [recent_start.strftime("%Y-%m-%d %H:%M:%S")]
-                if end_dt and recent_start:
-                    query_fine += f" AND stat_datetime < {ph}"
-                    params_fine.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-                query_fine += """
-                        GROUP BY time_group, downloader_id
-                        ORDER BY time_group
-                """
-
-                cursor.execute(query_fine, tuple(params_fine))
-                rows_fine = cursor.fetchall()
-
-                # 合并两个查询结果
-                rows = rows_hourly + rows_fine
-            else:
-                rows = rows_hourly
-        else:
-            # 短周期查询：使用原始表 traffic_stats
-            logging.info(f"使用原始表查询短时间范围数据: {time_range}")
+        # 按分组粒度累加
+        totals = defaultdict(lambda: [0, 0])
+        for dt, downloader_id, uploaded, downloaded, _ul_sum, _dl_sum, _samples in rows:
+            total = totals[(_bucket_label(db_manager, dt, bucket), downloader_id)]
+            total[0] += uploaded
+            total[1] += downloaded
 
-            # 如果 group_by_format 为 None，设置默认值
-            if not group_by_format:
-                group_by_format = "%Y-%m-%d %H:00"
-            time_group_fn = get_time_group_fn(db_manager.db_type,
-                                              group_by_format)
-            ph = db_manager.get_placeholder()
-
-            # --- 修改 SQL 查询，使用累计字段计算差值 ---
-            # 简化的累计差值计算方法
-            if db_manager.db_type == "postgresql":
-                query = f"""
-                    SELECT
-                        {time_group_fn} AS time_group,
-                        downloader_id,
-                        GREATEST(0, (MAX(cumulative_uploaded) - MIN(cumulative_uploaded))::bigint) AS total_ul,
-                        GREATEST(0, (MAX(cumulative_downloaded) - MIN(cumulative_downloaded))::bigint) AS total_dl
-                    FROM traffic_stats
-                    WHERE stat_datetime >= {ph}
-                """
-            elif db_manager.db_type == "mysql":
-                query = f"""
-                    SELECT
-                        {time_group_fn} AS time_group,
-                        downloader_id,
-                        GREATEST(0, MAX(cumulative_uploaded) - MIN(cumulative_uploaded)) AS total_ul,
-                        GREATEST(0, MAX(cumulative_downloaded) - MIN(cumulative_downloaded)) AS total_dl
-                    FROM traffic_stats
-                    WHERE stat_datetime >= {ph}
-                """
-            else:  # SQLite
-                query = f"""
-                    SELECT
-                        {time_group_fn} AS time_group,
-                        downloader_id,
-                        CASE WHEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) > 0 
-                             THEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) 
-                             ELSE 0 END AS total_ul,
-                        CASE WHEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) > 0 
-                             THEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) 
-                             ELSE 0 END AS total_dl
-                    FROM traffic_stats
-                    WHERE stat_datetime >= {ph}
-                """
-            params = [start_dt.strftime("%Y-%m-%d %H:%M:%S")
-                      ] if start_dt else []
-            if end_dt and start_dt:
-                query += f" AND stat_datetime < {ph}"
-                params.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-            query += """
-                    GROUP BY time_group, downloader_id
-                    ORDER BY time_group
-            """
-
-            # 如果没有参数但查询中有占位符，则返回空数据
-            if not params:
-                logging.info(
-                    "No params for chart data query, returning empty data")
-                return jsonify({
-                    "labels": [],
-                    "datasets": {},
-                    "downloaders": enabled_downloaders
-                })
-
-            # 添加调试日志
-            logging.info(f"Chart data query: {query}")
-            logging.info(f"Chart data params: {params}")
-            logging.info(f"Number of placeholders in query: {query.count(ph)}")
-            logging.info(f"Number of params: {len(params)}")
-
-            cursor.execute(query, tuple(params))
-            rows = cursor.fetchall()
-
-        # --- 重构数据处理逻辑 ---
-        # 1. 获取所有时间标签
-        labels = sorted(list(set(r['time_group'] for r in rows)))
+        labels = sorted({label for label, _ in totals})
         label_map = {label: i for i, label in enumerate(labels)}
-
-        # 2. 初始化数据集结构
         datasets = {
             dl['id']: {
                 'uploaded': [0] * len(labels),
@@ -319,42 +205,17 @@ def get_chart_data_api():
             }
             for dl in enabled_downloaders
         }
-
-        # 3. 填充数据 - 修复聚合表和原始表数据覆盖问题
-        # 使用累加方式处理相同时间段的数据，避免后者覆盖前者
-        processed_data = {}  # 记录已处理的(time_group, downloader_id)组合
-
-        for row in rows:
-            downloader_id = row['downloader_id']
-            # 只处理在当前配置中启用的下载器
-            if downloader_id not in downloader_ids:
+        for (label, downloader_id), (uploaded, downloaded) in totals.items():
+            if downloader_id not in datasets:
                 continue
-
-            time_group = row['time_group']
-            if time_group in label_map:
-                idx = label_map[time_group]
-                key = (time_group, downloader_id)
-
-                # 获取当前行的数据
-                uploaded = int(row['total_ul'] or 0)
-                downloaded = int(row['total_dl'] or 0)
-
-                # 如果该时间段和下载器的组合已经处理过，则累加数据
-                if key in processed_data:
-                    datasets[downloader_id]['uploaded'][idx] += uploaded
-                    datasets[downloader_id]['downloaded'][idx] += downloaded
-                else:
-                    # 首次处理该组合，直接赋值
-                    datasets[downloader_id]['uploaded'][idx] = uploaded
-                    datasets[downloader_id]['downloaded'][idx] = downloaded
-                    processed_data[key] = True
+            datasets[downloader_id]['uploaded'][label_map[label]] = uploaded
+            datasets[downloader_id]['downloaded'][label_map[label]] = downloaded
 
         return jsonify({
             "labels": labels,
             "datasets": datasets,
             "downloaders": enabled_downloaders
         })
-        # --- 结束 ---
 
     except Exception as e:
         logging.error(f"get_chart_data_api 出错: {e}", exc_info=True)
@@ -374,9 +235,94 @@ def get_speed_data_api():
         with services.CACHE_LOCK:
             speeds_by_client = copy.deepcopy(
                 services.data_tracker_thread.latest_speeds)
+    else:
+        # DataTracker 运行在 background_runner 进程中，从共享内存环形缓冲区读取
+        latest = get_speed_ring_reader().read_latest() or {}
+        downloaders = {
+            d["id"]: d
+            for d in stats_bp.config_manager.get().get("downloaders", [])
+            if d.get("enabled")
+        }
+        for downloader_id, speeds in latest.items():
+            downloader = downloaders.get(downloader_id)
+            if not downloader:
+                continue
+            speeds_by_client[downloader_id] = {
+                "name": downloader["name"],
+                "type": downloader["type"],
+                "enabled": True,
+                **speeds,
+            }
     return jsonify(speeds_by_client)
 
 
+def _tracker_metrics(section, get_local):
+    """DataTracker 在本进程中运行时直接读取，否则（gunicorn worker）读取 DataTracker 写入的跨进程指标文件。"""
+    if services.data_tracker_thread:
+        return jsonify(get_local(services.data_tracker_thread))
+    return jsonify(get_tracker_metrics_reader().read(section) or {})
+
+
+def _process_stats(get_local, tracker_section=None):
+    """返回 {"worker": 当前进程的指标, "data_tracker": DataTracker 进程的指标}。
+
+    DataTracker 不在本进程中运行时，data_tracker 读取其写入的跨进程指标文件（尚未写入时为 null）；
+    在本进程中运行或该指标没有发布到文件时只返回 worker。
+    """
+    stats = {"worker": get_local()}
+    if tracker_section and not services.data_tracker_thread:
+        stats["data_tracker"] = get_tracker_metrics_reader().read(tracker_section)
+    return jsonify(stats)
+
+
+@stats_bp.route("/speed_poll_metrics")
+def get_speed_poll_metrics_api():
+    """获取各下载器统计轮询的耗时指标（最近/平均/最大耗时、超时次数）。"""
+    return _tracker_metrics("poll_metrics", lambda tracker: tracker.get_poll_metrics())
+
+
+@stats_bp.route("/traffic_flush_metrics")
+def get_traffic_flush_metrics_api():
+    """获取流量缓冲写库的指标（写入次数、行数、耗时）。"""
+    return _tracker_metrics("traffic_flush_metrics", lambda tracker: tracker.get_traffic_flush_metrics())
+
+
+@stats_bp.route("/db_pool_stats")
+def get_db_pool_stats_api():
+    """获取数据库连接池指标（借出次数、等待耗时、连接数等）。"""
+    return _process_stats(stats_bp.db_manager.get_pool_stats, "db_pool_stats")
+
+
+@stats_bp.route("/db_slow_queries")
+def get_db_slow_queries_api():
+    """获取记录的慢查询（按累计耗时排序，附首次出现时的执行计划），含 DataTracker 进程的后台写库语句。"""
+    return _process_stats(stats_bp.db_manager.get_slow_queries, "db_slow_queries")
+
+
+@stats_bp.route("/proxy_client_stats")
+def get_proxy_client_stats_api():
+    """获取到各下载器代理的请求数、新建连接数与连接复用率，含 DataTracker 进程每秒的统计轮询。"""
+    return _process_stats(get_proxy_client().get_stats, "proxy_client_stats")
+
+
+@stats_bp.route("/scraper_pool_stats")
+def get_scraper_pool_stats_api():
+    """获取按站点复用的 scraper 借出次数、新建数与等待次数。"""
+    return _process_stats(get_scraper_pool().get_stats)
+
+
+@stats_bp.route("/image_url_check_stats")
+def get_image_url_check_stats_api():
+    """获取截图链接验证的缓存命中数与实际验证数。"""
+    return _process_stats(get_image_url_validator().get_stats)
+
+
+@stats_bp.route("/chart_cache_stats")
+def get_chart_cache_stats_api():
+    """获取已汇总时段查询缓存的命中情况。"""
+    return _process_stats(stats_bp.db_manager.get_rollup_cache_stats)
+
+
 @stats_bp.route("/recent_speed_data")
 def get_recent_speed_data_api():
     """获取最近一段时间（默认60秒）的速度数据，用于实时速度曲线。"""
@@ -392,9 +338,13 @@ def get_recent_speed_data_api():
         "name": d["name"]
     } for d in config_manager.get().get("downloaders", []) if d.get("enabled")]
 
-    with services.CACHE_LOCK:
-        buffer_data = (list(services.data_tracker_thread.recent_speeds_buffer)
-                       if services.data_tracker_thread else [])
+    if services.data_tracker_thread:
+        with services.CACHE_LOCK:
+            buffer_data = list(
+                services.data_tracker_thread.recent_speeds_buffer)
+    else:
+        buffer_data = get_speed_ring_reader().read_recent(
+            seconds_to_fetch) or []
 
     results_from_buffer = []
     for r in sorted(buffer_data, key=lambda x: x["timestamp"]):
@@ -421,21 +371,15 @@ def get_recent_speed_data_api():
                 "timestamp"] if buffer_data else datetime.now()
             conn = db_manager._get_connection()
             cursor = db_manager._get_cursor(conn)
-            query = f"SELECT stat_datetime, downloader_id, upload_speed, download_speed FROM traffic_stats WHERE stat_datetime < {db_manager.get_placeholder()} ORDER BY stat_datetime DESC LIMIT {db_manager.get_placeholder()}"
             limit = max(1, seconds_missing * len(enabled_downloaders))
-            cursor.execute(query,
-                           (end_dt.strftime("%Y-%m-%d %H:%M:%S"), limit))
 
             db_rows_by_time = defaultdict(dict)
-            for row in reversed(cursor.fetchall()):
-                dt_obj = (datetime.strptime(
-                    row["stat_datetime"], "%Y-%m-%d %H:%M:%S") if isinstance(
-                        row["stat_datetime"], str) else row["stat_datetime"])
-                db_rows_by_time[dt_obj.strftime("%H:%M:%S")][
-                    row["downloader_id"]] = {
-                        "ul_speed": row["upload_speed"] or 0,
-                        "dl_speed": row["download_speed"] or 0,
-                    }
+            for dt_obj, downloader_id, ul_speed, dl_speed in reversed(
+                    db_manager.raw_traffic.recent_speeds(cursor, end_dt, limit)):
+                db_rows_by_time[dt_obj.strftime("%H:%M:%S")][downloader_id] = {
+                    "ul_speed": ul_speed,
+                    "dl_speed": dl_speed,
+                }
             for time_str, speeds_dict in sorted(db_rows_by_time.items()):
                 results_from_db.append({
                     "time": time_str,
@@ -460,7 +404,7 @@ def get_recent_speed_data_api():
 
 @stats_bp.route("/speed_chart_data")
 def get_speed_chart_data_api():
-    """获取历史速度图表数据。"""
+    """获取历史速度图表数据，数据来源与 /chart_data 相同，速度按采样数加权平均。"""
     db_manager = stats_bp.db_manager
     config_manager = stats_bp.config_manager
     time_range = request.args.get("range", "last_12_hours")
@@ -469,123 +413,36 @@ def get_speed_chart_data_api():
         "name": d["name"]
     } for d in config_manager.get().get("downloaders", []) if d.get("enabled")]
 
-    # 设定决策边界：48小时
-    from datetime import datetime, timedelta
-    start_dt, end_dt, group_by_format = get_date_range_and_grouping(
-        time_range, for_speed=True)
-    long_period_threshold = datetime.now() - timedelta(hours=48)
+    start_dt, end_dt, bucket = _chart_params(time_range, for_speed=True)
 
-    # 判断是否为长周期查询
-    is_long_period_query = start_dt and start_dt < long_period_threshold
+    if not start_dt:
+        logging.info("No params for speed chart data query, returning empty data")
+        return jsonify({
+            "labels": [],
+            "datasets": [],
+            "downloaders": enabled_downloaders
+        })
 
     conn, cursor = None, None
     try:
         conn = db_manager._get_connection()
         cursor = db_manager._get_cursor(conn)
+        rows = _collect_chart_series(db_manager, cursor, {d["id"] for d in enabled_downloaders},
+                                     start_dt, end_dt, bucket)
 
-        if is_long_period_query:
-            # 长周期查询：同时查询聚合表 traffic_stats_hourly 和原始表 traffic_stats
-            logging.info(f"使用聚合表和原始表查询长时间范围速度数据: {time_range}")
-
-            # 对于长周期查询，检查是否需要保持小时级别的分组
-            # 特别处理本周和上周的时间范围，保持小时级别的分组以提供更好的分辨率
-            use_coarse_grouping = True
-            if time_range in ["this_week", "last_week"
-                              ] and "%H" in group_by_format:
-                use_coarse_grouping = False
-
-            if use_coarse_grouping and "%H" in group_by_format:
-                coarse_group_format = group_by_format.split(" %H")[0]  # 去掉小时部分
-            else:
-                coarse_group_format = group_by_format
-
-            time_group_fn = get_time_group_fn(db_manager.db_type,
-                                              coarse_group_format)
-            ph = db_manager.get_placeholder()
-
-            # 查询聚合表 traffic_stats_hourly
-            query_hourly = f"SELECT {time_group_fn} AS time_group, downloader_id, AVG(avg_upload_speed) AS ul_speed, AVG(avg_download_speed) AS dl_speed FROM traffic_stats_hourly WHERE stat_datetime >= {ph}"
-            params_hourly = [start_dt.strftime("%Y-%m-%d %H:%M:%S")
-                             ] if start_dt else []
-            if end_dt and start_dt:
-                query_hourly += f" AND stat_datetime < {ph}"
-                params_hourly.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-            query_hourly += " GROUP BY time_group, downloader_id ORDER BY time_group"
-
-            cursor.execute(query_hourly, tuple(params_hourly))
-            rows_hourly = cursor.fetchall()
-
-            # 计算最近3天的开始时间（这部分数据可能在聚合表中不完整）
-            from datetime import datetime, timedelta
-            recent_threshold = datetime.now() - timedelta(days=3)
-            recent_start = max(
-                start_dt, recent_threshold
-            ) if start_dt > recent_threshold else recent_threshold
-
-            # 查询原始表 traffic_stats 中最近3天的数据
-            if recent_start < end_dt:
-                time_group_fn_fine = get_time_group_fn(db_manager.db_type,
-                                                       group_by_format)
-                query_fine = f"SELECT {time_group_fn_fine} AS time_group, downloader_id, AVG(upload_speed) AS ul_speed, AVG(download_speed) AS dl_speed FROM traffic_stats WHERE stat_datetime >= {ph}"
-                params_fine = [recent_start.strftime("%Y-%m-%d %H:%M:%S")]
-                if end_dt and recent_start:
-                    query_fine += f" AND stat_datetime < {ph}"
-                    params_fine.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-                query_fine += " GROUP BY time_group, downloader_id ORDER BY time_group"
-
-                cursor.execute(query_fine, tuple(params_fine))
-                rows_fine = cursor.fetchall()
-
-                # 合并两个查询结果
-                rows = rows_hourly + rows_fine
-            else:
-                rows = rows_hourly
-        else:
-            # 短周期查询：使用原始表 traffic_stats
-            logging.info(f"使用原始表查询短时间范围速度数据: {time_range}")
-
-            # 如果 group_by_format 为 None，设置默认值
-            if not group_by_format:
-                group_by_format = "%Y-%m-%d %H:00" if not for_speed else "%Y-%m-%d %H:%M"
-            time_group_fn = get_time_group_fn(db_manager.db_type,
-                                              group_by_format)
-
-            query = f"SELECT {time_group_fn} AS time_group, downloader_id, AVG(upload_speed) AS ul_speed, AVG(download_speed) AS dl_speed FROM traffic_stats WHERE stat_datetime >= {db_manager.get_placeholder()}"
-            params = [start_dt.strftime("%Y-%m-%d %H:%M:%S")
-                      ] if start_dt else []
-            if end_dt and start_dt:
-                query += f" AND stat_datetime < {db_manager.get_placeholder()}"
-                params.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-            query += " GROUP BY time_group, downloader_id ORDER BY time_group"
-
-            # 如果没有参数但查询中有占位符，则返回空数据
-            if not params:
-                logging.info(
-                    "No params for speed chart data query, returning empty data"
-                )
-                return jsonify({
-                    "labels": [],
-                    "datasets": [],
-                    "downloaders": enabled_downloaders
-                })
-
-            # 添加调试日志
-            logging.info(f"Speed chart data query: {query}")
-            logging.info(f"Speed chart data params: {params}")
-            logging.info(
-                f"Number of placeholders in speed query: {query.count(db_manager.get_placeholder())}"
-            )
-            logging.info(f"Number of speed params: {len(params)}")
-
-            cursor.execute(query, tuple(params))
-            rows = cursor.fetchall()
+        totals = defaultdict(lambda: [0, 0, 0])
+        for dt, downloader_id, _uploaded, _downloaded, ul_sum, dl_sum, samples in rows:
+            total = totals[(_bucket_label(db_manager, dt, bucket), downloader_id)]
+            total[0] += ul_sum
+            total[1] += dl_sum
+            total[2] += samples
 
         results_by_time = defaultdict(lambda: {"time": "", "speeds": {}})
-        for r in rows:
-            results_by_time[r["time_group"]]["time"] = r["time_group"]
-            results_by_time[r["time_group"]]["speeds"][r["downloader_id"]] = {
-                "ul_speed": float(r["ul_speed"] or 0),
-                "dl_speed": float(r["dl_speed"] or 0),
+        for (label, downloader_id), (ul_sum, dl_sum, samples) in totals.items():
+            results_by_time[label]["time"] = label
+            results_by_time[label]["speeds"][downloader_id] = {
+                "ul_speed": ul_sum / samples if samples else 0.0,
+                "dl_speed": dl_sum / samples if samples else 0.0,
             }
 
         sorted_datasets = sorted(results_by_time.values(),
@@ -5,13 +5,12 @@ import json
 import uuid
 from datetime import datetime
 from flask import Blueprint, jsonify, request
-from collections import defaultdict
-from functools import cmp_to_key
 from threading import Thread
 
 # 从项目根目录导入核心模块和工具函数
 from core import services
-from utils import custom_sort_compare, format_bytes
+from core.torrent_index import get_torrent_index
+from utils import format_bytes
 from utils.downloader_selector import select_best_downloader
 
 # --- Blueprint Setup ---
@@ -81,196 +80,42 @@ def get_data_api():
     except (ValueError, json.JSONDecodeError):
         return jsonify({"error": "无效的查询参数"}), 400
 
-    conn, cursor = None, None
     try:
-        conn = db_manager._get_connection()
-        cursor = db_manager._get_cursor(conn)
-
-        # --- [新增] 开始: 一次性获取所有站点配置信息 ---
-        cursor.execute("SELECT nickname, migration, cookie FROM sites")
-        # [修复] 将 sqlite3.Row 对象转换为标准的 dict，以支持 .get() 方法
-        site_configs = {row["nickname"]: dict(row) for row in cursor.fetchall()}
-        # --- [新增] 结束 ---
+        site_configs, sites_with_cookie, existing_seed_names = _load_site_context(
+            db_manager, exclude_existing
+        )
 
         # 获取所有目标站点（migration 为 2 或 3 的站点）
         target_sites = {
             name for name, config in site_configs.items() if config.get("migration", 0) in [2, 3]
         }
 
-        # 修改后的逻辑：all_discovered_sites = 数据库中有做种记录的站点 + 配置了cookie的站点
-        cursor.execute(
-            "SELECT DISTINCT sites FROM torrents WHERE sites IS NOT NULL AND sites != ''"
-        )
-        sites_from_torrents = {row["sites"] for row in cursor.fetchall()}
-
-        # 获取配置了cookie的站点
-        cursor.execute("SELECT nickname FROM sites WHERE cookie IS NOT NULL AND cookie != ''")
-        sites_with_cookie = {row["nickname"] for row in cursor.fetchall()}
-
-        # 合并两个集合并排序
-        all_discovered_sites = sorted(sites_from_torrents | sites_with_cookie)
-
-        # 明确指定查询列，确保包含新添加的列，并排除状态为"不存在"的记录
-        placeholder = "%s" if db_manager.db_type in ["mysql", "postgresql"] else "?"
-        if db_manager.db_type == "postgresql":
-            if only_completed:
-                # 只返回下载进度达到100%的种子
-                cursor.execute(
-                    'SELECT hash, name, save_path, size, progress, state, sites, "group", details, downloader_id, last_seen, iyuu_last_check, seeders FROM torrents WHERE state != '
-                    + placeholder
-                    + " AND progress >= 100",
-                    ("不存在",),
-                )
-            else:
-                cursor.execute(
-                    'SELECT hash, name, save_path, size, progress, state, sites, "group", details, downloader_id, last_seen, iyuu_last_check, seeders FROM torrents WHERE state != '
-                    + placeholder,
-                    ("不存在",),
-                )
-        else:
-            if only_completed:
-                # 只返回下载进度达到100%的种子
-                cursor.execute(
-                    "SELECT hash, name, save_path, size, progress, state, sites, `group`, details, downloader_id, last_seen, iyuu_last_check, seeders FROM torrents WHERE state != "
-                    + placeholder
-                    + " AND progress >= 100",
-                    ("不存在",),
-                )
-            else:
-                cursor.execute(
-                    "SELECT hash, name, save_path, size, progress, state, sites, `group`, details, downloader_id, last_seen, iyuu_last_check, seeders FROM torrents WHERE state != "
-                    + placeholder,
-                    ("不存在",),
-                )
-        torrents_raw = [dict(row) for row in cursor.fetchall()]
-
-        cursor.execute(
-            "SELECT hash, SUM(uploaded) as total_uploaded FROM torrent_upload_stats GROUP BY hash"
+        # 聚合、按路径/状态/下载器/站点筛选以及自然排序都由常驻内存的聚合索引完成，
+        # 只有当种子数据发生变化时才会与数据库同步
+        torrent_index = get_torrent_index()
+        torrent_index.ensure_fresh(db_manager)
+        result = torrent_index.query(
+            only_completed=only_completed,
+            name_search=name_search,
+            path_filters=path_filters,
+            state_filters=state_filters,
+            downloader_filters=downloader_filters,
+            exist_sites=exist_site_names,
+            not_exist_sites=not_exist_site_names,
         )
-        uploads_by_hash = {
-            row["hash"]: int(row["total_uploaded"] or 0) for row in cursor.fetchall()
-        }
+        filtered_list = result["groups"]
 
-        agg_torrents = defaultdict(
-            lambda: {
-                "name": "",
-                "save_path": "",
-                "size": 0,
-                "progress": 0,
-                "state": set(),
-                "sites": defaultdict(
-                    lambda: {
-                        "uploaded": 0,
-                        "comment": "",
-                        "migration": 0,
-                        "state": "N/A",
-                        "seeders": 0,
-                    }
-                ),
-                "total_uploaded": 0,
-                "seeders": 0,  # 添加做种人数字段
-                "downloader_ids": [],  # 修改为数组以支持多个下载器
-            }
-        )
-        for t in torrents_raw:
-            # 使用种子名称和大小作为唯一标识，以区分同名但不同大小的种子
-            torrent_key = (t["name"], t.get("size", 0))
-            agg = agg_torrents[torrent_key]
-            if not agg["name"]:
-                agg.update(
-                    {
-                        "name": t["name"],
-                        "save_path": t.get("save_path", ""),
-                        "size": t.get("size", 0),
-                    }
-                )
-            # 如果当前save_path为空，但新记录有非空的save_path，则更新它
-            elif not agg["save_path"] and t.get("save_path"):
-                agg["save_path"] = t.get("save_path", "")
-            # 添加下载器ID到数组中（去重）
-            downloader_id = t.get("downloader_id")
-            if downloader_id and downloader_id not in agg["downloader_ids"]:
-                agg["downloader_ids"].append(downloader_id)
-            agg["progress"] = max(agg.get("progress", 0), t.get("progress", 0))
-            agg["state"].add(t.get("state", "N/A"))
-            upload_for_this_hash = uploads_by_hash.get(t["hash"], 0)
-            agg["total_uploaded"] += upload_for_this_hash
-            # 更新做种人数：取所有记录中的最大值
-            agg["seeders"] = max(agg.get("seeders", 0), t.get("seeders", 0))
-            if t.get("sites"):
-                site_name = t.get("sites")
-                agg["sites"][site_name]["uploaded"] = (
-                    agg["sites"][site_name].get("uploaded", 0) + upload_for_this_hash
-                )
-                agg["sites"][site_name]["comment"] = t.get("details")
-                # 添加站点状态
-                agg["sites"][site_name]["state"] = t.get("state", "N/A")
-                # 添加做种人数
-                agg["sites"][site_name]["seeders"] = max(
-                    agg["sites"][site_name].get("seeders", 0), t.get("seeders", 0)
-                )
+        # 修改后的逻辑：all_discovered_sites = 数据库中有做种记录的站点 + 配置了cookie的站点
+        all_discovered_sites = sorted(result["sites"] | sites_with_cookie)
 
-                # --- [修改] 开始: 附加 migration 状态 ---
-                # 从预加载的配置中获取 migration 值，如果站点不存在则默认为 0
-                # 此处现在可以安全地使用 .get()
-                agg["sites"][site_name]["migration"] = site_configs.get(site_name, {}).get(
-                    "migration", 0
-                )
-                # --- [修改] 结束 ---
-
-        final_torrent_list = []
-        for key, data in agg_torrents.items():
-            name, size = key
-            # 计算可以转种到的目标站点数量
-            # 目标站点是那些当前种子未存在于其上的目标站点
-            existing_sites = set(data.get("sites", {}).keys())
-            target_sites_count = len(target_sites - existing_sites)
-
-            data.update(
-                {
-                    "unique_id": f"{name}_{size}",
-                    "state": ", ".join(sorted(list(data["state"]))),
-                    "size_formatted": format_bytes(data["size"]),
-                    "total_uploaded_formatted": format_bytes(data["total_uploaded"]),
-                    "site_count": len(data.get("sites", {})),
-                    "total_site_count": len(all_discovered_sites),
-                    "target_sites_count": target_sites_count,
-                    "seeders": data.get("seeders", 0),  # 添加做种人数
-                    "downloaderIds": data.get("downloader_ids", []),
-                    "downloaderId": select_best_downloader(
-                        downloader_ids=data.get("downloader_ids", []),
-                        config_manager=torrents_bp.config_manager,
-                    ),
-                }
-            )
-            final_torrent_list.append(data)
-
-        # Filtering logic
-        filtered_list = final_torrent_list
-        if name_search:
-            filtered_list = [t for t in filtered_list if name_search in t["name"].lower()]
-        if path_filters:
-            filtered_list = [
-                t
-                for t in filtered_list
-                if any(t.get("save_path", "") == path for path in path_filters)
-            ]
-        if state_filters:
-            filtered_list = [
-                t
-                for t in filtered_list
-                if any(s in state_filters for s in t.get("state", "").split(", "))
-            ]
-        if downloader_filters:
-            filtered_list = [
-                t
-                for t in filtered_list
-                if any(
-                    downloader_id in downloader_filters
-                    for downloader_id in t.get("downloaderIds", [])
-                )
-            ]
         # 源站点可用性筛选（只计算有cookie的源站点）
+        def has_available_source(group):
+            return any(
+                site_configs.get(site_name, {}).get("migration", 0) in [1, 3]
+                and site_configs.get(site_name, {}).get("cookie", "") != ""
+                for site_name in group["sites"]
+            )
+
         if (
             "存在源站点" in source_availability_filters
             and "无可用源站点" in source_availability_filters
@@ -278,93 +123,42 @@ def get_data_api():
             # 包含所有（默认）
             pass
         elif "存在源站点" in source_availability_filters:
-            filtered_list = [
-                t
-                for t in filtered_list
-                if len(
-                    [
-                        site_name
-                        for site_name, site_data in t.get("sites", {}).items()
-                        if site_data.get("migration", 0) in [1, 3]
-                        and site_configs.get(site_name, {}).get("cookie", "") != ""
-                    ]
-                )
-                > 0
-            ]
+            filtered_list = [t for t in filtered_list if has_available_source(t)]
         elif "无可用源站点" in source_availability_filters:
-            filtered_list = [
-                t
-                for t in filtered_list
-                if len(
-                    [
-                        site_name
-                        for site_name, site_data in t.get("sites", {}).items()
-                        if site_data.get("migration", 0) in [1, 3]
-                        and site_configs.get(site_name, {}).get("cookie", "") != ""
-                    ]
-                )
-                == 0
-            ]
-        # 站点筛选逻辑：同时支持存在于和不存在于的筛选
-        # 种子必须存在于exist_site_names中的所有站点
-        if exist_site_names:
-            exist_site_set = set(exist_site_names)
-            filtered_list = [
-                t for t in filtered_list if exist_site_set.issubset(set(t.get("sites", {}).keys()))
-            ]
-
-        # 种子必须不存在于not_exist_site_names中的任何站点
-        if not_exist_site_names:
-            not_exist_site_set = set(not_exist_site_names)
-            filtered_list = [
-                t
-                for t in filtered_list
-                if not not_exist_site_set.intersection(set(t.get("sites", {}).keys()))
-            ]
+            filtered_list = [t for t in filtered_list if not has_available_source(t)]
 
         # 新增：如果 exclude_existing 为 True，则排除已存在于 seed_parameters 表中的种子
-        if exclude_existing:
-            try:
-                # 查询 seed_parameters 表中所有唯一的种子名称
-                cursor.execute("SELECT DISTINCT name FROM seed_parameters")
-                existing_seed_names = {row["name"] for row in cursor.fetchall()}
-
-                # 过滤掉已存在的种子
-                filtered_list = [t for t in filtered_list if t["name"] not in existing_seed_names]
-            except Exception as e:
-                logging.error(f"查询 seed_parameters 表失败: {e}", exc_info=True)
-                # 如果查询失败，可以选择返回错误或继续执行而不进行排除
-                # 这里我们选择继续执行，以保证接口的可用性
-                pass
+        if existing_seed_names:
+            filtered_list = [t for t in filtered_list if t["name"] not in existing_seed_names]
 
-        # Sorting logic
+        # Sorting logic（索引返回的结果已按名称自然排序）
         if sort_prop and sort_order:
             reverse = sort_order == "descending"
             sort_key_map = {"size_formatted": "size", "total_uploaded_formatted": "total_uploaded"}
             sort_key = sort_key_map.get(sort_prop, sort_prop)
-            if sort_key in [
-                "size",
-                "progress",
-                "total_uploaded",
-                "site_count",
-                "target_sites_count",
-            ]:
-                filtered_list.sort(key=lambda x: x.get(sort_key, 0), reverse=reverse)
+            if sort_key == "site_count":
+                filtered_list = sorted(filtered_list, key=lambda x: len(x["sites"]), reverse=reverse)
+            elif sort_key == "target_sites_count":
+                filtered_list = sorted(
+                    filtered_list,
+                    key=lambda x: len(target_sites - x["sites"].keys()),
+                    reverse=reverse,
+                )
+            elif sort_key in ["size", "progress", "total_uploaded"]:
+                filtered_list = sorted(
+                    filtered_list, key=lambda x: x.get(sort_key, 0), reverse=reverse
+                )
             else:
-                filtered_list.sort(
-                    key=cmp_to_key(lambda a, b: custom_sort_compare(a, b)), reverse=reverse
+                filtered_list = sorted(
+                    filtered_list, key=lambda x: x["sort_key"], reverse=reverse
                 )
-        else:
-            filtered_list.sort(key=cmp_to_key(custom_sort_compare))
 
         # Pagination
         total_items = len(filtered_list)
-        paginated_data = filtered_list[(page - 1) * page_size : page * page_size]
-
-        unique_paths = sorted(
-            list(set(r.get("save_path") for r in torrents_raw if r.get("save_path")))
-        )
-        unique_states = sorted(list(set(r.get("state") for r in torrents_raw if r.get("state"))))
+        paginated_data = [
+            _build_torrent_item(group, site_configs, target_sites, len(all_discovered_sites))
+            for group in filtered_list[(page - 1) * page_size : page * page_size]
+        ]
 
         _, site_link_rules, _ = services.load_site_maps_from_db(db_manager)
 
@@ -374,8 +168,8 @@ def get_data_api():
                 "total": total_items,
                 "page": page,
                 "pageSize": page_size,
-                "unique_paths": unique_paths,
-                "unique_states": unique_states,
+                "unique_paths": result["unique_paths"],
+                "unique_states": result["unique_states"],
                 "all_discovered_sites": all_discovered_sites,
                 "site_link_rules": site_link_rules,
                 "active_path_filters": path_filters,
@@ -384,11 +178,73 @@ def get_data_api():
     except Exception as e:
         logging.error(f"get_data_api 出错: {e}", exc_info=True)
         return jsonify({"error": "从数据库检索种子数据失败"}), 500
-    finally:
-        if cursor:
+
+
+def _load_site_context(db_manager, exclude_existing):
+    """读取 /data 接口需要的站点配置、配置了 cookie 的站点，以及（可选）已存在于 seed_parameters 的种子名称。"""
+    with db_manager.connection() as conn:
+        cursor = db_manager._get_cursor(conn)
+        try:
+            # --- [新增] 开始: 一次性获取所有站点配置信息 ---
+            cursor.execute("SELECT nickname, migration, cookie FROM sites")
+            # [修复] 将 sqlite3.Row 对象转换为标准的 dict，以支持 .get() 方法
+            site_configs = {row["nickname"]: dict(row) for row in cursor.fetchall()}
+            # --- [新增] 结束 ---
+
+            # 获取配置了cookie的站点
+            cursor.execute("SELECT nickname FROM sites WHERE cookie IS NOT NULL AND cookie != ''")
+            sites_with_cookie = {row["nickname"] for row in cursor.fetchall()}
+
+            existing_seed_names = set()
+            if exclude_existing:
+                try:
+                    # 查询 seed_parameters 表中所有唯一的种子名称
+                    cursor.execute("SELECT DISTINCT name FROM seed_parameters")
+                    existing_seed_names = {row["name"] for row in cursor.fetchall()}
+                except Exception as e:
+                    logging.error(f"查询 seed_parameters 表失败: {e}", exc_info=True)
+                    # 如果查询失败，继续执行而不进行排除，以保证接口的可用性
+                    conn.rollback()
+            return site_configs, sites_with_cookie, existing_seed_names
+        finally:
             cursor.close()
-        if conn:
-            conn.close()
+
+
+def _build_torrent_item(group, site_configs, target_sites, total_site_count):
+    """将聚合索引中的分组展开为 /data 接口返回的一行数据。"""
+    name, size = group["name"], group["size"]
+    sites = {
+        site_name: {
+            **site_data,
+            # 从预加载的配置中获取 migration 值，如果站点不存在则默认为 0
+            "migration": site_configs.get(site_name, {}).get("migration", 0),
+        }
+        for site_name, site_data in group["sites"].items()
+    }
+    downloader_ids = list(group["downloader_ids"])
+    return {
+        "name": name,
+        "save_path": group["save_path"],
+        "size": size,
+        "progress": group["progress"],
+        "state": ", ".join(sorted(group["states"])),
+        "sites": sites,
+        "total_uploaded": group["total_uploaded"],
+        "seeders": group["seeders"],
+        "downloader_ids": downloader_ids,
+        "unique_id": f"{name}_{size}",
+        "size_formatted": format_bytes(size),
+        "total_uploaded_formatted": format_bytes(group["total_uploaded"]),
+        "site_count": len(sites),
+        "total_site_count": total_site_count,
+        # 目标站点是那些当前种子未存在于其上的目标站点
+        "target_sites_count": len(target_sites - sites.keys()),
+        "downloaderIds": downloader_ids,
+        "downloaderId": select_best_downloader(
+            downloader_ids=downloader_ids,
+            config_manager=torrents_bp.config_manager,
+        ),
+    }
 
 
 @torrents_bp.route("/refresh_data", methods=["POST"])
@@ -186,14 +186,19 @@ def run_startup_maintenance(db_manager: DatabaseManager):
     """执行一次性启动维护任务（清理、迁移、统计基线）。"""
     cleanup_old_tmp_structure()
     run_downloader_id_migration(db_manager)
+    # 在写入启动基线之前补齐每日流量合计，避免把停机期间的流量记到今天
+    try:
+        db_manager.backfill_daily_totals()
+    except Exception as e:
+        logging.error(f"补齐每日流量合计失败: {e}")
     reconcile_historical_data(db_manager, config_manager.get())
 
-    logging.info("正在执行初始数据聚合...")
+    logging.info("正在补齐流量汇总...")
     try:
-        db_manager.aggregate_hourly_traffic()
-        logging.info("初始数据聚合完成。")
+        db_manager.rollup_traffic()
+        logging.info("流量汇总补齐完成。")
     except Exception as e:
-        logging.error(f"初始数据聚合失败: {e}")
+        logging.error(f"流量汇总补齐失败: {e}")
 
 
 def run_startup_refresh_task(db_manager: DatabaseManager):
@@ -0,0 +1,219 @@
+# benchmarks/bench_downloader_totals.py
+"""
+下载器信息卡片流量查询基准测试：在一年的 1 秒级合成数据上对比三种查询方式的耗时。
+
+- 旧实现：整表 MAX(cumulative) 求累计值，DATE(stat_datetime) = 今天 求今日流量（无法使用主键索引）
+- 范围谓词：今日流量改写为 stat_datetime >= 今天 0 点 AND < 明天 0 点，可以走主键范围扫描
+- 每日合计表：按主键读取 traffic_daily_totals 当天的行，累计值按 (downloader_id, stat_date) 索引取最近一行
+
+同时校验每日合计表的结果与合成数据的真实流量一致。数据写入临时 SQLite 文件，
+一年 × 1 秒 × 1 个下载器约 3150 万行、占用约 2 GB 磁盘，可用 --days 缩短。
+
+用法（在 server 目录下）：
+    python benchmarks/bench_downloader_totals.py [--days 365] [--downloaders 1] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+LEGACY_TOTALS_SQL = """
+    SELECT downloader_id, MAX(cumulative_downloaded) AS total_dl, MAX(cumulative_uploaded) AS total_ul
+    FROM traffic_stats
+    WHERE cumulative_downloaded > 0 OR cumulative_uploaded > 0
+    GROUP BY downloader_id
+"""
+LEGACY_TODAY_SQL = """
+    SELECT downloader_id,
+           CASE WHEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) > 0
+                THEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) ELSE 0 END AS today_dl,
+           CASE WHEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) > 0
+                THEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) ELSE 0 END AS today_ul
+    FROM traffic_stats
+    WHERE DATE(stat_datetime) = DATE('now', 'localtime')
+    GROUP BY downloader_id
+"""
+RANGE_TODAY_SQL = """
+    SELECT downloader_id,
+           MAX(cumulative_downloaded) - MIN(cumulative_downloaded) AS today_dl,
+           MAX(cumulative_uploaded) - MIN(cumulative_uploaded) AS today_ul
+    FROM traffic_stats
+    WHERE stat_datetime >= ? AND stat_datetime < ?
+    GROUP BY downloader_id
+"""
+RANGE_TOTAL_SQL = """
+    SELECT cumulative_uploaded, cumulative_downloaded FROM traffic_stats
+    WHERE downloader_id = ? ORDER BY stat_datetime DESC LIMIT 1
+"""
+# 与 DatabaseManager.get_downloader_traffic_summary 相同的查询
+TOTALS_TODAY_SQL = "SELECT downloader_id, uploaded, downloaded FROM traffic_daily_totals WHERE stat_date = ?"
+TOTALS_LATEST_SQL = """
+    SELECT cumulative_uploaded, cumulative_downloaded FROM traffic_daily_totals
+    WHERE downloader_id = ? ORDER BY stat_date DESC LIMIT 1
+"""
+
+
+def create_schema(conn):
+    conn.execute(
+        "CREATE TABLE traffic_stats (stat_datetime TEXT NOT NULL, downloader_id TEXT NOT NULL, "
+        "uploaded INTEGER DEFAULT 0, downloaded INTEGER DEFAULT 0, upload_speed INTEGER DEFAULT 0, "
+        "download_speed INTEGER DEFAULT 0, cumulative_uploaded INTEGER NOT NULL DEFAULT 0, "
+        "cumulative_downloaded INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+    )
+    conn.execute(
+        "CREATE TABLE traffic_daily_totals (stat_date TEXT NOT NULL, downloader_id TEXT NOT NULL, "
+        "uploaded INTEGER NOT NULL DEFAULT 0, downloaded INTEGER NOT NULL DEFAULT 0, "
+        "cumulative_uploaded INTEGER NOT NULL DEFAULT 0, cumulative_downloaded INTEGER NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (stat_date, downloader_id))"
+    )
+
+
+def generate(conn, days, downloader_ids, rng):
+    """写入 days 天的 1 秒级数据，同时按写库时的逻辑累加每日合计；返回今天真实的上传/下载量。"""
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    today_str = end.strftime("%Y-%m-%d")
+    truth = {}
+
+    for d_id in downloader_ids:
+        cum_ul, cum_dl = rng.randint(1, 10**12), rng.randint(1, 10**12)
+        daily = {}
+        batch = []
+        t = start
+        while t < end:
+            ul_speed, dl_speed = rng.randint(0, 5 * 2**20), rng.randint(0, 2**20)
+            cum_ul += ul_speed
+            cum_dl += dl_speed
+            ts = t.strftime("%Y-%m-%d %H:%M:%S")
+            batch.append((ts, d_id, ul_speed, dl_speed, cum_ul, cum_dl))
+            totals = daily.setdefault(ts[:10], [0, 0, 0, 0])
+            if t > start:
+                totals[0] += ul_speed
+                totals[1] += dl_speed
+            totals[2], totals[3] = cum_ul, cum_dl
+            if len(batch) >= 100000:
+                conn.executemany(
+                    "INSERT INTO traffic_stats (stat_datetime, downloader_id, upload_speed, download_speed, "
+                    "cumulative_uploaded, cumulative_downloaded) VALUES (?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+                batch = []
+            t += timedelta(seconds=1)
+        if batch:
+            conn.executemany(
+                "INSERT INTO traffic_stats (stat_datetime, downloader_id, upload_speed, download_speed, "
+                "cumulative_uploaded, cumulative_downloaded) VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+        conn.executemany(
+            "INSERT INTO traffic_daily_totals VALUES (?, ?, ?, ?, ?, ?)",
+            [(date, d_id, *values) for date, values in daily.items()],
+        )
+        today = daily.get(today_str, [0, 0, cum_ul, cum_dl])
+        truth[d_id] = {"today_ul": today[0], "today_dl": today[1], "total_ul": cum_ul, "total_dl": cum_dl}
+        conn.commit()
+
+    conn.execute("CREATE INDEX idx_traffic_stats_downloader_time ON traffic_stats(downloader_id, stat_datetime)")
+    conn.execute(
+        "CREATE INDEX idx_traffic_daily_totals_downloader ON traffic_daily_totals(downloader_id, stat_date)"
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
+    return truth
+
+
+def run_legacy(conn, downloader_ids, today):
+    totals = {r[0]: r for r in conn.execute(LEGACY_TOTALS_SQL)}
+    today_rows = {r[0]: r for r in conn.execute(LEGACY_TODAY_SQL)}
+    return {
+        d: {"today_ul": today_rows[d][2], "today_dl": today_rows[d][1], "total_ul": totals[d][2],
+            "total_dl": totals[d][1]}
+        for d in downloader_ids
+    }
+
+
+def run_range(conn, downloader_ids, today):
+    tomorrow = today + timedelta(days=1)
+    today_rows = {
+        r[0]: r
+        for r in conn.execute(RANGE_TODAY_SQL, (today.strftime("%Y-%m-%d %H:%M:%S"),
+                                                tomorrow.strftime("%Y-%m-%d %H:%M:%S")))
+    }
+    result = {}
+    for d in downloader_ids:
+        total_ul, total_dl = conn.execute(RANGE_TOTAL_SQL, (d, )).fetchone()
+        result[d] = {"today_ul": today_rows[d][2], "today_dl": today_rows[d][1], "total_ul": total_ul,
+                     "total_dl": total_dl}
+    return result
+
+
+def run_totals(conn, downloader_ids, today):
+    today_rows = {r[0]: r for r in conn.execute(TOTALS_TODAY_SQL, (today.strftime("%Y-%m-%d"), ))}
+    result = {}
+    for d in downloader_ids:
+        total_ul, total_dl = conn.execute(TOTALS_LATEST_SQL, (d, )).fetchone()
+        row = today_rows.get(d, (d, 0, 0))
+        result[d] = {"today_ul": row[1], "today_dl": row[2], "total_ul": total_ul, "total_dl": total_dl}
+    return result
+
+
+def timed(fn, repeat, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--downloaders", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    downloader_ids = [f"dl{i}" for i in range(args.downloaders)]
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        create_schema(conn)
+
+        start = time.perf_counter()
+        truth = generate(conn, args.days, downloader_ids, rng)
+        rows = conn.execute("SELECT COUNT(*) FROM traffic_stats").fetchone()[0]
+        print(f"生成 {rows} 行原始数据（{args.days} 天 × {args.downloaders} 个下载器），"
+              f"耗时 {time.perf_counter() - start:.1f} s")
+
+        # 旧实现每次都要扫全表，最多重复 3 次
+        legacy_time, legacy = timed(run_legacy, min(args.repeat, 3), conn, downloader_ids, today)
+        range_time, ranged = timed(run_range, args.repeat, conn, downloader_ids, today)
+        totals_time, totals = timed(run_totals, args.repeat, conn, downloader_ids, today)
+        conn.close()
+
+    print(f"旧实现（整表 MAX + DATE()=今天）: {legacy_time * 1000:.2f} ms")
+    print(f"范围谓词（原始表）:               {range_time * 1000:.2f} ms")
+    print(f"每日合计表:                       {totals_time * 1000:.3f} ms")
+    print(f"加速比（旧实现 / 每日合计表）: {legacy_time / totals_time:.0f}x")
+
+    mismatches = [d for d in downloader_ids if totals[d] != truth[d]]
+    for d in downloader_ids:
+        print(f"  {d}: 今日上传 真实={truth[d]['today_ul']} 每日合计表={totals[d]['today_ul']} "
+              f"旧实现={legacy[d]['today_ul']} 范围谓词={ranged[d]['today_ul']}")
+    print(f"每日合计表结果不一致: {len(mismatches)}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
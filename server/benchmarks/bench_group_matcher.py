@@ -0,0 +1,127 @@
+# benchmarks/bench_group_matcher.py
+"""
+官组识别基准测试：对比逐官组扫描（旧实现）与预编译匹配器在 5 万个种子名称上的耗时，
+并校验两者结果完全一致。
+
+用法（在 server 目录下）：
+    python benchmarks/bench_group_matcher.py [--torrents 50000] [--groups 600]
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.group_matcher import GroupNameMatcher  # noqa: E402
+
+
+def legacy_find_torrent_group(name, group_to_site_map_lower):
+    """DataTracker._find_torrent_group 的旧实现（去掉日志），作为结果与耗时的对照。"""
+    name_lower = name.lower()
+    exact_matches = []
+    partial_matches = []
+    if "@" in name_lower:
+        for part in name_lower.split("@"):
+            clean_part = part.strip().lstrip("-").strip()
+            clean_part = re.sub(r"\[.*?\]", "", clean_part).strip()
+            if clean_part:
+                for group_lower, group_info in group_to_site_map_lower.items():
+                    group_lower_clean = group_lower.lstrip("-")
+                    if group_lower_clean == clean_part:
+                        if group_info["original_case"] not in exact_matches:
+                            exact_matches.append(group_info["original_case"])
+                    elif group_lower_clean in clean_part or clean_part in group_lower_clean:
+                        if (
+                            group_info["original_case"] not in partial_matches
+                            and group_info["original_case"] not in exact_matches
+                        ):
+                            partial_matches.append(group_info["original_case"])
+    found_matches = exact_matches + partial_matches
+    if not found_matches:
+        for group_lower, group_info in group_to_site_map_lower.items():
+            if group_lower in name_lower and group_info["original_case"] not in found_matches:
+                found_matches.append(group_info["original_case"])
+    if found_matches:
+        if exact_matches:
+            return sorted(exact_matches, key=len)[0]
+        return sorted(found_matches, key=len, reverse=True)[0]
+    return None
+
+
+def build_groups(count, rng):
+    groups = {}
+    while len(groups) < count:
+        length = rng.randint(2, 10)
+        name = "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(length))
+        if rng.random() < 0.05:
+            name = "-" + name
+        groups[name.lower()] = {"original_case": name, "site": f"site{len(groups) % 40}"}
+    return groups
+
+
+def build_names(count, groups, rng):
+    originals = [info["original_case"] for info in groups.values()]
+    names = []
+    for i in range(count):
+        title = ".".join(
+            rng.choice(["The", "Movie", "Show", "S01", "E02", "2023", "BluRay", "WEB-DL", "x265"])
+            for _ in range(rng.randint(4, 9))
+        )
+        roll = rng.random()
+        if roll < 0.55:
+            names.append(f"{title}-{rng.choice(originals)}")
+        elif roll < 0.8:
+            names.append(f"{title}-{rng.choice(originals)}@{rng.choice(originals)}")
+        elif roll < 0.9:
+            names.append(f"[{title}]@{rng.choice(originals)}{rng.choice(['', 'book', 'X'])}")
+        else:
+            names.append(f"{title}-NOGROUP{i}")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--torrents", type=int, default=50000)
+    parser.add_argument("--groups", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    groups = build_groups(args.groups, rng)
+    names = build_names(args.torrents, groups, rng)
+
+    start = time.perf_counter()
+    matcher = GroupNameMatcher(groups)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_results = [matcher.match(name)[0] for name in names]
+    new_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_results = [legacy_find_torrent_group(name, groups) for name in names]
+    legacy_time = time.perf_counter() - start
+
+    mismatches = [
+        (name, old, new)
+        for name, old, new in zip(names, legacy_results, new_results)
+        if old != new
+    ]
+
+    print(f"种子数: {len(names)}, 官组数: {len(groups)}")
+    print(f"旧实现（逐官组扫描）: {legacy_time:.2f} s")
+    print(f"预编译匹配器: {new_time:.2f} s（构建 {build_time * 1000:.1f} ms）")
+    print(f"加速比: {legacy_time / new_time:.1f}x")
+    print(f"结果不一致: {len(mismatches)}")
+    for name, old, new in mismatches[:10]:
+        print(f"  {name!r}: 旧={old!r} 新={new!r}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# benchmarks/bench_html_parser.py
+"""
+HTML 解析后端基准测试：对比 BeautifulSoup 的 html.parser 与 lxml 后端（utils.html_soup.make_soup 的默认值）
+解析详情页/种子列表页的耗时与内存峰值，并校验迁移与列表抓取用到的选择器在两种后端下结果一致。
+
+页面来源：
+- --pages 指定目录时，读取其中保存的 *.html（从各站点浏览器“另存为”的详情页 details.php、列表页 torrents.php）
+- 未指定时生成一个 NexusPHP 风格的详情页和一个 100 行的种子列表页
+
+用法（在 server 目录下）：
+    python benchmarks/bench_html_parser.py [--pages DIR] [--repeat 20]
+"""
+
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+PARSERS = ["html.parser", "lxml"]
+
+
+def synthetic_details_page(torrent_id=12345, screenshots=12, mediainfo_lines=150):
+    mediainfo = "<br />\n".join(f"Field {i}{' ' * 20}: value {i}" for i in range(mediainfo_lines))
+    images = "\n".join(
+        f'<img src="https://img.example.com/{torrent_id}/{i}.png" alt="" /><br />' for i in range(screenshots)
+    )
+    rows = "\n".join(
+        f'<tr><td class="rowhead nowrap">字段{i}</td><td class="rowfollow">内容 {i} <a href="userdetails.php?id={i}">user{i}</a></td></tr>'
+        for i in range(40)
+    )
+    return f"""<!DOCTYPE html>
+<html><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8" /><title>种子详情</title></head>
+<body><table class="mainouter"><tr><td>
+<h1 id="top">Some.Movie.2023.1080p.BluRay.x264.DTS-GROUP&nbsp;&nbsp;&nbsp;<b>[<font class="free">免费</font>]</b></h1>
+<table width="97%" cellspacing="0" cellpadding="5">
+<tr><td class="rowhead">下载</td><td class="rowfollow"><a class="index" href="download.php?id={torrent_id}">[HDS].Some.Movie.torrent</a></td></tr>
+<tr><td class="rowhead">副标题</td><td class="rowfollow">某电影 / Some Movie | 中字</td></tr>
+<tr><td class="rowhead">基本信息</td><td class="rowfollow"><b>大小：</b>12.34 GB&nbsp;&nbsp;&nbsp;<b>类型:</b> Movies</td></tr>
+<tr><td class="rowhead">标签</td><td class="rowfollow"><span class="tags">官方</span><span class="tags">中字</span></td></tr>
+<tr><td class="rowhead">简介</td><td class="rowfollow"><div id="kdescr">
+<fieldset><legend>引用</legend>转载自 XXX，感谢原作者</fieldset>
+<img src="https://img.example.com/{torrent_id}/poster.jpg" /><br />
+◎译　　名　某电影<br />◎片　　名　Some Movie<br />◎年　　代　2023<br />
+{images}
+<div class="codetop">代码</div><div class="codemain">{mediainfo}</div>
+</div></td></tr>
+{rows}
+</table></td></tr></table></body></html>"""
+
+
+def synthetic_list_page(rows=100):
+    body = "\n".join(
+        f"""<tr><td class="rowfollow nowrap"><img class="c_movie" alt="Movies" /></td>
+<td class="rowfollow"><table class="torrentname"><tr><td class="embedded">
+<a title="Some.Show.S01E{i:02d}.1080p.WEB-DL" href="details.php?id={1000 + i}&amp;hit=1"><b>Some.Show.S01E{i:02d}.1080p.WEB-DL</b></a><br />副标题 {i}
+</td></tr></table></td>
+<td class="rowfollow">{i}<br />GB</td><td class="rowfollow">{i * 3}</td><td class="rowfollow">{i}</td></tr>"""
+        for i in range(rows)
+    )
+    return f"""<!DOCTYPE html><html><head><title>种子</title></head><body>
+<table class="torrents"><tr><td class="colhead">类型</td><td class="colhead">标题</td></tr>
+{body}
+</table></body></html>"""
+
+
+def probe(soup):
+    """迁移与列表抓取依赖的几个选择器的结果，用于比较两种后端的解析结果。"""
+    top = soup.select_one("h1#top")
+    descr = soup.select_one("div#kdescr")
+    download = soup.select_one('a.index[href^="download.php?id="]') or soup.select_one('a[href*="download.php?id="]')
+    main_table = soup.find("table", class_="torrents")
+    return {
+        "h1#top": top.get_text(" ", strip=True) if top else None,
+        "div#kdescr": " ".join(descr.get_text().split()) if descr else None,
+        "descr_imgs": len(descr.select("img")) if descr else None,
+        "download": download.get("href") if download else None,
+        "list_rows": len(main_table.find_all("tr", recursive=False)) if main_table else None,
+    }
+
+
+def measure(html, parser, repeat):
+    BeautifulSoup(html, parser)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        soup = BeautifulSoup(html, parser)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    soup = BeautifulSoup(html, parser)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, probe(soup)
+
+
+def load_pages(pages_dir):
+    if not pages_dir:
+        return [("synthetic-details", synthetic_details_page()), ("synthetic-list", synthetic_list_page())]
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html")) + glob.glob(os.path.join(pages_dir, "*.htm"))):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", help="保存的站点页面目录（*.html）")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    if not pages:
+        print(f"{args.pages} 中没有 .html 文件")
+        return
+
+    print(f"{'页面':<32}{'大小':>10}" + "".join(f"{name + ' ms':>16}{name + ' 峰值':>18}" for name in PARSERS) + f"{'加速':>8}  结果一致")
+    totals = {name: 0.0 for name in PARSERS}
+    mismatched = []
+    for name, html in pages:
+        results = {p: measure(html, p, args.repeat) for p in PARSERS}
+        for p in PARSERS:
+            totals[p] += results[p][0]
+        same = results["html.parser"][2] == results["lxml"][2]
+        if not same:
+            mismatched.append((name, results["html.parser"][2], results["lxml"][2]))
+        line = f"{name[:31]:<32}{len(html.encode()) / 1024:>8.0f}KB"
+        for p in PARSERS:
+            elapsed, peak, _ = results[p]
+            line += f"{elapsed * 1000:>16.2f}{peak / 1024 / 1024:>16.2f}MB"
+        line += f"{results['html.parser'][0] / results['lxml'][0]:>7.1f}x  {'是' if same else '否'}"
+        print(line)
+
+    print(f"\n合计: html.parser {totals['html.parser'] * 1000:.1f} ms, lxml {totals['lxml'] * 1000:.1f} ms")
+    for name, old, new in mismatched:
+        print(f"\n[{name}] 解析结果不同:")
+        for key in old:
+            if old[key] != new[key]:
+                print(f"  {key}:\n    html.parser: {str(old[key])[:200]}\n    lxml:        {str(new[key])[:200]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# benchmarks/bench_traffic_storage.py
+"""
+原始流量存储基准测试：对比 traffic_stats 表（SQLite，WAL + synchronous=NORMAL，与连接池设置相同）
+与段文件存储的写入和读取开销。
+
+按 DataTracker 的方式每 --flush-seconds 秒写入一批 1 秒级采样，统计：
+- 每次写入的耗时（平均 / P99）
+- 写放大：write() 系统调用写出的字节数（/proc/self/io 的 wchar）与落盘字节数（write_bytes）
+  相对采样本身大小（每条 5 个 64 位整数，40 字节）的倍数；以及最终占用的磁盘空间
+- 读取：最近 1 小时的分钟汇总、最近一条采样、/speed_data 回填最近 5 分钟速度的耗时
+
+用法（在 server 目录下）：
+    python benchmarks/bench_traffic_storage.py [--hours 48] [--downloaders 3] [--flush-seconds 60] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.traffic_store import SegmentRawTrafficStore, SqlRawTrafficStore  # noqa: E402
+
+SAMPLE_BYTES = 40
+
+
+def read_io_counters():
+    """返回 (wchar, write_bytes)；非 Linux 环境返回 None。"""
+    try:
+        with open("/proc/self/io") as f:
+            values = dict(line.split(": ") for line in f.read().splitlines())
+        return int(values["wchar"]), int(values["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def generate_batches(hours, downloader_ids, flush_seconds, rng):
+    """按 flush_seconds 切分的批次，每批是 SqlRawTrafficStore.write 接受的行。"""
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(hours=hours)
+    cumulative = {d: [rng.randint(1, 10**12), rng.randint(1, 10**12)] for d in downloader_ids}
+    batches, batch = [], []
+    t = start
+    while t < end:
+        ts = t.strftime("%Y-%m-%d %H:%M:%S")
+        for d in downloader_ids:
+            ul_speed, dl_speed = rng.randint(0, 5 * 2**20), rng.randint(0, 2**20)
+            cumulative[d][0] += ul_speed
+            cumulative[d][1] += dl_speed
+            batch.append((ts, d, 0, 0, ul_speed, dl_speed, cumulative[d][0], cumulative[d][1]))
+        t += timedelta(seconds=1)
+        if len(batch) >= flush_seconds * len(downloader_ids):
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    return batches, end
+
+
+def run_writes(store, cursor, commit, batches):
+    durations = []
+    io_before = read_io_counters()
+    for batch in batches:
+        start = time.perf_counter()
+        store.write(cursor, batch)
+        commit()
+        durations.append(time.perf_counter() - start)
+    io_after = read_io_counters()
+    io = None if io_before is None or io_after is None else (io_after[0] - io_before[0], io_after[1] - io_before[1])
+    durations.sort()
+    return {
+        "avg_ms": sum(durations) / len(durations) * 1000,
+        "p99_ms": durations[int(len(durations) * 0.99)] * 1000,
+        "io": io,
+    }
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_reads(store, cursor, downloader_ids, end, repeat):
+    hour_start = end - timedelta(hours=1)
+    return {
+        "minutes_ms": timed(lambda: [store.minute_summaries(cursor, d, hour_start, end) for d in downloader_ids],
+                            repeat),
+        "last_ms": timed(lambda: [store.last_sample(cursor, d, nonzero=True) for d in downloader_ids], repeat),
+        "recent_ms": timed(lambda: store.recent_speeds(cursor, end, 300 * len(downloader_ids)), repeat),
+    }
+
+
+def report(name, samples, writes, size, reads, cold_minutes_ms=None):
+    logical = samples * SAMPLE_BYTES
+    print(f"[{name}]")
+    print(f"  写入: 平均 {writes['avg_ms']:.2f} ms / 批, P99 {writes['p99_ms']:.2f} ms")
+    if writes["io"] is not None:
+        wchar, write_bytes = writes["io"]
+        print(f"  写放大: 系统调用 {wchar / logical:.2f}x ({wchar / samples:.1f} B/条), "
+              f"落盘 {write_bytes / logical:.2f}x ({write_bytes / samples:.1f} B/条)")
+    print(f"  磁盘占用: {size / 2**20:.1f} MiB ({size / samples:.1f} B/条)")
+    minutes = f"{reads['minutes_ms']:.2f} ms"
+    if cold_minutes_ms is not None:
+        minutes += f"（首次 {cold_minutes_ms:.2f} ms）"
+    print(f"  读取: 1 小时分钟汇总 {minutes}, 最近一条 {reads['last_ms']:.3f} ms, "
+          f"最近 5 分钟速度 {reads['recent_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=int, default=48)
+    parser.add_argument("--downloaders", type=int, default=3)
+    parser.add_argument("--flush-seconds", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    downloader_ids = [f"192.168.1.{i + 10}:8080" for i in range(args.downloaders)]
+    batches, end = generate_batches(args.hours, downloader_ids, args.flush_seconds, rng)
+    samples = sum(len(b) for b in batches)
+    print(f"{samples} 条采样（{args.hours} 小时 × {args.downloaders} 个下载器），"
+          f"每 {args.flush_seconds} 秒写入一批，共 {len(batches)} 批")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE traffic_stats (stat_datetime TEXT NOT NULL, downloader_id TEXT NOT NULL, "
+            "uploaded INTEGER DEFAULT 0, downloaded INTEGER DEFAULT 0, upload_speed INTEGER DEFAULT 0, "
+            "download_speed INTEGER DEFAULT 0, cumulative_uploaded INTEGER NOT NULL DEFAULT 0, "
+            "cumulative_downloaded INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+        )
+        conn.execute("CREATE INDEX idx_traffic_stats_downloader_time ON traffic_stats(downloader_id, stat_datetime)")
+        conn.commit()
+
+        sql_store = SqlRawTrafficStore("sqlite")
+        cursor = conn.cursor()
+        sql_writes = run_writes(sql_store, cursor, conn.commit, batches)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        sql_size = sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+        sql_reads = run_reads(sql_store, cursor, downloader_ids, end, args.repeat)
+        conn.close()
+
+        segments_dir = os.path.join(tmp, "segments")
+        segment_store = SegmentRawTrafficStore(segments_dir)
+        segment_writes = run_writes(segment_store, None, lambda: None, batches)
+        segment_size = directory_size(segments_dir)
+        # 新实例没有解码缓存，对应其它进程第一次读取
+        hour_start = end - timedelta(hours=1)
+        cold_store = SegmentRawTrafficStore(segments_dir)
+        cold_minutes_ms = timed(
+            lambda: [cold_store.minute_summaries(None, d, hour_start, end) for d in downloader_ids], 1)
+        segment_reads = run_reads(segment_store, None, downloader_ids, end, args.repeat)
+
+    report("traffic_stats (SQLite)", samples, sql_writes, sql_size, sql_reads)
+    report("段文件", samples, segment_writes, segment_size, segment_reads, cold_minutes_ms)
+    print(f"磁盘占用: 段文件为数据库的 {segment_size / sql_size:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
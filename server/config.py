@@ -21,6 +21,8 @@ def _resolve_runtime_paths():
 
     base_dir = os.getenv("PTNEXUS_BASE_DIR", default_base_dir)
     data_dir = os.getenv("PTNEXUS_DATA_DIR", default_data_dir)
+    # 进程间共享的小文件（实时速度环形缓冲区、种子索引变更日志、DataTracker 指标）优先放在 /dev/shm，不可用时退回数据目录
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else data_dir
 
     return {
         "base_dir": base_dir,
@@ -34,6 +36,24 @@ def _resolve_runtime_paths():
         ),
         "bdinfo_dir": os.getenv("PTNEXUS_BDINFO_DIR", os.path.join(base_dir, "bdinfo")),
         "static_dir": os.getenv("PTNEXUS_STATIC_DIR", os.path.join(base_dir, "dist")),
+        "speed_ring_file": os.getenv(
+            "PTNEXUS_SPEED_RING_FILE", os.path.join(shm_dir, "ptnexus_speed_ring.bin")
+        ),
+        "torrent_index_changelog_file": os.getenv(
+            "PTNEXUS_TORRENT_INDEX_CHANGELOG_FILE",
+            os.path.join(shm_dir, "ptnexus_torrent_index.changes"),
+        ),
+        "tracker_metrics_file": os.getenv(
+            "PTNEXUS_TRACKER_METRICS_FILE", os.path.join(shm_dir, "ptnexus_tracker_metrics.json")
+        ),
+        # 种子状态快照需要跨重启保留，放在数据目录
+        "torrent_snapshot_file": os.getenv(
+            "PTNEXUS_TORRENT_SNAPSHOT_FILE", os.path.join(data_dir, "torrent_snapshot.bin")
+        ),
+        # TRAFFIC_RAW_STORAGE=segments 时原始流量采样的段文件目录
+        "traffic_segments_dir": os.getenv(
+            "PTNEXUS_TRAFFIC_SEGMENTS_DIR", os.path.join(data_dir, "traffic_segments")
+        ),
     }
 
 
@@ -45,6 +65,11 @@ SITES_DATA_FILE = runtime_paths["sites_data_file"]
 GLOBAL_MAPPINGS = runtime_paths["global_mappings"]
 BDINFO_DIR = runtime_paths["bdinfo_dir"]
 STATIC_DIR = runtime_paths["static_dir"]
+SPEED_RING_FILE = runtime_paths["speed_ring_file"]
+TORRENT_INDEX_CHANGELOG_FILE = runtime_paths["torrent_index_changelog_file"]
+TRACKER_METRICS_FILE = runtime_paths["tracker_metrics_file"]
+TORRENT_SNAPSHOT_FILE = runtime_paths["torrent_snapshot_file"]
+TRAFFIC_SEGMENTS_DIR = runtime_paths["traffic_segments_dir"]
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -66,6 +91,8 @@ class ConfigManager:
         return {
             "downloaders": [],
             "realtime_speed_enabled": True,
+            # 种子增量同步（qB sync/maindata rid、TR recently-active），关闭后只在手动刷新时更新种子
+            "torrent_delta_sync_enabled": True,
             "auth": {"username": "admin", "password_hash": "", "must_change_password": True},
             "cookiecloud": {"url": "", "key": "", "e2e_password": ""},
             "cross_seed": {
@@ -122,6 +149,9 @@ class ConfigManager:
                 "query_interval_hours": 72,
                 "auto_query_enabled": True,
                 "tmp_dir": TEMP_DIR,
+                # 按 infohash 缓存的查询结果有效期（小时）：有辅种 / 无辅种
+                "result_cache_hours": 168,
+                "negative_cache_hours": 24,
             },
             # --- [新增] 源站点优先级设置 ---
             "source_priority": [],
@@ -195,6 +225,10 @@ class ConfigManager:
                         self._config["iyuu_settings"]["query_interval_hours"] = 72
                     if "auto_query_enabled" not in self._config["iyuu_settings"]:
                         self._config["iyuu_settings"]["auto_query_enabled"] = True
+                    if "result_cache_hours" not in self._config["iyuu_settings"]:
+                        self._config["iyuu_settings"]["result_cache_hours"] = 168
+                    if "negative_cache_hours" not in self._config["iyuu_settings"]:
+                        self._config["iyuu_settings"]["negative_cache_hours"] = 24
                     if (
                         "tmp_dir" not in self._config["iyuu_settings"]
                         or not self._config["iyuu_settings"]["tmp_dir"]
@@ -305,10 +339,45 @@ class ConfigManager:
             return False
 
 
+def _get_db_pool_config():
+    """数据库连接池参数，可通过 DB_POOL_* 环境变量覆盖。"""
+    defaults = {"max_size": 10, "idle_timeout": 300, "checkout_timeout": 30}
+    pool_config = {}
+    for key, default in defaults.items():
+        env_name = f"DB_POOL_{key.upper()}"
+        try:
+            pool_config[key] = int(os.getenv(env_name, default))
+        except (ValueError, TypeError):
+            logging.warning(f"{env_name} 不是有效的整数，使用默认值 {default}")
+            pool_config[key] = default
+    return pool_config
+
+
+def _get_slow_query_ms():
+    """慢查询记录阈值（毫秒），可通过 DB_SLOW_QUERY_MS 环境变量覆盖，0 表示关闭。"""
+    try:
+        return max(0, int(os.getenv("DB_SLOW_QUERY_MS", 200)))
+    except (ValueError, TypeError):
+        logging.warning("DB_SLOW_QUERY_MS 不是有效的整数，使用默认值 200")
+        return 200
+
+
+def _get_traffic_storage_config():
+    """原始流量采样的存储方式，TRAFFIC_RAW_STORAGE=database（默认，traffic_stats 表）或 segments（段文件）。"""
+    raw = os.getenv("TRAFFIC_RAW_STORAGE", "database").lower()
+    if raw not in ("database", "segments"):
+        logging.warning(f"无效的 TRAFFIC_RAW_STORAGE 值: '{raw}'，使用 database")
+        raw = "database"
+    return {"raw": raw, "segments_dir": TRAFFIC_SEGMENTS_DIR}
+
+
 # ... (文件其余部分 get_db_config 和 config_manager 实例保持不变) ...
 def get_db_config():
     """根据环境变量 DB_TYPE 显式选择数据库。"""
     db_choice = os.getenv("DB_TYPE", "sqlite").lower()
+    pool_config = _get_db_pool_config()
+    slow_query_ms = _get_slow_query_ms()
+    traffic_storage = _get_traffic_storage_config()
 
     if db_choice == "mysql":
         logging.info("数据库类型选择为 MySQL。正在检查相关环境变量...")
@@ -328,7 +397,8 @@ def get_db_config():
             logging.error(f"关键错误: MYSQL_PORT ('{mysql_config['port']}') 不是一个有效的整数！")
             sys.exit(1)
         logging.info("MySQL 配置验证通过。")
-        return {"db_type": "mysql", "mysql": mysql_config}
+        return {"db_type": "mysql", "mysql": mysql_config, "pool": pool_config, "slow_query_ms": slow_query_ms,
+                "traffic_storage": traffic_storage}
 
     elif db_choice == "postgresql":
         logging.info("数据库类型选择为 PostgreSQL。正在检查相关环境变量...")
@@ -350,17 +420,20 @@ def get_db_config():
             )
             sys.exit(1)
         logging.info("PostgreSQL 配置验证通过。")
-        return {"db_type": "postgresql", "postgresql": postgresql_config}
+        return {"db_type": "postgresql", "postgresql": postgresql_config, "pool": pool_config, "slow_query_ms": slow_query_ms,
+                "traffic_storage": traffic_storage}
 
     elif db_choice == "sqlite":
         logging.info("数据库类型选择为 SQLite。")
         db_path = os.path.join(DATA_DIR, "pt_stats.db")
-        return {"db_type": "sqlite", "path": db_path}
+        return {"db_type": "sqlite", "path": db_path, "pool": pool_config, "slow_query_ms": slow_query_ms,
+                "traffic_storage": traffic_storage}
 
     else:
         logging.warning(f"无效的 DB_TYPE 值: '{db_choice}'。将回退到使用 SQLite。")
         db_path = os.path.join(DATA_DIR, "pt_stats.db")
-        return {"db_type": "sqlite", "path": db_path}
+        return {"db_type": "sqlite", "path": db_path, "pool": pool_config, "slow_query_ms": slow_query_ms,
+                "traffic_storage": traffic_storage}
 
 
 config_manager = ConfigManager()
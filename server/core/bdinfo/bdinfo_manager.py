@@ -15,6 +15,8 @@ from datetime import datetime
 from queue import PriorityQueue, Empty
 from typing import Dict, Optional, List, Tuple
 
+from utils.proxy_client import get_proxy_client
+
 
 class BDInfoTask:
     """BDInfo 任务类"""
@@ -277,7 +279,7 @@ class BDInfoManager:
                 # 不传递 callback_url，使用轮询模式
             }
 
-            response = requests.post(
+            response = get_proxy_client().post(
                 url, json=payload, timeout=10
             )  # 减少超时时间，因为现在立即返回
 
@@ -424,7 +426,7 @@ class BDInfoManager:
         }
 
         try:
-            response = requests.post(
+            response = get_proxy_client().post(
                 url, json=payload, timeout=10
             )  # 减少超时时间，因为现在立即返回
             if response.status_code != 200:
@@ -496,7 +498,7 @@ class BDInfoManager:
         while time.time() - start_time < timeout:
             try:
                 # 轮询进度
-                response = requests.get(progress_url, timeout=10)
+                response = get_proxy_client().get(progress_url, timeout=10)
 
                 if response.status_code == 200:
                     progress_data = response.json()
@@ -641,7 +643,7 @@ class BDInfoManager:
         payload = {"remote_path": task.save_path, "task_id": task.id}
 
         # 发起请求，这会阻塞直到完成
-        response = requests.post(url, json=payload, timeout=600)  # 10分钟超时
+        response = get_proxy_client().post(url, json=payload, timeout=600)  # 10分钟超时
 
         if response.status_code == 200:
             data = response.json()
@@ -1168,8 +1170,6 @@ class BDInfoManager:
         retry_delay = 1  # 秒
 
         for attempt in range(max_retries):
-            conn = None
-            cursor = None
             try:
                 # 导入数据库管理器
                 from database import DatabaseManager
@@ -1201,74 +1201,74 @@ class BDInfoManager:
                 if error_message:
                     updates["bdinfo_error"] = error_message
 
-                # 更新数据库 - 使用 id 字段而不是 seed_id
-                conn = db_manager._get_connection()
-                cursor = db_manager._get_cursor(conn)
-
-                # seed_id 格式为 "hash_torrentId_siteName"，需要解析
-                if "_" in seed_id:
-                    # 解析复合 seed_id
-                    parts = seed_id.split("_")
-                    if len(parts) >= 3:
-                        # 最后一个部分是 site_name，中间是 torrent_id，前面是 hash
-                        site_name_val = parts[-1]
-                        torrent_id_val = parts[-2]
-                        hash_val = "_".join(parts[:-2])  # hash 可能包含下划线
-
-                        # 仅使用hash作为主键更新
-                        if db_manager.db_type == "sqlite":
-                            set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
-                            values = list(updates.values()) + [hash_val]
-                            sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = ?"
-                            cursor.execute(sql, values)
-                        else:
-                            set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
-                            values = list(updates.values()) + [hash_val]
-                            sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = %s"
-                            cursor.execute(sql, values)
-                    else:
-                        # 如果格式不对，尝试使用 CONCAT 查询，但只提取hash部分
-                        if db_manager.db_type == "sqlite":
-                            cursor.execute(
-                                "SELECT hash FROM seed_parameters WHERE hash || '_' || torrent_id || '_' || site_name = ?",
-                                (seed_id,),
-                            )
-                        else:
-                            cursor.execute(
-                                "SELECT hash FROM seed_parameters WHERE CONCAT(hash, '_', torrent_id, '_', site_name) = %s",
-                                (seed_id,),
-                            )
-
-                        result = cursor.fetchone()
-                        if result:
-                            hash_val = result[0]
-                            # 仅使用hash作为主键更新
-                            if db_manager.db_type == "sqlite":
-                                set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
-                                values = list(updates.values()) + [hash_val]
-                                sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = ?"
+                # 更新数据库 - 使用 id 字段而不是 seed_id（连接取自连接池，退出时自动归还）
+                with db_manager.connection() as conn:
+                    cursor = db_manager._get_cursor(conn)
+                    try:
+                        # seed_id 格式为 "hash_torrentId_siteName"，需要解析
+                        if "_" in seed_id:
+                            # 解析复合 seed_id
+                            parts = seed_id.split("_")
+                            if len(parts) >= 3:
+                                # 最后一个部分是 site_name，中间是 torrent_id，前面是 hash
+                                site_name_val = parts[-1]
+                                torrent_id_val = parts[-2]
+                                hash_val = "_".join(parts[:-2])  # hash 可能包含下划线
+
+                                # 仅使用hash作为主键更新
+                                if db_manager.db_type == "sqlite":
+                                    set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
+                                    values = list(updates.values()) + [hash_val]
+                                    sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = ?"
+                                    cursor.execute(sql, values)
+                                else:
+                                    set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
+                                    values = list(updates.values()) + [hash_val]
+                                    sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = %s"
+                                    cursor.execute(sql, values)
                             else:
-                                set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
-                                values = list(updates.values()) + [hash_val]
-                                sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = %s"
-                else:
-                    # 如果没有下划线，说明格式不对，记录错误
-                    logging.error(f"无效的 seed_id 格式: {seed_id}")
-                    raise ValueError(f"Invalid seed_id format: {seed_id}")
+                                # 如果格式不对，尝试使用 CONCAT 查询，但只提取hash部分
+                                if db_manager.db_type == "sqlite":
+                                    cursor.execute(
+                                        "SELECT hash FROM seed_parameters WHERE hash || '_' || torrent_id || '_' || site_name = ?",
+                                        (seed_id,),
+                                    )
+                                else:
+                                    cursor.execute(
+                                        "SELECT hash FROM seed_parameters WHERE CONCAT(hash, '_', torrent_id, '_', site_name) = %s",
+                                        (seed_id,),
+                                    )
+
+                                result = cursor.fetchone()
+                                if result:
+                                    hash_val = result[0]
+                                    # 仅使用hash作为主键更新
+                                    if db_manager.db_type == "sqlite":
+                                        set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
+                                        values = list(updates.values()) + [hash_val]
+                                        sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = ?"
+                                    else:
+                                        set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
+                                        values = list(updates.values()) + [hash_val]
+                                        sql = f"UPDATE seed_parameters SET {set_clause} WHERE hash = %s"
+                        else:
+                            # 如果没有下划线，说明格式不对，记录错误
+                            logging.error(f"无效的 seed_id 格式: {seed_id}")
+                            raise ValueError(f"Invalid seed_id format: {seed_id}")
 
-                conn.commit()
+                        conn.commit()
+                        updated_rows = cursor.rowcount
+                    finally:
+                        cursor.close()
 
                 # 检查是否实际更新了记录
-                if cursor.rowcount == 0:
+                if updated_rows == 0:
                     # 如果是第一次尝试且没有找到记录，可能是时机问题，等待一段时间后重试
                     if attempt < max_retries - 1:
                         time.sleep(retry_delay)
                         retry_delay *= 2  # 指数退避
                         continue
 
-                cursor.close()
-                conn.close()
-
                 logging.info(f"已更新 BDInfo 任务状态: seed_id={seed_id}, status={status}")
 
                 # 如果更新成功，跳出循环
@@ -1280,19 +1280,6 @@ class BDInfoManager:
                     exc_info=True,
                 )
 
-                # 清理资源
-                if cursor:
-                    try:
-                        cursor.close()
-                    except:
-                        pass
-                if conn:
-                    try:
-                        conn.rollback()
-                        conn.close()
-                    except:
-                        pass
-
                 # 如果是最后一次尝试，添加到重试队列
                 if attempt == max_retries - 1:
                     self._add_to_retry_queue(seed_id, status, task_id, **kwargs)
@@ -8,7 +8,7 @@ import requests
 import urllib.parse
 
 # 导入自定义工具函数
-from utils import handle_incomplete_links, search_by_subtitle, normalize_imdb_link
+from utils import handle_incomplete_links, search_by_subtitle, normalize_imdb_link, make_soup
 from utils.content_filter import get_content_filter, get_unwanted_image_urls
 from config import GLOBAL_MAPPINGS
 from .sites.audiences import AudiencesSpecialExtractor
@@ -263,12 +263,7 @@ class Extractor:
             )
             corrected_descr_html = re.sub(r"(<img[^>]*[^/])>", r"\1 />", corrected_descr_html)
 
-            try:
-                from bs4 import BeautifulSoup as BS
-
-                descr_container_soup = BS(corrected_descr_html, "lxml")
-            except ImportError:
-                descr_container_soup = BS(corrected_descr_html, "html.parser")
+            descr_container_soup = make_soup(corrected_descr_html)
 
             bbcode = self._html_to_bbcode(descr_container_soup)
 
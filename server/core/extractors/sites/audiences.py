@@ -7,8 +7,7 @@ Audiences特殊站点种子详情参数提取器
 import re
 import os
 import yaml
-from bs4 import BeautifulSoup
-from utils import extract_tags_from_mediainfo, extract_origin_from_description
+from utils import extract_tags_from_mediainfo, extract_origin_from_description, make_soup
 from config import TEMP_DIR, GLOBAL_MAPPINGS
 
 # 加载内容过滤配置
@@ -187,8 +186,7 @@ class AudiencesSpecialExtractor:
                         quote_content += str(child)
 
                 # 清理引用内容
-                quote_text = BeautifulSoup(quote_content,
-                                           "html.parser").get_text().strip()
+                quote_text = make_soup(quote_content).get_text().strip()
                 if quote_text:
                     # 过滤掉不需要的声明和信息
                     if not self._is_unwanted_declaration(quote_text):
@@ -218,7 +216,7 @@ class AudiencesSpecialExtractor:
             flags=re.DOTALL)
 
         # 清理HTML标签获取纯文本
-        body_soup = BeautifulSoup(body_content, "html.parser")
+        body_soup = make_soup(body_content)
         body = body_soup.get_text().strip()
 
         # 过滤掉ARUTU相关工具的声明信息
@@ -7,8 +7,7 @@ HDDolby特殊站点种子详情参数提取器
 import re
 import os
 import yaml
-from bs4 import BeautifulSoup
-from utils import extract_origin_from_description
+from utils import extract_origin_from_description, make_soup
 from config import GLOBAL_MAPPINGS
 
 # 加载内容过滤配置
@@ -99,7 +98,7 @@ class HDDolbySpecialExtractor:
                         quote_content += str(child)
 
                 # 清理引用内容
-                quote_soup = BeautifulSoup(quote_content, "html.parser")
+                quote_soup = make_soup(quote_content)
                 quote_text = quote_soup.get_text().strip()
 
                 if quote_text:
@@ -128,7 +127,7 @@ class HDDolbySpecialExtractor:
             body_content = re.sub(r'<div[^>]*id="ad_torrentdetail"[^>]*>.*?</div>', "", body_content, flags=re.DOTALL)
 
             # 清理HTML标签获取纯文本
-            body_soup = BeautifulSoup(body_content, "html.parser")
+            body_soup = make_soup(body_content)
             body = body_soup.get_text().strip()
 
             # 过滤掉不需要的声明信息
@@ -1,8 +1,7 @@
 import re
 import os
 import yaml
-from bs4 import BeautifulSoup
-from utils import extract_tags_from_mediainfo, extract_origin_from_description, normalize_douban_link, normalize_imdb_link
+from utils import extract_tags_from_mediainfo, extract_origin_from_description, normalize_douban_link, normalize_imdb_link, make_soup
 from utils import validate_media_info_format
 from config import GLOBAL_MAPPINGS
 
@@ -171,7 +170,7 @@ class SSDSpecialExtractor:
                 content_html = re.sub(r"</span>", "[/color]", content_html, flags=re.IGNORECASE)
 
                 # 5. 清理剩余 HTML
-                temp_soup = BeautifulSoup(content_html, "html.parser")
+                temp_soup = make_soup(content_html)
                 material_content = temp_soup.get_text()
 
                 # 6. 后期清理
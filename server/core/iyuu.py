@@ -2,12 +2,19 @@
 import logging
 import time
 import os
+import random
 import requests
 import json
 import hashlib
-from threading import Thread, Event
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from threading import Thread, Event, Lock
 from collections import defaultdict
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+
+from config import DATA_DIR
+from core.torrent_index import notify_torrents_changed
 
 
 class IYUUThread(Thread):
@@ -326,6 +333,9 @@ class IYUUThread(Thread):
             'sites_found': []
         }
 
+        # finally 中写回，未创建时为 None
+        last_check_batcher = None
+        result_cache = None
         try:
             # 获取IYUU token
             config = self.config_manager.get()
@@ -369,6 +379,9 @@ class IYUUThread(Thread):
             # 处理所有种子组
             test_torrents = list(agg_torrents.items())
 
+            # 只需更新查询时间的种子组（无支持站点、无匹配结果）攒批写回
+            last_check_batcher = IyuuLastCheckBatcher(self.db_manager)
+
             # 获取总种子组数
             total_torrents = len(test_torrents)
 
@@ -389,18 +402,27 @@ class IYUUThread(Thread):
             skipped_interval_count = 0
             skipped_no_supported_count = 0
 
+            # 非强制查询时，一次性读取所有种子组的上次查询时间，代替逐组查询数据库
+            query_interval_hours = config.get("iyuu_settings", {}).get(
+                "query_interval_hours", 72)
+            last_checks = None
+            if not force_query:
+                last_checks = self._load_iyuu_last_checks(
+                    [name for name, _ in test_torrents])
+
             for i, (name, torrents) in enumerate(test_torrents):
                 if not self._is_running:  # 检查线程是否应该停止
                     break
 
                 # 如果不是强制查询，则检查时间间隔
                 if not force_query:
-                    config = self.config_manager.get()
-                    iyuu_settings = config.get("iyuu_settings", {})
-                    query_interval_hours = iyuu_settings.get(
-                        "query_interval_hours", 72)
-
-                    if not self._should_query_iyuu(name, query_interval_hours):
+                    if last_checks is not None:
+                        should_query = self._is_iyuu_check_due(
+                            last_checks.get(name), query_interval_hours)
+                    else:
+                        should_query = self._should_query_iyuu(
+                            name, query_interval_hours)
+                    if not should_query:
                         skipped_interval_count += 1
                         continue
 
@@ -426,7 +448,7 @@ class IYUUThread(Thread):
                 # 如果没有支持的站点，则跳过
                 if not filtered_torrents:
                     skipped_no_supported_count += 1
-                    self._update_iyuu_last_check(name, [], all_torrents_for_name)
+                    last_check_batcher.add(name)
                     continue
 
                 total_attempts = min(3, len(priority_hashes))
@@ -444,10 +466,22 @@ class IYUUThread(Thread):
                 }
                 ordered_group_names.append(name)
 
-            # 批量查询：每次最多200个hash
+            # 按 infohash 缓存的查询结果，只请求没有缓存或已过期的 hash
+            iyuu_settings = config.get("iyuu_settings", {})
+            result_cache = IYUUResultCache(
+                DATA_DIR,
+                ttl_hours=iyuu_settings.get("result_cache_hours", 168),
+                negative_ttl_hours=iyuu_settings.get("negative_cache_hours",
+                                                     24))
+            result_cache.load(sid_sha1)
+            cached_hash_count = 0
+
+            # 批量查询：每次最多200个hash，最多 batch_concurrency 个批次同时请求
             max_hashes_per_request = 200
+            batch_concurrency = _env_number("IYUU_BATCH_CONCURRENCY",
+                                            IYUU_BATCH_CONCURRENCY_DEFAULT, int)
             log_iyuu_message(
-                f"批量查询模式：每批最多 {max_hashes_per_request} 个hash，最多尝试3个hash",
+                f"批量查询模式：每批最多 {max_hashes_per_request} 个hash，并发 {batch_concurrency} 批，最多尝试3个hash",
                 "INFO")
             log_iyuu_message(
                 f"待查询种子组: {len(ordered_group_names)}（跳过：间隔未到 {skipped_interval_count}，无支持站点 {skipped_no_supported_count}）",
@@ -484,46 +518,70 @@ class IYUUThread(Thread):
                 if not hash_to_groups:
                     continue
 
-                unique_hashes = list(hash_to_groups.keys())
+                # 先用缓存结果，剩下的 hash 再请求 API
+                combined_results = {}
+                unique_hashes = []
+                for h_lower in hash_to_groups:
+                    cached_results = result_cache.get(h_lower)
+                    if cached_results is None:
+                        unique_hashes.append(h_lower)
+                    else:
+                        combined_results[h_lower] = cached_results
+                cached_hash_count += len(combined_results)
+
                 total_batches = (len(unique_hashes) + max_hashes_per_request -
                                  1) // max_hashes_per_request
                 groups_in_attempt = sum(
                     len(group_names) for group_names in hash_to_groups.values())
                 log_iyuu_message(
-                    f"批量查询 attempt {attempt+1}/3: {groups_in_attempt} 个种子组，{len(unique_hashes)} 个hash，共 {total_batches} 批",
+                    f"批量查询 attempt {attempt+1}/3: {groups_in_attempt} 个种子组，缓存命中 {len(combined_results)} 个hash，"
+                    f"需请求 {len(unique_hashes)} 个hash，共 {total_batches} 批",
                     "INFO")
 
-                combined_results = {}
-                for batch_index, batch_hashes in enumerate(
-                        chunk_list(unique_hashes, max_hashes_per_request),
-                        start=1):
+                def run_batch(batch_hashes):
                     if not self._is_running:
-                        break
+                        return batch_hashes, {}, 0.0
                     batch_start = time.time()
                     batch_results = query_cross_seed_batch(
                         iyuu_token, batch_hashes, sid_sha1)
-                    combined_results.update(batch_results or {})
-                    batch_cost = time.time() - batch_start
-
-                    hit_hashes = [
-                        h for h in batch_hashes
-                        if (batch_results or {}).get(h, [])
-                    ]
-                    hit_hash_count = len(hit_hashes)
-                    miss_hash_count = len(batch_hashes) - hit_hash_count
-
-                    groups_total = sum(
-                        len(hash_to_groups.get(h, [])) for h in batch_hashes)
-                    groups_hit = sum(
-                        len(hash_to_groups.get(h, [])) for h in hit_hashes)
-                    groups_miss = groups_total - groups_hit
+                    return batch_hashes, batch_results or {}, time.time() - batch_start
+
+                # 多个批次并发请求，请求频率由共享客户端的令牌桶控制
+                with ThreadPoolExecutor(
+                        max_workers=max(1, min(batch_concurrency,
+                                               total_batches)),
+                        thread_name_prefix="iyuu-batch") as executor:
+                    batch_outputs = executor.map(
+                        run_batch,
+                        list(chunk_list(unique_hashes, max_hashes_per_request)))
+                    for batch_index, (batch_hashes, batch_results,
+                                      batch_cost) in enumerate(batch_outputs,
+                                                               start=1):
+                        combined_results.update(batch_results)
+                        for h_lower, results in batch_results.items():
+                            result_cache.put(h_lower, results)
+
+                        hit_hashes = [
+                            h for h in batch_hashes if batch_results.get(h, [])
+                        ]
+                        hit_hash_count = len(hit_hashes)
+                        miss_hash_count = len(batch_hashes) - hit_hash_count
+
+                        groups_total = sum(
+                            len(hash_to_groups.get(h, [])) for h in batch_hashes)
+                        groups_hit = sum(
+                            len(hash_to_groups.get(h, [])) for h in hit_hashes)
+                        groups_miss = groups_total - groups_hit
+
+                        log_iyuu_message(
+                            f"批量查询 attempt {attempt+1}/3, batch {batch_index}/{total_batches}: "
+                            f"hash 命中 {hit_hash_count} 未命中 {miss_hash_count} / {len(batch_hashes)}；"
+                            f"种子组 命中 {groups_hit} 未命中 {groups_miss} / {groups_total}；"
+                            f"耗时 {batch_cost:.2f}s",
+                            "INFO")
 
-                    log_iyuu_message(
-                        f"批量查询 attempt {attempt+1}/3, batch {batch_index}/{total_batches}: "
-                        f"hash 命中 {hit_hash_count} 未命中 {miss_hash_count} / {len(batch_hashes)}；"
-                        f"种子组 命中 {groups_hit} 未命中 {groups_miss} / {groups_total}；"
-                        f"耗时 {batch_cost:.2f}s",
-                        "INFO")
+                if not self._is_running:
+                    break
 
                 # 根据本次结果更新每个种子组状态
                 for h_lower, group_names in hash_to_groups.items():
@@ -657,6 +715,10 @@ class IYUUThread(Thread):
                 torrent_size_for_update = None
                 if isinstance(selected_torrent, dict):
                     torrent_size_for_update = selected_torrent.get('size')
+                if not matched_sites:
+                    # 没有需要填入的详情链接，只更新查询时间
+                    last_check_batcher.add(name, torrent_size_for_update)
+                    continue
                 updated_rows, filled_details_count = self._update_iyuu_last_check(
                     name,
                     matched_sites,
@@ -669,8 +731,10 @@ class IYUUThread(Thread):
                         f"种子组 '{name}': 新增 {new_count}，更新 {updated_rows}（详情 {filled_details_count}）",
                         "INFO")
 
+            last_check_batcher.flush()
             log_iyuu_message(
                 f"批量查询完成：种子组 {len(ordered_group_names)}，有结果 {groups_with_results}，无结果 {groups_without_results}，"
+                f"缓存命中 {cached_hash_count} 个hash，"
                 f"匹配到已存在站点 {groups_with_matched_sites}；新增记录 {result_stats['new_records']}，更新记录 {result_stats['updated_records']}",
                 "INFO")
 
@@ -679,6 +743,69 @@ class IYUUThread(Thread):
         except Exception as e:
             logging.error(f"IYUU搜索执行出错: {e}", exc_info=True)
             return result_stats if return_stats else None
+        finally:
+            # 中途停止或出错时也写回已完成种子组的查询时间
+            if last_check_batcher is not None:
+                last_check_batcher.flush()
+            if result_cache is not None:
+                result_cache.save()
+
+    @staticmethod
+    def _is_iyuu_check_due(last_check, query_interval_hours=72):
+        """根据上次查询时间判断是否需要查询（从未查询过或超过设置的时间间隔）"""
+        # 如果从未查询过，则应该查询
+        if not last_check:
+            return True
+
+        # 处理不同的时间格式
+        try:
+            if isinstance(last_check, str):
+                # 尝试解析常见的日期时间格式
+                last_check = datetime.strptime(last_check, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            # 如果解析失败，假设需要重新查询
+            return True
+
+        # 如果超过设置的时间间隔，则应该查询
+        return datetime.now() - last_check > timedelta(hours=query_interval_hours)
+
+    def _load_iyuu_last_checks(self, torrent_names, chunk_size=500):
+        """批量读取种子组最近一次的iyuu_last_check时间
+
+        按 name IN (...) 分块查询（走 idx_torrents_name_size_sites 索引），返回 {name: last_check}，
+        从未查询过的种子组不在结果中；出错时返回 None，由调用方退回逐组查询。
+        """
+        names = list(dict.fromkeys(torrent_names))
+        last_checks = {}
+        if not names:
+            return last_checks
+
+        conn = None
+        cursor = None
+        try:
+            conn = self.db_manager._get_connection()
+            cursor = self.db_manager._get_cursor(conn)
+            ph = self.db_manager.get_placeholder()
+            for idx in range(0, len(names), chunk_size):
+                chunk = names[idx:idx + chunk_size]
+                cursor.execute(
+                    f"SELECT name, MAX(iyuu_last_check) AS last_check FROM torrents "
+                    f"WHERE name IN ({', '.join([ph] * len(chunk))}) GROUP BY name",
+                    tuple(chunk))
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    if row['last_check']:
+                        last_checks[row['name']] = row['last_check']
+            return last_checks
+        except Exception as e:
+            logging.error(f"批量读取IYUU查询时间时出错，改为逐个检查: {e}",
+                          exc_info=True)
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
 
     def _should_query_iyuu(self, torrent_name, query_interval_hours=72):
         """检查是否需要进行IYUU查询（根据设置的时间间隔或从未查询过）"""
@@ -688,43 +815,14 @@ class IYUUThread(Thread):
             ph = self.db_manager.get_placeholder()
 
             # 查询该种子最近一次的iyuu_last_check时间
-            if self.db_manager.db_type == "postgresql":
-                cursor.execute(
-                    f"SELECT MAX(iyuu_last_check) as last_check FROM torrents WHERE name = {ph}",
-                    (torrent_name, ))
-            else:
-                cursor.execute(
-                    f"SELECT MAX(iyuu_last_check) as last_check FROM torrents WHERE name = {ph}",
-                    (torrent_name, ))
+            cursor.execute(
+                f"SELECT MAX(iyuu_last_check) as last_check FROM torrents WHERE name = {ph}",
+                (torrent_name, ))
 
             result = cursor.fetchone()
-            last_check_str = result['last_check'] if isinstance(
+            last_check = result['last_check'] if isinstance(
                 result, dict) else (result[0] if result else None)
-
-            # 如果从未查询过，则应该查询
-            if not last_check_str:
-                return True
-
-            # 解析上次查询时间
-            from datetime import datetime, timedelta
-            # 处理不同的时间格式
-            try:
-                if isinstance(last_check_str, str):
-                    # 尝试解析常见的日期时间格式
-                    last_check = datetime.strptime(last_check_str,
-                                                   "%Y-%m-%d %H:%M:%S")
-                else:
-                    last_check = last_check_str
-            except ValueError:
-                # 如果解析失败，假设需要重新查询
-                return True
-
-            # 计算距离现在的时间差
-            now = datetime.now()
-            time_diff = now - last_check
-
-            # 如果超过设置的时间间隔，则应该查询
-            return time_diff > timedelta(hours=query_interval_hours)
+            return self._is_iyuu_check_due(last_check, query_interval_hours)
 
         except Exception as e:
             logging.error(f"检查IYUU查询条件时出错: {e}", exc_info=True)
@@ -774,6 +872,7 @@ class IYUUThread(Thread):
 
             updated_count = 0
             filled_details_count = 0
+            filled_hashes = set()
 
             # 为每条记录更新iyuu_last_check时间，并为没有details的记录填入详情链接
             for record in existing_records:
@@ -796,6 +895,7 @@ class IYUUThread(Thread):
                     update_params.append(matched_site['url'])
                     update_fields.append(f"details = {ph}")
                     filled_details_count += 1
+                    filled_hashes.add(hash_value)
 
                 # 添加WHERE条件参数
                 if torrent_size is not None:
@@ -826,6 +926,8 @@ class IYUUThread(Thread):
                 updated_count += cursor.rowcount
 
             conn.commit()
+            # iyuu_last_check 不在种子聚合索引中，只有填入详情链接的记录需要通知
+            notify_torrents_changed(self.db_manager, filled_hashes)
             return updated_count, filled_details_count
 
         except Exception as e:
@@ -907,6 +1009,7 @@ class IYUUThread(Thread):
                 return None
 
             # 为每个缺失的站点添加记录
+            inserted_hashes = set()
             for site_name in missing_sites:
                 # 找到该站点的匹配信息
                 matched_site = next(
@@ -929,6 +1032,7 @@ class IYUUThread(Thread):
                 unique_string = f"{torrent_data['hash']}_{site_name}_{current_time}"
                 new_hash = hashlib.sha1(
                     unique_string.encode('utf-8')).hexdigest()
+                inserted_hashes.add(new_hash)
 
                 if self.db_manager.db_type == "postgresql":
                     cursor.execute(
@@ -966,6 +1070,7 @@ class IYUUThread(Thread):
                         ))
 
             conn.commit()
+            notify_torrents_changed(self.db_manager, inserted_hashes)
 
             # 返回统计信息
             if return_count:
@@ -1120,13 +1225,257 @@ class IYUUThread(Thread):
         self.shutdown_event.set()
 
 
+class IyuuLastCheckBatcher:
+    """iyuu_last_check 的写回批处理器
+
+    只需更新查询时间的种子组先记在内存中，攒够 chunk_size 组或调用 flush() 时
+    在一个事务里批量更新：不限大小的按 name IN (...) 更新，限定大小的按 (name, size) executemany。
+    查询时间取写回时的时间。
+    """
+
+    def __init__(self, db_manager, chunk_size=500):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+        self._names = []  # 更新所有同名记录
+        self._name_sizes = []  # 只更新同名且大小相同的记录
+        self.updated_rows = 0
+
+    def add(self, torrent_name, torrent_size=None):
+        if torrent_size is None:
+            self._names.append(torrent_name)
+        else:
+            self._name_sizes.append((torrent_name, torrent_size))
+        if len(self._names) + len(self._name_sizes) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """写回已记下的种子组，返回更新的行数；出错时丢弃本批（下次任务会重新查询这些种子组）。"""
+        names, name_sizes = self._names, self._name_sizes
+        self._names, self._name_sizes = [], []
+        if not names and not name_sizes:
+            return 0
+
+        conn = None
+        cursor = None
+        updated = 0
+        try:
+            conn = self.db_manager._get_connection()
+            cursor = self.db_manager._get_cursor(conn)
+            ph = self.db_manager.get_placeholder()
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            unique_names = list(dict.fromkeys(names))
+            for idx in range(0, len(unique_names), self.chunk_size):
+                chunk = unique_names[idx:idx + self.chunk_size]
+                cursor.execute(
+                    f"UPDATE torrents SET iyuu_last_check = {ph} "
+                    f"WHERE name IN ({', '.join([ph] * len(chunk))})",
+                    (current_time, *chunk))
+                updated += max(cursor.rowcount or 0, 0)
+            if name_sizes:
+                cursor.executemany(
+                    f"UPDATE torrents SET iyuu_last_check = {ph} WHERE name = {ph} AND size = {ph}",
+                    [(current_time, name, size) for name, size in dict.fromkeys(name_sizes)])
+                updated += max(cursor.rowcount or 0, 0)
+
+            conn.commit()
+            self.updated_rows += updated
+            return updated
+        except Exception as e:
+            logging.error(f"批量更新iyuu_last_check时间时出错: {e}", exc_info=True)
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+
+
 # --- IYUU API 配置 ---
 API_BASE = "https://2025.iyuu.cn"
 CLIENT_VERSION = "8.2.0"
 
 # --- 请求频率控制 ---
-_last_request_time = 0
-_rate_limit_delay = 5.0  # 请求间隔时间（秒）
+# 每分钟最多请求次数（默认 12，即平均 5 秒一次）与允许的突发请求数，可通过环境变量覆盖
+IYUU_REQUESTS_PER_MINUTE_DEFAULT = 12
+IYUU_BURST_DEFAULT = 1
+# 批量辅种查询同时进行的请求数，实际请求频率仍受令牌桶限制
+IYUU_BATCH_CONCURRENCY_DEFAULT = 2
+# 重试退避：第 n 次重试等待 base * 2^n 秒（带随机抖动），最长 cap 秒
+IYUU_BACKOFF_BASE = 2.0
+IYUU_BACKOFF_CAP = 60.0
+# 这些状态码说明服务端暂时不可用或被限流，可以重试；其余 4xx 直接失败
+IYUU_RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _env_number(name, default, cast=float):
+    try:
+        value = cast(os.getenv(name, default))
+        return value if value > 0 else default
+    except (TypeError, ValueError):
+        logging.warning(f"{name} 不是有效的数值，使用默认值 {default}")
+        return default
+
+
+class TokenBucket:
+    """线程安全的令牌桶：每秒补充 rate 个令牌，最多积累 capacity 个。"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = Lock()
+
+    def acquire(self):
+        """取一个令牌，不足时阻塞等待；返回等待的秒数。"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = max(self._blocked_until - now,
+                           (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """服务端要求等待（Retry-After）时，所有调用方在 seconds 秒内都不再发出请求。"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until,
+                                      time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+def backoff_delay(attempt, retry_after=None):
+    """第 attempt 次（从 0 开始）重试前的等待时间：指数退避加随机抖动，不短于服务端给出的 Retry-After。"""
+    delay = min(IYUU_BACKOFF_CAP, IYUU_BACKOFF_BASE * (2**attempt))
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def _parse_retry_after(response):
+    """解析 Retry-After 头（秒数或 HTTP 日期），没有或无法解析时返回 None。"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class IYUUApiClient:
+    """进程内共享的 IYUU API 客户端
+
+    - 所有线程（后台扫描、手动触发、接口）共用一个令牌桶限速，代替全局的“上次请求时间 + sleep”
+    - 共用一个 requests.Session，连接保持复用，不必每次请求都重新进行 TLS 握手
+    - 网络错误、超时、429/5xx 按带抖动的指数退避重试，429/503 的 Retry-After 会让所有线程一起暂停
+    """
+
+    def __init__(self, requests_per_minute=None, burst=None, pool_size=4, timeout=20):
+        requests_per_minute = requests_per_minute or _env_number(
+            "IYUU_REQUESTS_PER_MINUTE", IYUU_REQUESTS_PER_MINUTE_DEFAULT)
+        burst = burst or _env_number("IYUU_BURST", IYUU_BURST_DEFAULT, int)
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, token, max_retries=3, **kwargs):
+        """发送请求并返回 code 为 0 的响应数据；data 可以是可调用对象，每次尝试时重新生成（例如带时间戳的表单）。"""
+        # 基础 headers，包含 Token；调用时传入的额外 headers (如 Content-Type) 合并进来
+        headers = {'Token': token}
+        headers.update(kwargs.pop('headers', None) or {})
+        data_factory = kwargs.pop('data') if callable(kwargs.get('data')) else None
+        if method.upper() not in ('GET', 'POST'):
+            raise ValueError("Unsupported HTTP method")
+
+        for attempt in range(max_retries):
+            retry_after = None
+            try:
+                waited = self.bucket.acquire()
+                if waited >= 1:
+                    print(f"请求频率控制: 等待 {waited:.2f} 秒")
+                if data_factory is not None:
+                    kwargs['data'] = data_factory()
+
+                response = self.session.request(method.upper(),
+                                                url,
+                                                headers=headers,
+                                                timeout=self.timeout,
+                                                **kwargs)
+                if response.status_code in IYUU_RETRY_STATUS:
+                    retry_after = _parse_retry_after(response)
+                    if retry_after:
+                        self.bucket.pause(retry_after)
+                response.raise_for_status()  # 如果状态码不是 2xx，则抛出异常
+
+                data = response.json()
+                if data.get("code") != 0:
+                    error_msg = data.get("msg", "未知 API 错误")
+                    raise Exception(
+                        f"API 错误: {error_msg} (代码: {data.get('code')})")
+                return data
+
+            except requests.exceptions.HTTPError as e:
+                error_msg = f"网络请求失败: {e}"
+                status = e.response.status_code if e.response is not None else None
+                # 其余 4xx（参数错误等）重试也不会成功
+                if status not in IYUU_RETRY_STATUS or attempt >= max_retries - 1:
+                    raise Exception(error_msg)
+            except requests.exceptions.RequestException as e:
+                error_msg = f"网络请求失败: {e}"
+                if attempt >= max_retries - 1:
+                    raise Exception(error_msg)
+            except json.JSONDecodeError as e:
+                error_msg = f"无法解析服务器返回的 JSON 数据: {e}"
+                if attempt >= max_retries - 1:
+                    raise Exception(error_msg)
+            except Exception as e:
+                error_msg = str(e)
+                # 对于API错误（如token无效等），不进行重试，直接抛出
+                if "API 错误" in error_msg or "Token" in error_msg:
+                    raise e
+                if attempt >= max_retries - 1:
+                    raise e
+
+            wait_time = backoff_delay(attempt, retry_after)
+            log_iyuu_message(
+                f"请求失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}",
+                "WARNING")
+            log_iyuu_message(f"等待 {wait_time:.1f} 秒后重试...", "INFO")
+            time.sleep(wait_time)
+
+
+_api_client = None
+_api_client_lock = Lock()
+
+
+def get_iyuu_client():
+    """获取当前进程共享的 IYUU API 客户端。"""
+    global _api_client
+    with _api_client_lock:
+        if _api_client is None:
+            _api_client = IYUUApiClient()
+        return _api_client
 
 
 # --- IYUU 缓存管理类 ---
@@ -1252,6 +1601,101 @@ class IYUUSiteCache:
             logging.error(f"保存IYUU缓存时出错: {e}", exc_info=True)
 
 
+class IYUUResultCache:
+    """按 infohash 缓存的IYUU辅种查询结果
+
+    有辅种结果与无结果的 hash 分别设置过期时间；sid_sha1 变化（站点列表变化）时
+    查询范围不同，整个缓存作废。
+    """
+
+    def __init__(self, cache_dir, ttl_hours=168, negative_ttl_hours=24):
+        """初始化缓存管理器
+
+        Args:
+            cache_dir: 缓存文件存储目录
+            ttl_hours: 有辅种结果的 hash 缓存时长（小时）
+            negative_ttl_hours: 无辅种结果的 hash 缓存时长（小时），0 表示不缓存
+        """
+        self.cache_file = os.path.join(cache_dir, "iyuu_result_cache.json")
+        self.ttl = timedelta(hours=ttl_hours).total_seconds()
+        self.negative_ttl = timedelta(hours=negative_ttl_hours).total_seconds()
+        self.sid_sha1 = None
+        # {infohash_lower: [查询时间戳, [[sid, torrent_id, info_hash], ...]]}
+        self._entries = {}
+        self._dirty = False
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _is_fresh(self, entry, now):
+        checked_at, hits = entry
+        ttl = self.ttl if hits else self.negative_ttl
+        return now - checked_at < ttl
+
+    def load(self, sid_sha1):
+        """加载缓存文件，丢弃过期条目；sid_sha1 与缓存不一致时从空缓存开始"""
+        self.sid_sha1 = sid_sha1
+        self._entries = {}
+        self._dirty = False
+        try:
+            if not os.path.exists(self.cache_file):
+                return
+
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+
+            if cache_data.get("sid_sha1") != sid_sha1:
+                log_iyuu_message("sid_sha1 已变化，IYUU查询结果缓存作废", "INFO")
+                self._dirty = True
+                return
+
+            now = time.time()
+            entries = cache_data.get("entries", {})
+            self._entries = {
+                h: entry
+                for h, entry in entries.items() if self._is_fresh(entry, now)
+            }
+            self._dirty = len(self._entries) != len(entries)
+        except Exception as e:
+            logging.error(f"加载IYUU查询结果缓存时出错: {e}", exc_info=True)
+            self._entries = {}
+
+    def get(self, infohash):
+        """返回缓存的辅种结果列表；没有缓存或已过期时返回 None"""
+        entry = self._entries.get(infohash.lower())
+        if entry is None or not self._is_fresh(entry, time.time()):
+            return None
+        return [{
+            "sid": sid,
+            "torrent_id": torrent_id,
+            "info_hash": info_hash
+        } for sid, torrent_id, info_hash in entry[1]]
+
+    def put(self, infohash, results):
+        """记录一次查询结果，results 为空表示该 hash 没有辅种"""
+        hits = [[item.get("sid"), item.get("torrent_id"),
+                 item.get("info_hash")] for item in results or []]
+        if not hits and self.negative_ttl <= 0:
+            return
+        self._entries[infohash.lower()] = [int(time.time()), hits]
+        self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        """有变化时写回缓存文件（先写临时文件再替换，避免中途退出留下损坏的文件）"""
+        if not self._dirty:
+            return
+        try:
+            cache_data = {"sid_sha1": self.sid_sha1, "entries": self._entries}
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(cache_data, f, separators=(",", ":"))
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+        except Exception as e:
+            logging.error(f"保存IYUU查询结果缓存时出错: {e}", exc_info=True)
+
+
 # --- IYUU API 辅助函数 ---
 
 
@@ -1266,101 +1710,19 @@ def make_api_request(method: str,
                      max_retries: int = 3,
                      **kwargs) -> dict:
     """
-    封装 API 请求，统一处理 headers 和错误，支持重试机制。
+    封装 API 请求，统一处理 headers、限速和错误，支持重试机制。
     
     Args:
         method: HTTP方法 (GET, POST)
         url: 请求URL
         token: IYUU Token
-        max_retries: 最大重试次数，默认3次
-        **kwargs: 其他请求参数
+        max_retries: 最大尝试次数，默认3次
+        **kwargs: 其他请求参数；data 可以是每次尝试时调用的函数
     
     Returns:
         dict: API响应数据
     """
-    global _last_request_time, _rate_limit_delay
-
-    for attempt in range(max_retries):
-        try:
-            # 请求频率控制 - 确保请求之间有适当的延迟
-            current_time = time.time()
-            time_since_last_request = current_time - _last_request_time
-            if time_since_last_request < _rate_limit_delay:
-                sleep_time = _rate_limit_delay - time_since_last_request
-                print(f"请求频率控制: 等待 {sleep_time:.2f} 秒")
-                time.sleep(sleep_time)
-
-            # 更新最后请求时间
-            _last_request_time = time.time()
-
-            # 基础 headers，包含 Token
-            final_headers = {'Token': token}
-
-            # 如果调用时传入了额外的 headers (如 Content-Type)，则进行合并
-            if 'headers' in kwargs:
-                # 使用 update 方法将传入的 headers 合并进来
-                final_headers.update(kwargs.pop('headers'))
-
-            if method.upper() == 'GET':
-                response = requests.get(url,
-                                        headers=final_headers,
-                                        timeout=20,
-                                        **kwargs)
-            elif method.upper() == 'POST':
-                response = requests.post(url,
-                                         headers=final_headers,
-                                         timeout=20,
-                                         **kwargs)
-            else:
-                raise ValueError("Unsupported HTTP method")
-
-            response.raise_for_status()  # 如果状态码不是 2xx，则抛出异常
-
-            data = response.json()
-            if data.get("code") != 0:
-                error_msg = data.get("msg", "未知 API 错误")
-                raise Exception(
-                    f"API 错误: {error_msg} (代码: {data.get('code')})")
-
-            return data
-
-        except requests.exceptions.RequestException as e:
-            error_msg = f"网络请求失败: {e}"
-            if attempt < max_retries - 1:
-                wait_time = 5 * (attempt + 1)  # 递增等待时间：5秒、10秒、15秒
-                log_iyuu_message(
-                    f"请求失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}",
-                    "WARNING")
-                log_iyuu_message(f"等待 {wait_time} 秒后重试...", "INFO")
-                time.sleep(wait_time)
-            else:
-                raise Exception(error_msg)
-        except json.JSONDecodeError as e:
-            error_msg = f"无法解析服务器返回的 JSON 数据: {e}"
-            if attempt < max_retries - 1:
-                wait_time = 5 * (attempt + 1)
-                log_iyuu_message(
-                    f"JSON解析失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}",
-                    "WARNING")
-                log_iyuu_message(f"等待 {wait_time} 秒后重试...", "INFO")
-                time.sleep(wait_time)
-            else:
-                raise Exception(error_msg)
-        except Exception as e:
-            error_msg = str(e)
-            # 对于API错误（如token无效等），不进行重试，直接抛出
-            if "API 错误" in error_msg or "Token" in error_msg:
-                raise e
-            # 对于其他错误，进行重试
-            if attempt < max_retries - 1:
-                wait_time = 5 * (attempt + 1)
-                log_iyuu_message(
-                    f"请求失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}",
-                    "WARNING")
-                log_iyuu_message(f"等待 {wait_time} 秒后重试...", "INFO")
-                time.sleep(wait_time)
-            else:
-                raise e
+    return get_iyuu_client().request(method, url, token, max_retries=max_retries, **kwargs)
 
 
 def get_supported_sites(token: str) -> list:
@@ -1416,7 +1778,6 @@ def get_filtered_sid_sha1_and_sites(token: str, db_manager) -> tuple:
     print("=== 开始获取过滤后的sid_sha1和站点列表 ===")
 
     # 初始化缓存管理器
-    from config import DATA_DIR
     cache = IYUUSiteCache(DATA_DIR)
 
     # 1. 获取torrents表中存在的站点列表
@@ -1470,10 +1831,6 @@ def get_filtered_sid_sha1_and_sites(token: str, db_manager) -> tuple:
         logging.error(f"获取IYUU支持站点列表失败: {e}")
         raise
 
-    # 在获取站点列表和后续请求之间添加额外延迟
-    print("等待额外延迟以避免请求频率过快...")
-    time.sleep(2)
-
     # 4. 从数据库获取 site -> nickname 映射
     try:
         conn = db_manager._get_connection()
@@ -1532,10 +1889,6 @@ def get_filtered_sid_sha1_and_sites(token: str, db_manager) -> tuple:
     if not filtered_site_ids:
         raise Exception("没有找到在torrents表中存在的IYUU支持站点")
 
-    # 在发送reportExisting请求前添加额外延迟
-    print("准备发送reportExisting请求，等待额外延迟...")
-    time.sleep(2)
-
     # 5. 构建sid_sha1
     try:
         payload = {"sid_list": filtered_site_ids}
@@ -1578,57 +1931,9 @@ def query_cross_seed(token: str,
         list: 辅种信息列表
     """
     print(f"正在为种子 {infohash[:8]}... 查询辅种信息...")
-    url = f"{API_BASE}/reseed/index/index"
-
-    for attempt in range(max_retries):
-        try:
-            hashes_json_str = json.dumps([infohash.lower()])
-            form_data = {
-                "hash": hashes_json_str,
-                "sha1": get_sha1_hex(hashes_json_str),
-                "sid_sha1": sid_sha1,
-                "timestamp": str(int(time.time())),
-                "version": CLIENT_VERSION
-            }
-
-            # 这里的 headers 也会被正确合并
-            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-            response_data = make_api_request("POST",
-                                             url,
-                                             token,
-                                             data=form_data,
-                                             headers=headers)
-
-            data = response_data.get("data", {})
-            if not data or infohash.lower() not in data:
-                return []
-
-            results = data[infohash.lower()].get("torrent", [])
-            return results
-
-        except Exception as e:
-            error_msg = str(e)
-            # 如果是"未查询到可辅种数据"错误，不进行重试，直接返回空列表
-            if "未查询到可辅种数据" in error_msg or "400" in error_msg:
-                return []
-
-            # 对于API错误（如token无效等），不进行重试，直接抛出
-            if "API 错误" in error_msg or "Token" in error_msg:
-                raise e
-
-            # 对于其他错误，进行重试
-            if attempt < max_retries - 1:
-                wait_time = 5 * (attempt + 1)  # 递增等待时间：5秒、10秒、15秒
-                log_iyuu_message(
-                    f"查询辅种信息失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}",
-                    "WARNING")
-                log_iyuu_message(f"等待 {wait_time} 秒后重试...", "INFO")
-                time.sleep(wait_time)
-            else:
-                log_iyuu_message(f"查询辅种信息失败，已达到最大重试次数: {error_msg}", "ERROR")
-                raise e
-
-    return []  # 理论上不会执行到这里，但为了安全起见
+    results = query_cross_seed_batch(token, [infohash], sid_sha1,
+                                     max_retries=max_retries)
+    return results.get(infohash.lower(), [])
 
 
 def query_cross_seed_batch(token: str,
@@ -1665,56 +1970,43 @@ def query_cross_seed_batch(token: str,
 
     print(f"正在批量查询 {len(unique_hashes)} 个种子辅种信息...")
     url = f"{API_BASE}/reseed/index/index"
+    hashes_json_str = json.dumps(unique_hashes)
+
+    def build_form_data():
+        # 每次尝试重新生成时间戳
+        return {
+            "hash": hashes_json_str,
+            "sha1": get_sha1_hex(hashes_json_str),
+            "sid_sha1": sid_sha1,
+            "timestamp": str(int(time.time())),
+            "version": CLIENT_VERSION
+        }
 
-    for attempt in range(max_retries):
-        try:
-            hashes_json_str = json.dumps(unique_hashes)
-            form_data = {
-                "hash": hashes_json_str,
-                "sha1": get_sha1_hex(hashes_json_str),
-                "sid_sha1": sid_sha1,
-                "timestamp": str(int(time.time())),
-                "version": CLIENT_VERSION
-            }
-
-            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-            response_data = make_api_request("POST",
-                                             url,
-                                             token,
-                                             data=form_data,
-                                             headers=headers)
-
-            data = response_data.get("data", {}) or {}
-            result_map = {}
-            for h in unique_hashes:
-                entry = data.get(h) or {}
-                result_map[h] = entry.get("torrent", []) or []
-            return result_map
-
-        except Exception as e:
-            error_msg = str(e)
-            # 对于“未查询到可辅种数据/400”等情况，视为全部无结果
-            if "未查询到可辅种数据" in error_msg or "400" in error_msg:
-                return {h: [] for h in unique_hashes}
-
-            # 对于API错误（如token无效等），不进行重试，直接抛出
-            if "API 错误" in error_msg or "Token" in error_msg:
-                raise e
-
-            # 对于其他错误，进行重试
-            if attempt < max_retries - 1:
-                wait_time = 5 * (attempt + 1)
-                log_iyuu_message(
-                    f"批量查询辅种信息失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}",
-                    "WARNING")
-                log_iyuu_message(f"等待 {wait_time} 秒后重试...", "INFO")
-                time.sleep(wait_time)
-            else:
-                log_iyuu_message(f"批量查询辅种信息失败，已达到最大重试次数: {error_msg}",
-                                 "ERROR")
-                raise e
+    try:
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        response_data = make_api_request("POST",
+                                         url,
+                                         token,
+                                         max_retries=max_retries,
+                                         data=build_form_data,
+                                         headers=headers)
+    except Exception as e:
+        error_msg = str(e)
+        # 对于“未查询到可辅种数据/400”等情况，视为全部无结果
+        if "未查询到可辅种数据" in error_msg or "400" in error_msg:
+            return {h: [] for h in unique_hashes}
+        # 对于API错误（如token无效等），直接抛出
+        if "API 错误" not in error_msg and "Token" not in error_msg:
+            log_iyuu_message(f"批量查询辅种信息失败，已达到最大重试次数: {error_msg}",
+                             "ERROR")
+        raise
 
-    return {h: [] for h in unique_hashes}
+    data = response_data.get("data", {}) or {}
+    result_map = {}
+    for h in unique_hashes:
+        entry = data.get(h) or {}
+        result_map[h] = entry.get("torrent", []) or []
+    return result_map
 
 
 # 全局变量
@@ -1,7 +1,6 @@
 # core/migrator.py
 
-import cloudscraper
-from bs4 import BeautifulSoup, Tag
+from bs4 import Tag
 from loguru import logger
 import re
 import json
@@ -9,18 +8,19 @@ import os
 import sys
 import time
 import bencoder
-import requests
 import urllib3
 import threading
 import traceback
 import importlib
 import yaml
 import urllib.parse
+from contextlib import contextmanager
 from io import StringIO
 from typing import Dict, Any, Optional, List
 from config import TEMP_DIR, DATA_DIR, GLOBAL_MAPPINGS
 from utils import (
     ensure_scheme,
+    make_soup,
     upload_data_mediaInfo,
     upload_data_title,
     extract_origin_from_description,
@@ -33,7 +33,7 @@ from utils.mediainfo_parser import (
     extract_audio_info_from_mediainfo,
 )
 from utils import _process_poster_url
-from utils import is_image_url_valid_robust
+from utils import get_image_url_validator
 from utils import check_completion_status, add_completion_tag_if_needed
 
 # 导入种子参数模型
@@ -44,9 +44,20 @@ from utils import log_streamer
 
 # 导入新的Extractor和ParameterMapper
 from core.extractors.extractor import Extractor, ParameterMapper
+from core.scraper_pool import get_scraper_pool
+from core.review_pipeline import ReviewStagePipeline
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# 详情页完整性校验：页面中必须出现的元素（CSS 选择器，{torrent_id} 会被替换）。
+# 站点配置文件（configs/<站点>.yaml）中的 page_anchors 可以覆盖默认值。
+DEFAULT_DETAILS_PAGE_ANCHORS = [
+    'a[href*="download.php?id={torrent_id}"], form[action*="download.php?id={torrent_id}"]',
+]
+# 页面不完整时的最大请求次数与重试间隔（秒，按次数翻倍）
+DETAILS_FETCH_ATTEMPTS = 3
+DETAILS_RETRY_BACKOFF = 1.0
+
 # loguru 默认会带一个 stderr sink；原实现会在每次初始化 TorrentMigrator 时 remove 全局 sinks。
 # 为了支持并发批量发布，这里统一移除默认 sink，并在每个 TorrentMigrator 实例上按线程绑定一个独立 sink。
 try:
@@ -109,22 +120,23 @@ class TorrentMigrator:
             self.TARGET_COOKIE = self.target_site.get("cookie")
             self.TARGET_UPLOAD_MODULE = self.target_site["site"]
 
-        # Initialize scraper and logger
-        session = requests.Session()
-        session.verify = False
-        self.scraper = cloudscraper.create_scraper(sess=session)
+        # 访问源站点的 scraper 从进程共享的站点池中借用（见 _source_scraper）
+        self.scraper_pool = get_scraper_pool()
 
         # Create a separate log handler for this instance with site name
         site_name = self.target_site["nickname"] if self.target_site else self.SOURCE_NAME
         self.log_handler = LoguruHandler(site_name=site_name)
         self.logger = logger
         self._loguru_thread_id = threading.get_ident()
+        # 预处理阶段在线程池中执行时，临时加入的工作线程（见 _capture_thread_logs）
+        self._loguru_stage_thread_ids = set()
         # 仅捕获当前线程的 loguru 输出，避免并发场景下不同站点日志互相串扰
         self._loguru_sink_id = self.logger.add(
             self.log_handler,
             format="{time:HH:mm:ss} - {level} - {message}",
             level="DEBUG",
-            filter=lambda record: record["thread"].id == self._loguru_thread_id,
+            filter=lambda record: record["thread"].id == self._loguru_thread_id
+            or record["thread"].id in self._loguru_stage_thread_ids,
         )
 
         self.temp_files = []
@@ -136,6 +148,20 @@ class TorrentMigrator:
         # 加载源站点配置（如果存在）
         self.source_config = self._load_source_site_config()
 
+    @contextmanager
+    def _capture_thread_logs(self):
+        """在当前（工作）线程中执行预处理阶段期间，把它的 loguru 输出也记录到本实例的日志中。"""
+        thread_id = threading.get_ident()
+        self._loguru_stage_thread_ids.add(thread_id)
+        try:
+            yield
+        finally:
+            self._loguru_stage_thread_ids.discard(thread_id)
+
+    def _source_scraper(self):
+        """从站点池借用源站点的 scraper，Cookie 由池同步到会话中（与原来一样不校验源站点证书）。"""
+        return self.scraper_pool.session(self.SOURCE_SITE_CODE, self.SOURCE_COOKIE, verify=False)
+
     def _load_source_site_config(self) -> Dict[str, Any]:
         """
         加载源站点的YAML配置文件，用于解析source_parsers
@@ -431,14 +457,14 @@ class TorrentMigrator:
             download_url = f"{self.SOURCE_BASE_URL}/download.php?id={torrent_id}"
 
             # 下载种子文件
-            torrent_response = self.scraper.get(
-                download_url,
-                headers={
-                    "Cookie": self.SOURCE_COOKIE,
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
-                },
-                timeout=600,
-            )
+            with self._source_scraper() as scraper:
+                torrent_response = scraper.get(
+                    download_url,
+                    headers={
+                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
+                    },
+                    timeout=600,
+                )
             torrent_response.raise_for_status()
 
             # 从响应头中尝试获取文件名，这是最准确的方式
@@ -621,17 +647,415 @@ class TorrentMigrator:
 
         return standardized_params
 
+    def _details_page_problem(self, response, soup, anchors):
+        """检查详情页是否完整，返回问题描述；页面完整时返回 None。"""
+        expected_length = response.headers.get("Content-Length")
+        if (
+            expected_length
+            and expected_length.isdigit()
+            and not response.headers.get("Content-Encoding")
+            and len(response.content) < int(expected_length)
+        ):
+            return f"响应体不完整（{len(response.content)}/{expected_length} 字节）"
+        if "</html>" not in response.text[-4096:].lower():
+            return "页面缺少 </html> 结束标签"
+        for anchor in anchors:
+            if not soup.select_one(anchor):
+                return f"页面中未找到 {anchor}"
+        return None
+
+    def _fetch_details_page(self, torrent_id):
+        """请求源站点详情页并校验完整性，返回 (response, soup)。
+
+        页面不完整时按 DETAILS_RETRY_BACKOFF 退避重试，超过 DETAILS_FETCH_ATTEMPTS 次后返回最后一次的结果，
+        由后续解析给出具体错误。
+        """
+        anchors = (
+            self.parameter_mapper.load_site_config(self.SOURCE_SITE_CODE).get("page_anchors")
+            or DEFAULT_DETAILS_PAGE_ANCHORS
+        )
+        anchors = [anchor.replace("{torrent_id}", str(torrent_id)) for anchor in anchors]
+
+        for attempt in range(DETAILS_FETCH_ATTEMPTS):
+            with self._source_scraper() as scraper:
+                response = scraper.get(
+                    f"{self.SOURCE_BASE_URL}/details.php",
+                    headers={
+                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
+                    },
+                    params={"id": torrent_id, "hit": "1"},
+                    timeout=600,
+                )
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            soup = make_soup(response.text)
+
+            problem = self._details_page_problem(response, soup, anchors)
+            if problem is None:
+                return response, soup
+            if attempt < DETAILS_FETCH_ATTEMPTS - 1:
+                delay = DETAILS_RETRY_BACKOFF * 2**attempt
+                self.logger.warning(f"详情页不完整（{problem}），{delay:.0f} 秒后重新获取...")
+                time.sleep(delay)
+            else:
+                self.logger.warning(f"详情页仍不完整（{problem}），使用最后一次获取的页面继续处理")
+        return response, soup
+
+    def _extract_mediainfo(self, mediainfo_text, original_main_title, processed_torrent_name, torrent_id):
+        """预处理阶段：提取 MediaInfo/BDInfo，返回 (mediainfo, is_mediainfo, is_bdinfo, bdinfo_async)。"""
+        # 使用upload_data_mediaInfo_async处理mediainfo（支持异步BDInfo）
+        if self.task_id:
+            log_streamer.emit_log(
+                self.task_id, "提取媒体信息", "正在提取 MediaInfo...", "processing"
+            )
+
+        # 生成种子ID用于BDInfo任务跟踪
+        # 使用复合主键格式: hash_torrentId_siteName
+        # 从source_site中获取site_name，使用英文站点名而不是中文名
+        site_name = (
+            self.SOURCE_SITE_CODE if hasattr(self, "SOURCE_SITE_CODE") else "unknown"
+        )
+
+        # 获取真实的hash值
+        seed_hash = "batch_seed"  # 默认值
+        try:
+            # 使用与保存种子参数相同的方法获取hash
+            temp_seed_param_model = SeedParameter(self.db_manager)
+            real_hash = temp_seed_param_model.search_torrent_hash(
+                self.torrent_name, self.SOURCE_NAME
+            )
+            if real_hash:
+                seed_hash = real_hash
+        except Exception as e:
+            print(f"获取hash失败，使用默认值: {e}")
+
+        # 构建复合seed_id
+        composite_seed_id = f"{seed_hash}_{torrent_id}_{site_name}"
+
+        # 使用异步版本的MediaInfo处理
+        mediainfo, is_mediainfo, is_bdinfo, bdinfo_async = upload_data_mediaInfo_async(
+            mediaInfo=mediainfo_text if mediainfo_text else "未找到 Mediainfo 或 BDInfo",
+            save_path=self.save_path,
+            seed_id=composite_seed_id,
+            content_name=original_main_title,
+            torrent_name=processed_torrent_name,
+            downloader_id=self.downloader_id,
+            priority=2,  # 批量获取使用普通优先级
+            # 新增参数：预写入所需的基本信息
+            hash_value=seed_hash,
+            torrent_id=torrent_id,
+            site_name=site_name,
+            nickname=self.SOURCE_NAME,  # 传递站点中文名
+        )
+
+        if self.task_id:
+            if mediainfo and mediainfo != "未找到 Mediainfo 或 BDInfo":
+                log_streamer.emit_log(
+                    self.task_id, "提取媒体信息", "MediaInfo 提取成功", "success"
+                )
+
+                # 如果BDInfo在后台处理中，添加提示
+                if bdinfo_async and bdinfo_async.get("bdinfo_status") == "processing":
+                    log_streamer.emit_log(
+                        self.task_id,
+                        "BDInfo处理",
+                        f"BDInfo 正在后台处理中 (任务ID: {bdinfo_async.get('bdinfo_task_id')})",
+                        "info",
+                    )
+            else:
+                log_streamer.emit_log(
+                    self.task_id, "提取媒体信息", "MediaInfo 提取失败或不存在", "warning"
+                )
+
+        return mediainfo, is_mediainfo, is_bdinfo, bdinfo_async
+
+    def _resolve_poster_and_links(self, images, imdb_link, douban_link, tmdb_link, subtitle, body):
+        """预处理阶段：验证/转存海报，必要时从豆瓣或 IMDb 获取海报并补全链接和简介。
+
+        返回 (images, imdb_link, douban_link, tmdb_link, body)。
+        """
+        # 检查媒体链接（不发送日志，内部处理）
+        self.logger.info("[*] 开始统一验证海报链接...")
+
+        # 提取海报URL
+        poster_url = None
+        if images and images[0]:
+            # 从BBCode [img]...[/img] 中提取URL
+            if poster_url_match := re.search(
+                r"\[img\](.*?)\[/img\]", images[0], re.IGNORECASE
+            ):
+                poster_url = poster_url_match.group(1)
+                self.logger.info(f"从ptgen提取到原始海报URL: {poster_url}")
+
+        # 使用新的海报处理函数统一处理海报
+        if poster_url:
+            # 调用 _process_poster_url 进行统一处理（包括pixhost检查、验证和转存）
+            processed_poster = _process_poster_url(poster_url, imdb_link, douban_link)
+            if processed_poster:
+                images[0] = processed_poster
+                self.logger.success(f"海报已成功处理: {processed_poster}")
+                current_poster_valid = True
+            else:
+                # 处理失败，标记需要重新获取
+                self.logger.warning("海报处理失败，将尝试从豆瓣/IMDb重新获取")
+                current_poster_valid = False
+        else:
+            # 没有海报URL
+            self.logger.info("未找到海报URL，将尝试从豆瓣/IMDb获取")
+            current_poster_valid = False
+
+        # 统一调用upload_data_movie_info来获取海报和补全链接
+        # 该函数会自动判断缺失内容并进行补全，同时执行智能获取和转存
+        if not current_poster_valid or (douban_link and not imdb_link):
+            self.logger.info("尝试从豆瓣或IMDb获取海报和补全链接...")
+
+            # 传递当前已有的链接，让函数自动判断和补全
+            (
+                poster_status,
+                poster_content,
+                description_content,
+                extracted_imdb,
+                extracted_douban,
+                extracted_tmdb,
+            ) = upload_data_movie_info(
+                media_type="",
+                douban_link=douban_link,
+                imdb_link=imdb_link,
+                tmdb_link=tmdb_link,
+                subtitle=subtitle,
+            )
+
+            # 更新海报（如果获取成功）
+            if poster_status and poster_content:
+                if not images:
+                    images = [poster_content]
+                else:
+                    images[0] = poster_content
+                self.logger.success("成功获取到海报")
+            elif not current_poster_valid:
+                self.logger.warning("无法从豆瓣或IMDb获取到有效的海报")
+
+            # 更新IMDb链接（如果获取成功且当前没有）
+            if extracted_imdb and not imdb_link:
+                imdb_link = extracted_imdb
+                self.logger.info(f"成功补全IMDb链接: {imdb_link}")
+
+            # 更新豆瓣链接（如果获取成功且当前没有）
+            if extracted_douban and not douban_link:
+                douban_link = extracted_douban
+                self.logger.info(f"成功补全豆瓣链接: {douban_link}")
+
+            # 更新TMDb链接（如果获取成功且当前没有）
+            if extracted_tmdb and not tmdb_link:
+                tmdb_link = extracted_tmdb
+                self.logger.info(f"成功补全TMDb链接: {tmdb_link}")
+
+            # 更新简介（如果当前为空，且获取到新简介）
+            if (not body or not body.strip()) and description_content:
+                body = description_content
+                self.logger.info("成功补全简介内容")
+
+        return images, imdb_link, douban_link, tmdb_link, body
+
+    def _check_screenshots(self, intro_data):
+        """预处理阶段：验证提取到的截图链接，返回 (screenshots_valid, screenshots_sufficient)。"""
+        screenshots_valid = True
+        screenshots_sufficient = True
+        required_screenshot_count = 3  # 需要至少3张截图
+
+        # 使用 intro_data 来检查，因为它包含了从 extractor 提取的原始截图
+        if intro_data.get("screenshots"):
+            screenshot_links = intro_data["screenshots"].strip().split("\n")
+            # 过滤掉空字符串
+            screenshot_links = [link for link in screenshot_links if link.strip()]
+
+            if screenshot_links:
+                self.logger.info(
+                    f"[*] 开始验证 {len(screenshot_links)} 个截图链接的有效性..."
+                )
+                print(f"[*] 开始验证 {len(screenshot_links)} 个截图链接的有效性...")
+
+                # 检查数量是否足够
+                if len(screenshot_links) < required_screenshot_count:
+                    self.logger.warning(
+                        f"⚠️ 截图数量不足（当前: {len(screenshot_links)}，需要: {required_screenshot_count}张）"
+                    )
+                    print(
+                        f"⚠️ 截图数量不足（当前: {len(screenshot_links)}，需要: {required_screenshot_count}张）"
+                    )
+                    screenshots_sufficient = False
+
+                # 并发验证全部截图链接（已缓存的结果不再请求），再按顺序统计
+                shot_validity = get_image_url_validator().validate_many(
+                    match.group(1)
+                    for match in (
+                        re.search(r"\[img\](.*?)\[/img\]", shot_tag, re.IGNORECASE)
+                        for shot_tag in screenshot_links
+                    )
+                    if match
+                )
+
+                # 验证每个截图的有效性
+                valid_count = 0
+                invalid_count = 0
+                for i, shot_tag in enumerate(screenshot_links):
+                    if shot_url_match := re.search(
+                        r"\[img\](.*?)\[/img\]", shot_tag, re.IGNORECASE
+                    ):
+                        shot_url = shot_url_match.group(1)
+                        if shot_validity.get(shot_url):
+                            valid_count += 1
+                        else:
+                            invalid_count += 1
+                            self.logger.warning(
+                                f"检测到第 {i+1} 个截图链接失效: {shot_url}"
+                            )
+                            # 如果超过5张图片失效，直接清空全部重新获取
+                            if invalid_count > 5:
+                                self.logger.warning(
+                                    f"失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
+                                )
+                                print(
+                                    f"⚠️ 失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
+                                )
+                                screenshots_valid = False
+                                screenshots_sufficient = False
+                                # 清空截图数据，强制重新生成
+                                intro_data["screenshots"] = ""
+                                screenshot_links = []
+                                break
+                    else:
+                        # 如果标签格式不正确，也视为无效
+                        invalid_count += 1
+                        self.logger.warning(f"第 {i+1} 个截图标签格式不正确: {shot_tag}")
+                        # 如果超过5张图片失效，直接清空全部重新获取
+                        if invalid_count > 5:
+                            self.logger.warning(
+                                f"失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
+                            )
+                            print(
+                                f"⚠️ 失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
+                            )
+                            screenshots_valid = False
+                            screenshots_sufficient = False
+                            # 清空截图数据，强制重新生成
+                            intro_data["screenshots"] = ""
+                            screenshot_links = []
+                            break
+
+                # 只有在没有提前退出循环的情况下才设置screenshots_valid
+                if invalid_count <= 5 and invalid_count > 0:
+                    screenshots_valid = False
+
+                # 最终检查：即使所有链接有效，如果数量不足也需要重新生成
+                if screenshots_valid and valid_count < required_screenshot_count:
+                    self.logger.warning(
+                        f"⚠️ 有效截图数量不足（总图片: {len(screenshot_links)}，有效: {valid_count}，需要: {required_screenshot_count}张）"
+                    )
+                    print(
+                        f"⚠️ 有效截图数量不足（总图片: {len(screenshot_links)}，有效: {valid_count}，需要: {required_screenshot_count}张）"
+                    )
+                    screenshots_sufficient = False
+
+                if screenshots_valid and screenshots_sufficient:
+                    self.logger.info(f"[*] 验证完成，保留 {valid_count} 个有效截图链接。")
+                    print(f"[*] 验证完成，保留 {valid_count} 个有效截图链接。")
+                    # 截图有效，发送验证成功日志
+                    if self.task_id:
+                        log_streamer.emit_log(
+                            self.task_id,
+                            "验证图片链接",
+                            f"图片链接验证通过 ({valid_count}张)",
+                            "success",
+                        )
+            else:
+                # 如果 screenshots 字段存在但为空，视为需要生成
+                self.logger.info("未找到截图链接，将重新生成。")
+                print("未找到截图链接，将重新生成。")
+                screenshots_valid = False
+        else:
+            # 如果没有截图字段，也需要生成
+            self.logger.info("未找到截图字段，将重新生成。")
+            print("未找到截图字段，将重新生成。")
+            screenshots_valid = False
+
+        return screenshots_valid, screenshots_sufficient
+
+    def _regenerate_screenshots(self, original_main_title, processed_torrent_name, screenshot_check):
+        """预处理阶段：截图失效或数量不足时重新截图。
+
+        不需要重新截图时返回 None；否则返回新的截图 BBCode，失败时返回空字符串。
+        """
+        screenshots_valid, screenshots_sufficient = screenshot_check
+        if screenshots_valid and screenshots_sufficient:
+            return None
+
+        if not screenshots_valid:
+            self.logger.warning("⚠️ 检测到截图失效，立即重新生成截图...")
+            print("⚠️ 检测到截图失效，立即重新生成截图...")
+            if self.task_id:
+                log_streamer.emit_log(
+                    self.task_id,
+                    "验证图片链接",
+                    "检测到截图失效，开始重新生成...",
+                    "processing",
+                )
+        else:
+            self.logger.warning(f"⚠️ 截图数量不足，立即重新生成截图...")
+            print(f"⚠️ 截图数量不足，立即重新生成截图...")
+            if self.task_id:
+                log_streamer.emit_log(
+                    self.task_id,
+                    "验证图片链接",
+                    f"截图数量不足，开始重新生成...",
+                    "processing",
+                )
+
+        # 准备调用截图函数所需参数
+        source_info_for_screenshot = {"main_title": original_main_title}
+
+        # 立即调用截图函数
+        if os.getenv("SCREENSHOTS") == "false":
+            new_screenshots = "https://example.com/placeholder.jpg"
+        else:
+            from utils import upload_data_screenshot
+
+            new_screenshots = upload_data_screenshot(
+                source_info=source_info_for_screenshot,
+                save_path=self.save_path,
+                torrent_name=processed_torrent_name,
+                downloader_id=self.downloader_id,
+            )
+
+        if new_screenshots:
+            self.logger.success("✅ 成功重新生成并上传截图。")
+            print("✅ 成功重新生成并上传截图。")
+            if self.task_id:
+                log_streamer.emit_log(
+                    self.task_id, "验证图片链接", "截图重新生成并上传成功", "success"
+                )
+            return new_screenshots
+
+        self.logger.error("❌ 重新生成截图失败。")
+        print("❌ 重新生成截图失败。")
+        if self.task_id:
+            log_streamer.emit_log(
+                self.task_id, "验证图片链接", "截图重新生成失败", "error"
+            )
+        return ""
+
     def prepare_review_data(self):
         """重构后的方法：获取、解析信息，并输出标准化参数。"""
         # [新增] 定义重试配置
         MAX_RETRIES = 2  # 最大重试次数
         RETRY_DELAY = 5  # 重试等待时间(秒)
-        PAGE_LOAD_WAIT = 3  # 页面加载等待时间(秒)
 
         retry_count = 0
         last_error = None
 
         while retry_count < MAX_RETRIES:
+            # 各阶段的执行与耗时统计（见 core/review_pipeline.py）
+            stages = ReviewStagePipeline(self.task_id, thread_scope=self._capture_thread_logs)
             try:
                 if retry_count > 0:
                     self.logger.warning(f"第 {retry_count + 1} 次尝试获取种子信息...")
@@ -676,26 +1100,12 @@ class TorrentMigrator:
 
                 self.logger.info(f"正在获取种子(ID: {torrent_id})的详细信息...")
 
-                response = self.scraper.get(
-                    f"{self.SOURCE_BASE_URL}/details.php",
-                    headers={
-                        "Cookie": self.SOURCE_COOKIE,
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
-                    },
-                    params={"id": torrent_id, "hit": "1"},
-                    timeout=600,
-                )
-                response.raise_for_status()
-                response.encoding = "utf-8"
+                # 校验页面完整性，只有不完整时才等待重试
+                with stages.timed("details_page", "获取详情页"):
+                    response, soup = self._fetch_details_page(torrent_id)
 
                 self.logger.success("详情页请求成功！")
 
-                # [新增] 等待页面内容完全加载
-                self.logger.info(f"等待 {PAGE_LOAD_WAIT} 秒确保页面内容完全加载...")
-                time.sleep(PAGE_LOAD_WAIT)
-
-                soup = BeautifulSoup(response.text, "html.parser")
-
                 # Pre-check for acknowledgment statement on the raw description
                 descr_container_for_check = soup.select_one("div#kdescr")
                 full_bbcode_descr_for_check = ""
@@ -743,15 +1153,16 @@ class TorrentMigrator:
 
                 self.logger.info(f"找到下载链接: {final_download_url}")
 
-                torrent_response = self.scraper.get(
-                    final_download_url,
-                    headers={
-                        "Cookie": self.SOURCE_COOKIE,
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
-                    },
-                    timeout=600,
-                )
-                torrent_response.raise_for_status()
+                with stages.timed("torrent_file", "下载种子文件"):
+                    with self._source_scraper() as scraper:
+                        torrent_response = scraper.get(
+                            final_download_url,
+                            headers={
+                                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
+                            },
+                            timeout=600,
+                        )
+                    torrent_response.raise_for_status()
 
                 # 从响应头中尝试获取文件名，这是最准确的方式
                 content_disposition = torrent_response.headers.get("content-disposition")
@@ -786,7 +1197,8 @@ class TorrentMigrator:
                             # =========== [新增修复代码结束] ===========
 
                 # 使用统一的数据提取方法
-                extracted_data = self._extract_data_by_site_type(soup, torrent_id)
+                with stages.timed("extract", "解析详情页"):
+                    extracted_data = self._extract_data_by_site_type(soup, torrent_id)
 
                 # 检查是否返回了错误
                 if isinstance(extracted_data, dict) and extracted_data.get("error") == True:
@@ -856,71 +1268,118 @@ class TorrentMigrator:
 
                 processed_torrent_name = re.sub(r"^(?:\[[^\]]+\]\.?)+", "", processed_torrent_name)
 
-                # 使用upload_data_mediaInfo_async处理mediainfo（支持异步BDInfo）
-                if self.task_id:
-                    log_streamer.emit_log(
-                        self.task_id, "提取媒体信息", "正在提取 MediaInfo...", "processing"
-                    )
-
-                # 生成种子ID用于BDInfo任务跟踪
-                # 使用复合主键格式: hash_torrentId_siteName
                 # 从search_term中提取torrent_id（在批量处理中search_term就是torrent_id）
                 torrent_id = self.search_term if self.search_term else "unknown"
-                # 从source_site中获取site_name，使用英文站点名而不是中文名
-                site_name = (
-                    self.SOURCE_SITE_CODE if hasattr(self, "SOURCE_SITE_CODE") else "unknown"
-                )
 
-                # 获取真实的hash值
-                seed_hash = "batch_seed"  # 默认值
-                try:
-                    # 使用与保存种子参数相同的方法获取hash
-                    temp_seed_param_model = SeedParameter(self.db_manager)
-                    real_hash = temp_seed_param_model.search_torrent_hash(
-                        self.torrent_name, self.SOURCE_NAME
-                    )
-                    if real_hash:
-                        seed_hash = real_hash
-                except Exception as e:
-                    print(f"获取hash失败，使用默认值: {e}")
-
-                # 构建复合seed_id
-                composite_seed_id = f"{seed_hash}_{torrent_id}_{site_name}"
-
-                # 使用异步版本的MediaInfo处理
-                mediainfo, is_mediainfo, is_bdinfo, bdinfo_async = upload_data_mediaInfo_async(
-                    mediaInfo=mediainfo_text if mediainfo_text else "未找到 Mediainfo 或 BDInfo",
-                    save_path=self.save_path,
-                    seed_id=composite_seed_id,
-                    content_name=original_main_title,
-                    torrent_name=processed_torrent_name,
-                    downloader_id=self.downloader_id,
-                    priority=2,  # 批量获取使用普通优先级
-                    # 新增参数：预写入所需的基本信息
-                    hash_value=seed_hash,
-                    torrent_id=torrent_id,
-                    site_name=site_name,
-                    nickname=self.SOURCE_NAME,  # 传递站点中文名
+                # 提取IMDb和豆瓣链接
+                imdb_link = intro.get("imdb_link", "")
+                douban_link = intro.get("douban_link", "")
+                tmdb_link = intro.get("tmdb_link", "")
+
+                # 使用统一提取方法获取的数据
+                descr_container = soup.select_one("div#kdescr")
+
+                # 从提取的数据中获取简介信息
+                intro_data = extracted_data.get("intro", {})
+                tmdb_link = tmdb_link or intro_data.get("tmdb_link", "")
+                quotes = (
+                    intro_data.get("statement", "").split("\n")
+                    if intro_data.get("statement")
+                    else []
                 )
+                images = []
+                if intro_data.get("poster"):
+                    images.append(intro_data.get("poster"))
+                if intro_data.get("screenshots"):
+                    screenshots_raw = intro_data.get("screenshots")
+                    screenshots_list = screenshots_raw.split("\n") if screenshots_raw else []
 
-                if self.task_id:
-                    if mediainfo and mediainfo != "未找到 Mediainfo 或 BDInfo":
-                        log_streamer.emit_log(
-                            self.task_id, "提取媒体信息", "MediaInfo 提取成功", "success"
-                        )
+                    # [新增] 从配置文件读取并过滤掉指定的不需要的图片URL
+                    # 加载内容过滤配置（使用config.py中的统一路径配置）
+                    CONTENT_FILTERING_CONFIG = {}
+                    try:
+                        if os.path.exists(GLOBAL_MAPPINGS):
+                            import yaml
 
-                        # 如果BDInfo在后台处理中，添加提示
-                        if bdinfo_async and bdinfo_async.get("bdinfo_status") == "processing":
-                            log_streamer.emit_log(
-                                self.task_id,
-                                "BDInfo处理",
-                                f"BDInfo 正在后台处理中 (任务ID: {bdinfo_async.get('bdinfo_task_id')})",
-                                "info",
-                            )
-                    else:
-                        log_streamer.emit_log(
-                            self.task_id, "提取媒体信息", "MediaInfo 提取失败或不存在", "warning"
+                            with open(GLOBAL_MAPPINGS, "r", encoding="utf-8") as f:
+                                global_config = yaml.safe_load(f)
+                                CONTENT_FILTERING_CONFIG = global_config.get(
+                                    "content_filtering", {}
+                                )
+                        else:
+                            self.logger.warning(f"配置文件不存在: {GLOBAL_MAPPINGS}")
+                    except Exception as e:
+                        self.logger.warning(f"加载内容过滤配置时出错: {e}")
+
+                    # 应用图片过滤
+                    unwanted_image_urls = CONTENT_FILTERING_CONFIG.get("unwanted_image_urls", [])
+
+                    if unwanted_image_urls:
+                        filtered_screenshots = []
+                        for img_tag in screenshots_list:
+                            img_tag = img_tag.strip()
+                            if not img_tag:
+                                continue
+                            # 从[img]标签中提取URL
+                            url_match = re.search(r"\[img\](.*?)\[/img\]", img_tag, re.IGNORECASE)
+                            if url_match:
+                                img_url = url_match.group(1)
+                                # 检查是否在过滤列表中
+                                if img_url not in unwanted_image_urls:
+                                    filtered_screenshots.append(img_tag)
+                                else:
+                                    self.logger.info(f"过滤掉不需要的截图: {img_url}")
+                                    print(f"[过滤] 移除截图: {img_url}")
+                            else:
+                                # 如果无法提取URL，保留原图片标签
+                                filtered_screenshots.append(img_tag)
+
+                        screenshots_list = filtered_screenshots
+                        self.logger.info(
+                            f"[调试migrator] 过滤后剩余截图数量: {len(screenshots_list)}"
                         )
+                        print(f"[调试migrator] 过滤后剩余截图数量: {len(screenshots_list)}")
+                    else:
+                        self.logger.info(f"[调试migrator] 未配置图片过滤列表，跳过过滤")
+                        print(f"[调试migrator] 未配置图片过滤列表，跳过过滤")
+
+                    images.extend(screenshots_list)
+                body = intro_data.get("body", "")
+                ardtu_declarations = intro_data.get("removed_ardtudeclarations", [])
+
+                # 以下阶段互不依赖，交给阶段执行器并行执行：MediaInfo 提取、海报验证与豆瓣/IMDb 补全、
+                # 截图验证（失效或数量不足时接着重新截图）。标题解析依赖 MediaInfo，在主线程等待其结果。
+                stages.add(
+                    "mediainfo",
+                    "提取 MediaInfo",
+                    self._extract_mediainfo,
+                    mediainfo_text,
+                    original_main_title,
+                    processed_torrent_name,
+                    torrent_id,
+                )
+                stages.add(
+                    "poster",
+                    "海报与链接补全",
+                    self._resolve_poster_and_links,
+                    images,
+                    imdb_link,
+                    douban_link,
+                    tmdb_link,
+                    subtitle,
+                    body,
+                )
+                stages.add("screenshot_check", "截图验证", self._check_screenshots, intro_data)
+                stages.add(
+                    "screenshots",
+                    "重新截图",
+                    self._regenerate_screenshots,
+                    original_main_title,
+                    processed_torrent_name,
+                    after=("screenshot_check",),
+                )
+
+                mediainfo, is_mediainfo, is_bdinfo, bdinfo_async = stages.result("mediainfo")
 
                 # [新增] 从 MediaInfo 中提取标签并补充到 source_params
                 if mediainfo and mediainfo != "未找到 Mediainfo 或 BDInfo":
@@ -1039,165 +1498,8 @@ class TorrentMigrator:
                 )
                 print(f"[调试] 补充后的source_params['制作组']: {source_params.get('制作组')}")
 
-                # 提取IMDb和豆瓣链接
-                imdb_link = intro.get("imdb_link", "")
-                douban_link = intro.get("douban_link", "")
-                tmdb_link = intro.get("tmdb_link", "")
-
-                # 使用统一提取方法获取的数据
-                descr_container = soup.select_one("div#kdescr")
-
-                # 从提取的数据中获取简介信息
-                intro_data = extracted_data.get("intro", {})
-                tmdb_link = tmdb_link or intro_data.get("tmdb_link", "")
-                quotes = (
-                    intro_data.get("statement", "").split("\n")
-                    if intro_data.get("statement")
-                    else []
-                )
-                images = []
-                if intro_data.get("poster"):
-                    images.append(intro_data.get("poster"))
-                if intro_data.get("screenshots"):
-                    screenshots_raw = intro_data.get("screenshots")
-                    screenshots_list = screenshots_raw.split("\n") if screenshots_raw else []
-
-                    # [新增] 从配置文件读取并过滤掉指定的不需要的图片URL
-                    # 加载内容过滤配置（使用config.py中的统一路径配置）
-                    CONTENT_FILTERING_CONFIG = {}
-                    try:
-                        if os.path.exists(GLOBAL_MAPPINGS):
-                            import yaml
-
-                            with open(GLOBAL_MAPPINGS, "r", encoding="utf-8") as f:
-                                global_config = yaml.safe_load(f)
-                                CONTENT_FILTERING_CONFIG = global_config.get(
-                                    "content_filtering", {}
-                                )
-                        else:
-                            self.logger.warning(f"配置文件不存在: {GLOBAL_MAPPINGS}")
-                    except Exception as e:
-                        self.logger.warning(f"加载内容过滤配置时出错: {e}")
-
-                    # 应用图片过滤
-                    unwanted_image_urls = CONTENT_FILTERING_CONFIG.get("unwanted_image_urls", [])
-
-                    if unwanted_image_urls:
-                        filtered_screenshots = []
-                        for img_tag in screenshots_list:
-                            img_tag = img_tag.strip()
-                            if not img_tag:
-                                continue
-                            # 从[img]标签中提取URL
-                            url_match = re.search(r"\[img\](.*?)\[/img\]", img_tag, re.IGNORECASE)
-                            if url_match:
-                                img_url = url_match.group(1)
-                                # 检查是否在过滤列表中
-                                if img_url not in unwanted_image_urls:
-                                    filtered_screenshots.append(img_tag)
-                                else:
-                                    self.logger.info(f"过滤掉不需要的截图: {img_url}")
-                                    print(f"[过滤] 移除截图: {img_url}")
-                            else:
-                                # 如果无法提取URL，保留原图片标签
-                                filtered_screenshots.append(img_tag)
-
-                        screenshots_list = filtered_screenshots
-                        self.logger.info(
-                            f"[调试migrator] 过滤后剩余截图数量: {len(screenshots_list)}"
-                        )
-                        print(f"[调试migrator] 过滤后剩余截图数量: {len(screenshots_list)}")
-                    else:
-                        self.logger.info(f"[调试migrator] 未配置图片过滤列表，跳过过滤")
-                        print(f"[调试migrator] 未配置图片过滤列表，跳过过滤")
-
-                    images.extend(screenshots_list)
-                body = intro_data.get("body", "")
-                ardtu_declarations = intro_data.get("removed_ardtudeclarations", [])
-
-                # [统一海报处理] 所有提取器返回海报后，在此统一验证和转存
-                from utils import upload_data_movie_info
-
-                # 检查媒体链接（不发送日志，内部处理）
-                self.logger.info("[*] 开始统一验证海报链接...")
-
-                # 提取海报URL
-                poster_url = None
-                if images and images[0]:
-                    # 从BBCode [img]...[/img] 中提取URL
-                    if poster_url_match := re.search(
-                        r"\[img\](.*?)\[/img\]", images[0], re.IGNORECASE
-                    ):
-                        poster_url = poster_url_match.group(1)
-                        self.logger.info(f"从ptgen提取到原始海报URL: {poster_url}")
-
-                # 使用新的海报处理函数统一处理海报
-                if poster_url:
-                    # 调用 _process_poster_url 进行统一处理（包括pixhost检查、验证和转存）
-                    processed_poster = _process_poster_url(poster_url, imdb_link, douban_link)
-                    if processed_poster:
-                        images[0] = processed_poster
-                        self.logger.success(f"海报已成功处理: {processed_poster}")
-                        current_poster_valid = True
-                    else:
-                        # 处理失败，标记需要重新获取
-                        self.logger.warning("海报处理失败，将尝试从豆瓣/IMDb重新获取")
-                        current_poster_valid = False
-                else:
-                    # 没有海报URL
-                    self.logger.info("未找到海报URL，将尝试从豆瓣/IMDb获取")
-                    current_poster_valid = False
-
-                # 统一调用upload_data_movie_info来获取海报和补全链接
-                # 该函数会自动判断缺失内容并进行补全，同时执行智能获取和转存
-                if not current_poster_valid or (douban_link and not imdb_link):
-                    self.logger.info("尝试从豆瓣或IMDb获取海报和补全链接...")
-
-                    # 传递当前已有的链接，让函数自动判断和补全
-                    (
-                        poster_status,
-                        poster_content,
-                        description_content,
-                        extracted_imdb,
-                        extracted_douban,
-                        extracted_tmdb,
-                    ) = upload_data_movie_info(
-                        media_type="",
-                        douban_link=douban_link,
-                        imdb_link=imdb_link,
-                        tmdb_link=tmdb_link,
-                        subtitle=subtitle,
-                    )
-
-                    # 更新海报（如果获取成功）
-                    if poster_status and poster_content:
-                        if not images:
-                            images = [poster_content]
-                        else:
-                            images[0] = poster_content
-                        self.logger.success("成功获取到海报")
-                    elif not current_poster_valid:
-                        self.logger.warning("无法从豆瓣或IMDb获取到有效的海报")
-
-                    # 更新IMDb链接（如果获取成功且当前没有）
-                    if extracted_imdb and not imdb_link:
-                        imdb_link = extracted_imdb
-                        self.logger.info(f"成功补全IMDb链接: {imdb_link}")
-
-                    # 更新豆瓣链接（如果获取成功且当前没有）
-                    if extracted_douban and not douban_link:
-                        douban_link = extracted_douban
-                        self.logger.info(f"成功补全豆瓣链接: {douban_link}")
-
-                    # 更新TMDb链接（如果获取成功且当前没有）
-                    if extracted_tmdb and not tmdb_link:
-                        tmdb_link = extracted_tmdb
-                        self.logger.info(f"成功补全TMDb链接: {tmdb_link}")
-
-                    # 更新简介（如果当前为空，且获取到新简介）
-                    if (not body or not body.strip()) and description_content:
-                        body = description_content
-                        self.logger.info("成功补全简介内容")
+                # 等待海报与链接补全阶段
+                images, imdb_link, douban_link, tmdb_link, body = stages.result("poster")
 
                 # 重新组装intro字典
                 intro = {
@@ -1224,180 +1526,14 @@ class TorrentMigrator:
 
                 processed_torrent_name = re.sub(r"^(?:\[[^\]]+\]\.?)+", "", processed_torrent_name)
 
-                # --- [核心修改] 在这里统一验证和重新生成截图 ---
-                screenshots_valid = True
-                screenshots_sufficient = True
-                required_screenshot_count = 3  # 需要至少3张截图
-
-                # 使用 intro_data 来检查，因为它包含了从 extractor 提取的原始截图
-                if intro_data.get("screenshots"):
-                    screenshot_links = intro_data["screenshots"].strip().split("\n")
-                    # 过滤掉空字符串
-                    screenshot_links = [link for link in screenshot_links if link.strip()]
-
-                    if screenshot_links:
-                        self.logger.info(
-                            f"[*] 开始验证 {len(screenshot_links)} 个截图链接的有效性..."
-                        )
-                        print(f"[*] 开始验证 {len(screenshot_links)} 个截图链接的有效性...")
-
-                        # 检查数量是否足够
-                        if len(screenshot_links) < required_screenshot_count:
-                            self.logger.warning(
-                                f"⚠️ 截图数量不足（当前: {len(screenshot_links)}，需要: {required_screenshot_count}张）"
-                            )
-                            print(
-                                f"⚠️ 截图数量不足（当前: {len(screenshot_links)}，需要: {required_screenshot_count}张）"
-                            )
-                            screenshots_sufficient = False
-
-                        # 验证每个截图的有效性
-                        valid_count = 0
-                        invalid_count = 0
-                        for i, shot_tag in enumerate(screenshot_links):
-                            if shot_url_match := re.search(
-                                r"\[img\](.*?)\[/img\]", shot_tag, re.IGNORECASE
-                            ):
-                                shot_url = shot_url_match.group(1)
-                                if is_image_url_valid_robust(shot_url):
-                                    valid_count += 1
-                                else:
-                                    invalid_count += 1
-                                    self.logger.warning(
-                                        f"检测到第 {i+1} 个截图链接失效: {shot_url}"
-                                    )
-                                    # 如果超过5张图片失效，直接清空全部重新获取
-                                    if invalid_count > 5:
-                                        self.logger.warning(
-                                            f"失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
-                                        )
-                                        print(
-                                            f"⚠️ 失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
-                                        )
-                                        screenshots_valid = False
-                                        screenshots_sufficient = False
-                                        # 清空截图数据，强制重新生成
-                                        intro_data["screenshots"] = ""
-                                        screenshot_links = []
-                                        break
-                            else:
-                                # 如果标签格式不正确，也视为无效
-                                invalid_count += 1
-                                self.logger.warning(f"第 {i+1} 个截图标签格式不正确: {shot_tag}")
-                                # 如果超过5张图片失效，直接清空全部重新获取
-                                if invalid_count > 5:
-                                    self.logger.warning(
-                                        f"失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
-                                    )
-                                    print(
-                                        f"⚠️ 失效图片数量超过5张（{invalid_count}张），直接清空全部截图重新获取"
-                                    )
-                                    screenshots_valid = False
-                                    screenshots_sufficient = False
-                                    # 清空截图数据，强制重新生成
-                                    intro_data["screenshots"] = ""
-                                    screenshot_links = []
-                                    break
-
-                        # 只有在没有提前退出循环的情况下才设置screenshots_valid
-                        if invalid_count <= 5 and invalid_count > 0:
-                            screenshots_valid = False
-
-                        # 最终检查：即使所有链接有效，如果数量不足也需要重新生成
-                        if screenshots_valid and valid_count < required_screenshot_count:
-                            self.logger.warning(
-                                f"⚠️ 有效截图数量不足（总图片: {len(screenshot_links)}，有效: {valid_count}，需要: {required_screenshot_count}张）"
-                            )
-                            print(
-                                f"⚠️ 有效截图数量不足（总图片: {len(screenshot_links)}，有效: {valid_count}，需要: {required_screenshot_count}张）"
-                            )
-                            screenshots_sufficient = False
-
-                        if screenshots_valid and screenshots_sufficient:
-                            self.logger.info(f"[*] 验证完成，保留 {valid_count} 个有效截图链接。")
-                            print(f"[*] 验证完成，保留 {valid_count} 个有效截图链接。")
-                            # 截图有效，发送验证成功日志
-                            if self.task_id:
-                                log_streamer.emit_log(
-                                    self.task_id,
-                                    "验证图片链接",
-                                    f"图片链接验证通过 ({valid_count}张)",
-                                    "success",
-                                )
-                    else:
-                        # 如果 screenshots 字段存在但为空，视为需要生成
-                        self.logger.info("未找到截图链接，将重新生成。")
-                        print("未找到截图链接，将重新生成。")
-                        screenshots_valid = False
-                else:
-                    # 如果没有截图字段，也需要生成
-                    self.logger.info("未找到截图字段，将重新生成。")
-                    print("未找到截图字段，将重新生成。")
-                    screenshots_valid = False
-
-                # 如果截图无效或数量不足，则立即重新生成（不再只是标记）
-                if not screenshots_valid or not screenshots_sufficient:
-                    if not screenshots_valid:
-                        self.logger.warning("⚠️ 检测到截图失效，立即重新生成截图...")
-                        print("⚠️ 检测到截图失效，立即重新生成截图...")
-                        if self.task_id:
-                            log_streamer.emit_log(
-                                self.task_id,
-                                "验证图片链接",
-                                "检测到截图失效，开始重新生成...",
-                                "processing",
-                            )
-                    else:
-                        self.logger.warning(f"⚠️ 截图数量不足，立即重新生成截图...")
-                        print(f"⚠️ 截图数量不足，立即重新生成截图...")
-                        if self.task_id:
-                            log_streamer.emit_log(
-                                self.task_id,
-                                "验证图片链接",
-                                f"截图数量不足，开始重新生成...",
-                                "processing",
-                            )
-
-                    # 准备调用截图函数所需参数
-                    source_info_for_screenshot = {"main_title": original_main_title}
-
-                    # 立即调用截图函数
-                    if os.getenv("SCREENSHOTS") == "false":
-                        new_screenshots = "https://example.com/placeholder.jpg"
-                    else:
-                        from utils import upload_data_screenshot
-
-                        new_screenshots = upload_data_screenshot(
-                            source_info=source_info_for_screenshot,
-                            save_path=self.save_path,
-                            torrent_name=processed_torrent_name,
-                            downloader_id=self.downloader_id,
-                        )
-
+                # 等待截图验证/重新截图阶段，截图重新生成后同步更新 intro 与 images
+                new_screenshots = stages.result("screenshots")
+                if new_screenshots is not None:
+                    # 保留海报（第一个元素），然后添加新截图
+                    images = [images[0]] if images and images[0] else []
+                    intro["screenshots"] = new_screenshots
                     if new_screenshots:
-                        # 更新 intro 字典中的截图
-                        intro["screenshots"] = new_screenshots
-                        self.logger.success("✅ 成功重新生成并上传截图。")
-                        print("✅ 成功重新生成并上传截图。")
-                        if self.task_id:
-                            log_streamer.emit_log(
-                                self.task_id, "验证图片链接", "截图重新生成并上传成功", "success"
-                            )
-
-                        # 更新 images 列表，保持数据同步
-                        # 保留海报（第一个元素），然后添加新截图
-                        images = [images[0]] if images and images[0] else []
                         images.extend(new_screenshots.strip().split("\n"))
-                    else:
-                        self.logger.error("❌ 重新生成截图失败。")
-                        print("❌ 重新生成截图失败。")
-                        if self.task_id:
-                            log_streamer.emit_log(
-                                self.task_id, "验证图片链接", "截图重新生成失败", "error"
-                            )
-                        # 清空截图
-                        intro["screenshots"] = ""
-                        images = [images[0]] if images and images[0] else []
 
                 # [新增] 从标题参数中提取标签（DIY、VCB-Studio等）
                 from utils import extract_tags_from_title
@@ -1999,6 +2135,8 @@ class TorrentMigrator:
                         log_streamer.emit_log(
                             self.task_id, "获取失败", f"已重试 {MAX_RETRIES} 次仍然失败", "error"
                         )
+            finally:
+                stages.close()
 
         # [新增] 如果所有重试都失败,返回错误信息
         # self.cleanup() # 此处不清理，因为原始种子文件需要被缓存
@@ -0,0 +1,68 @@
+# core/proxy_torrents.py
+"""
+流式读取代理（proxy.go）/api/torrents/all 返回的种子列表
+
+请求带 Accept: application/x-ndjson 时，代理每行输出一个种子，并在 X-Torrent-Count 响应头中给出总数。
+这里按块读取响应体（gzip 由 requests 边读边解压），逐行解码并逐个交给调用方，
+不需要先拼出完整的响应字符串和整个原始对象列表。
+
+旧版代理不认识该请求头，仍返回整个 JSON 数组，此时退回一次性解码。
+"""
+
+import json
+
+from utils.proxy_client import get_proxy_client
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ProxyTorrentStream:
+    """代理返回的种子列表，只能迭代一次。
+
+    迭代结束后 count 为读到的种子数；读到的数量与 X-Torrent-Count 不一致（连接中断、代理输出出错）时
+    在迭代末尾抛出 IOError，调用方不会把不完整的列表当作下载器的完整种子列表。
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self.streaming = NDJSON_CONTENT_TYPE in response.headers.get("Content-Type", "")
+        expected = response.headers.get("X-Torrent-Count")
+        self.expected = int(expected) if expected and expected.isdigit() else None
+        self.count = 0
+
+    def __iter__(self):
+        try:
+            if self.streaming:
+                for line in self._response.iter_lines(chunk_size=STREAM_CHUNK_SIZE):
+                    if not line:
+                        continue
+                    yield json.loads(line)
+                    self.count += 1
+            else:
+                torrents = self._response.json() or []
+                for torrent in torrents:
+                    yield torrent
+                    self.count += 1
+        finally:
+            self._response.close()
+
+        if self.expected is not None and self.count != self.expected:
+            raise IOError(f"代理返回的种子列表不完整: 应有 {self.expected} 个，实际读取 {self.count} 个")
+
+
+def stream_proxy_torrents(proxy_base_url, request_data, timeout=None):
+    """请求代理获取种子列表，返回 ProxyTorrentStream；连接失败或 HTTP 错误时直接抛出异常。"""
+    response = get_proxy_client().post(
+        f"{proxy_base_url}/api/torrents/all",
+        json=request_data,
+        headers={"Accept": f"{NDJSON_CONTENT_TYPE}, application/json"},
+        timeout=timeout,
+        stream=True,
+    )
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return ProxyTorrentStream(response)
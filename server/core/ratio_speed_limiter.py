@@ -3,13 +3,14 @@ import time
 from threading import Thread, Event
 from urllib.parse import urlparse
 
-import requests
 
 from qbittorrentapi import Client
 from transmission_rpc import Client as TrClient
 
+from core.proxy_torrents import stream_proxy_torrents
 from core.services import _prepare_api_config
 from utils import _extract_core_domain, _extract_url_from_comment, _parse_hostname_from_url
+from utils.proxy_client import get_proxy_client
 
 
 ratio_speed_limiter_thread = None
@@ -84,19 +85,25 @@ class RatioSpeedLimiter(Thread):
 
             try:
                 torrents = self._fetch_torrents(downloader)
+                if downloader.get("use_proxy") and torrents:
+                    # 代理返回的种子边读边匹配，读取完成后才知道种子数
+                    proxy_matches = self._match_proxy_torrents(torrents, domain_rule_map)
+                    torrents_count = torrents.count
+                else:
+                    torrents_count = len(torrents)
             except Exception as e:
                 logging.error(f"下载器 {downloader_id} 获取种子失败: {e}")
                 print(f"[RatioSpeedLimiter] 下载器 {downloader_id} 获取种子失败: {e}")
                 skipped += 1
                 continue
 
-            total += len(torrents)
-            if not torrents:
+            total += torrents_count
+            if not torrents_count:
                 print(f"[RatioSpeedLimiter] 下载器 {downloader_id} 未获取到种子")
                 continue
 
             if downloader.get("use_proxy"):
-                m, l = self._apply_for_proxy(downloader, torrents, domain_rule_map)
+                m, l = self._apply_for_proxy(downloader, *proxy_matches)
                 proxy_limited += l
             elif downloader.get("type") == "qbittorrent":
                 m, l = self._apply_for_qb(downloader, torrents, domain_rule_map)
@@ -220,20 +227,14 @@ class RatioSpeedLimiter(Thread):
                 "include_trackers": True,
             }
 
-            response = requests.post(
-                f"{proxy_base_url}/api/torrents/all",
-                json=request_data,
-                timeout=600,
-            )
-            response.raise_for_status()
-            return response.json() or []
+            return stream_proxy_torrents(proxy_base_url, request_data)
         except Exception as e:
             logging.error(f"通过代理获取 '{downloader.get('name', downloader.get('id'))}' 种子信息失败: {e}")
             return []
 
-    def _apply_for_proxy(self, downloader, torrents, domain_rule_map):
+    def _match_proxy_torrents(self, torrents, domain_rule_map):
+        """返回 (匹配到规则的种子数, {限速值: [达到分享率阈值的种子 hash]})。"""
         matched = 0
-        limited = 0
         ids_by_limit = {}
 
         for torrent in torrents:
@@ -258,6 +259,10 @@ class RatioSpeedLimiter(Thread):
                 limit = int(rule["seed_speed_limit"])
                 ids_by_limit.setdefault(limit, []).append(torrent_id)
 
+        return matched, ids_by_limit
+
+    def _apply_for_proxy(self, downloader, matched, ids_by_limit):
+        limited = 0
         if not ids_by_limit:
             print(f"[RatioSpeedLimiter] 代理下载器 {downloader.get('id')} 无需限速")
             return matched, limited
@@ -287,10 +292,9 @@ class RatioSpeedLimiter(Thread):
                 ],
             }
 
-            resp = requests.post(
+            resp = get_proxy_client().post(
                 f"{proxy_base_url}/api/torrents/upload-limit/batch",
                 json={"downloaders": [proxy_downloader]},
-                timeout=120,
             )
             resp.raise_for_status()
             payload = resp.json() or {}
@@ -0,0 +1,99 @@
+# core/review_pipeline.py
+"""
+种子信息预处理（TorrentMigrator.prepare_review_data）的阶段执行器
+
+获取详情页、下载种子文件之后，MediaInfo 提取、海报验证与豆瓣/IMDb 补全、截图验证与重新截图
+彼此不依赖，大部分时间都在等待网络或子进程，原来按顺序执行时单个种子的耗时是这些阶段之和。
+这里把这些阶段放到线程池中并行执行：
+
+- add(name, label, func, *args, after=()) 提交一个阶段，after 中的阶段完成后才开始执行，
+  其结果依次追加在 func 的参数之后；依赖的阶段失败时，该阶段抛出同样的异常
+- result(name) 等待阶段完成并返回结果（或抛出阶段中的异常）
+- timed(name, label) 记录在主线程中执行的阶段耗时
+- 每个阶段完成后通过 LogStreamer 发送“阶段耗时”日志，close() 时发送汇总
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from utils import log_streamer
+
+# 同时执行的阶段数上限
+REVIEW_STAGE_WORKERS = int(os.getenv("REVIEW_STAGE_WORKERS", "4"))
+
+
+class ReviewStagePipeline:
+    """单次预处理使用的阶段执行器，用完需要 close()。"""
+
+    def __init__(self, task_id=None, max_workers=REVIEW_STAGE_WORKERS, thread_scope=None):
+        """thread_scope: 可选的上下文管理器工厂，在工作线程中执行每个阶段时进入（用于绑定日志捕获等）。"""
+        self.task_id = task_id
+        self.thread_scope = thread_scope
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review-stage")
+        self._futures = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def _record(self, name, label, elapsed, failed=False):
+        with self._lock:
+            self._timings[name] = (label, elapsed)
+        if self.task_id:
+            log_streamer.emit_log(
+                self.task_id,
+                "阶段耗时",
+                f"{label}{'失败' if failed else '完成'}，用时 {elapsed:.2f} 秒",
+                "warning" if failed else "info",
+                extra={"stage": name, "duration": round(elapsed, 3)},
+            )
+
+    @contextmanager
+    def timed(self, name, label):
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._record(name, label, time.perf_counter() - start, failed)
+
+    def add(self, name, label, func, *args, after=()):
+        dependencies = [self._futures[dep] for dep in after]
+
+        def run():
+            dep_results = [future.result() for future in dependencies]
+            with self.thread_scope() if self.thread_scope else nullcontext():
+                with self.timed(name, label):
+                    return func(*args, *dep_results)
+
+        self._futures[name] = self._executor.submit(run)
+
+    def result(self, name):
+        return self._futures[name].result()
+
+    def timings(self):
+        """各阶段耗时（秒）。"""
+        with self._lock:
+            return {name: elapsed for name, (_, elapsed) in self._timings.items()}
+
+    def close(self):
+        """等待仍在执行的阶段结束（未开始的阶段取消），并发送耗时汇总。"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        wall = time.perf_counter() - self._started
+        with self._lock:
+            timings = dict(self._timings)
+        if self.task_id and timings:
+            total = sum(elapsed for _, elapsed in timings.values())
+            log_streamer.emit_log(
+                self.task_id,
+                "阶段耗时",
+                f"预处理总用时 {wall:.2f} 秒（各阶段合计 {total:.2f} 秒）",
+                "info",
+                extra={
+                    "stage_timings": {name: round(elapsed, 3) for name, (_, elapsed) in timings.items()},
+                    "duration": round(wall, 3),
+                },
+            )
@@ -0,0 +1,153 @@
+# core/scraper_pool.py
+"""
+按站点复用的 cloudscraper 会话池
+
+迁移（TorrentMigrator 访问源站点）和发布（BaseUploader 提交到目标站点）原来每个种子都新建一个
+scraper，每次都要重新建立 TLS 连接，遇到 Cloudflare 质询还要重新求解。这里按站点保留已经用过的
+scraper（连接池保持 keep-alive，会话中保留质询得到的 cookie），批量迁移/发布时复用：
+
+- session(site_key, cookie) 借出一个该站点的 scraper，用完放回；同一站点同时借出的数量不超过
+  max_per_site，超过时等待，避免批量任务同时向一个站点发起过多请求
+- 借出时把 sites 表中的 Cookie 同步到会话的 cookie jar：站点 Cookie 被修改后，旧会话的 cookie 全部清除
+  （包括质询 cookie）再写入新的
+- 放回后空闲超过 max_idle_seconds 的 scraper 在下次借出时关闭
+- 默认校验 TLS 证书（发布到目标站点）；只有迁移访问源站点时传 verify=False，与原来的行为一致。
+  两种 scraper 分别保留，不会互相借用
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import cloudscraper
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import cookies_raw2jar
+
+# 每个站点同时进行的请求数上限
+SCRAPER_MAX_PER_SITE = int(os.getenv("SITE_SCRAPER_MAX_PER_SITE", "2"))
+# 空闲超过该时间（秒）的 scraper 被关闭
+SCRAPER_MAX_IDLE_SECONDS = int(os.getenv("SITE_SCRAPER_MAX_IDLE_SECONDS", "600"))
+
+
+class _PooledScraper:
+    __slots__ = ("scraper", "cookie", "last_used")
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.cookie = None
+        self.last_used = 0.0
+
+
+class SiteScraperPool:
+    """进程内共享的按站点 scraper 池（线程安全）。"""
+
+    def __init__(self, max_per_site=SCRAPER_MAX_PER_SITE, max_idle_seconds=SCRAPER_MAX_IDLE_SECONDS):
+        self.max_per_site = max_per_site
+        self.max_idle_seconds = max_idle_seconds
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+        self._stats = {}
+
+    def _create_scraper(self, verify=True):
+        session = requests.Session()
+        session.verify = verify
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return cloudscraper.create_scraper(sess=session)
+
+    def _evict_idle(self, now):
+        """关闭空闲过久的 scraper，调用方持有 self._lock。"""
+        expired = []
+        for idle_key, idle in self._idle.items():
+            keep = []
+            for entry in idle:
+                (keep if now - entry.last_used < self.max_idle_seconds else expired).append(entry)
+            self._idle[idle_key] = keep
+        return expired
+
+    @staticmethod
+    def _sync_cookie(entry, cookie):
+        if cookie == entry.cookie:
+            return
+        scraper = entry.scraper
+        scraper.cookies.clear()
+        scraper.headers.pop("Cookie", None)
+        if cookie:
+            try:
+                scraper.cookies.update(cookies_raw2jar(cookie))
+            except Exception as e:
+                # 无法解析时按原样作为请求头发送（此时会话中的质询 cookie 不会被带上）
+                logging.warning(f"解析站点 Cookie 失败，改为直接发送 Cookie 请求头: {e}")
+                scraper.headers["Cookie"] = cookie
+        entry.cookie = cookie
+
+    @contextmanager
+    def session(self, site_key, cookie=None, verify=True):
+        """借出 site_key 对应站点的 scraper，cookie 为 sites 表中该站点当前的 Cookie。
+
+        verify 为 False 时借出不校验 TLS 证书的 scraper。同一站点的两种 scraper 共用并发上限。
+        """
+        idle_key = (site_key, verify)
+        with self._lock:
+            slots = self._slots.get(site_key)
+            if slots is None:
+                slots = self._slots[site_key] = threading.BoundedSemaphore(self.max_per_site)
+                self._stats[site_key] = {"borrowed": 0, "created": 0, "waited": 0}
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._stats[site_key]["waited"] += 1
+            slots.acquire()
+
+        try:
+            now = time.monotonic()
+            with self._lock:
+                expired = self._evict_idle(now)
+                idle = self._idle.get(idle_key)
+                entry = idle.pop() if idle else None
+                self._stats[site_key]["borrowed"] += 1
+                if entry is None:
+                    self._stats[site_key]["created"] += 1
+            for old in expired:
+                old.scraper.close()
+            if entry is None:
+                entry = _PooledScraper(self._create_scraper(verify))
+
+            self._sync_cookie(entry, cookie)
+            try:
+                yield entry.scraper
+            finally:
+                entry.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.setdefault(idle_key, []).append(entry)
+        finally:
+            slots.release()
+
+    def get_stats(self):
+        """每个站点的借出次数、新建 scraper 数、因达到并发上限而等待的次数与当前空闲数。"""
+        with self._lock:
+            idle_counts = {}
+            for (site_key, _verify), idle in self._idle.items():
+                idle_counts[site_key] = idle_counts.get(site_key, 0) + len(idle)
+            return {
+                site_key: dict(stats, idle=idle_counts.get(site_key, 0))
+                for site_key, stats in self._stats.items()
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_scraper_pool():
+    """获取当前进程共享的站点 scraper 池。"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SiteScraperPool()
+        return _pool
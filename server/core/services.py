@@ -4,12 +4,14 @@ import collections
 import logging
 import os
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
 from threading import Thread, Lock, Event
 from urllib.parse import urlparse
 
 # 外部库导入
 import requests  # <-- [新增] 导入 requests 库，用于手动发送HTTP请求
+from requests.adapters import HTTPAdapter
 from qbittorrentapi import Client, exceptions as qb_exceptions
 from transmission_rpc import Client as TrClient
 
@@ -20,12 +22,45 @@ from utils import (
     _extract_url_from_comment,
     format_state,
     format_bytes,
+    torrent_attr_key,
 )
+from utils.proxy_client import get_proxy_client
+from utils.speed_ring import SpeedRingWriter
+from utils.tracker_metrics import TrackerMetricsWriter
+from utils.group_matcher import GroupNameMatcher, GroupSiteMap, get_group_matcher
+from utils.lru_cache import LRUCache
+from core.proxy_torrents import stream_proxy_torrents
+from core.torrent_index import notify_torrents_changed
+from core.torrent_sync import QbMaindataSyncState, TransmissionSyncState
+from core.torrent_snapshot import get_torrent_snapshot_store, torrent_fingerprint
 
 # --- 全局变量和锁 ---
 CACHE_LOCK = Lock()
 data_tracker_thread = None
 
+# qBittorrent 种子注释缓存（hash -> comment），跨刷新、跨 DataTracker 实例复用；
+# 每次刷新都会访问仍在下载器中的种子，已删除种子的条目按 LRU 淘汰
+_qb_comment_cache = LRUCache(max_weight=int(os.getenv("QB_COMMENT_CACHE_SIZE", "50000")))
+
+# 刷新 Transmission 种子时请求的字段（完整刷新与 recently-active 增量同步共用）
+_TR_TORRENT_FIELDS = [
+    "id",
+    "name",
+    "hashString",
+    "downloadDir",
+    "totalSize",
+    "status",
+    "comment",
+    "trackers",
+    "percentDone",
+    "uploadedEver",
+    "peersGettingFromUs",
+    "trackerStats",
+    "peers",
+    "peersConnected",
+    "sizeWhenDone",  # 添加 sizeWhenDone 字段
+]
+
 
 def load_site_maps_from_db(db_manager):
     """从数据库加载站点和发布组的映射关系。"""
@@ -75,6 +110,10 @@ def load_site_maps_from_db(db_manager):
             if "cursor" in locals() and cursor:
                 cursor.close()
             conn.close()
+
+    # 每次加载时预编译官组匹配器，刷新期间所有种子共用
+    group_to_site_map_lower = GroupSiteMap(group_to_site_map_lower)
+    group_to_site_map_lower.matcher = GroupNameMatcher(group_to_site_map_lower)
     return core_domain_map, link_rules, group_to_site_map_lower
 
 
@@ -125,17 +164,70 @@ class DataTracker(Thread):
         logging.info(f"数据库批量写入大小设置为 {self.TRAFFIC_BATCH_WRITE_SIZE} 条记录。")
         self.traffic_buffer = []
         self.traffic_buffer_lock = Lock()
+        # 流量写库：每个下载器最近一次写入的采样 (时间, 累计上传, 累计下载)，首次用到时从原始流量存储读取一次
+        self._traffic_last_cumulative = {}
+        # 原始流量存储不参与事务（段文件）时，数据库提交后追加失败的采样，下次写库时重试
+        self._raw_traffic_retry_rows = []
+        self.traffic_flush_metrics = {
+            "flushes": 0,
+            "rows_written": 0,
+            "rows_skipped": 0,
+            "last_duration_ms": None,
+            "max_duration_ms": 0.0,
+            "last_rows": 0,
+            "last_flush_at": None,
+            "errors": 0,
+        }
         self.latest_speeds = {}
         self.recent_speeds_buffer = collections.deque(maxlen=self.TRAFFIC_BATCH_WRITE_SIZE)
         self.torrent_update_counter = 0
         self.TORRENT_UPDATE_INTERVAL = 3600
         self.clients = {}
+        # 统计轮询线程池与主循环都会重连/替换客户端，对 self.clients 的读写都在该锁内进行
+        self._clients_lock = Lock()
+        # 统计数据并发轮询：每个下载器独立提交到线程池，超过截止时间仍未返回的标记为 late
+        self.STATS_POLL_MAX_WORKERS = 16
+        self.STATS_POLL_DEADLINE = max(0.5, self.interval * 0.8)
+        self._stats_executor = None
+        self._stats_inflight = {}
+        self.poll_metrics = {}
+        self._poll_metrics_lock = Lock()
+        # 跨进程实时速度环形缓冲区（供 gunicorn worker 免查库读取），保留最近 5 分钟样本
+        self.SPEED_RING_SECONDS = 300
+        self._speed_ring = None
+        self._speed_ring_failed = False
+        # 轮询指标写入跨进程指标文件（供 gunicorn worker 的统计接口读取）的最小间隔（秒）
+        self.METRICS_PUBLISH_INTERVAL = 5
+        self._metrics_writer = None
+        self._metrics_published_at = 0
+        # qBittorrent 注释补全并发请求数
+        self.COMMENT_BACKFILL_MAX_WORKERS = 8
+        # 种子增量同步：qB 复用统计轮询的 sync/maindata rid，TR 使用 recently-active（只覆盖最近 60 秒，间隔需小于 60）
+        self.TORRENT_DELTA_SYNC_INTERVAL = 10
+        self.DELTA_SITE_MAPS_TTL = 300
+        self.torrent_delta_counter = 0
+        # 种子增量同步等耗时任务放到后台线程执行，每种任务同时只运行一个（上一轮未结束时跳过本轮），
+        # 统计主循环不会因为首次完整同步、分组匹配或写库而停顿
+        self.BACKGROUND_MAX_WORKERS = 2
+        self._background_executor = None
+        self._background_tasks = {}
+        self._qb_sync_states = {}
+        self._tr_sync_states = {}
+        self._delta_site_maps = None
+        self._delta_site_maps_loaded_at = 0
+        # 持久化种子快照：增量同步后的快照最多每 SNAPSHOT_SAVE_INTERVAL 秒写一次文件
+        self.SNAPSHOT_SAVE_INTERVAL = 60
+        # 种子聚合索引的变更：写库提交后记录变化的 hash，每轮结束时统一通知（None 表示全量变化）
+        self._index_changes_lock = Lock()
+        self._index_changed_hashes = set()
+        self._index_full_change = False
+        # 每个下载器最近一次写入的上传量 {downloader_id: {hash: uploaded}}，用于找出上传量变化的种子
+        self._index_last_uploads = {}
         # 用于优雅停止的event
         self.shutdown_event = Event()
 
-        # 数据聚合任务相关变量
-        self.aggregation_counter = 0  # 用于计时的计数器
-        self.AGGREGATION_INTERVAL = 21600  # 聚合任务的执行间隔（秒），这里是6小时
+        # 流量增量汇总：每结束一分钟（留出 ROLLUP_GRACE_SECONDS 等待缓冲写入）执行一次
+        self._last_rollup_boundary = None
         # 仅在后端启动后的“第一次刷新”完成后执行一次的清理/重建
         self._startup_agg_rebuild_done = False
         self._startup_agg_rebuild_lock = Lock()
@@ -143,8 +235,10 @@ class DataTracker(Thread):
     def _get_client(self, downloader_config):
         """智能获取或创建并缓存客户端实例，支持自动重连。"""
         client_id = downloader_config["id"]
-        if client_id in self.clients:
-            return self.clients[client_id]
+        with self._clients_lock:
+            client = self.clients.get(client_id)
+        if client is not None:
+            return client
 
         try:
             logging.info(f"正在为 '{downloader_config['name']}' 创建新的客户端连接...")
@@ -157,15 +251,22 @@ class DataTracker(Thread):
                 client = TrClient(**api_config)
                 client.get_session()
 
-            self.clients[client_id] = client
+            with self._clients_lock:
+                # 登录期间其它线程可能已经建立了连接，以先缓存的为准
+                client = self.clients.setdefault(client_id, client)
             logging.info(f"客户端 '{downloader_config['name']}' 连接成功并已缓存。")
             return client
         except Exception as e:
             logging.error(f"为 '{downloader_config['name']}' 初始化客户端失败: {e}")
-            if client_id in self.clients:
-                del self.clients[client_id]
+            self._drop_client(client_id)
             return None
 
+    def _drop_client(self, client_id, client=None):
+        """移除缓存的客户端；传入 client 时只有缓存的仍是该实例才移除，不会误删其它线程刚重连的客户端。"""
+        with self._clients_lock:
+            if client is None or self.clients.get(client_id) is client:
+                self.clients.pop(client_id, None)
+
     def _get_proxy_stats(self, downloader_config):
         """通过代理获取下载器的统计信息。"""
         try:
@@ -198,9 +299,9 @@ class DataTracker(Thread):
                 "password": downloader_config.get("password", ""),
             }
 
-            # 发送请求到代理获取统计信息
-            response = requests.post(
-                f"{proxy_base_url}/api/stats/server", json=[proxy_downloader_config], timeout=30
+            # 发送请求到代理获取统计信息（复用到该代理的 keep-alive 连接）
+            response = get_proxy_client().post(
+                f"{proxy_base_url}/api/stats/server", json=[proxy_downloader_config]
             )
             response.raise_for_status()
 
@@ -229,7 +330,7 @@ class DataTracker(Thread):
             return False
 
     def _get_proxy_torrents(self, downloader_config):
-        """通过代理获取下载器的完整种子信息。"""
+        """通过代理获取下载器的完整种子信息，返回逐个产出种子的 ProxyTorrentStream，失败时返回 None。"""
         try:
             # 从下载器配置的host中提取IP地址作为代理服务器地址
             host_value = downloader_config["host"]
@@ -267,16 +368,8 @@ class DataTracker(Thread):
                 "include_trackers": True,
             }
 
-            # 发送请求到代理获取种子信息
-            response = requests.post(
-                f"{proxy_base_url}/api/torrents/all",
-                json=request_data,
-                timeout=600,  # 种子信息可能需要更长的时间
-            )
-            response.raise_for_status()
-
-            torrents_data = response.json()
-            return torrents_data
+            # 发送请求到代理获取种子信息，响应体在迭代时逐个解码
+            return stream_proxy_torrents(proxy_base_url, request_data)
 
         except Exception as e:
             logging.error(f"通过代理获取 '{downloader_config['name']}' 种子信息失败: {e}")
@@ -305,6 +398,8 @@ class DataTracker(Thread):
                         enabled_downloaders=enabled_downloaders,
                     )
                     logging.info(f"启动后聚合重建清理完成：处理了 {rebuilt} 个种子组。")
+                    if rebuilt:
+                        notify_torrents_changed(self.db_manager)
                 self._startup_agg_rebuild_done = True
         except Exception as e:
             # 不影响主循环
@@ -333,17 +428,14 @@ class DataTracker(Thread):
                 #     self._update_torrents_in_db()
                 #     self.torrent_update_counter = 0
 
-                # 累加计数器并检查是否达到执行条件
-                self.aggregation_counter += self.interval
-                if self.aggregation_counter >= self.AGGREGATION_INTERVAL:
-                    try:
-                        logging.info("开始执行小时数据聚合任务...")
-                        self.db_manager.aggregate_hourly_traffic()
-                        logging.info("小时数据聚合任务执行完成。")
-                    except Exception as e:
-                        logging.error(f"执行小时数据聚合任务时出错: {e}", exc_info=True)
-                    # 重置计数器
-                    self.aggregation_counter = 0
+                # 种子增量同步：只把上次同步以来变化/删除的种子写入数据库（后台执行）
+                self.torrent_delta_counter += self.interval
+                if self.torrent_delta_counter >= self.TORRENT_DELTA_SYNC_INTERVAL:
+                    self.torrent_delta_counter = 0
+                    if self.config_manager.get().get("torrent_delta_sync_enabled", True):
+                        self._submit_background("种子增量同步", self._run_torrent_delta_sync)
+
+                self._maybe_rollup_traffic()
             except Exception as e:
                 logging.error(f"DataTracker 循环出错: {e}", exc_info=True)
             elapsed = time.monotonic() - start_time
@@ -355,6 +447,276 @@ class DataTracker(Thread):
                     # 如果被事件唤醒，说明要停止
                     break
 
+    def _maybe_rollup_traffic(self):
+        """每结束一分钟在后台逐层汇总新结束的时段（分钟/5 分钟/小时/天），只处理启用的下载器。"""
+        grace = self.db_manager.ROLLUP_GRACE_SECONDS
+        boundary = self.db_manager.floor_period(datetime.now() - timedelta(seconds=grace), 60)
+        if boundary == self._last_rollup_boundary:
+            return
+        downloader_ids = [
+            d["id"] for d in self.config_manager.get().get("downloaders", []) if d.get("enabled")
+        ]
+        # 失败时也记下边界，未汇总的时段由水位线在下一分钟一并补上；上一次汇总仍在执行时下一秒再试
+        if self._submit_background("流量增量汇总", lambda: self._rollup_traffic(downloader_ids)):
+            self._last_rollup_boundary = boundary
+
+    def _rollup_traffic(self, downloader_ids):
+        self.db_manager.rollup_traffic(
+            downloader_ids=downloader_ids, pending_since=self._traffic_pending_since()
+        )
+
+    def _traffic_pending_since(self):
+        """每个下载器尚未写入数据库的最早采样时间 {downloader_id: datetime}。
+
+        写库在持有 traffic_buffer_lock 时进行，这里拿到锁时缓冲区中的就是全部未提交的采样。
+        """
+        pending = {}
+        with self.traffic_buffer_lock:
+            for stat_datetime, downloader_id, *_ in self._raw_traffic_retry_rows:
+                stat_datetime = datetime.strptime(stat_datetime, "%Y-%m-%d %H:%M:%S")
+                if downloader_id not in pending or stat_datetime < pending[downloader_id]:
+                    pending[downloader_id] = stat_datetime
+            for entry in self.traffic_buffer:
+                for data_point in entry["points"]:
+                    pending.setdefault(data_point["downloader_id"], entry["timestamp"])
+        return pending
+
+    def _submit_background(self, name, func):
+        """在后台线程中执行 func；同名任务仍在运行时跳过，返回是否已提交。"""
+        running = self._background_tasks.get(name)
+        if running is not None and not running.done():
+            logging.debug(f"{name}仍在执行，跳过本轮")
+            return False
+        if self._background_executor is None:
+            self._background_executor = ThreadPoolExecutor(
+                max_workers=self.BACKGROUND_MAX_WORKERS, thread_name_prefix="DataTrackerTask"
+            )
+
+        def run():
+            try:
+                func()
+            except Exception as e:
+                logging.error(f"{name}出错: {e}", exc_info=True)
+
+        self._background_tasks[name] = self._background_executor.submit(run)
+        return True
+
+    def _get_stats_executor(self):
+        """懒加载统计轮询线程池（有界，线程数上限为 STATS_POLL_MAX_WORKERS）。"""
+        if self._stats_executor is None:
+            self._stats_executor = ThreadPoolExecutor(
+                max_workers=self.STATS_POLL_MAX_WORKERS, thread_name_prefix="StatsPoll"
+            )
+        return self._stats_executor
+
+    def _build_speed_info(self, downloader, upload_speed, download_speed, late=False):
+        metrics = self.poll_metrics.get(downloader["id"], {})
+        return {
+            "name": downloader["name"],
+            "type": downloader["type"],
+            "enabled": True,
+            "upload_speed": upload_speed,
+            "download_speed": download_speed,
+            "late": late,
+            "poll_latency_ms": metrics.get("last_latency_ms"),
+        }
+
+    @staticmethod
+    def _new_poll_metric(name):
+        return {
+            "name": name,
+            "last_latency_ms": None,
+            "avg_latency_ms": None,
+            "max_latency_ms": 0,
+            "polls": 0,
+            "late_count": 0,
+            "error_count": 0,
+            "late": False,
+            "last_poll_at": None,
+        }
+
+    def _record_poll_metric(self, downloader, latency_ms, ok):
+        """记录单个下载器的轮询耗时（指数滑动平均）与错误计数。"""
+        with self._poll_metrics_lock:
+            metrics = self.poll_metrics.setdefault(
+                downloader["id"], self._new_poll_metric(downloader["name"])
+            )
+            metrics["name"] = downloader["name"]
+            metrics["last_latency_ms"] = round(latency_ms, 1)
+            if metrics["avg_latency_ms"] is None:
+                metrics["avg_latency_ms"] = round(latency_ms, 1)
+            else:
+                metrics["avg_latency_ms"] = round(
+                    metrics["avg_latency_ms"] * 0.8 + latency_ms * 0.2, 1
+                )
+            metrics["max_latency_ms"] = max(metrics["max_latency_ms"], round(latency_ms, 1))
+            metrics["polls"] += 1
+            if not ok:
+                metrics["error_count"] += 1
+            metrics["last_poll_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _mark_poll_late(self, downloader, late):
+        with self._poll_metrics_lock:
+            metrics = self.poll_metrics.setdefault(
+                downloader["id"], self._new_poll_metric(downloader["name"])
+            )
+            if late and not metrics["late"]:
+                metrics["late_count"] += 1
+            metrics["late"] = late
+
+    def get_poll_metrics(self):
+        """返回各下载器统计轮询的耗时指标快照。"""
+        with self._poll_metrics_lock:
+            return {k: dict(v) for k, v in self.poll_metrics.items()}
+
+    def _timed_poll_downloader_stats(self, downloader):
+        start = time.monotonic()
+        ok = False
+        try:
+            data_point, status = self._poll_downloader_stats(downloader)
+            ok = status is True
+            return data_point, status
+        finally:
+            self._record_poll_metric(downloader, (time.monotonic() - start) * 1000, ok)
+
+    def _poll_downloader_stats(self, downloader):
+        """获取单个下载器的统计数据，在统计线程池中执行。
+
+        返回 (data_point, status)：
+        - status 为 True 表示成功；
+        - status 为 None 表示本轮没有可用数据（连接/代理失败），不更新该下载器的速度；
+        - status 为 False 表示获取过程中出现异常，速度按 0 处理。
+        """
+        data_point = {
+            "downloader_id": downloader["id"],
+            "total_dl": 0,
+            "total_ul": 0,
+            "dl_speed": 0,
+            "ul_speed": 0,
+        }
+        client = None
+        try:
+            # 检查是否需要使用代理
+            use_proxy = downloader.get("use_proxy", False)
+
+            if use_proxy and downloader["type"] == "qbittorrent":
+                # 使用代理获取统计数据
+                logging.info(f"通过代理获取 '{downloader['name']}' 的统计信息...")
+                proxy_stats = self._get_proxy_stats(downloader)
+
+                if not proxy_stats:
+                    # 代理获取失败，跳过此下载器
+                    logging.warning(f"通过代理获取 '{downloader['name']}' 统计信息失败")
+                    return data_point, None
+
+                # 代理返回的数据格式与直连不同，需要适配
+                if "server_state" in proxy_stats:
+                    # 如果代理返回的是标准格式
+                    server_state = proxy_stats.get("server_state", {})
+                    data_point.update(
+                        {
+                            "dl_speed": int(server_state.get("dl_info_speed", 0)),
+                            "ul_speed": int(server_state.get("up_info_speed", 0)),
+                            "total_dl": int(server_state.get("alltime_dl", 0)),
+                            "total_ul": int(server_state.get("alltime_ul", 0)),
+                        }
+                    )
+                else:
+                    # 新的代理数据格式，直接从根级别获取数据
+                    data_point.update(
+                        {
+                            "dl_speed": int(proxy_stats.get("download_speed", 0)),
+                            "ul_speed": int(proxy_stats.get("upload_speed", 0)),
+                            "total_dl": int(proxy_stats.get("total_download", 0)),
+                            "total_ul": int(proxy_stats.get("total_upload", 0)),
+                        }
+                    )
+                    logging.info(
+                        f"代理数据: 上传速度={data_point['ul_speed']:,}, 下载速度={data_point['dl_speed']:,}, 总上传={data_point['total_ul']:,}, 总下载={data_point['total_dl']:,}"
+                    )
+            else:
+                # 使用常规方式获取统计数据
+                client = self._get_client(downloader)
+                if not client:
+                    return data_point, None
+
+                if downloader["type"] == "qbittorrent":
+                    # 携带上次的 rid，qB 只返回变化的部分（server_state 也是增量，需合并后使用）
+                    sync_state = self._get_qb_sync_state(downloader["id"])
+                    try:
+                        main_data = client.sync_maindata(rid=sync_state.rid_for(client))
+                    except qb_exceptions.APIConnectionError:
+                        logging.warning(f"与 '{downloader['name']}' 的连接丢失，正在尝试重新连接...")
+                        self._drop_client(downloader["id"], client)
+                        client = self._get_client(downloader)
+                        if not client:
+                            return data_point, None
+                        main_data = client.sync_maindata(rid=sync_state.rid_for(client))
+
+                    server_state = sync_state.apply(main_data)
+                    data_point.update(
+                        {
+                            "dl_speed": int(server_state.get("dl_info_speed", 0)),
+                            "ul_speed": int(server_state.get("up_info_speed", 0)),
+                            "total_dl": int(server_state.get("alltime_dl", 0)),
+                            "total_ul": int(server_state.get("alltime_ul", 0)),
+                        }
+                    )
+                elif downloader["type"] == "transmission":
+                    stats = client.session_stats()
+                    data_point.update(
+                        {
+                            "dl_speed": int(getattr(stats, "download_speed", 0)),
+                            "ul_speed": int(getattr(stats, "upload_speed", 0)),
+                            "total_dl": int(stats.cumulative_stats.downloaded_bytes),
+                            "total_ul": int(stats.cumulative_stats.uploaded_bytes),
+                        }
+                    )
+            return data_point, True
+        except Exception as e:
+            logging.warning(f"无法从客户端 '{downloader['name']}' 获取统计信息: {e}")
+            self._drop_client(downloader["id"], client)
+            return data_point, False
+
+    def _publish_speed_ring(self, timestamp, speeds):
+        """将本轮速度写入跨进程环形缓冲区，失败时仅记录一次日志，不影响主流程。"""
+        if self._speed_ring_failed:
+            return
+        try:
+            if self._speed_ring is None:
+                from config import SPEED_RING_FILE
+
+                self._speed_ring = SpeedRingWriter(SPEED_RING_FILE, capacity=self.SPEED_RING_SECONDS)
+            self._speed_ring.publish(timestamp, speeds)
+        except Exception as e:
+            logging.warning(f"写入实时速度环形缓冲区失败，已停用: {e}")
+            self._speed_ring_failed = True
+            if self._speed_ring is not None:
+                self._speed_ring.close()
+                self._speed_ring = None
+
+    def _publish_tracker_metrics(self, force=False):
+        """把轮询与流量写库指标，以及本进程的代理请求、连接池与慢查询指标写入跨进程指标文件，
+        最多每 METRICS_PUBLISH_INTERVAL 秒一次（force 时立即写入），失败不影响主流程。"""
+        now = time.monotonic()
+        if not force and now - self._metrics_published_at < self.METRICS_PUBLISH_INTERVAL:
+            return
+        self._metrics_published_at = now
+        try:
+            if self._metrics_writer is None:
+                from config import TRACKER_METRICS_FILE
+
+                self._metrics_writer = TrackerMetricsWriter(TRACKER_METRICS_FILE)
+            self._metrics_writer.publish(
+                poll_metrics=self.get_poll_metrics(),
+                traffic_flush_metrics=self.get_traffic_flush_metrics(),
+                proxy_client_stats=get_proxy_client().get_stats(),
+                db_pool_stats=self.db_manager.get_pool_stats(),
+                db_slow_queries=self.db_manager.get_slow_queries(),
+            )
+        except Exception as e:
+            logging.warning(f"写入 DataTracker 指标文件失败: {e}")
+
     def _fetch_and_buffer_stats(self):
         config = self.config_manager.get()
         enabled_downloaders = [d for d in config.get("downloaders", []) if d.get("enabled")]
@@ -366,124 +728,60 @@ class DataTracker(Thread):
         data_points = []
         latest_speeds_update = {}
 
+        # 并发轮询：每个下载器一个任务，上一轮仍未返回的下载器不重复提交
+        executor = self._get_stats_executor()
+        futures = {}
         for downloader in enabled_downloaders:
-            data_point = {
-                "downloader_id": downloader["id"],
-                "total_dl": 0,
-                "total_ul": 0,
-                "dl_speed": 0,
-                "ul_speed": 0,
-            }
-            try:
-                # 检查是否需要使用代理
-                use_proxy = downloader.get("use_proxy", False)
+            inflight = self._stats_inflight.get(downloader["id"])
+            if inflight is not None and not inflight.done():
+                continue
+            future = executor.submit(self._timed_poll_downloader_stats, downloader)
+            self._stats_inflight[downloader["id"]] = future
+            futures[future] = downloader
 
-                if use_proxy and downloader["type"] == "qbittorrent":
-                    # 使用代理获取统计数据
-                    logging.info(f"通过代理获取 '{downloader['name']}' 的统计信息...")
-                    proxy_stats = self._get_proxy_stats(downloader)
-
-                    if proxy_stats:
-                        # 代理返回的数据格式与直连不同，需要适配
-                        if "server_state" in proxy_stats:
-                            # 如果代理返回的是标准格式
-                            server_state = proxy_stats.get("server_state", {})
-                            data_point.update(
-                                {
-                                    "dl_speed": int(server_state.get("dl_info_speed", 0)),
-                                    "ul_speed": int(server_state.get("up_info_speed", 0)),
-                                    "total_dl": int(server_state.get("alltime_dl", 0)),
-                                    "total_ul": int(server_state.get("alltime_ul", 0)),
-                                }
-                            )
-                        else:
-                            # 新的代理数据格式，直接从根级别获取数据
-                            data_point.update(
-                                {
-                                    "dl_speed": int(proxy_stats.get("download_speed", 0)),
-                                    "ul_speed": int(proxy_stats.get("upload_speed", 0)),
-                                    "total_dl": int(proxy_stats.get("total_download", 0)),
-                                    "total_ul": int(proxy_stats.get("total_upload", 0)),
-                                }
-                            )
-                            logging.info(
-                                f"代理数据: 上传速度={data_point['ul_speed']:,}, 下载速度={data_point['dl_speed']:,}, 总上传={data_point['total_ul']:,}, 总下载={data_point['total_dl']:,}"
-                            )
+        if futures:
+            wait(futures, timeout=self.STATS_POLL_DEADLINE)
 
-                        # 更新 latest_speeds_update
-                        latest_speeds_update[downloader["id"]] = {
-                            "name": downloader["name"],
-                            "type": downloader["type"],
-                            "enabled": True,
-                            "upload_speed": data_point["ul_speed"],
-                            "download_speed": data_point["dl_speed"],
-                        }
-                        # 过滤掉累计上传量和下载量都为0的数据
-                        if data_point["total_ul"] > 0 or data_point["total_dl"] > 0:
-                            data_points.append(data_point)
-                    else:
-                        # 代理获取失败，跳过此下载器
-                        logging.warning(f"通过代理获取 '{downloader['name']}' 统计信息失败")
-                        continue
-                else:
-                    # 使用常规方式获取统计数据
-                    client = self._get_client(downloader)
-                    if not client:
-                        continue
+        with CACHE_LOCK:
+            previous_speeds = self.latest_speeds
 
-                    if downloader["type"] == "qbittorrent":
-                        try:
-                            main_data = client.sync_maindata()
-                        except qb_exceptions.APIConnectionError:
-                            logging.warning(
-                                f"与 '{downloader['name']}' 的连接丢失，正在尝试重新连接..."
-                            )
-                            del self.clients[downloader["id"]]
-                            client = self._get_client(downloader)
-                            if not client:
-                                continue
-                            main_data = client.sync_maindata()
-
-                        server_state = main_data.get("server_state", {})
-                        data_point.update(
-                            {
-                                "dl_speed": int(server_state.get("dl_info_speed", 0)),
-                                "ul_speed": int(server_state.get("up_info_speed", 0)),
-                                "total_dl": int(server_state.get("alltime_dl", 0)),
-                                "total_ul": int(server_state.get("alltime_ul", 0)),
-                            }
-                        )
-                    elif downloader["type"] == "transmission":
-                        stats = client.session_stats()
-                        data_point.update(
-                            {
-                                "dl_speed": int(getattr(stats, "download_speed", 0)),
-                                "ul_speed": int(getattr(stats, "upload_speed", 0)),
-                                "total_dl": int(stats.cumulative_stats.downloaded_bytes),
-                                "total_ul": int(stats.cumulative_stats.uploaded_bytes),
-                            }
-                        )
-                latest_speeds_update[downloader["id"]] = {
-                    "name": downloader["name"],
-                    "type": downloader["type"],
-                    "enabled": True,
-                    "upload_speed": data_point["ul_speed"],
-                    "download_speed": data_point["dl_speed"],
-                }
-                # 过滤掉累计上传量和下载量都为0的数据
-                if data_point["total_ul"] > 0 or data_point["total_dl"] > 0:
-                    data_points.append(data_point)
+        for downloader in enabled_downloaders:
+            future = self._stats_inflight.get(downloader["id"])
+            if future is None or not future.done():
+                # 超过截止时间仍未返回：标记为 late，沿用上一轮速度，不阻塞其它下载器
+                self._mark_poll_late(downloader, True)
+                previous = previous_speeds.get(downloader["id"], {})
+                latest_speeds_update[downloader["id"]] = self._build_speed_info(
+                    downloader,
+                    previous.get("upload_speed", 0),
+                    previous.get("download_speed", 0),
+                    late=True,
+                )
+                continue
+
+            self._mark_poll_late(downloader, False)
+            self._stats_inflight.pop(downloader["id"], None)
+            # 上一轮超时、本轮才完成的任务：速度可用于展示，但采样时间已过期，不写入流量缓冲
+            is_current_sample = future in futures
+
+            try:
+                data_point, status = future.result()
             except Exception as e:
                 logging.warning(f"无法从客户端 '{downloader['name']}' 获取统计信息: {e}")
-                if downloader["id"] in self.clients:
-                    del self.clients[downloader["id"]]
-                latest_speeds_update[downloader["id"]] = {
-                    "name": downloader["name"],
-                    "type": downloader["type"],
-                    "enabled": True,
-                    "upload_speed": 0,
-                    "download_speed": 0,
-                }
+                data_point, status = None, False
+
+            if status is None:
+                continue
+            if status is False or data_point is None:
+                latest_speeds_update[downloader["id"]] = self._build_speed_info(downloader, 0, 0)
+                continue
+
+            latest_speeds_update[downloader["id"]] = self._build_speed_info(
+                downloader, data_point["ul_speed"], data_point["dl_speed"]
+            )
+            # 过滤掉累计上传量和下载量都为0的数据
+            if is_current_sample and (data_point["total_ul"] > 0 or data_point["total_dl"] > 0):
+                data_points.append(data_point)
 
         with CACHE_LOCK:
             self.latest_speeds = latest_speeds_update
@@ -497,6 +795,8 @@ class DataTracker(Thread):
             self.recent_speeds_buffer.append(
                 {"timestamp": current_timestamp, "speeds": speeds_for_buffer}
             )
+        self._publish_speed_ring(current_timestamp, latest_speeds_update)
+        self._publish_tracker_metrics()
 
         with self.traffic_buffer_lock:
             self.traffic_buffer.append({"timestamp": current_timestamp, "points": data_points})
@@ -524,78 +824,64 @@ class DataTracker(Thread):
             logging.info("过滤后的流量缓冲为空，跳过数据库写入")
             return
 
-        conn = None
+        start = time.monotonic()
+        rows_written = 0
+        rows_skipped = 0
+        ok = False
         try:
-            conn = self.db_manager._get_connection()
-            cursor = self.db_manager._get_cursor(conn)
-
-            # 根据数据库类型设置占位符
-            placeholder = "%s" if self.db_manager.db_type in ["mysql", "postgresql"] else "?"
-
-            # 第一步：获取每个下载器的最后一条记录
-            downloader_ids = set()
-            for entry in filtered_buffer:
-                for data_point in entry["points"]:
-                    downloader_ids.add(data_point["downloader_id"])
-
-            last_records = {}
-            if downloader_ids:
-                # 查询每个下载器的最后一条有效记录
-                placeholders = ",".join([placeholder] * len(downloader_ids))
-                query = f"""
-                    SELECT downloader_id, cumulative_uploaded, cumulative_downloaded, stat_datetime
-                    FROM traffic_stats
-                    WHERE downloader_id IN ({placeholders})
-                    AND cumulative_uploaded > 0 OR cumulative_downloaded > 0
-                    ORDER BY stat_datetime DESC
-                """
-                cursor.execute(query, tuple(downloader_ids))
-                rows = cursor.fetchall()
-
-                # 为每个下载器保存最新的记录
-                for row in rows:
-                    downloader_id = row["downloader_id"]
-                    if downloader_id not in last_records:
-                        last_records[downloader_id] = {
-                            "cumulative_uploaded": row["cumulative_uploaded"],
-                            "cumulative_downloaded": row["cumulative_downloaded"],
-                            "stat_datetime": row["stat_datetime"],
-                        }
-
-            # 第二步：验证并准备插入数据
-            params_to_insert = []
-
-            for entry in filtered_buffer:
-                timestamp_str = entry["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
-                for data_point in entry["points"]:
-                    client_id = data_point["downloader_id"]
-                    current_dl = data_point["total_dl"]
-                    current_ul = data_point["total_ul"]
-
-                    # 数据验证逻辑
-                    should_insert = True
-
-                    if client_id in last_records:
-                        last_ul = last_records[client_id]["cumulative_uploaded"]
-                        last_dl = last_records[client_id]["cumulative_downloaded"]
-
-                        # 检测异常情况：累计值降低或变为0
-                        if (
-                            (current_ul > 0 and current_ul < last_ul)
-                            or (current_dl > 0 and current_dl < last_dl)
-                            or (current_ul == 0 and last_ul > 0)
-                            or (current_dl == 0 and last_dl > 0)
-                        ):
-                            should_insert = False
-                            logging.warning(
-                                f"检测到下载器 {client_id} 的累计流量降低或归零，"
-                                f"跳过插入。当前: 上传={format_bytes(current_ul)}, 下载={format_bytes(current_dl)}; "
-                                f"上次: 上传={format_bytes(last_ul)}, 下载={format_bytes(last_dl)}"
-                            )
+            with self.db_manager.connection() as conn:
+                cursor = self.db_manager._get_cursor(conn)
+                try:
+                    placeholder = "%s" if self.db_manager.db_type in ["mysql", "postgresql"] else "?"
 
-                    if should_insert:
-                        params_to_insert.append(
-                            (
+                    # 第一步：每个下载器的上一条采样，内存中没有时与分钟汇总一样从原始流量存储读取最新一条
+                    downloader_ids = {
+                        data_point["downloader_id"]
+                        for entry in filtered_buffer
+                        for data_point in entry["points"]
+                    }
+                    last_records = {
+                        client_id: self._traffic_last_cumulative[client_id]
+                        for client_id in downloader_ids
+                        if client_id in self._traffic_last_cumulative
+                    }
+                    for client_id in downloader_ids - set(last_records):
+                        last = self.db_manager.raw_traffic.last_sample(cursor, client_id)
+                        if last:
+                            last_records[client_id] = last
+                    max_gap = timedelta(seconds=self.db_manager.ROLLUP_MAX_SAMPLE_GAP)
+
+                    # 第二步：验证并准备插入数据，同一秒同一下载器只保留最后一条（多行 upsert 不能两次命中同一行）
+                    rows_by_key = {}
+                    # (日期, 下载器) -> [上传增量, 下载增量, 累计上传, 累计下载]，写入 traffic_daily_totals
+                    daily_totals = {}
+                    for entry in filtered_buffer:
+                        timestamp_str = entry["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
+                        date_str = timestamp_str[:10]
+                        for data_point in entry["points"]:
+                            client_id = data_point["downloader_id"]
+                            current_dl = data_point["total_dl"]
+                            current_ul = data_point["total_ul"]
+
+                            if client_id in last_records:
+                                _, last_ul, last_dl = last_records[client_id]
+
+                                # 检测异常情况：累计值降低或变为0
+                                if (
+                                    (current_ul > 0 and current_ul < last_ul)
+                                    or (current_dl > 0 and current_dl < last_dl)
+                                    or (current_ul == 0 and last_ul > 0)
+                                    or (current_dl == 0 and last_dl > 0)
+                                ):
+                                    rows_skipped += 1
+                                    logging.warning(
+                                        f"检测到下载器 {client_id} 的累计流量降低或归零，"
+                                        f"跳过插入。当前: 上传={format_bytes(current_ul)}, 下载={format_bytes(current_dl)}; "
+                                        f"上次: 上传={format_bytes(last_ul)}, 下载={format_bytes(last_dl)}"
+                                    )
+                                    continue
+
+                            rows_by_key[(timestamp_str, client_id)] = (
                                 timestamp_str,
                                 client_id,
                                 0,
@@ -605,35 +891,102 @@ class DataTracker(Thread):
                                 current_ul,
                                 current_dl,
                             )
-                        )
-
-                        # 更新本地缓存的最后记录，用于批次内的后续数据验证
-                        last_records[client_id] = {
-                            "cumulative_uploaded": current_ul,
-                            "cumulative_downloaded": current_dl,
-                            "stat_datetime": timestamp_str,
-                        }
-
-            if params_to_insert:
-                # 根据数据库类型使用正确的占位符和冲突处理语法
-                if self.db_manager.db_type == "mysql":
-                    sql_insert = """INSERT INTO traffic_stats (stat_datetime, downloader_id, uploaded, downloaded, upload_speed, download_speed, cumulative_uploaded, cumulative_downloaded) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE uploaded = VALUES(uploaded), downloaded = VALUES(downloaded), upload_speed = VALUES(upload_speed), download_speed = VALUES(download_speed), cumulative_uploaded = VALUES(cumulative_uploaded), cumulative_downloaded = VALUES(cumulative_downloaded)"""
-                elif self.db_manager.db_type == "postgresql":
-                    sql_insert = """INSERT INTO traffic_stats (stat_datetime, downloader_id, uploaded, downloaded, upload_speed, download_speed, cumulative_uploaded, cumulative_downloaded) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT(stat_datetime, downloader_id) DO UPDATE SET uploaded = EXCLUDED.uploaded, downloaded = EXCLUDED.downloaded, upload_speed = EXCLUDED.upload_speed, download_speed = EXCLUDED.download_speed, cumulative_uploaded = EXCLUDED.cumulative_uploaded, cumulative_downloaded = EXCLUDED.cumulative_downloaded"""
-                else:  # sqlite
-                    sql_insert = """INSERT INTO traffic_stats (stat_datetime, downloader_id, uploaded, downloaded, upload_speed, download_speed, cumulative_uploaded, cumulative_downloaded) VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(stat_datetime, downloader_id) DO UPDATE SET uploaded = excluded.uploaded, downloaded = excluded.downloaded, upload_speed = excluded.upload_speed, download_speed = excluded.download_speed, cumulative_uploaded = excluded.cumulative_uploaded, cumulative_downloaded = excluded.cumulative_downloaded"""
-                cursor.executemany(sql_insert, params_to_insert)
-                logging.info(f"成功插入 {len(params_to_insert)} 条流量记录（已过滤异常数据）")
+                            # 与上一个累计值的差即为这段时间的流量。与分钟汇总（rollup_traffic）规则一致：
+                            # 没有上一个值、上一个值为 0 或与上一条采样间隔超过 ROLLUP_MAX_SAMPLE_GAP 时不计
+                            last_at, last_ul, last_dl = last_records.get(client_id, (None, 0, 0))
+                            if last_at is not None and entry["timestamp"] - last_at > max_gap:
+                                last_ul = last_dl = 0
+                            totals = daily_totals.setdefault((date_str, client_id), [0, 0, 0, 0])
+                            totals[0] += current_ul - last_ul if last_ul > 0 else 0
+                            totals[1] += current_dl - last_dl if last_dl > 0 else 0
+                            totals[2] = max(totals[2], current_ul)
+                            totals[3] = max(totals[3], current_dl)
+
+                            # 更新最后记录，用于批次内的后续数据验证
+                            last_records[client_id] = (entry["timestamp"], current_ul, current_dl)
+
+                    params_to_insert = list(rows_by_key.values())
+                    raw_store = self.db_manager.raw_traffic
+                    if params_to_insert and raw_store.in_transaction:
+                        rows_written = raw_store.write(cursor, params_to_insert)
+                    if daily_totals:
+                        self._upsert_daily_totals(cursor, daily_totals, placeholder)
+
+                    conn.commit()
+                    ok = True
+                finally:
+                    cursor.close()
+
+            if not raw_store.in_transaction:
+                # 段文件在每日流量提交成功后才追加；追加失败的采样保留下来重试，并让汇总水位线停在它们之前
+                pending_rows = self._raw_traffic_retry_rows + params_to_insert
+                self._raw_traffic_retry_rows = []
+                if pending_rows:
+                    try:
+                        rows_written = raw_store.write(None, pending_rows)
+                    except Exception as e:
+                        self._raw_traffic_retry_rows = pending_rows
+                        ok = False
+                        logging.error(f"追加流量段文件失败，{len(pending_rows)} 条采样将在下次写入时重试: {e}")
 
-            conn.commit()
+            # 提交成功后才更新内存中的累计值，写库失败时下次重新从数据库读取
+            self._traffic_last_cumulative.update(last_records)
         except Exception as e:
+            self._traffic_last_cumulative.clear()
             logging.error(f"将流量缓冲刷新到数据库失败: {e}", exc_info=True)
-            if conn:
-                conn.rollback()
         finally:
-            if conn:
-                cursor.close()
-                conn.close()
+            self._record_traffic_flush_metric((time.monotonic() - start) * 1000, rows_written, rows_skipped, ok)
+
+    def _upsert_daily_totals(self, cursor, daily_totals, placeholder):
+        """把本批次的流量增量累加到 traffic_daily_totals，累计值取较大者。"""
+        db_type = self.db_manager.db_type
+        if db_type == "mysql":
+            conflict_clause = (
+                "ON DUPLICATE KEY UPDATE uploaded = uploaded + VALUES(uploaded), "
+                "downloaded = downloaded + VALUES(downloaded), "
+                "cumulative_uploaded = GREATEST(cumulative_uploaded, VALUES(cumulative_uploaded)), "
+                "cumulative_downloaded = GREATEST(cumulative_downloaded, VALUES(cumulative_downloaded))"
+            )
+        else:  # postgresql / sqlite
+            greatest = "GREATEST" if db_type == "postgresql" else "MAX"
+            conflict_clause = (
+                "ON CONFLICT(stat_date, downloader_id) DO UPDATE SET "
+                "uploaded = traffic_daily_totals.uploaded + excluded.uploaded, "
+                "downloaded = traffic_daily_totals.downloaded + excluded.downloaded, "
+                f"cumulative_uploaded = {greatest}(traffic_daily_totals.cumulative_uploaded, excluded.cumulative_uploaded), "
+                f"cumulative_downloaded = {greatest}(traffic_daily_totals.cumulative_downloaded, excluded.cumulative_downloaded)"
+            )
+        rows = [(date_str, client_id, *values) for (date_str, client_id), values in daily_totals.items()]
+        row_placeholders = "(" + ", ".join([placeholder] * 6) + ")"
+        cursor.execute(
+            f"INSERT INTO traffic_daily_totals (stat_date, downloader_id, uploaded, downloaded, "
+            f"cumulative_uploaded, cumulative_downloaded) VALUES {', '.join([row_placeholders] * len(rows))} "
+            f"{conflict_clause}",
+            [value for row in rows for value in row],
+        )
+
+    def _record_traffic_flush_metric(self, duration_ms, rows_written, rows_skipped, ok):
+        with self._poll_metrics_lock:
+            metrics = self.traffic_flush_metrics
+            metrics["flushes"] += 1
+            metrics["rows_written"] += rows_written
+            metrics["rows_skipped"] += rows_skipped
+            metrics["last_rows"] = rows_written
+            metrics["last_duration_ms"] = round(duration_ms, 1)
+            metrics["max_duration_ms"] = max(metrics["max_duration_ms"], round(duration_ms, 1))
+            metrics["last_flush_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if not ok:
+                metrics["errors"] += 1
+        self._publish_tracker_metrics(force=True)
+        if ok:
+            logging.info(
+                f"流量缓冲写入完成: {rows_written} 条记录（跳过异常 {rows_skipped} 条），耗时 {duration_ms:.1f} ms"
+            )
+
+    def get_traffic_flush_metrics(self):
+        """返回流量缓冲写库的次数、行数与耗时指标快照。"""
+        with self._poll_metrics_lock:
+            return dict(self.traffic_flush_metrics)
 
     def _cleanup_duplicate_torrents(self):
         """[已废弃] 旧的启动清理逻辑，保留为空函数以防调用"""
@@ -643,7 +996,7 @@ class DataTracker(Thread):
         """基于活跃种子列表进行智能去重
 
         策略：
-        1. 按 5 参数 (name, save_path, size, sites, group) 分组
+        1. 按 5 参数 (name, save_path, size, sites, group) 的 attr_key 分组，由数据库在索引上完成聚合
         2. 只处理 “同组但 downloader_id 不同” 的重复（同一下载器内重复不处理）
         3. 在一个重复组里只保留一个 downloader（优先保留活跃且 last_seen 最新的那一份）
         2. 对于有重复的组：
@@ -656,53 +1009,40 @@ class DataTracker(Thread):
         try:
             conn = self.db_manager._get_connection()
             cursor = self.db_manager._get_cursor(conn)
+            placeholder = "%s" if self.db_manager.db_type in ["mysql", "postgresql"] else "?"
 
-            # 根据数据库类型使用正确的引号包围group字段
-            if self.db_manager.db_type == "postgresql":
-                group_field = '"group"'
-            else:
-                group_field = "`group`"
+            self._backfill_torrent_attr_keys(cursor, placeholder)
 
-            query = (
-                f"SELECT hash, downloader_id, name, save_path, size, sites, {group_field}, last_seen "
-                f"FROM torrents"
+            cursor.execute(
+                "SELECT attr_key, COUNT(DISTINCT downloader_id) AS dl_count FROM torrents "
+                "WHERE attr_key IS NOT NULL GROUP BY attr_key HAVING COUNT(*) > 1"
             )
-            cursor.execute(query)
-
-            groups = {}
+            duplicate_keys = []
+            skipped_same_downloader_groups = 0
             for row in cursor.fetchall():
                 row_dict = dict(row)
-                group_val = row_dict.get("group") or ""
-
-                # 统一做轻量规范化，避免 None/大小写/空白导致“看起来一样但键不相等”
-                name_val = (row_dict.get("name") or "").strip()
-                save_path_val = (row_dict.get("save_path") or "").strip()
-                try:
-                    size_val = int(row_dict.get("size") or 0)
-                except Exception:
-                    size_val = 0
-                sites_val = (row_dict.get("sites") or "").strip().lower()
-                group_val_norm = (group_val or "").strip().lower()
-
-                attr_key = ("attrs", name_val, save_path_val, size_val, sites_val, group_val_norm)
+                if int(row_dict["dl_count"] or 0) < 2:
+                    skipped_same_downloader_groups += 1
+                else:
+                    duplicate_keys.append(row_dict["attr_key"])
 
-                if attr_key not in groups:
-                    groups[attr_key] = []
-                groups[attr_key].append(row_dict)
+            # 只取出跨下载器重复组的记录
+            groups = collections.defaultdict(list)
+            for i in range(0, len(duplicate_keys), 500):
+                batch = duplicate_keys[i : i + 500]
+                in_clause = ", ".join([placeholder] * len(batch))
+                cursor.execute(
+                    f"SELECT hash, downloader_id, last_seen, attr_key FROM torrents WHERE attr_key IN ({in_clause})",
+                    batch,
+                )
+                for row in cursor.fetchall():
+                    row_dict = dict(row)
+                    groups[row_dict["attr_key"]].append(row_dict)
 
             to_delete = []
             duplicate_groups = 0
-            skipped_same_downloader_groups = 0
 
             for key, records in groups.items():
-                if len(records) < 2:
-                    continue
-
-                downloader_ids = {r.get("downloader_id") for r in records if r.get("downloader_id") is not None}
-                if len(downloader_ids) < 2:
-                    skipped_same_downloader_groups += 1
-                    continue
-
                 duplicate_groups += 1
 
                 keep_downloader_id = self._choose_keep_downloader_id_for_dedup(records, active_hashes)
@@ -715,16 +1055,16 @@ class DataTracker(Thread):
                         )
 
             if to_delete:
-                placeholder = "%s" if self.db_manager.db_type in ["mysql", "postgresql"] else "?"
                 del_sql = f"DELETE FROM torrents WHERE hash={placeholder} AND downloader_id={placeholder}"
                 cursor.executemany(del_sql, to_delete)
 
                 stats_del_sql = f"DELETE FROM torrent_upload_stats WHERE hash={placeholder} AND downloader_id={placeholder}"
                 cursor.executemany(stats_del_sql, to_delete)
 
-                conn.commit()
                 deleted_total = len(to_delete)
 
+            conn.commit()
+
             print(
                 f"【刷新线程】智能去重统计: 重复组 {duplicate_groups}, "
                 f"删除 {deleted_total}, 同下载器重复而跳过 {skipped_same_downloader_groups}"
@@ -765,55 +1105,49 @@ class DataTracker(Thread):
         keep = max(candidates, key=sort_key)
         return keep.get("downloader_id")
 
-    def _normalize_attr_key(self, name, save_path, size, sites, group):
-        name_val = (name or "").strip()
-        save_path_val = (save_path or "").strip()
-        try:
-            size_val = int(size or 0)
-        except Exception:
-            size_val = 0
-        sites_val = (sites or "").strip().lower()
-        group_val = (group or "").strip().lower()
-        return (name_val, save_path_val, size_val, sites_val, group_val)
-
-    def _build_torrents_attribute_index_from_db(self):
-        """构建全库的 5 参数索引，用于跨下载器/跨 hash 寻找同一条目。
+    def _build_torrents_attribute_index_from_db(self, attr_keys):
+        """按 attr_key 索引查询数据库中的同属性记录，用于跨下载器/跨 hash 寻找同一条目。
 
-        key: (name, save_path, size, sites(lower), group(lower))
+        只查询传入的 attr_key，不再扫描全表；查询前先为缺少 attr_key 的旧记录补全。
+        key: attr_key（5 参数规范化后的 MD5，见 torrent_attr_key）
         value: list[(hash, downloader_id, last_seen)]
         """
+        index = collections.defaultdict(list)
+        attr_keys = list(attr_keys)
+        if not attr_keys:
+            return index
+
         conn = None
         try:
             conn = self.db_manager._get_connection()
             cursor = self.db_manager._get_cursor(conn)
+            placeholder = "%s" if self.db_manager.db_type in ["mysql", "postgresql"] else "?"
 
-            group_field = '"group"' if self.db_manager.db_type == "postgresql" else "`group`"
-            cursor.execute(
-                f"SELECT hash, downloader_id, name, save_path, size, sites, {group_field}, last_seen FROM torrents"
-            )
+            if self._backfill_torrent_attr_keys(cursor, placeholder):
+                conn.commit()
 
-            index = collections.defaultdict(list)
-            for row in cursor.fetchall():
-                row_dict = dict(row)
-                group_val = row_dict.get("group") or ""
-                key = self._normalize_attr_key(
-                    row_dict.get("name"),
-                    row_dict.get("save_path"),
-                    row_dict.get("size"),
-                    row_dict.get("sites"),
-                    group_val,
+            for i in range(0, len(attr_keys), 500):
+                batch = attr_keys[i : i + 500]
+                in_clause = ", ".join([placeholder] * len(batch))
+                cursor.execute(
+                    f"SELECT hash, downloader_id, last_seen, attr_key FROM torrents WHERE attr_key IN ({in_clause})",
+                    batch,
                 )
-                index[key].append(
-                    (
-                        row_dict.get("hash"),
-                        row_dict.get("downloader_id"),
-                        row_dict.get("last_seen"),
+                for row in cursor.fetchall():
+                    row_dict = dict(row)
+                    index[row_dict["attr_key"]].append(
+                        (
+                            row_dict.get("hash"),
+                            row_dict.get("downloader_id"),
+                            row_dict.get("last_seen"),
+                        )
                     )
-                )
 
             return index
         except Exception as e:
             logging.error(f"构建种子属性索引失败: {e}", exc_info=True)
+            if conn:
+                conn.rollback()
             return collections.defaultdict(list)
         finally:
             if conn:
@@ -839,9 +1173,14 @@ class DataTracker(Thread):
             placeholder = "%s" if self.db_manager.db_type in ["mysql", "postgresql"] else "?"
             group_field = '"group"' if self.db_manager.db_type == "postgresql" else "`group`"
 
-            # 1) 读取全表最小字段，找出“当前活跃的聚合组”（name+size）
-            cursor.execute("SELECT hash, downloader_id, name, size FROM torrents")
-            rows_min = [dict(r) for r in cursor.fetchall()]
+            # 1) 读取全表（后续回填也使用这一次的结果），找出“当前活跃的聚合组”（name+size）
+            cursor.execute(
+                f"SELECT hash, downloader_id, name, save_path, size, progress, state, sites, details, "
+                f"{group_field} AS group_value, last_seen, seeders, attr_key "
+                f"FROM torrents"
+            )
+            rows_full = [dict(r) for r in cursor.fetchall()]
+            rows_min = rows_full
 
             active_groups = set()
             for r in rows_min:
@@ -874,14 +1213,7 @@ class DataTracker(Thread):
             if not rebuild_groups:
                 return 0
 
-            # 3) 拉取这些组的完整 torrents 行（用于回填）并收集要删除的 (hash, downloader_id)
-            cursor.execute(
-                f"SELECT hash, downloader_id, name, save_path, size, progress, state, sites, details, "
-                f"{group_field} AS group_value, last_seen, seeders "
-                f"FROM torrents"
-            )
-            rows_full = [dict(r) for r in cursor.fetchall()]
-
+            # 3) 从这些组的完整 torrents 行中收集要回填的行和要删除的 (hash, downloader_id)
             delete_pairs = []
             keep_torrent_params = []
             keep_pairs = set()
@@ -915,12 +1247,21 @@ class DataTracker(Thread):
                             r.get("downloader_id"),
                             r.get("last_seen"),
                             r.get("seeders") or 0,
+                            r.get("attr_key"),
                         )
                     )
 
-            # 4) 备份要回填的上传统计（按 keep_pairs）
-            cursor.execute("SELECT hash, downloader_id, uploaded FROM torrent_upload_stats")
-            stats_rows = [dict(r) for r in cursor.fetchall()]
+            # 4) 备份要回填的上传统计（按 keep_pairs，只查询这些 hash）
+            keep_hashes = list({pair[0] for pair in keep_pairs})
+            stats_rows = []
+            for i in range(0, len(keep_hashes), 500):
+                batch = keep_hashes[i : i + 500]
+                in_clause = ", ".join([placeholder] * len(batch))
+                cursor.execute(
+                    f"SELECT hash, downloader_id, uploaded FROM torrent_upload_stats WHERE hash IN ({in_clause})",
+                    tuple(batch),
+                )
+                stats_rows.extend(dict(r) for r in cursor.fetchall())
             keep_stats_params = []
             for r in stats_rows:
                 pair = (r.get("hash"), r.get("downloader_id"))
@@ -941,18 +1282,18 @@ class DataTracker(Thread):
             # 6) 回填 torrents
             if self.db_manager.db_type == "mysql":
                 insert_sql = (
-                    "INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, `group`, downloader_id, last_seen, seeders) "
-                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+                    "INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, `group`, downloader_id, last_seen, seeders, attr_key) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
                 )
             elif self.db_manager.db_type == "postgresql":
                 insert_sql = (
-                    'INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders) '
-                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+                    'INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders, attr_key) '
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
                 )
             else:
                 insert_sql = (
-                    'INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders) '
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    'INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders, attr_key) '
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
                 )
 
             for i in range(0, len(keep_torrent_params), batch_size):
@@ -1013,7 +1354,6 @@ class DataTracker(Thread):
             return set(), []
 
         core_domain_map, _, group_to_site_map_lower = load_site_maps_from_db(self.db_manager)
-        all_db_attribute_index = self._build_torrents_attribute_index_from_db()
 
         # 增量同步：按下载器单独处理，减少内存占用
         total_new = 0
@@ -1029,7 +1369,6 @@ class DataTracker(Thread):
                         downloader,
                         core_domain_map,
                         group_to_site_map_lower,
-                        all_db_attribute_index,
                     )
                 )
                 total_new += new_count
@@ -1048,6 +1387,12 @@ class DataTracker(Thread):
 
         # 清理已删除下载器的数据
         self._cleanup_deleted_downloaders(config)
+        snapshot_store = get_torrent_snapshot_store()
+        snapshot_store.retain({d["id"] for d in config.get("downloaders", [])})
+        snapshot_store.save()
+
+        # 只通知本轮记录或上传量发生变化的种子
+        notify_torrents_changed(self.db_manager, self._take_index_changes())
 
         print(
             f"【刷新线程】=== 增量更新完成: 总新增 {total_new}, 总更新 {total_updated}, 总删除 {total_deleted} ==="
@@ -1058,18 +1403,13 @@ class DataTracker(Thread):
         return all_active_hashes, enabled_downloaders
 
     def _update_downloader_torrents_incremental(
-        self, downloader, core_domain_map, group_to_site_map_lower, all_db_attribute_index
+        self, downloader, core_domain_map, group_to_site_map_lower
     ):
         """增量同步单个下载器的种子数据"""
-        from datetime import datetime
-
-        new_count = 0
-        updated_count = 0
-        deleted_count = 0
-
         # 1. 获取下载器中的种子列表
         torrents_list = []
         client_instance = None
+        proxy_torrents = None
 
         try:
             # 检查是否需要使用代理
@@ -1081,10 +1421,8 @@ class DataTracker(Thread):
                 proxy_torrents = self._get_proxy_torrents(downloader)
 
                 if proxy_torrents is not None:
+                    # 种子在同步时边读边处理，数量在读取完成后输出
                     torrents_list = proxy_torrents
-                    print(
-                        f"【刷新线程】通过代理从 '{downloader['name']}' 成功获取到 {len(torrents_list)} 个种子。"
-                    )
                 else:
                     print(f"【刷新线程】通过代理获取 '{downloader['name']} 种子信息失败")
                     return 0, 0, 0, set()
@@ -1099,24 +1437,9 @@ class DataTracker(Thread):
                 if downloader["type"] == "qbittorrent":
                     torrents_list = client_instance.torrents_info(status_filter="all")
                 elif downloader["type"] == "transmission":
-                    fields = [
-                        "id",
-                        "name",
-                        "hashString",
-                        "downloadDir",
-                        "totalSize",
-                        "status",
-                        "comment",
-                        "trackers",
-                        "percentDone",
-                        "uploadedEver",
-                        "peersGettingFromUs",
-                        "trackerStats",
-                        "peers",
-                        "peersConnected",
-                        "sizeWhenDone" # 添加 sizeWhenDone 字段
-                    ]
-                    torrents_list = client_instance.get_torrents(arguments=fields)
+                    torrents_list = client_instance.get_torrents(arguments=_TR_TORRENT_FIELDS)
+                    # 完整列表同时作为 recently-active 增量同步的 id -> hash 基线
+                    self._get_tr_sync_state(downloader["id"]).prime(torrents_list)
 
                 print(
                     f"【刷新线程】从 '{downloader['name']}' 成功获取到 {len(torrents_list)} 个种子。"
@@ -1126,24 +1449,91 @@ class DataTracker(Thread):
             logging.error(f"未能从 '{downloader['name']}' 获取数据: {e}")
             return 0, 0, 0, set()
 
-        # 2. 构建当前种子的内存快照
+        # 2. 与数据库及持久化快照对比并写入变化
+        counts, current_hashes = self._sync_downloader_torrent_list(
+            downloader,
+            torrents_list,
+            client_instance,
+            core_domain_map,
+            group_to_site_map_lower,
+        )
+        if proxy_torrents is not None:
+            print(
+                f"【刷新线程】通过代理从 '{downloader['name']}' 成功获取到 {proxy_torrents.count} 个种子。"
+            )
+        if counts is None:
+            return 0, 0, 0, current_hashes
+        return (*counts, current_hashes)
+
+    def _sync_downloader_torrent_list(
+        self,
+        downloader,
+        torrents_list,
+        client_instance,
+        core_domain_map,
+        group_to_site_map_lower,
+    ):
+        """把下载器的完整种子列表同步到数据库。
+
+        返回 ((新增数, 更新数, 删除数), 当前 hash 集合)，写库失败时计数为 None。
+        """
+        new_count = 0
+        updated_count = 0
+        deleted_count = 0
+
+        # 1. 构建当前种子的内存快照
         current_torrents = {}
         for t in torrents_list:
             t_info = self._normalize_torrent_info(t, downloader["type"], client_instance)
             current_torrents[t_info["hash"]] = t_info
 
-        # 3. 查询数据库中该下载器的现有种子
-        db_torrents = self._get_downloader_torrents_from_db(downloader["id"])
+        # 2. 与上次写入数据库时的持久化快照对比：指纹未变的种子无需识别站点/官组，也无需与数据库对比
+        snapshot_store = get_torrent_snapshot_store()
+        fingerprints = {
+            t_hash: self._snapshot_entry(t_info) for t_hash, t_info in current_torrents.items()
+        }
+        snapshot = snapshot_store.get(downloader["id"], self._get_torrent_db_marker(downloader["id"]))
+        if snapshot is None:
+            changed_torrents = current_torrents
+            upload_torrents = current_torrents
+            db_torrents = self._get_downloader_torrents_from_db(downloader["id"])
+        else:
+            changed_torrents = {}
+            upload_torrents = {}
+            for t_hash, t_info in current_torrents.items():
+                previous = snapshot.get(t_hash)
+                if previous == fingerprints[t_hash]:
+                    continue
+                upload_torrents[t_hash] = t_info
+                if previous is None or previous[0] != fingerprints[t_hash][0]:
+                    changed_torrents[t_hash] = t_info
+            removed_hashes = set(snapshot) - set(current_torrents)
+            db_torrents = self._get_downloader_torrents_from_db(
+                downloader["id"], set(changed_torrents) | removed_hashes
+            )
+            if any(t_hash not in db_torrents for t_hash in changed_torrents):
+                # 有新种子时需要该下载器的全部记录，才能识别同下载器内 hash 变化的情况
+                db_torrents = self._get_downloader_torrents_from_db(downloader["id"])
+            print(
+                f"【刷新线程】下载器 {downloader['name']} 与快照对比: "
+                f"{len(current_torrents) - len(changed_torrents)} 个种子未变化, "
+                f"{len(changed_torrents)} 个需要对比"
+            )
+
+        # 3. qBittorrent：批量补全为空的注释
+        if downloader["type"] == "qbittorrent" and client_instance:
+            self._backfill_qb_comments(changed_torrents.values(), client_instance, downloader["name"])
 
         # 4. 对比找出变化的种子
         new_torrents, updated_torrents, deleted_hashes = self._compare_torrent_changes(
-            current_torrents,
+            changed_torrents,
             db_torrents,
             downloader,
             core_domain_map,
             group_to_site_map_lower,
-            all_db_attribute_index,
         )
+        # 只对比了部分种子时，未参与对比的种子仍在下载器中
+        deleted_hashes -= set(current_torrents)
 
         print(
             f"【刷新线程】下载器 {downloader['name']} 变化分析: "
@@ -1151,15 +1541,248 @@ class DataTracker(Thread):
         )
 
         # 5. 分批处理变化的数据
-        if new_torrents or updated_torrents or deleted_hashes:
-            new_count, updated_count, deleted_count = self._process_torrent_changes(
-                downloader["id"], new_torrents, updated_torrents, deleted_hashes, current_torrents
+        if new_torrents or updated_torrents or deleted_hashes or upload_torrents:
+            result = self._process_torrent_changes(
+                downloader["id"], new_torrents, updated_torrents, deleted_hashes, upload_torrents
+            )
+            if result is None:
+                snapshot_store.invalidate(downloader["id"])
+                return None, set(current_torrents.keys())
+            new_count, updated_count, deleted_count = result
+
+        # 6. 更新持久化快照；删除时因同名种子仍在做种而保留的记录用空指纹占位，下次刷新会重新检查
+        for t_hash in deleted_hashes:
+            fingerprints[t_hash] = (0, 0)
+        snapshot_store.replace(
+            downloader["id"], fingerprints, self._get_torrent_db_marker(downloader["id"])
+        )
+
+        return (new_count, updated_count, deleted_count), set(current_torrents.keys())
+
+    def _snapshot_entry(self, torrent_info):
+        """种子在持久化快照中的记录：(参与数据库对比的字段指纹, 上传量)。"""
+        fingerprint = torrent_fingerprint(
+            (
+                torrent_info["name"],
+                torrent_info["save_path"],
+                torrent_info["size"],
+                round(torrent_info["progress"] * 100, 1),
+                format_state(torrent_info["state"]),
+                torrent_info.get("seeders", 0),
             )
+        )
+        return fingerprint, int(torrent_info.get("uploaded") or 0)
+
+    def _get_torrent_db_marker(self, downloader_id):
+        """下载器在 torrents 表中的 (行数, 最大 last_seen)，用于判断持久化快照是否仍与数据库一致。"""
+        placeholder = "%s" if self.db_manager.db_type in ["mysql", "postgresql"] else "?"
+        try:
+            with self.db_manager.connection() as conn:
+                cursor = self.db_manager._get_cursor(conn)
+                try:
+                    cursor.execute(
+                        f"SELECT COUNT(*) AS cnt, MAX(last_seen) AS max_seen FROM torrents "
+                        f"WHERE downloader_id = {placeholder}",
+                        (downloader_id,),
+                    )
+                    row = dict(cursor.fetchone())
+                finally:
+                    cursor.close()
+        except Exception as e:
+            logging.warning(f"查询下载器 {downloader_id} 的种子快照标记失败: {e}")
+            return None
+        return f"{row['cnt']}|{row['max_seen'] or ''}"
+
+    def _get_qb_sync_state(self, downloader_id):
+        state = self._qb_sync_states.get(downloader_id)
+        if state is None:
+            state = self._qb_sync_states.setdefault(downloader_id, QbMaindataSyncState())
+        return state
+
+    def _get_tr_sync_state(self, downloader_id):
+        state = self._tr_sync_states.get(downloader_id)
+        if state is None:
+            state = self._tr_sync_states.setdefault(downloader_id, TransmissionSyncState())
+        return state
+
+    def _get_delta_site_maps(self):
+        """增量同步使用的站点/官组映射，按 DELTA_SITE_MAPS_TTL 缓存，避免每轮都查库并重建匹配器。"""
+        now = time.monotonic()
+        if (
+            self._delta_site_maps is None
+            or now - self._delta_site_maps_loaded_at > self.DELTA_SITE_MAPS_TTL
+        ):
+            core_domain_map, _, group_to_site_map_lower = load_site_maps_from_db(self.db_manager)
+            self._delta_site_maps = (core_domain_map, group_to_site_map_lower)
+            self._delta_site_maps_loaded_at = now
+        return self._delta_site_maps
+
+    def _run_torrent_delta_sync(self):
+        """增量同步所有下载器的种子：只处理上次同步以来变化和删除的种子。
+
+        - qBittorrent：消费统计轮询 sync/maindata 时累积的变化，不再额外请求下载器
+        - Transmission：请求 recently-active 种子及已删除的种子 id
+        - 通过代理连接的下载器不支持增量，仍由完整刷新处理
+        """
+        config = self.config_manager.get()
+        enabled_downloaders = [d for d in config.get("downloaders", []) if d.get("enabled")]
+        enabled_ids = {d["id"] for d in enabled_downloaders}
+        for states in (self._qb_sync_states, self._tr_sync_states):
+            for downloader_id in list(states):
+                if downloader_id not in enabled_ids:
+                    states.pop(downloader_id, None)
+        if not enabled_downloaders:
+            return
+
+        site_maps = None
+        total_new = total_updated = total_deleted = 0
+        for downloader in enabled_downloaders:
+            if downloader.get("use_proxy", False) and downloader["type"] == "qbittorrent":
+                continue
+            try:
+                if downloader["type"] == "qbittorrent":
+                    state = self._qb_sync_states.get(downloader["id"])
+                    if state is None or not state.primed:
+                        continue
+                    changed, removed_hashes, is_full = state.take_changes()
+                    with self._clients_lock:
+                        client_instance = self.clients.get(downloader["id"])
+                elif downloader["type"] == "transmission":
+                    if site_maps is None:
+                        site_maps = self._get_delta_site_maps()
+                    state = self._get_tr_sync_state(downloader["id"])
+                    if not state.primed:
+                        # 新加入的下载器还没有 id -> hash 基线，先做一次完整刷新
+                        counts = self._update_downloader_torrents_incremental(
+                            downloader, site_maps[0], site_maps[1]
+                        )
+                        total_new += counts[0]
+                        total_updated += counts[1]
+                        total_deleted += counts[2]
+                        continue
+                    client_instance = self._get_client(downloader)
+                    if not client_instance:
+                        continue
+                    active, removed_ids = client_instance.get_recently_active_torrents(
+                        arguments=_TR_TORRENT_FIELDS
+                    )
+                    removed_hashes = state.apply_recently_active(active, removed_ids)
+                    changed = {t.hash_string: t for t in active}
+                    is_full = False
+                else:
+                    continue
 
-        return new_count, updated_count, deleted_count, set(current_torrents.keys())
+                if not changed and not removed_hashes:
+                    continue
+                if site_maps is None:
+                    site_maps = self._get_delta_site_maps()
+                result = self._apply_torrent_delta(
+                    downloader, changed, removed_hashes, is_full, client_instance, *site_maps
+                )
+                if result is None:
+                    # 写库失败，本轮变化已被取出：qB 重新获取完整快照，TR 下一轮先做完整刷新
+                    if downloader["type"] == "qbittorrent":
+                        self._get_qb_sync_state(downloader["id"]).reset()
+                    else:
+                        self._tr_sync_states.pop(downloader["id"], None)
+                    continue
+                new_count, updated_count, deleted_count = result
+                total_new += new_count
+                total_updated += updated_count
+                total_deleted += deleted_count
+            except Exception as e:
+                logging.warning(f"增量同步下载器 '{downloader['name']}' 的种子失败: {e}")
+                if downloader["type"] == "qbittorrent":
+                    self._get_qb_sync_state(downloader["id"]).reset()
+
+        get_torrent_snapshot_store().save(min_interval=self.SNAPSHOT_SAVE_INTERVAL)
 
-    def _get_downloader_torrents_from_db(self, downloader_id):
-        """从数据库获取指定下载器的所有种子信息"""
+        notify_torrents_changed(self.db_manager, self._take_index_changes())
+        if total_new or total_updated or total_deleted:
+            logging.info(
+                f"种子增量同步完成: 新增 {total_new}, 更新 {total_updated}, 删除 {total_deleted}"
+            )
+
+    def _apply_torrent_delta(
+        self,
+        downloader,
+        changed,
+        removed_hashes,
+        is_full,
+        client_instance,
+        core_domain_map,
+        group_to_site_map_lower,
+    ):
+        """把单个下载器的增量变化写入数据库，返回 (新增数, 更新数, 删除数)，写库失败时返回 None。
+
+        is_full 为 True 时 changed 是完整种子列表（例如 qB 重新建立会话后的首个快照），
+        此时按完整刷新处理（同样会先与持久化快照对比）。
+        """
+        if is_full:
+            counts, _ = self._sync_downloader_torrent_list(
+                downloader,
+                changed.values(),
+                client_instance,
+                core_domain_map,
+                group_to_site_map_lower,
+            )
+            return counts
+
+        current_torrents = {}
+        for t in changed.values():
+            t_info = self._normalize_torrent_info(t, downloader["type"], client_instance)
+            if t_info.get("hash"):
+                current_torrents[t_info["hash"]] = t_info
+
+        if downloader["type"] == "qbittorrent" and client_instance:
+            self._backfill_qb_comments(current_torrents.values(), client_instance, downloader["name"])
+
+        db_torrents = self._get_downloader_torrents_from_db(
+            downloader["id"], set(current_torrents) | set(removed_hashes)
+        )
+        if any(t_hash not in db_torrents for t_hash in current_torrents):
+            # 有新种子时需要该下载器的全部记录，才能识别同下载器内 hash 变化的情况
+            db_torrents = self._get_downloader_torrents_from_db(downloader["id"])
+
+        new_torrents, updated_torrents, deleted_hashes = self._compare_torrent_changes(
+            current_torrents,
+            db_torrents,
+            downloader,
+            core_domain_map,
+            group_to_site_map_lower,
+        )
+        # 未出现在本轮变化中的种子并没有被删除，只删除下载器明确报告移除的种子
+        deleted_hashes &= set(removed_hashes)
+        # 同下载器内 hash 变化时旧 hash 的记录会被替换（写库时会从种子信息中移除该字段，需提前记录）
+        replaced_hashes = {
+            t["old_hash_for_replacement"]
+            for t in updated_torrents.values()
+            if t.get("old_hash_for_replacement")
+        }
+
+        if not (new_torrents or updated_torrents or deleted_hashes or current_torrents):
+            return 0, 0, 0
+        result = self._process_torrent_changes(
+            downloader["id"], new_torrents, updated_torrents, deleted_hashes, current_torrents
+        )
+        if result is None:
+            return None
+
+        changed_entries = {
+            t_hash: self._snapshot_entry(t_info) for t_hash, t_info in current_torrents.items()
+        }
+        # 与完整刷新一致：删除时被保留的记录用空指纹占位
+        changed_entries.update({t_hash: (0, 0) for t_hash in deleted_hashes})
+        get_torrent_snapshot_store().update(
+            downloader["id"],
+            changed_entries,
+            (set(removed_hashes) - deleted_hashes) | replaced_hashes,
+            self._get_torrent_db_marker(downloader["id"]),
+        )
+        return result
+
+    def _get_downloader_torrents_from_db(self, downloader_id, hashes=None):
+        """从数据库获取指定下载器的种子信息，传入 hashes 时只查询这些种子"""
         conn = None
         try:
             conn = self.db_manager._get_connection()
@@ -1172,15 +1795,25 @@ class DataTracker(Thread):
             else:
                 group_field = "`group`"
 
-            cursor.execute(
+            base_sql = (
                 f"SELECT hash, name, save_path, size, progress, state, sites, details, "
                 f"{group_field}, downloader_id, last_seen, seeders FROM torrents "
-                f"WHERE downloader_id = {placeholder}",
-                (downloader_id,),
+                f"WHERE downloader_id = {placeholder}"
             )
+            rows = []
+            if hashes is None:
+                cursor.execute(base_sql, (downloader_id,))
+                rows = cursor.fetchall()
+            else:
+                hash_list = list(hashes)
+                for i in range(0, len(hash_list), 500):
+                    batch = hash_list[i : i + 500]
+                    in_clause = ", ".join([placeholder] * len(batch))
+                    cursor.execute(f"{base_sql} AND hash IN ({in_clause})", (downloader_id, *batch))
+                    rows.extend(cursor.fetchall())
 
             db_torrents = {}
-            for row in cursor.fetchall():
+            for row in rows:
                 # 处理不同数据库类型返回的字段名差异
                 row_dict = dict(row)
 
@@ -1217,7 +1850,6 @@ class DataTracker(Thread):
         downloader,
         core_domain_map,
         group_to_site_map_lower,
-        all_db_attribute_index,
     ):
         """对比当前种子和数据库种子，找出变化的部分（支持基于属性的匹配）"""
         new_torrents = {}
@@ -1239,6 +1871,22 @@ class DataTracker(Thread):
         current_hashes = set(current_torrents.keys())
         db_hashes = set(db_torrents.keys())
 
+        # 只为数据库中没有的 hash 按 attr_key 索引查找全库同属性记录（识别跨下载器迁移）
+        unseen_attr_keys = {
+            hash_value: torrent_attr_key(
+                info.get("name"),
+                info.get("save_path"),
+                info.get("size"),
+                info.get("sites"),
+                info.get("group"),
+            )
+            for hash_value, info in current_torrents.items()
+            if hash_value not in db_hashes
+        }
+        all_db_attribute_index = self._build_torrents_attribute_index_from_db(
+            set(unseen_attr_keys.values())
+        )
+
         # 构建当前下载器内基于属性的映射，用于处理“同下载器内 hash 变化”的情况
         # key: (name, save_path, size, sites, group), value: hash
         db_attribute_to_hash = {}
@@ -1253,13 +1901,6 @@ class DataTracker(Thread):
                 # - 同下载器内：按 5 属性匹配，视为 hash 变化 -> 替换旧 hash
                 # - 跨下载器：按 5 属性匹配，视为迁移覆盖 -> 删除旧 downloader 的记录，保留当前 downloader
                 attr_key_raw = self._generate_attribute_key(current_info)
-                norm_key = self._normalize_attr_key(
-                    current_info.get("name"),
-                    current_info.get("save_path"),
-                    current_info.get("size"),
-                    current_info.get("sites"),
-                    current_info.get("group"),
-                )
 
                 old_rows_for_replacement = []
                 old_hash_for_replacement = None
@@ -1272,7 +1913,7 @@ class DataTracker(Thread):
                         deleted_hashes.remove(matched_hash)
 
                 # 跨下载器覆盖：删除其他 downloader_id 的旧记录（避免 A->B 迁移后产生重复）
-                global_matches = (all_db_attribute_index or {}).get(norm_key, [])
+                global_matches = all_db_attribute_index.get(unseen_attr_keys[hash_value], [])
                 for old_hash, old_downloader_id, _last_seen in global_matches:
                     if old_downloader_id and old_downloader_id != downloader["id"]:
                         old_rows_for_replacement.append((old_hash, old_downloader_id))
@@ -1349,7 +1990,7 @@ class DataTracker(Thread):
     def _process_torrent_changes(
         self, downloader_id, new_torrents, updated_torrents, deleted_hashes, current_torrents
     ):
-        """处理种子的增删改操作"""
+        """处理种子的增删改操作，返回 (新增数, 更新数, 删除数)，出错回滚时返回 None"""
         from datetime import datetime
 
         new_count = 0
@@ -1388,18 +2029,53 @@ class DataTracker(Thread):
                 print(f"【刷新线程】批量处理了 {upload_count} 条上传统计")
 
             conn.commit()
+            self._record_index_changes(set(deleted_hashes) | all_to_insert.keys())
+            self._record_upload_changes(downloader_id, upload_stats, deleted_hashes)
             return new_count, updated_count, deleted_count
 
         except Exception as e:
             logging.error(f"处理种子变化时出错: {e}", exc_info=True)
             if conn:
                 conn.rollback()
-            return 0, 0, 0
+            return None
         finally:
             if conn:
                 cursor.close()
                 conn.close()
 
+    def _record_index_changes(self, hashes=None):
+        """记录写入数据库的种子变化，hashes 为 None 表示无法确定范围（全量变化）。"""
+        with self._index_changes_lock:
+            if hashes is None:
+                self._index_full_change = True
+            else:
+                self._index_changed_hashes.update(hashes)
+
+    def _record_upload_changes(self, downloader_id, upload_stats, deleted_hashes=()):
+        """把本轮写入的上传统计与此前写入的值比较，只把上传量变化的种子记为变化。
+
+        增量同步时 upload_stats 只包含本轮处理的种子，未写入的种子数据库中的值不变，
+        因此按本轮写入的行合并到已记录的值中，而不是整体替换。
+        """
+        with self._index_changes_lock:
+            last_uploads = self._index_last_uploads.setdefault(downloader_id, {})
+            changed = set()
+            for hash_value, _, uploaded in upload_stats:
+                if last_uploads.get(hash_value) != uploaded:
+                    changed.add(hash_value)
+                    last_uploads[hash_value] = uploaded
+            for hash_value in deleted_hashes:
+                last_uploads.pop(hash_value, None)
+            self._index_changed_hashes.update(changed)
+
+    def _take_index_changes(self):
+        """取出并清空已记录的变化：返回 hash 集合，全量变化时返回 None。"""
+        with self._index_changes_lock:
+            hashes = None if self._index_full_change else self._index_changed_hashes
+            self._index_changed_hashes = set()
+            self._index_full_change = False
+            return hashes
+
     def _collect_upload_stats(self, current_torrents, downloader_id):
         """收集有上传量的种子统计"""
         upload_stats = []
@@ -1530,6 +2206,13 @@ class DataTracker(Thread):
                 torrent_info["downloader_id"],
                 now_str,
                 torrent_info.get("seeders", 0),
+                torrent_attr_key(
+                    torrent_info["name"],
+                    torrent_info["save_path"],
+                    torrent_info["size"],
+                    torrent_info.get("sites"),
+                    torrent_info.get("group"),
+                ),
             )
             params.append(param)
 
@@ -1540,9 +2223,13 @@ class DataTracker(Thread):
 
             # 根据数据库类型使用正确的语法
             if self.db_manager.db_type == "mysql":
-                sql = """INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, `group`, downloader_id, last_seen, seeders)
-                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                # attr_key 必须在 sites/`group` 之前赋值：MySQL 按顺序求值，之后引用的是已更新的列
+                sql = """INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, `group`, downloader_id, last_seen, seeders, attr_key)
+                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                          ON DUPLICATE KEY UPDATE
+                         attr_key=IF((COALESCE(VALUES(sites), '') != '' OR COALESCE(sites, '') = '')
+                                     AND (COALESCE(VALUES(`group`), '') != '' OR COALESCE(`group`, '') = ''),
+                                     VALUES(attr_key), NULL),
                          name=VALUES(name), save_path=VALUES(save_path), size=VALUES(size),
                          progress=VALUES(progress), state=VALUES(state),
                          sites=COALESCE(NULLIF(VALUES(sites), ''), sites),
@@ -1551,9 +2238,12 @@ class DataTracker(Thread):
                          downloader_id=VALUES(downloader_id), last_seen=VALUES(last_seen),
                          seeders=VALUES(seeders)"""
             elif self.db_manager.db_type == "postgresql":
-                sql = """INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders)
-                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                sql = """INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders, attr_key)
+                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                          ON CONFLICT(hash, downloader_id) DO UPDATE SET
+                         attr_key=CASE WHEN (COALESCE(excluded.sites, '') != '' OR COALESCE(torrents.sites, '') = '')
+                                        AND (COALESCE(excluded."group", '') != '' OR COALESCE(torrents."group", '') = '')
+                                       THEN excluded.attr_key ELSE NULL END,
                          name=excluded.name, save_path=excluded.save_path, size=excluded.size,
                          progress=excluded.progress, state=excluded.state,
                          sites=COALESCE(NULLIF(excluded.sites, ''), torrents.sites),
@@ -1562,9 +2252,12 @@ class DataTracker(Thread):
                          downloader_id=excluded.downloader_id, last_seen=excluded.last_seen,
                          seeders=excluded.seeders"""
             else:  # sqlite
-                sql = """INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                sql = """INSERT INTO torrents (hash, name, save_path, size, progress, state, sites, details, "group", downloader_id, last_seen, seeders, attr_key)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                          ON CONFLICT(hash, downloader_id) DO UPDATE SET
+                         attr_key=CASE WHEN (COALESCE(excluded.sites, '') != '' OR COALESCE(torrents.sites, '') = '')
+                                        AND (COALESCE(excluded."group", '') != '' OR COALESCE(torrents."group", '') = '')
+                                       THEN excluded.attr_key ELSE NULL END,
                          name=excluded.name, save_path=excluded.save_path, size=excluded.size,
                          progress=excluded.progress, state=excluded.state,
                          sites=COALESCE(NULLIF(excluded.sites, ''), torrents.sites),
@@ -1585,8 +2278,36 @@ class DataTracker(Thread):
             new_count += len(batch_new_hashes)
             update_count += len(batch_params) - len(batch_new_hashes)
 
+        # 保留了旧 sites/group 的记录无法在写入时确定 attr_key，在同一事务内补全
+        self._backfill_torrent_attr_keys(cursor, placeholder)
+
         return new_count, update_count
 
+    def _backfill_torrent_attr_keys(self, cursor, placeholder):
+        """为 attr_key 为空的记录（旧数据、保留旧 sites/group 的更新、其它路径插入的记录）补全 attr_key。"""
+        group_field = '"group"' if self.db_manager.db_type == "postgresql" else "`group`"
+        cursor.execute(
+            f"SELECT hash, downloader_id, name, save_path, size, sites, {group_field} AS group_value "
+            f"FROM torrents WHERE attr_key IS NULL"
+        )
+        params = [
+            (
+                torrent_attr_key(r["name"], r["save_path"], r["size"], r["sites"], r["group_value"]),
+                r["hash"],
+                r["downloader_id"],
+            )
+            for r in (dict(row) for row in cursor.fetchall())
+        ]
+        update_sql = (
+            f"UPDATE torrents SET attr_key = {placeholder} "
+            f"WHERE hash = {placeholder} AND downloader_id = {placeholder}"
+        )
+        for i in range(0, len(params), 500):
+            cursor.executemany(update_sql, params[i : i + 500])
+        if len(params) > 500:
+            logging.info(f"补全了 {len(params)} 条种子记录的 attr_key")
+        return len(params)
+
     def _cleanup_deleted_downloaders(self, config):
         """清理已删除下载器的种子数据"""
         conn = None
@@ -1619,6 +2340,11 @@ class DataTracker(Thread):
                 logging.info(f"从 torrents 表中移除了 {deleted_count} 个已删除下载器的种子。")
 
             conn.commit()
+            if deleted_downloader_ids:
+                self._record_index_changes(None)
+                with self._index_changes_lock:
+                    for downloader_id in deleted_downloader_ids:
+                        self._index_last_uploads.pop(downloader_id, None)
         except Exception as e:
             logging.error(f"清理已删除下载器数据失败: {e}", exc_info=True)
             if conn:
@@ -1663,13 +2389,8 @@ class DataTracker(Thread):
                     proxy_torrents = self._get_proxy_torrents(downloader)
 
                     if proxy_torrents is not None:
+                        # 种子在下面规范化时边读边处理
                         torrents_list = proxy_torrents
-                        print(
-                            f"【刷新线程】通过代理从 '{downloader['name']}' 成功获取到 {len(torrents_list)} 个种子。"
-                        )
-                        logging.info(
-                            f"通过代理从 '{downloader['name']}' 成功获取到 {len(torrents_list)} 个种子。"
-                        )
                     else:
                         # 代理获取失败，跳过此下载器
                         print(f"【刷新线程】通过代理获取 '{downloader['name']}' 种子信息失败")
@@ -1714,9 +2435,26 @@ class DataTracker(Thread):
                 logging.error(f"未能从 '{downloader['name']}' 获取数据: {e}")
                 continue
 
-            print(f"【刷新线程】开始处理 {len(torrents_list)} 个种子...")
-            for t in torrents_list:
-                t_info = self._normalize_torrent_info(t, downloader["type"], client_instance)
+            try:
+                normalized_torrents = [
+                    self._normalize_torrent_info(t, downloader["type"], client_instance)
+                    for t in torrents_list
+                ]
+            except Exception as e:
+                print(f"【刷新线程】未能从 '{downloader['name']}' 获取数据: {e}")
+                logging.error(f"未能从 '{downloader['name']}' 获取数据: {e}")
+                continue
+            if client_instance is None:
+                print(
+                    f"【刷新线程】通过代理从 '{downloader['name']}' 成功获取到 {len(normalized_torrents)} 个种子。"
+                )
+                logging.info(
+                    f"通过代理从 '{downloader['name']}' 成功获取到 {len(normalized_torrents)} 个种子。"
+                )
+            print(f"【刷新线程】开始处理 {len(normalized_torrents)} 个种子...")
+            if downloader["type"] == "qbittorrent" and client_instance:
+                self._backfill_qb_comments(normalized_torrents, client_instance, downloader["name"])
+            for t_info in normalized_torrents:
                 all_current_hashes.add(t_info["hash"])
 
                 # 使用复合主键 (hash, downloader_id) 作为唯一标识
@@ -1970,6 +2708,70 @@ class DataTracker(Thread):
                 cursor.close()
                 conn.close()
 
+    def _backfill_qb_comments(self, torrent_infos, client_instance, downloader_name):
+        """为注释为空的 qBittorrent 种子批量补全注释。
+
+        种子注释创建后不会变化，结果（包括确实为空的注释）按 hash 缓存，后续刷新不再重复请求；
+        未缓存的种子通过复用同一个已认证 Session 的有界线程池并发请求 /api/v2/torrents/properties。
+        """
+        missing = {}
+        for info in torrent_infos:
+            if info.get("comment"):
+                continue
+            cached = _qb_comment_cache.get(info["hash"])
+            if cached is None:
+                missing.setdefault(info["hash"], []).append(info)
+            else:
+                info["comment"] = cached
+        if not missing:
+            return
+
+        sid_cookie = client_instance._session.cookies.get("SID")
+        if not sid_cookie:
+            logging.warning(f"无法为 '{downloader_name}' 的注释补全请求提取 SID cookie，跳过。")
+            return
+
+        # 使用 client.host 属性，这是库提供的公共接口，比_host更稳定
+        properties_url = f"{client_instance.host}/api/v2/torrents/properties"
+        max_workers = min(self.COMMENT_BACKFILL_MAX_WORKERS, len(missing))
+        session = requests.Session()
+        session.cookies.set("SID", sid_cookie)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def fetch_comment(t_hash):
+            try:
+                response = session.get(properties_url, params={"hash": t_hash}, timeout=10)
+                response.raise_for_status()
+                return t_hash, response.json().get("comment", "") or ""
+            except Exception as e:
+                logging.warning(f"为种子HASH {t_hash} 调用备用接口获取注释失败: {e}")
+                return t_hash, None
+
+        start = time.monotonic()
+        filled = failed = 0
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="qb-comment"
+            ) as executor:
+                for t_hash, comment in executor.map(fetch_comment, list(missing)):
+                    if comment is None:
+                        failed += 1
+                        continue
+                    _qb_comment_cache.put(t_hash, comment)
+                    if comment:
+                        filled += 1
+                        for info in missing[t_hash]:
+                            info["comment"] = comment
+        finally:
+            session.close()
+
+        logging.info(
+            f"'{downloader_name}' 注释补全完成: 请求 {len(missing)} 个, 获取到 {filled} 个, "
+            f"失败 {failed} 个, 耗时 {time.monotonic() - start:.1f} 秒"
+        )
+
     def _normalize_torrent_info(self, t, client_type, client_instance=None):
         if client_type == "qbittorrent":
             # --- DEBUG START ---
@@ -2042,49 +2844,8 @@ class DataTracker(Thread):
                 if not isinstance(t, dict):
                      info["comment"] = t.get("comment", "")
 
-                # 移除之前的调试代码
-                # ...
-
-
-                # --- [核心修正] ---
-                # 基于成功的测试脚本，实现可靠的备用方案
-                if not info["comment"] and client_instance:
-                    logging.debug(f"种子 '{t.name[:30]}...' 的注释为空，尝试备用接口获取。")
-                    try:
-                        # 1. 从客户端实例中提取 SID cookie
-                        sid_cookie = client_instance._session.cookies.get("SID")
-                        if sid_cookie:
-                            cookies_for_request = {"SID": sid_cookie}
-
-                            # 2. 构造请求
-                            # 使用 client.host 属性，这是库提供的公共接口，比_host更稳定
-                            base_url = client_instance.host
-                            properties_url = f"{base_url}/api/v2/torrents/properties"
-                            params = {"hash": t.hash}
-
-                            # 3. 发送手动请求
-                            response = requests.get(
-                                properties_url,
-                                params=params,
-                                cookies=cookies_for_request,
-                                timeout=10,
-                            )
-                            response.raise_for_status()
-
-                            # 4. 解析并更新 comment
-                            properties_data = response.json()
-                            fallback_comment = properties_data.get("comment", "")
-
-                            if fallback_comment:
-                                logging.info(
-                                    f"成功通过备用接口为种子 '{t.name[:30]}...' 获取到注释。"
-                                )
-                                info["comment"] = fallback_comment
-                        else:
-                            logging.warning(f"无法为备用请求提取 SID cookie，跳过。")
-
-                    except Exception as e:
-                        logging.warning(f"为种子HASH {t.hash} 调用备用接口获取注释失败: {e}")
+                # 注释为空的种子不在这里逐个请求备用接口，
+                # 由 _backfill_qb_comments 在列表获取完成后统一并发补全
 
             return info
         # --- [修正结束] ---
@@ -2216,87 +2977,36 @@ class DataTracker(Thread):
         - AnimeF@ADE -> 优先精确匹配"ADE"，避免匹配到"ADEbook"
         - 7³ACG@OurBits -> 检查"7³acg"和"ourbits"
         - [xxx]@OurBits -> 先去除[]后检查"ourbits"
-        """
-        name_lower = name.lower()
-        exact_matches = []  # 精确匹配结果
-        partial_matches = []  # 部分匹配结果
-
-        # 检查是否包含@符号
-        if "@" in name_lower:
-            # 分割@符号前后的部分
-            parts = name_lower.split("@")
-            logging.debug(f"种子名称包含@符号，分割为: {parts}")
-
-            for part in parts:
-                # 清理每个部分：
-                # 1. 去除首尾空格
-                # 2. 去除前导的-符号
-                # 3. 去除方括号[]内的内容（处理[BDrip]这种格式）
-                clean_part = part.strip().lstrip("-").strip()
-
-                # 处理方括号：去除[xxx]格式，保留括号外的内容
-                import re
-
-                clean_part = re.sub(r"\[.*?\]", "", clean_part).strip()
-
-                if clean_part:
-                    logging.debug(f"检查部分: '{clean_part}'")
-
-                    # 先检查精确匹配
-                    for group_lower, group_info in group_to_site_map_lower.items():
-                        # 去除官组名称前面的-（如果有）
-                        group_lower_clean = group_lower.lstrip("-")
-
-                        # 精确匹配（优先级最高）
-                        if group_lower_clean == clean_part:
-                            if group_info["original_case"] not in exact_matches:
-                                exact_matches.append(group_info["original_case"])
-                                logging.debug(f"精确匹配到官组: '{group_info['original_case']}'")
-                        # 包含匹配（次优先级）
-                        elif group_lower_clean in clean_part or clean_part in group_lower_clean:
-                            if (
-                                group_info["original_case"] not in partial_matches
-                                and group_info["original_case"] not in exact_matches
-                            ):
-                                partial_matches.append(group_info["original_case"])
-                                logging.debug(f"部分匹配到官组: '{group_info['original_case']}'")
-
-        # 合并结果：精确匹配优先
-        found_matches = exact_matches + partial_matches
-
-        # 如果@符号匹配没有结果，或者名称中没有@符号，使用原来的全名匹配逻辑
-        if not found_matches:
-            logging.debug(f"@符号匹配无结果，尝试全名匹配: '{name_lower}'")
-            for group_lower, group_info in group_to_site_map_lower.items():
-                if group_lower in name_lower:
-                    if group_info["original_case"] not in found_matches:
-                        found_matches.append(group_info["original_case"])
-                        logging.debug(
-                            f"匹配到官组: '{group_info['original_case']}' (通过全名匹配)"
-                        )
 
-        if found_matches:
-            # 如果有精确匹配，优先返回最短的精确匹配（最准确）
-            # 如果没有精确匹配，返回最长的部分匹配（避免匹配到子串）
-            if exact_matches:
-                result = sorted(exact_matches, key=len)[0]  # 最短的精确匹配
-                logging.info(f"种子 '{name[:50]}...' 精确匹配到官组: {result}")
-            else:
-                result = sorted(found_matches, key=len, reverse=True)[0]  # 最长的匹配
-                logging.info(f"种子 '{name[:50]}...' 匹配到官组: {result}")
-            return result
+        匹配由 load_site_maps_from_db 预编译的多模式匹配器完成，每个名称只扫描一遍。
+        """
+        result, is_exact = get_group_matcher(group_to_site_map_lower).match(name)
+        if result is None:
+            logging.debug(f"种子 '{name[:50]}...' 未识别到官组")
+            return None
 
-        logging.debug(f"种子 '{name[:50]}...' 未识别到官组")
-        return None
+        if is_exact:
+            logging.info(f"种子 '{name[:50]}...' 精确匹配到官组: {result}")
+        else:
+            logging.info(f"种子 '{name[:50]}...' 匹配到官组: {result}")
+        return result
 
     def stop(self):
         logging.info("正在停止 DataTracker 线程...")
         self._is_running = False
         self.shutdown_event.set()
+        if self._stats_executor is not None:
+            self._stats_executor.shutdown(wait=False, cancel_futures=True)
+            self._stats_executor = None
+        if self._background_executor is not None:
+            # 等待正在写库的后台任务结束，避免与下面的最终写入交错
+            self._background_executor.shutdown(wait=True, cancel_futures=True)
+            self._background_executor = None
         with self.traffic_buffer_lock:
             if self.traffic_buffer:
                 self._flush_traffic_buffer_to_db(self.traffic_buffer)
                 self.traffic_buffer = []
+        get_torrent_snapshot_store().save()
 
 
 def start_data_tracker(db_manager, config_manager):
@@ -0,0 +1,503 @@
+# core/torrent_index.py
+"""
+种子聚合索引
+
+/api/data 原先每次请求都全表读取 torrents 与 torrent_upload_stats，再在 Python 中按 (name, size)
+聚合、筛选、排序后分页。这里把聚合结果常驻在进程内存中：
+
+- 聚合行按 (name, size) 分组，预先计算自然排序键
+- 按站点、保存路径、状态、下载器维护倒排列表，筛选只做集合运算
+- 与数据库做差量同步，只读取并重算发生变化的种子及其分组
+
+写入 torrents / torrent_upload_stats 后调用 notify_torrents_changed(db_manager, hashes)：
+变化的 hash 追加到各进程共享的变更日志（TorrentChangeLog），本进程内已加载的索引立即同步，
+其它进程（gunicorn 各 worker）在下一次请求时读取日志中新增的部分，只按这些 hash 查询数据库。
+日志被轮转、丢失或记录了全量变化（hashes=None）时才重新读取全表。
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+try:
+    import fcntl
+except ImportError:  # Windows：追加写本身足够小，不加文件锁
+    fcntl = None
+
+from utils import natural_sort_key
+
+MISSING_STATE = "不存在"
+
+
+def _row_visible(row):
+    return row.get("state") != MISSING_STATE
+
+
+def _row_completed(row):
+    return _row_visible(row) and (row.get("progress") or 0) >= 100
+
+
+def _group_key(row):
+    return (row["name"], row.get("size", 0))
+
+
+class TorrentChangeLog:
+    """各进程共享的种子变更日志（追加写的文本文件）。
+
+    每行一条记录："F" 表示全量变化，"D hash1,hash2,..." 表示这些 hash 的记录或上传量有变化。
+    读取位置为 (inode, 字节偏移)：文件超过 MAX_BYTES 时由写入方替换为新文件，读取方发现 inode 变化
+    （或文件丢失、变短）即视为日志有缺口，需要全量同步。
+    """
+
+    MAX_BYTES = 4 * 1024 * 1024
+    MISSING = (0, 0)
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, hashes=None):
+        line = "F\n" if hashes is None else f"D {','.join(sorted(hashes))}\n"
+        data = line.encode()
+        try:
+            while True:
+                with open(self.path, "ab") as f:
+                    if fcntl:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    try:
+                        st = os.fstat(f.fileno())
+                        try:
+                            if os.stat(self.path).st_ino != st.st_ino:
+                                continue  # 等锁期间文件已被轮转，重新打开
+                        except FileNotFoundError:
+                            continue
+                        if st.st_size + len(data) > self.MAX_BYTES:
+                            # 轮转：新文件只写入一条全量标记，所有读取方都会做一次全量同步
+                            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                            with open(tmp_path, "wb") as tmp:
+                                tmp.write(b"F\n")
+                            os.replace(tmp_path, self.path)
+                            return
+                        f.write(data)
+                        return
+                    finally:
+                        if fcntl:
+                            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except OSError as e:
+            logging.warning(f"写入种子变更日志失败: {e}")
+
+    def read_since(self, position):
+        """读取 position 之后的记录，返回 (新位置, hash 集合)。
+
+        hash 集合为 None 表示需要全量同步：position 为 None（首次读取）、日志有缺口或包含全量标记。
+        只读取到最后一个完整的行，写入中的行留到下次读取。
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return self.MISSING, (set() if position == self.MISSING else None)
+        with f:
+            st = os.fstat(f.fileno())
+            if position == self.MISSING:
+                # 上次读取时文件还不存在，文件中的全部记录都是之后写入的
+                position = (st.st_ino, 0)
+            if position is None or position[0] != st.st_ino or position[1] > st.st_size:
+                data = f.read(st.st_size)
+                return (st.st_ino, data.rfind(b"\n") + 1), None
+            f.seek(position[1])
+            data = f.read(st.st_size - position[1])
+        end = data.rfind(b"\n") + 1
+        new_position = (position[0], position[1] + end)
+        hashes = set()
+        for line in data[:end].splitlines():
+            if line == b"F":
+                return new_position, None
+            if line.startswith(b"D "):
+                hashes.update(line[2:].decode().split(","))
+        hashes.discard("")
+        return new_position, hashes
+
+
+# IN 子句每批的 hash 数
+HASH_CHUNK_SIZE = 500
+
+
+def _load_rows(db_manager, hashes=None):
+    """读取种子记录及按 hash 汇总的上传量；hashes 不为 None 时只读取这些 hash。"""
+    with db_manager.connection() as conn:
+        cursor = db_manager._get_cursor(conn)
+        try:
+            columns = "hash, name, save_path, size, progress, state, sites, details, downloader_id, seeders"
+            rows = {}
+            uploads = {}
+            if hashes is None:
+                cursor.execute(f"SELECT {columns} FROM torrents")
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    rows[(row["hash"], row["downloader_id"])] = row
+                cursor.execute(
+                    "SELECT hash, SUM(uploaded) as total_uploaded FROM torrent_upload_stats GROUP BY hash"
+                )
+                uploads = {row["hash"]: int(row["total_uploaded"] or 0) for row in cursor.fetchall()}
+                return rows, uploads
+
+            placeholder = "%s" if db_manager.db_type in ["mysql", "postgresql"] else "?"
+            hashes = list(hashes)
+            for i in range(0, len(hashes), HASH_CHUNK_SIZE):
+                chunk = hashes[i : i + HASH_CHUNK_SIZE]
+                in_clause = ",".join([placeholder] * len(chunk))
+                cursor.execute(f"SELECT {columns} FROM torrents WHERE hash IN ({in_clause})", chunk)
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    rows[(row["hash"], row["downloader_id"])] = row
+                cursor.execute(
+                    f"SELECT hash, SUM(uploaded) as total_uploaded FROM torrent_upload_stats "
+                    f"WHERE hash IN ({in_clause}) GROUP BY hash",
+                    chunk,
+                )
+                for row in cursor.fetchall():
+                    uploads[row["hash"]] = int(row["total_uploaded"] or 0)
+            return rows, uploads
+        finally:
+            cursor.close()
+
+
+class _GroupView:
+    """某一行过滤条件（全部 / 仅已完成）下的聚合分组及倒排列表。"""
+
+    DIMENSIONS = ("site", "path", "state", "downloader")
+
+    def __init__(self, row_filter):
+        self.row_filter = row_filter
+        self.groups = {}
+        # 分组 -> 有序的行键集合（dict 保持插入顺序，与原先按查询结果顺序聚合一致）
+        self.group_rows = defaultdict(dict)
+        self.postings = {dim: defaultdict(set) for dim in self.DIMENSIONS}
+        self.path_counts = Counter()
+        self.state_counts = Counter()
+        self._ordered = None
+        self._order = None
+
+    def _count(self, row, delta):
+        for counter, value in (
+            (self.path_counts, row.get("save_path")),
+            (self.state_counts, row.get("state")),
+        ):
+            if value:
+                counter[value] += delta
+                if counter[value] <= 0:
+                    del counter[value]
+
+    def update_row(self, row_key, old, new, dirty):
+        """应用单行变化（old/new 为 None 表示新增/删除），受影响的分组记入 dirty。"""
+        old_in = old is not None and self.row_filter(old)
+        new_in = new is not None and self.row_filter(new)
+
+        if old_in and new_in and _group_key(old) == _group_key(new):
+            # 原地更新，保留该行在分组内的位置
+            self._count(old, -1)
+            self._count(new, 1)
+            dirty.add(_group_key(new))
+            return
+
+        if old_in:
+            group_key = _group_key(old)
+            rows = self.group_rows.get(group_key)
+            if rows is not None:
+                rows.pop(row_key, None)
+                if not rows:
+                    del self.group_rows[group_key]
+            self._count(old, -1)
+            dirty.add(group_key)
+        if new_in:
+            group_key = _group_key(new)
+            self.group_rows[group_key][row_key] = None
+            self._count(new, 1)
+            dirty.add(group_key)
+
+    def mark_row(self, row, dirty):
+        if self.row_filter(row):
+            dirty.add(_group_key(row))
+
+    def _post(self, group_key, group, add):
+        values = {
+            "site": group["sites"].keys(),
+            "path": (group["save_path"],),
+            "state": group["states"],
+            "downloader": group["downloader_ids"],
+        }
+        for dim, keys in values.items():
+            postings = self.postings[dim]
+            for value in keys:
+                if add:
+                    postings[value].add(group_key)
+                else:
+                    members = postings.get(value)
+                    if members is not None:
+                        members.discard(group_key)
+                        if not members:
+                            del postings[value]
+
+    def rebuild_group(self, group_key, rows, uploads):
+        """按该分组的全部行重新计算聚合结果，逻辑与原 /api/data 中的聚合保持一致。"""
+        previous = self.groups.get(group_key)
+        if previous is not None:
+            self._post(group_key, previous, add=False)
+
+        row_keys = self.group_rows.get(group_key)
+        if not row_keys:
+            if self.groups.pop(group_key, None) is not None:
+                self._ordered = None
+            return
+
+        group = {
+            "name": "",
+            "save_path": "",
+            "size": 0,
+            "progress": 0,
+            "states": set(),
+            "sites": {},
+            "total_uploaded": 0,
+            "seeders": 0,
+            "downloader_ids": [],
+        }
+        for row_key in row_keys:
+            t = rows[row_key]
+            if not group["name"]:
+                group.update(
+                    {"name": t["name"], "save_path": t.get("save_path", ""), "size": t.get("size", 0)}
+                )
+            elif not group["save_path"] and t.get("save_path"):
+                group["save_path"] = t.get("save_path", "")
+            downloader_id = t.get("downloader_id")
+            if downloader_id and downloader_id not in group["downloader_ids"]:
+                group["downloader_ids"].append(downloader_id)
+            group["progress"] = max(group["progress"], t.get("progress", 0))
+            group["states"].add(t.get("state", "N/A"))
+            upload_for_this_hash = uploads.get(t["hash"], 0)
+            group["total_uploaded"] += upload_for_this_hash
+            group["seeders"] = max(group["seeders"], t.get("seeders", 0))
+            site_name = t.get("sites")
+            if site_name:
+                site = group["sites"].setdefault(
+                    site_name, {"uploaded": 0, "comment": "", "state": "N/A", "seeders": 0}
+                )
+                site["uploaded"] += upload_for_this_hash
+                site["comment"] = t.get("details")
+                site["state"] = t.get("state", "N/A")
+                site["seeders"] = max(site["seeders"], t.get("seeders", 0))
+
+        group["name_lower"] = group["name"].lower()
+        group["sort_key"] = natural_sort_key(group["name"])
+        if previous is None:
+            self._ordered = None
+        self.groups[group_key] = group
+        self._post(group_key, group, add=True)
+
+    def _ensure_order(self):
+        if self._ordered is None:
+            self._ordered = sorted(self.groups, key=lambda k: self.groups[k]["sort_key"])
+            self._order = {key: pos for pos, key in enumerate(self._ordered)}
+
+    def _union(self, dim, values):
+        postings = self.postings[dim]
+        result = set()
+        for value in values:
+            result |= postings.get(value, set())
+        return result
+
+    def select(
+        self,
+        name_search="",
+        path_filters=(),
+        state_filters=(),
+        downloader_filters=(),
+        exist_sites=(),
+        not_exist_sites=(),
+    ):
+        """返回满足筛选条件的分组，按名称自然排序。"""
+        candidates = None
+
+        def narrow(keys):
+            nonlocal candidates
+            candidates = set(keys) if candidates is None else candidates & keys
+
+        if path_filters:
+            narrow(self._union("path", path_filters))
+        if state_filters:
+            narrow(self._union("state", state_filters))
+        if downloader_filters:
+            narrow(self._union("downloader", downloader_filters))
+        for site in exist_sites:
+            narrow(self.postings["site"].get(site, set()))
+
+        self._ensure_order()
+        if candidates is None:
+            keys = self._ordered
+        else:
+            keys = sorted(candidates, key=self._order.__getitem__)
+        if not_exist_sites:
+            excluded = self._union("site", not_exist_sites)
+            keys = [key for key in keys if key not in excluded]
+
+        groups = [self.groups[key] for key in keys]
+        if name_search:
+            groups = [g for g in groups if name_search in g["name_lower"]]
+        return groups
+
+
+class TorrentAggregateIndex:
+    """进程内的种子聚合索引。"""
+
+    def __init__(self, changelog):
+        self.changelog = changelog
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._uploads = {}
+        self._hash_rows = defaultdict(set)
+        self._site_counts = Counter()
+        self._views = {False: _GroupView(_row_visible), True: _GroupView(_row_completed)}
+        self._log_position = None
+        self._synced_at = None
+
+    @property
+    def loaded(self):
+        return self._synced_at is not None
+
+    def ensure_fresh(self, db_manager):
+        """按变更日志中新增的记录同步：只查询变化的 hash，日志有缺口时全量同步。"""
+        with self._lock:
+            position, hashes = self.changelog.read_since(self._log_position if self.loaded else None)
+            if hashes is not None and not hashes:
+                self._log_position = position
+                return
+            self._sync(db_manager, hashes)
+            # 记录同步前读取到的位置，同步期间其它进程追加的记录会在下次请求时再同步
+            self._log_position = position
+
+    def _apply_row(self, row_key, old, new, dirty):
+        for only_completed, view in self._views.items():
+            view.update_row(row_key, old, new, dirty[only_completed])
+        for row, delta in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            if delta > 0:
+                self._hash_rows[row["hash"]].add(row_key)
+            else:
+                keys = self._hash_rows.get(row["hash"])
+                if keys is not None:
+                    keys.discard(row_key)
+                    if not keys:
+                        del self._hash_rows[row["hash"]]
+            site_name = row.get("sites")
+            if site_name:
+                self._site_counts[site_name] += delta
+                if self._site_counts[site_name] <= 0:
+                    del self._site_counts[site_name]
+
+    def _sync(self, db_manager, hashes=None):
+        """hashes 为 None 时读取全表对比，否则只读取并对比这些 hash 的记录与上传量。"""
+        start = time.monotonic()
+        rows, uploads = _load_rows(db_manager, hashes)
+        dirty = {only_completed: set() for only_completed in self._views}
+
+        if hashes is None:
+            known_keys = set(self._rows)
+            known_hashes = self._uploads.keys() | uploads.keys()
+        else:
+            known_keys = {row_key for h in hashes for row_key in self._hash_rows.get(h, ())}
+            known_hashes = hashes
+
+        for row_key in known_keys - rows.keys():
+            self._apply_row(row_key, self._rows.pop(row_key), None, dirty)
+        for row_key, row in rows.items():
+            old = self._rows.get(row_key)
+            if old != row:
+                self._apply_row(row_key, old, row, dirty)
+                self._rows[row_key] = row
+
+        # 上传量变化只影响包含该 hash 的分组
+        for hash_value in known_hashes:
+            new_upload = uploads.get(hash_value, 0)
+            if self._uploads.get(hash_value, 0) != new_upload:
+                for row_key in self._hash_rows.get(hash_value, ()):
+                    for only_completed, view in self._views.items():
+                        view.mark_row(self._rows[row_key], dirty[only_completed])
+            if new_upload:
+                self._uploads[hash_value] = new_upload
+            else:
+                self._uploads.pop(hash_value, None)
+
+        rebuilt = 0
+        for only_completed, view in self._views.items():
+            for group_key in dirty[only_completed]:
+                view.rebuild_group(group_key, self._rows, self._uploads)
+            rebuilt += len(dirty[only_completed])
+
+        first_load = not self.loaded
+        self._synced_at = time.monotonic()
+        elapsed_ms = (self._synced_at - start) * 1000
+        if first_load or rebuilt:
+            scope = "全量" if hashes is None else f"{len(hashes)} 个 hash"
+            logging.info(
+                f"种子聚合索引已{'构建' if first_load else '同步'}（{scope}）: {len(self._rows)} 条记录, "
+                f"{len(self._views[False].groups)} 个分组, 重算 {rebuilt} 个分组, 耗时 {elapsed_ms:.0f} ms"
+            )
+
+    def query(self, only_completed=False, **filters):
+        """按筛选条件查询分组，同时返回筛选项所需的路径、状态和站点集合。
+
+        返回的分组字典由索引持有，调用方不应修改。
+        """
+        with self._lock:
+            view = self._views[only_completed]
+            return {
+                "groups": view.select(**filters),
+                "unique_paths": sorted(view.path_counts),
+                "unique_states": sorted(view.state_counts),
+                "sites": set(self._site_counts),
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_torrent_index():
+    """获取当前进程共享的种子聚合索引（首次查询时才从数据库加载）。"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TorrentAggregateIndex(_get_changelog())
+        return _index
+
+
+_changelog = None
+
+
+def _get_changelog():
+    global _changelog
+    if _changelog is None:
+        from config import TORRENT_INDEX_CHANGELOG_FILE
+
+        _changelog = TorrentChangeLog(TORRENT_INDEX_CHANGELOG_FILE)
+    return _changelog
+
+
+def notify_torrents_changed(db_manager=None, hashes=None):
+    """torrents / torrent_upload_stats 写入后调用。
+
+    hashes 为记录或上传量发生变化的 hash；无法确定范围（按下载器整体删除、迁移下载器 ID 等）时传 None，
+    所有进程的索引都会全量同步。变化追加到变更日志通知其它进程；本进程内已加载的索引在传入
+    db_manager 时立即同步。
+    """
+    if hashes is not None and not hashes:
+        return
+    _get_changelog().append(hashes)
+    index = _index
+    if index is not None and index.loaded and db_manager is not None:
+        try:
+            index.ensure_fresh(db_manager)
+        except Exception as e:
+            logging.warning(f"同步种子聚合索引失败，将在下次查询时重试: {e}")
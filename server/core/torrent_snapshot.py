@@ -0,0 +1,210 @@
+# core/torrent_snapshot.py
+"""
+种子状态持久化快照
+
+记录每个下载器上次写入数据库的种子状态：hash -> (内容指纹, 上传量)。重启后的首次刷新
+先与快照对比，只有指纹或上传量变化的种子才需要做站点/官组识别并与数据库对比，
+未变化的种子不再触碰数据库。
+
+文件保存在 DATA_DIR 下，格式（小端，头部之后整体 zlib 压缩）：
+- 头部: magic, version
+- 下载器数量，随后每个下载器: ID、数据库标记、保存时间、种子数量、种子记录
+- 种子记录: hash、64 位指纹、上传量
+
+数据库标记是写入快照时该下载器在 torrents 表中的 (行数, 最大 last_seen)。其它进程或代码路径
+（手动刷新、IYUU 等）改动过这些行时标记会对不上，该下载器退回完整对比；文件缺失、损坏或过期时同理。
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"PTTS"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sI")
+_COUNT = struct.Struct("<I")
+_DOWNLOADER = struct.Struct("<dI")
+_RECORD = struct.Struct("<Qq")
+
+# 超过该时间的快照不再信任（秒）
+MAX_SNAPSHOT_AGE = 7 * 24 * 3600
+
+
+def torrent_fingerprint(values):
+    """对参与数据库对比的字段计算 64 位指纹。"""
+    payload = "\x1f".join("" if v is None else str(v) for v in values)
+    return int.from_bytes(
+        hashlib.blake2b(payload.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little"
+    )
+
+
+def _pack_str(value):
+    encoded = value.encode("utf-8")
+    return struct.pack("<H", len(encoded)) + encoded
+
+
+def _unpack_str(buf, offset):
+    (length,) = struct.unpack_from("<H", buf, offset)
+    offset += 2
+    return buf[offset : offset + length].decode("utf-8"), offset + length
+
+
+class TorrentSnapshotStore:
+    """按下载器保存种子快照，线程安全；修改只在内存中进行，save() 时原子写入文件。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._downloaders = {}  # downloader_id -> {"saved_at": float, "torrents": {hash: (fp, uploaded)}}
+        self._dirty = False
+        self._last_saved = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logging.warning(f"读取种子快照失败，将按完整刷新处理: {e}")
+            return
+
+        try:
+            magic, version = _HEADER.unpack_from(raw, 0)
+            if magic != MAGIC or version != VERSION:
+                logging.info("种子快照格式不匹配，忽略。")
+                return
+            body = zlib.decompress(raw[_HEADER.size :])
+            offset = 0
+            (downloader_count,) = _COUNT.unpack_from(body, offset)
+            offset += _COUNT.size
+            downloaders = {}
+            for _ in range(downloader_count):
+                downloader_id, offset = _unpack_str(body, offset)
+                db_marker, offset = _unpack_str(body, offset)
+                saved_at, torrent_count = _DOWNLOADER.unpack_from(body, offset)
+                offset += _DOWNLOADER.size
+                torrents = {}
+                for _ in range(torrent_count):
+                    t_hash, offset = _unpack_str(body, offset)
+                    fp, uploaded = _RECORD.unpack_from(body, offset)
+                    offset += _RECORD.size
+                    torrents[t_hash] = (fp, uploaded)
+                downloaders[downloader_id] = {
+                    "db_marker": db_marker,
+                    "saved_at": saved_at,
+                    "torrents": torrents,
+                }
+        except (struct.error, zlib.error, UnicodeDecodeError) as e:
+            logging.warning(f"种子快照已损坏，忽略: {e}")
+            return
+
+        self._downloaders = downloaders
+        logging.info(
+            f"已加载种子快照: {len(downloaders)} 个下载器, "
+            f"{sum(len(d['torrents']) for d in downloaders.values())} 个种子"
+        )
+
+    def get(self, downloader_id, db_marker):
+        """返回下载器的快照 {hash: (fp, uploaded)}；不存在、已过期或数据库标记不一致时返回 None。"""
+        with self._lock:
+            entry = self._downloaders.get(downloader_id)
+            if entry is None or time.time() - entry["saved_at"] > MAX_SNAPSHOT_AGE:
+                return None
+            if db_marker is None or entry["db_marker"] != db_marker:
+                return None
+            return dict(entry["torrents"])
+
+    def replace(self, downloader_id, torrents, db_marker):
+        """用一次完整对比的结果替换下载器的快照；db_marker 为 None（查询失败）时改为作废快照。"""
+        with self._lock:
+            if db_marker is None:
+                self._dirty |= self._downloaders.pop(downloader_id, None) is not None
+                return
+            self._downloaders[downloader_id] = {
+                "db_marker": db_marker,
+                "saved_at": time.time(),
+                "torrents": dict(torrents),
+            }
+            self._dirty = True
+
+    def update(self, downloader_id, changed, removed, db_marker):
+        """合并增量变化；下载器没有快照时忽略（增量结果不足以构成完整快照）。"""
+        with self._lock:
+            entry = self._downloaders.get(downloader_id)
+            if entry is None:
+                return
+            if db_marker is None:
+                del self._downloaders[downloader_id]
+                self._dirty = True
+                return
+            entry["torrents"].update(changed)
+            for t_hash in removed:
+                entry["torrents"].pop(t_hash, None)
+            entry["db_marker"] = db_marker
+            entry["saved_at"] = time.time()
+            self._dirty = True
+
+    def invalidate(self, downloader_id):
+        with self._lock:
+            if self._downloaders.pop(downloader_id, None) is not None:
+                self._dirty = True
+
+    def retain(self, downloader_ids):
+        """删除不在 downloader_ids 中的下载器快照。"""
+        with self._lock:
+            for downloader_id in list(self._downloaders):
+                if downloader_id not in downloader_ids:
+                    del self._downloaders[downloader_id]
+                    self._dirty = True
+
+    def save(self, min_interval=0):
+        """有变化时写入文件；min_interval 秒内已保存过则跳过。"""
+        with self._lock:
+            if not self._dirty or time.monotonic() - self._last_saved < min_interval:
+                return
+            parts = [_COUNT.pack(len(self._downloaders))]
+            for downloader_id, entry in self._downloaders.items():
+                parts.append(_pack_str(downloader_id))
+                parts.append(_pack_str(entry["db_marker"]))
+                parts.append(_DOWNLOADER.pack(entry["saved_at"], len(entry["torrents"])))
+                for t_hash, (fp, uploaded) in entry["torrents"].items():
+                    parts.append(_pack_str(t_hash))
+                    parts.append(_RECORD.pack(fp, int(uploaded or 0)))
+            self._last_saved = time.monotonic()
+
+            # 先写临时文件再原子替换，进程中途退出不会留下不完整的快照
+            data = _HEADER.pack(MAGIC, VERSION) + zlib.compress(b"".join(parts), 6)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logging.warning(f"写入种子快照失败: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_torrent_snapshot_store():
+    """获取当前进程共享的种子快照。"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from config import TORRENT_SNAPSHOT_FILE
+
+            _store = TorrentSnapshotStore(TORRENT_SNAPSHOT_FILE)
+        return _store
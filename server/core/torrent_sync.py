@@ -0,0 +1,145 @@
+# core/torrent_sync.py
+"""
+下载器种子增量同步状态
+
+- qBittorrent：统计线程每秒调用 sync/maindata 时携带上次返回的 rid，qB 只返回变化的字段和被删除的种子；
+  这里把增量合并进每个下载器的种子快照，并记录自上次消费以来变化/删除的 hash
+  （只有 QB_DB_FIELDS 中的字段变化才算变化，计时类字段的变化不触发写库）
+- Transmission：记录 id -> hash 映射，配合 recently-active 返回的已删除 id 还原出被删除的 hash
+
+DataTracker 定期消费这些变化，只把变化的种子写入数据库。
+"""
+
+import threading
+
+# 写入数据库的种子记录用到的 maindata 字段（见 DataTracker._normalize_torrent_info）。
+# time_active、seeding_time、eta、last_activity 等字段每秒都会变化，只有这些字段变化的种子不需要写库。
+QB_DB_FIELDS = frozenset(
+    {
+        "name",
+        "save_path",
+        "size",
+        "total_size",
+        "progress",
+        "state",
+        "uploaded",
+        "num_complete",
+        "tracker",
+        "trackers",
+        "comment",
+    }
+)
+
+
+class QbMaindataSyncState:
+    """单个 qBittorrent 下载器的 sync/maindata 增量状态（统计线程写入，DataTracker 线程消费）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self.rid = 0
+        self.torrents = {}  # hash -> 合并后的完整字段
+        self.server_state = {}
+        self.primed = False  # 是否已收到过完整快照
+        self._dirty = set()
+        self._removed = set()
+        self._full_pending = False
+
+    def rid_for(self, client):
+        """返回本次请求应携带的 rid。rid 与 qB 会话绑定，客户端实例变化（重新登录）后需从 0 开始。"""
+        with self._lock:
+            if client is not self._client:
+                self._client = client
+                self.rid = 0
+            return self.rid
+
+    def reset(self):
+        """下次请求重新获取完整快照。"""
+        with self._lock:
+            self._client = None
+            self.rid = 0
+
+    def apply(self, main_data):
+        """合并一次 sync/maindata 返回的数据，返回合并后的 server_state。"""
+        with self._lock:
+            torrents = main_data.get("torrents") or {}
+            if main_data.get("full_update"):
+                self._removed.update(set(self.torrents) - set(torrents))
+                self.torrents = {}
+                self.server_state = {}
+                self._dirty = set()
+                self._full_pending = True
+                self.primed = True
+
+            for t_hash, fields in torrents.items():
+                current = self.torrents.get(t_hash)
+                if current is None:
+                    self.torrents[t_hash] = dict(fields)
+                    self._dirty.add(t_hash)
+                else:
+                    if any(
+                        key in QB_DB_FIELDS and current.get(key) != value
+                        for key, value in fields.items()
+                    ):
+                        self._dirty.add(t_hash)
+                    current.update(fields)
+                self._removed.discard(t_hash)
+
+            for t_hash in main_data.get("torrents_removed") or ():
+                self.torrents.pop(t_hash, None)
+                self._dirty.discard(t_hash)
+                self._removed.add(t_hash)
+
+            self.server_state.update(main_data.get("server_state") or {})
+            self.rid = main_data.get("rid", self.rid)
+            return dict(self.server_state)
+
+    def take_changes(self):
+        """取出并清空自上次调用以来的变化。
+
+        返回 (changed, removed_hashes, is_full)：changed 为 hash -> 种子字段（含 hash）；
+        is_full 为 True 时 changed 是下载器的完整种子列表，调用方应按全量对比处理删除。
+        """
+        with self._lock:
+            if self._full_pending:
+                dirty = set(self.torrents)
+            else:
+                dirty = self._dirty
+            changed = {
+                t_hash: dict(self.torrents[t_hash], hash=t_hash)
+                for t_hash in dirty
+                if t_hash in self.torrents
+            }
+            removed = self._removed
+            is_full = self._full_pending
+            self._dirty = set()
+            self._removed = set()
+            self._full_pending = False
+            return changed, removed, is_full
+
+
+class TransmissionSyncState:
+    """单个 Transmission 下载器的 recently-active 增量状态。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._id_to_hash = {}
+        self.primed = False
+
+    def prime(self, torrents):
+        """用一次完整的种子列表重建 id -> hash 映射。"""
+        with self._lock:
+            self._id_to_hash = {t.id: t.hash_string for t in torrents}
+            self.primed = True
+
+    def apply_recently_active(self, active_torrents, removed_ids):
+        """更新映射，返回被删除种子的 hash 集合。"""
+        with self._lock:
+            for t in active_torrents:
+                self._id_to_hash[t.id] = t.hash_string
+            removed = set()
+            for torrent_id in removed_ids or ():
+                t_hash = self._id_to_hash.pop(torrent_id, None)
+                if t_hash:
+                    removed.add(t_hash)
+            return removed
@@ -0,0 +1,519 @@
+# core/traffic_store.py
+"""
+原始流量采样的存储后端
+
+DataTracker 每秒为每个下载器产生一条采样（时间、上传/下载速度、累计上传/下载量），分层汇总
+（DatabaseManager.rollup_traffic）把它们汇总进分钟表后只再保留 48 小时。原始采样的写入、
+汇总读取和清理都经过这里的存储对象，由 TRAFFIC_RAW_STORAGE 环境变量选择：
+
+- database（默认）：traffic_stats 表，与之前的行为一致
+- segments：DATA_DIR 下按下载器、按小时切分的只追加段文件。每次写库追加一帧，帧内采样按时间
+  排序后对时间戳和累计值做差分、zigzag + varint 编码，每条采样通常只占十几个字节；
+  没有 B 树索引和事务日志的写放大，清理时整文件删除
+
+段文件格式（小端）：
+- 文件头: magic, version
+- 帧: 负载长度 (u32)、负载 crc32 (u32)、负载
+- 负载: 采样数 (varint)，随后每条采样依次为时间戳、上传速度、下载速度、累计上传、累计下载，
+  时间戳和累计值相对帧内上一条采样取差值（第一条相对 0），全部 zigzag 编码
+
+时间戳是本地时间（与 stat_datetime 相同的不带时区的时间）距 1970-01-01 的秒数。同一秒出现多条
+采样时以最后写入的为准；进程在写入中途退出留下的不完整帧在读取时被忽略。
+
+段文件不参与数据库事务（in_transaction 为 False）：调用方只在同一批数据库写入（每日流量、汇总水位线）
+提交成功后才追加或删除段文件，追加失败的采样由调用方保留重试。这样数据库提交失败不会留下多余的原始采样，
+汇总水位线也不会越过尚未落盘的采样。
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
+
+from utils.lru_cache import LRUCache
+
+RAW_STORAGE_KINDS = ("database", "segments")
+
+MAGIC = b"PTRS"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sI")
+_FRAME = struct.Struct("<II")
+
+_EPOCH = datetime(1970, 1, 1)
+_SEGMENT_SUFFIX = ".seg"
+_SEGMENT_SECONDS = 3600
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S")
+
+
+def _to_epoch(value):
+    if isinstance(value, str):
+        # 写入路径上每条采样都要转换，按固定格式切片比 strptime 快一个数量级
+        value = datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]), int(value[11:13]),
+                         int(value[14:16]), int(value[17:19]))
+    return int((_as_datetime(value) - _EPOCH).total_seconds())
+
+
+def _from_epoch(seconds):
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _append_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_varints(buf, pos, count):
+    """从 pos 开始连续读取 count 个 varint。"""
+    values = []
+    append = values.append
+    for _ in range(count):
+        byte = buf[pos]
+        pos += 1
+        if byte < 0x80:
+            append(byte)
+            continue
+        result, shift = byte & 0x7F, 7
+        while True:
+            byte = buf[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        append(result)
+    return values
+
+
+def encode_frame(samples):
+    """把 [(时间戳, 上传速度, 下载速度, 累计上传, 累计下载)] 编码成一帧。"""
+    payload = bytearray()
+    _append_varint(payload, len(samples))
+    prev_ts = prev_ul = prev_dl = 0
+    for ts, ul_speed, dl_speed, cum_ul, cum_dl in sorted(samples):
+        _append_varint(payload, _zigzag(ts - prev_ts))
+        _append_varint(payload, _zigzag(ul_speed))
+        _append_varint(payload, _zigzag(dl_speed))
+        _append_varint(payload, _zigzag(cum_ul - prev_ul))
+        _append_varint(payload, _zigzag(cum_dl - prev_dl))
+        prev_ts, prev_ul, prev_dl = ts, cum_ul, cum_dl
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_frames(buf, offset, into):
+    """从 offset 开始解码完整的帧，采样写入 into {时间戳: 采样}；返回最后一个完整帧之后的位置。"""
+    end = len(buf)
+    while offset + _FRAME.size <= end:
+        length, crc = _FRAME.unpack_from(buf, offset)
+        start = offset + _FRAME.size
+        if start + length > end:
+            break
+        payload = buf[start : start + length]
+        if zlib.crc32(payload) != crc:
+            logging.warning(f"流量段文件中的帧校验失败，忽略其后的内容（偏移 {offset}）")
+            break
+        count, pos = _read_varint(payload, 0)
+        values = _read_varints(payload, pos, count * 5)
+        ts = cum_ul = cum_dl = 0
+        for i in range(0, count * 5, 5):
+            ts += _unzigzag(values[i])
+            cum_ul += _unzigzag(values[i + 3])
+            cum_dl += _unzigzag(values[i + 4])
+            into[ts] = (ts, _unzigzag(values[i + 1]), _unzigzag(values[i + 2]), cum_ul, cum_dl)
+        offset = start + length
+    return offset
+
+
+def _summarize_minutes(samples):
+    """把按时间排序的采样按分钟汇总，返回字段与 SqlRawTrafficStore.minute_summaries 相同的字典。"""
+    minutes = []
+    current = None
+    for ts, ul_speed, dl_speed, cum_ul, cum_dl in samples:
+        period = ts - ts % 60
+        if current is None or current["period"] != period:
+            current = {
+                "period": period, "first_at": ts, "last_at": ts,
+                "min_ul": cum_ul, "max_ul": cum_ul, "min_dl": cum_dl, "max_dl": cum_dl,
+                "sum_ul": 0, "sum_dl": 0, "samples": 0,
+            }
+            minutes.append(current)
+        current["last_at"] = ts
+        current["min_ul"] = min(current["min_ul"], cum_ul)
+        current["max_ul"] = max(current["max_ul"], cum_ul)
+        current["min_dl"] = min(current["min_dl"], cum_dl)
+        current["max_dl"] = max(current["max_dl"], cum_dl)
+        current["sum_ul"] += ul_speed
+        current["sum_dl"] += dl_speed
+        current["samples"] += 1
+    return [{
+        "period": _from_epoch(m["period"]),
+        "first_at": _from_epoch(m["first_at"]),
+        "last_at": _from_epoch(m["last_at"]),
+        "min_ul": m["min_ul"],
+        "max_ul": m["max_ul"],
+        "min_dl": m["min_dl"],
+        "max_dl": m["max_dl"],
+        "avg_ul": m["sum_ul"] / m["samples"],
+        "avg_dl": m["sum_dl"] / m["samples"],
+        "samples": m["samples"],
+    } for m in minutes]
+
+
+class SqlRawTrafficStore:
+    """原始采样保存在 traffic_stats 表中，所有方法在调用方的游标（事务）上执行。"""
+
+    kind = "database"
+    # 写入与删除都在调用方的事务中进行
+    in_transaction = True
+    # 多行 upsert 每条语句最多写入的行数
+    UPSERT_CHUNK_ROWS = 100
+
+    def __init__(self, db_type):
+        self.db_type = db_type
+        self.ph = "%s" if db_type in ("mysql", "postgresql") else "?"
+
+    def _minute_period_fn(self):
+        """把 stat_datetime 截断到分钟的 SQL 表达式。"""
+        if self.db_type == "mysql":
+            return "DATE_FORMAT(stat_datetime, '%Y-%m-%d %H:%i:00')"
+        elif self.db_type == "postgresql":
+            return "DATE_TRUNC('minute', stat_datetime)"
+        else:  # sqlite
+            return "STRFTIME('%Y-%m-%d %H:%M:00', stat_datetime)"
+
+    def write(self, cursor, rows):
+        """多行 upsert 写入采样，rows 为 (stat_datetime, downloader_id, uploaded, downloaded, upload_speed,
+        download_speed, cumulative_uploaded, cumulative_downloaded)，同一秒同一下载器覆盖；返回写入行数。"""
+        columns = (
+            "stat_datetime, downloader_id, uploaded, downloaded, upload_speed, download_speed, "
+            "cumulative_uploaded, cumulative_downloaded"
+        )
+        if self.db_type == "mysql":
+            conflict_clause = (
+                "ON DUPLICATE KEY UPDATE uploaded = VALUES(uploaded), downloaded = VALUES(downloaded), "
+                "upload_speed = VALUES(upload_speed), download_speed = VALUES(download_speed), "
+                "cumulative_uploaded = VALUES(cumulative_uploaded), cumulative_downloaded = VALUES(cumulative_downloaded)"
+            )
+        else:  # postgresql / sqlite
+            conflict_clause = (
+                "ON CONFLICT(stat_datetime, downloader_id) DO UPDATE SET uploaded = excluded.uploaded, "
+                "downloaded = excluded.downloaded, upload_speed = excluded.upload_speed, "
+                "download_speed = excluded.download_speed, cumulative_uploaded = excluded.cumulative_uploaded, "
+                "cumulative_downloaded = excluded.cumulative_downloaded"
+            )
+        row_placeholders = "(" + ", ".join([self.ph] * 8) + ")"
+
+        for i in range(0, len(rows), self.UPSERT_CHUNK_ROWS):
+            chunk = rows[i : i + self.UPSERT_CHUNK_ROWS]
+            sql = (
+                f"INSERT INTO traffic_stats ({columns}) VALUES "
+                f"{', '.join([row_placeholders] * len(chunk))} {conflict_clause}"
+            )
+            cursor.execute(sql, [value for row in chunk for value in row])
+        return len(rows)
+
+    def downloader_ids(self, cursor):
+        cursor.execute("SELECT DISTINCT downloader_id FROM traffic_stats")
+        return {dict(r)["downloader_id"] for r in cursor.fetchall()}
+
+    def first_time(self, cursor, downloader_id):
+        cursor.execute(
+            f"SELECT MIN(stat_datetime) AS first_seen FROM traffic_stats WHERE downloader_id = {self.ph}",
+            (downloader_id, ))
+        return _as_datetime(dict(cursor.fetchone())["first_seen"])
+
+    def last_sample(self, cursor, downloader_id, before=None, nonzero=False):
+        """返回 before 之前（None 为全部）最新的一条采样 (时间, 累计上传, 累计下载)；
+        nonzero 为 True 时跳过累计值全为 0 的采样。没有时返回 None。"""
+        conditions = [f"downloader_id = {self.ph}"]
+        params = [downloader_id]
+        if before is not None:
+            conditions.append(f"stat_datetime < {self.ph}")
+            params.append(before.strftime("%Y-%m-%d %H:%M:%S"))
+        if nonzero:
+            conditions.append("(cumulative_uploaded > 0 OR cumulative_downloaded > 0)")
+        cursor.execute(
+            f"SELECT stat_datetime, cumulative_uploaded, cumulative_downloaded FROM traffic_stats "
+            f"WHERE {' AND '.join(conditions)} ORDER BY stat_datetime DESC LIMIT 1",
+            params,
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        row = dict(row)
+        return (_as_datetime(row["stat_datetime"]), int(row["cumulative_uploaded"] or 0),
+                int(row["cumulative_downloaded"] or 0))
+
+    def minute_summaries(self, cursor, downloader_id, start, until):
+        """按分钟汇总 [start, until) 的采样，返回按时间排序的字典：period, first_at, last_at,
+        min_ul, max_ul, min_dl, max_dl（累计值）, avg_ul, avg_dl（平均速度）, samples。"""
+        cursor.execute(
+            f"""
+            SELECT {self._minute_period_fn()} AS period, MIN(stat_datetime) AS first_at, MAX(stat_datetime) AS last_at,
+                   MIN(cumulative_uploaded) AS min_ul, MAX(cumulative_uploaded) AS max_ul,
+                   MIN(cumulative_downloaded) AS min_dl, MAX(cumulative_downloaded) AS max_dl,
+                   AVG(upload_speed) AS avg_ul, AVG(download_speed) AS avg_dl, COUNT(*) AS samples
+            FROM traffic_stats
+            WHERE downloader_id = {self.ph} AND stat_datetime >= {self.ph} AND stat_datetime < {self.ph}
+            GROUP BY period
+            ORDER BY period
+            """,
+            (downloader_id, start.strftime("%Y-%m-%d %H:%M:%S"), until.strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        minutes = []
+        for r in cursor.fetchall():
+            r = dict(r)
+            for key in ("period", "first_at", "last_at"):
+                r[key] = _as_datetime(r[key])
+            minutes.append(r)
+        return minutes
+
+    def recent_speeds(self, cursor, before, limit):
+        """返回 before 之前最新的 limit 条采样 [(时间, downloader_id, 上传速度, 下载速度)]，从新到旧。"""
+        cursor.execute(
+            f"SELECT stat_datetime, downloader_id, upload_speed, download_speed FROM traffic_stats "
+            f"WHERE stat_datetime < {self.ph} ORDER BY stat_datetime DESC LIMIT {self.ph}",
+            (before.strftime("%Y-%m-%d %H:%M:%S"), limit),
+        )
+        return [(_as_datetime(r["stat_datetime"]), r["downloader_id"], r["upload_speed"] or 0,
+                 r["download_speed"] or 0) for r in map(dict, cursor.fetchall())]
+
+    def delete_before(self, cursor, downloader_id, cutoff):
+        """删除下载器 cutoff 之前的采样，返回删除的行数。"""
+        cursor.execute(
+            f"DELETE FROM traffic_stats WHERE downloader_id = {self.ph} AND stat_datetime < {self.ph}",
+            (downloader_id, cutoff.strftime("%Y-%m-%d %H:%M:%S")))
+        return max(cursor.rowcount or 0, 0)
+
+
+class SegmentRawTrafficStore:
+    """原始采样保存在 directory/<下载器>/<YYYYMMDDHH>.seg 段文件中，不使用数据库游标。
+
+    写入只发生在 DataTracker（以及启动时的状态同步）中；读取可以来自任意进程，按文件的
+    (inode, 大小) 缓存解码结果，文件追加后只解码新增的帧。
+    """
+
+    kind = "segments"
+    # 段文件不参与数据库事务，写入与删除需在数据库提交成功后进行
+    in_transaction = False
+
+    def __init__(self, directory, cache_samples=200000):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._write_lock = threading.Lock()
+        # path -> (inode, 已解码到的位置, {时间戳: 采样}, 按时间排序的采样)
+        self._decoded = LRUCache(max_weight=cache_samples)
+        self._checked_paths = set()
+        self.write_metrics = {"frames": 0, "samples": 0, "bytes": 0, "total_ms": 0.0}
+
+    def _downloader_dir(self, downloader_id):
+        return os.path.join(self.directory, quote(str(downloader_id), safe=""))
+
+    def _segment_names(self, downloader_id):
+        """按时间排序的 (小时开始的时间戳, 文件路径)。"""
+        directory = self._downloader_dir(downloader_id)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        segments = []
+        for name in names:
+            if not name.endswith(_SEGMENT_SUFFIX):
+                continue
+            stem = name[: -len(_SEGMENT_SUFFIX)]
+            if len(stem) != 10 or not stem.isdigit():
+                continue
+            try:
+                hour = datetime(int(stem[0:4]), int(stem[4:6]), int(stem[6:8]), int(stem[8:10]))
+            except ValueError:
+                continue
+            segments.append((_to_epoch(hour), os.path.join(directory, name)))
+        segments.sort()
+        return segments
+
+    def _read_segment(self, path):
+        """返回段文件中按时间排序的采样列表。"""
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                cached = self._decoded.get(path)
+                if cached is not None and cached[0] == st.st_ino and cached[1] == st.st_size:
+                    return cached[3]
+                if cached is not None and cached[0] == st.st_ino and cached[1] < st.st_size:
+                    inode, offset, samples = cached[0], cached[1], dict(cached[2])
+                else:
+                    header = f.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        return []
+                    magic, version = _HEADER.unpack(header)
+                    if magic != MAGIC or version != VERSION:
+                        logging.warning(f"流量段文件格式不匹配，忽略: {path}")
+                        return []
+                    inode, offset, samples = st.st_ino, _HEADER.size, {}
+                f.seek(offset)
+                buf = f.read(st.st_size - offset)
+        except FileNotFoundError:
+            return []
+
+        offset += decode_frames(buf, 0, samples)
+        ordered = sorted(samples.values())
+        self._decoded.put(path, (inode, offset, samples, ordered), weight=len(samples) or 1)
+        return ordered
+
+    def _truncate_torn_tail(self, path):
+        """进程在追加中途退出会在文件末尾留下不完整的帧，继续追加前截掉它，否则其后的帧都无法读取。"""
+        if path in self._checked_paths:
+            return
+        self._checked_paths.add(path)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return
+        self._read_segment(path)
+        cached = self._decoded.get(path)
+        if cached is not None and cached[1] < size:
+            logging.warning(f"流量段文件末尾有不完整的帧，已截断: {path}")
+            with open(path, "r+b") as f:
+                f.truncate(cached[1])
+
+    def write(self, cursor, rows):
+        """按 (下载器, 小时) 分组后各追加一帧，rows 格式同 SqlRawTrafficStore.write；返回写入的采样数。"""
+        start = time.perf_counter()
+        groups = {}
+        epochs = {}
+        for stat_datetime, downloader_id, _, _, ul_speed, dl_speed, cum_ul, cum_dl in rows:
+            ts = epochs.get(stat_datetime)
+            if ts is None:
+                ts = epochs[stat_datetime] = _to_epoch(stat_datetime)
+            hour = ts - ts % _SEGMENT_SECONDS
+            groups.setdefault((downloader_id, hour), {})[ts] = (
+                ts, int(ul_speed or 0), int(dl_speed or 0), int(cum_ul or 0), int(cum_dl or 0))
+
+        written = 0
+        with self._write_lock:
+            for (downloader_id, hour), samples in groups.items():
+                directory = self._downloader_dir(downloader_id)
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, _from_epoch(hour).strftime("%Y%m%d%H") + _SEGMENT_SUFFIX)
+                self._truncate_torn_tail(path)
+                frame = encode_frame(list(samples.values()))
+                # O_APPEND 下单次 write 追加整帧，读取方最多看到一个不完整的尾帧
+                with open(path, "ab") as f:
+                    if f.tell() == 0:
+                        frame = _HEADER.pack(MAGIC, VERSION) + frame
+                    f.write(frame)
+                written += len(samples)
+                self.write_metrics["frames"] += 1
+                self.write_metrics["bytes"] += len(frame)
+            self.write_metrics["samples"] += written
+            self.write_metrics["total_ms"] += (time.perf_counter() - start) * 1000
+        return written
+
+    def downloader_ids(self, cursor):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return set()
+        return {unquote(name) for name in names if self._segment_names(unquote(name))}
+
+    def first_time(self, cursor, downloader_id):
+        for _, path in self._segment_names(downloader_id):
+            samples = self._read_segment(path)
+            if samples:
+                return _from_epoch(samples[0][0])
+        return None
+
+    def last_sample(self, cursor, downloader_id, before=None, nonzero=False):
+        before_ts = _to_epoch(before) if before is not None else None
+        for hour, path in reversed(self._segment_names(downloader_id)):
+            if before_ts is not None and hour >= before_ts:
+                continue
+            for ts, _, _, cum_ul, cum_dl in reversed(self._read_segment(path)):
+                if before_ts is not None and ts >= before_ts:
+                    continue
+                if nonzero and not (cum_ul > 0 or cum_dl > 0):
+                    continue
+                return _from_epoch(ts), cum_ul, cum_dl
+        return None
+
+    def minute_summaries(self, cursor, downloader_id, start, until):
+        start_ts, until_ts = _to_epoch(start), _to_epoch(until)
+        samples = []
+        for hour, path in self._segment_names(downloader_id):
+            if hour + _SEGMENT_SECONDS <= start_ts or hour >= until_ts:
+                continue
+            samples.extend(s for s in self._read_segment(path) if start_ts <= s[0] < until_ts)
+        return _summarize_minutes(samples)
+
+    def recent_speeds(self, cursor, before, limit):
+        before_ts = _to_epoch(before)
+        collected = []
+        for downloader_id in self.downloader_ids(cursor):
+            found = 0
+            for hour, path in reversed(self._segment_names(downloader_id)):
+                if hour >= before_ts:
+                    continue
+                for ts, ul_speed, dl_speed, _, _ in reversed(self._read_segment(path)):
+                    if ts < before_ts:
+                        collected.append((ts, downloader_id, ul_speed, dl_speed))
+                        found += 1
+                if found >= limit:
+                    break
+        collected.sort(key=lambda s: s[0], reverse=True)
+        return [(_from_epoch(ts), d_id, ul, dl) for ts, d_id, ul, dl in collected[:limit]]
+
+    def delete_before(self, cursor, downloader_id, cutoff):
+        """删除整段都在 cutoff 之前的段文件，返回删除的采样数；cutoff 所在小时的文件保留到下一次。"""
+        cutoff_ts = _to_epoch(cutoff)
+        deleted = 0
+        for hour, path in self._segment_names(downloader_id):
+            if hour + _SEGMENT_SECONDS > cutoff_ts:
+                break
+            deleted += len(self._read_segment(path))
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return deleted
+
+
+def create_raw_traffic_store(db_type, kind="database", segments_dir=None):
+    """按配置创建原始流量存储；segments 目录不可用时退回数据库。"""
+    if kind == "segments":
+        try:
+            return SegmentRawTrafficStore(segments_dir)
+        except (OSError, TypeError) as e:
+            logging.error(f"流量段文件目录 {segments_dir} 不可用，原始流量改为保存在数据库: {e}")
+    elif kind not in RAW_STORAGE_KINDS:
+        logging.warning(f"未知的原始流量存储类型 '{kind}'，使用数据库。")
+    return SqlRawTrafficStore(db_type)
@@ -208,7 +208,7 @@ class PtlgsUploader(SpecialUploader):
                     logger.info(
                         f"正在向 {self.site_name} 站点提交发布请求... (尝试 {attempt + 1}/{max_retries})"
                     )
-                    response = self.scraper.post(
+                    response = self._post_to_site(
                         self.post_url,
                         headers=self.headers,
                         cookies=cookie_jar,
@@ -3,7 +3,6 @@
 import os
 import re
 import traceback
-import cloudscraper
 import yaml
 from loguru import logger
 from abc import ABC, abstractmethod
@@ -14,6 +13,7 @@ from utils import (
     extract_origin_from_description,
 )
 from config import GLOBAL_MAPPINGS
+from core.scraper_pool import get_scraper_pool
 from .fallback_manager import FallbackManager
 
 # 加载全局默认 title_components 配置
@@ -44,7 +44,6 @@ class BaseUploader(ABC):
         self.site_name = site_name
         self.site_info = site_info
         self.upload_data = upload_data
-        self.scraper = cloudscraper.create_scraper()
 
         # 从站点信息动态生成URL和headers
         base_url = ensure_scheme(self.site_info.get("base_url") or "")
@@ -66,6 +65,11 @@ class BaseUploader(ABC):
         # [新增] 初始化降级管理器
         self.fallback_manager = FallbackManager(GLOBAL_MAPPINGS)
 
+    def _post_to_site(self, url, **kwargs):
+        """借用站点池中目标站点的 scraper 发送 POST 请求，复用已建立的连接与质询 cookie。"""
+        with get_scraper_pool().session(self.site_name, self.site_info.get("cookie", "").strip()) as scraper:
+            return scraper.post(url, **kwargs)
+
     def _load_site_config(self, site_name: str) -> dict:
         """加载站点的YAML配置文件"""
         # 修改配置文件路径到新的位置
@@ -641,7 +645,7 @@ class BaseUploader(ABC):
                             # 站点级别的代理已移除，不再使用全局代理
                             proxies = None
 
-                            response = self.scraper.post(
+                            response = self._post_to_site(
                                 self.post_url,
                                 headers=self.headers,
                                 cookies=cookie_jar,
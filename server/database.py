@@ -6,7 +6,10 @@ import mysql.connector
 import psycopg2
 import json
 import os
-from datetime import datetime
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from psycopg2.extras import RealDictCursor
 
 # 从项目根目录导入模块
@@ -22,6 +25,27 @@ from core.services import _prepare_api_config
 
 # 导入数据库迁移管理模块
 from database_migrations import DatabaseMigrationManager
+from db_pool import ConnectionPool, SQLiteConnectionCache
+from db_advisor import QueryAdvisor
+from utils.lru_cache import LRUCache
+from core.traffic_store import create_raw_traffic_store
+
+# 同一进程内相同连接配置的 DatabaseManager 共享一个连接池
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
+# 同一进程内相同连接配置的 DatabaseManager 共享一个慢查询记录器
+_shared_advisors = {}
+# 已汇总时段的查询结果，按行数限制总大小
+_rollup_series_cache = LRUCache(max_weight=200000)
+_ensured_databases = set()
+
+# 说明连接本身已不可用、归还时应直接丢弃的异常
+_CONNECTION_ERRORS = (
+    mysql.connector.errors.InterfaceError,
+    mysql.connector.errors.OperationalError,
+    psycopg2.InterfaceError,
+    psycopg2.OperationalError,
+)
 
 
 class DatabaseManager:
@@ -33,18 +57,29 @@ class DatabaseManager:
         if self.db_type == "mysql":
             self.mysql_config = config.get("mysql", {})
             logging.info("数据库后端设置为 MySQL。")
-            # 自动创建数据库（如果不存在）
-            self._ensure_database_exists()
+            # 自动创建数据库（如果不存在），同一进程内每个库只检查一次
+            if self._pool_key() not in _ensured_databases:
+                self._ensure_database_exists()
+                _ensured_databases.add(self._pool_key())
         elif self.db_type == "postgresql":
             self.postgresql_config = config.get("postgresql", {})
             logging.info("数据库后端设置为 PostgreSQL。")
-            # 自动创建数据库（如果不存在）
-            self._ensure_database_exists()
+            # 自动创建数据库（如果不存在），同一进程内每个库只检查一次
+            if self._pool_key() not in _ensured_databases:
+                self._ensure_database_exists()
+                _ensured_databases.add(self._pool_key())
         else:
             self.sqlite_path = config.get("path", "data/pt_stats.db")
             logging.info(f"数据库后端设置为 SQLite。路径: {self.sqlite_path}")
             # SQLite 会自动创建文件，无需额外处理
 
+        self.pool_config = config.get("pool", {})
+        self.slow_query_ms = config.get("slow_query_ms", 200)
+        # 原始流量采样（traffic_stats 表或段文件）的读写都经过 raw_traffic
+        traffic_storage = config.get("traffic_storage", {})
+        self.raw_traffic = create_raw_traffic_store(
+            self.db_type, traffic_storage.get("raw", "database"), traffic_storage.get("segments_dir"))
+
         # 初始化迁移管理器
         self.migration_manager = DatabaseMigrationManager(self)
 
@@ -123,7 +158,7 @@ class DatabaseManager:
                 raise
 
     def _get_connection(self):
-        """返回一个新的数据库连接。"""
+        """返回一个新的数据库连接（不经过连接池，调用方负责关闭）。"""
         if self.db_type == "mysql":
             # 添加字符集配置以避免字符集冲突
             mysql_config = self.mysql_config.copy()
@@ -136,15 +171,93 @@ class DatabaseManager:
         else:
             return sqlite3.connect(self.sqlite_path, timeout=20)
 
+    def _pool_key(self):
+        if self.db_type == "mysql":
+            return ("mysql", tuple(sorted(self.mysql_config.items())))
+        elif self.db_type == "postgresql":
+            return ("postgresql", tuple(sorted(self.postgresql_config.items())))
+        return ("sqlite", os.path.abspath(self.sqlite_path))
+
+    def _ping_connection(self, conn):
+        """连接池健康检查。"""
+        if self.db_type == "mysql":
+            return conn.is_connected()
+        if conn.closed:
+            return False
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+
+    def _create_pool(self):
+        max_size = self.pool_config.get("max_size", 10)
+        idle_timeout = self.pool_config.get("idle_timeout", 300)
+        if self.db_type == "sqlite":
+            return SQLiteConnectionCache(self.sqlite_path, idle_timeout=idle_timeout)
+        logging.info(f"创建 {self.db_type} 连接池，最大连接数 {max_size}")
+        return ConnectionPool(
+            self.db_type,
+            self._get_connection,
+            self._ping_connection,
+            max_size=max_size,
+            idle_timeout=idle_timeout,
+            checkout_timeout=self.pool_config.get("checkout_timeout", 30),
+        )
+
+    def _get_pool(self):
+        key = self._pool_key()
+        with _shared_pools_lock:
+            entry = _shared_pools.get(key)
+            # fork 出的子进程不能复用父进程的连接，直接丢弃（不关闭）后重建
+            if entry is None or entry[0] != os.getpid():
+                entry = (os.getpid(), self._create_pool())
+                _shared_pools[key] = entry
+            return entry[1]
+
+    @contextmanager
+    def connection(self):
+        """从连接池借出一个连接，退出 with 块时归还。
+
+        归还时会回滚未提交的事务，写操作仍需显式 commit()。
+        SQLite 同一线程内嵌套借出时复用同一个连接。
+        """
+        pool = self._get_pool()
+        conn = pool.acquire()
+        discard = False
+        try:
+            yield conn
+        except _CONNECTION_ERRORS:
+            discard = True
+            raise
+        finally:
+            pool.release(conn, discard=discard)
+
+    def get_pool_stats(self):
+        """返回本进程连接池的借出次数、等待耗时等指标。"""
+        return self._get_pool().stats()
+
+    def _get_query_advisor(self):
+        key = self._pool_key()
+        with _shared_pools_lock:
+            advisor = _shared_advisors.get(key)
+            if advisor is None:
+                advisor = QueryAdvisor(self.db_type, threshold_ms=self.slow_query_ms)
+                _shared_advisors[key] = advisor
+            return advisor
+
+    def get_slow_queries(self):
+        """返回本进程记录的慢查询（次数、耗时、首次出现时的执行计划）。"""
+        return self._get_query_advisor().snapshot()
+
     def _get_cursor(self, conn):
-        """从连接中返回一个游标。"""
+        """从连接中返回一个游标，超过慢查询阈值的语句会被记录。"""
         if self.db_type == "mysql":
-            return conn.cursor(dictionary=True, buffered=True)
+            cursor = conn.cursor(dictionary=True, buffered=True)
         elif self.db_type == "postgresql":
-            return conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
         else:
             conn.row_factory = sqlite3.Row
-            return conn.cursor()
+            cursor = conn.cursor()
+        return self._get_query_advisor().wrap(cursor, conn)
 
     def get_placeholder(self):
         """返回数据库类型对应的正确参数占位符。"""
@@ -606,8 +719,25 @@ class DatabaseManager:
             cursor.execute(
                 "CREATE TABLE IF NOT EXISTS traffic_stats_hourly (stat_datetime DATETIME NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
             )
+            # 创建天/分钟/5分钟聚合表与汇总水位线表 (MySQL)
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_daily (stat_datetime DATETIME NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_minute (stat_datetime DATETIME NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_5minute (stat_datetime DATETIME NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_rollup_state (downloader_id VARCHAR(36) NOT NULL, tier VARCHAR(16) NOT NULL, watermark DATETIME NOT NULL, PRIMARY KEY (downloader_id, tier)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
+            )
+            # 每日流量合计，写库时维护，供下载器信息卡片使用
             cursor.execute(
-                "CREATE TABLE IF NOT EXISTS torrents (hash VARCHAR(40) NOT NULL, name TEXT NOT NULL, save_path TEXT, size BIGINT, progress FLOAT, state VARCHAR(50), sites VARCHAR(255), `group` VARCHAR(255), details TEXT, downloader_id VARCHAR(36) NOT NULL, last_seen DATETIME NOT NULL, iyuu_last_check DATETIME NULL, seeders INT DEFAULT 0, PRIMARY KEY (hash, downloader_id)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
+                "CREATE TABLE IF NOT EXISTS traffic_daily_totals (stat_date DATE NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT NOT NULL DEFAULT 0, downloaded BIGINT NOT NULL DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_date, downloader_id)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS torrents (hash VARCHAR(40) NOT NULL, name TEXT NOT NULL, save_path TEXT, size BIGINT, progress FLOAT, state VARCHAR(50), sites VARCHAR(255), `group` VARCHAR(255), details TEXT, downloader_id VARCHAR(36) NOT NULL, last_seen DATETIME NOT NULL, iyuu_last_check DATETIME NULL, seeders INT DEFAULT 0, attr_key VARCHAR(32) NULL, PRIMARY KEY (hash, downloader_id), INDEX idx_torrents_attr_key (attr_key)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
             )
             cursor.execute(
                 "CREATE TABLE IF NOT EXISTS torrent_upload_stats (hash VARCHAR(40) NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, PRIMARY KEY (hash, downloader_id)) ENGINE=InnoDB ROW_FORMAT=Dynamic"
@@ -632,8 +762,25 @@ class DatabaseManager:
             cursor.execute(
                 "CREATE TABLE IF NOT EXISTS traffic_stats_hourly (stat_datetime TIMESTAMP NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
             )
+            # 创建天/分钟/5分钟聚合表与汇总水位线表 (PostgreSQL)
             cursor.execute(
-                "CREATE TABLE IF NOT EXISTS torrents (hash VARCHAR(40) NOT NULL, name TEXT NOT NULL, save_path TEXT, size BIGINT, progress REAL, state VARCHAR(50), sites VARCHAR(255), \"group\" VARCHAR(255), details TEXT, downloader_id VARCHAR(36) NOT NULL, last_seen TIMESTAMP NOT NULL, iyuu_last_check TIMESTAMP NULL, seeders INTEGER DEFAULT 0, PRIMARY KEY (hash, downloader_id))"
+                "CREATE TABLE IF NOT EXISTS traffic_stats_daily (stat_datetime TIMESTAMP NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_minute (stat_datetime TIMESTAMP NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_5minute (stat_datetime TIMESTAMP NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, downloaded BIGINT DEFAULT 0, avg_upload_speed BIGINT DEFAULT 0, avg_download_speed BIGINT DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_rollup_state (downloader_id VARCHAR(36) NOT NULL, tier VARCHAR(16) NOT NULL, watermark TIMESTAMP NOT NULL, PRIMARY KEY (downloader_id, tier))"
+            )
+            # 每日流量合计，写库时维护，供下载器信息卡片使用
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_daily_totals (stat_date DATE NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT NOT NULL DEFAULT 0, downloaded BIGINT NOT NULL DEFAULT 0, cumulative_uploaded BIGINT NOT NULL DEFAULT 0, cumulative_downloaded BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (stat_date, downloader_id))"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS torrents (hash VARCHAR(40) NOT NULL, name TEXT NOT NULL, save_path TEXT, size BIGINT, progress REAL, state VARCHAR(50), sites VARCHAR(255), \"group\" VARCHAR(255), details TEXT, downloader_id VARCHAR(36) NOT NULL, last_seen TIMESTAMP NOT NULL, iyuu_last_check TIMESTAMP NULL, seeders INTEGER DEFAULT 0, attr_key VARCHAR(32), PRIMARY KEY (hash, downloader_id))"
             )
             cursor.execute(
                 "CREATE TABLE IF NOT EXISTS torrent_upload_stats (hash VARCHAR(40) NOT NULL, downloader_id VARCHAR(36) NOT NULL, uploaded BIGINT DEFAULT 0, PRIMARY KEY (hash, downloader_id))"
@@ -670,8 +817,25 @@ class DatabaseManager:
             cursor.execute(
                 "CREATE TABLE IF NOT EXISTS traffic_stats_hourly (stat_datetime TEXT NOT NULL, downloader_id TEXT NOT NULL, uploaded INTEGER DEFAULT 0, downloaded INTEGER DEFAULT 0, avg_upload_speed INTEGER DEFAULT 0, avg_download_speed INTEGER DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded INTEGER NOT NULL DEFAULT 0, cumulative_downloaded INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
             )
+            # 创建天/分钟/5分钟聚合表与汇总水位线表 (SQLite)
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_daily (stat_datetime TEXT NOT NULL, downloader_id TEXT NOT NULL, uploaded INTEGER DEFAULT 0, downloaded INTEGER DEFAULT 0, avg_upload_speed INTEGER DEFAULT 0, avg_download_speed INTEGER DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded INTEGER NOT NULL DEFAULT 0, cumulative_downloaded INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_minute (stat_datetime TEXT NOT NULL, downloader_id TEXT NOT NULL, uploaded INTEGER DEFAULT 0, downloaded INTEGER DEFAULT 0, avg_upload_speed INTEGER DEFAULT 0, avg_download_speed INTEGER DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded INTEGER NOT NULL DEFAULT 0, cumulative_downloaded INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_stats_5minute (stat_datetime TEXT NOT NULL, downloader_id TEXT NOT NULL, uploaded INTEGER DEFAULT 0, downloaded INTEGER DEFAULT 0, avg_upload_speed INTEGER DEFAULT 0, avg_download_speed INTEGER DEFAULT 0, samples INTEGER DEFAULT 0, cumulative_uploaded INTEGER NOT NULL DEFAULT 0, cumulative_downloaded INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (stat_datetime, downloader_id))"
+            )
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_rollup_state (downloader_id TEXT NOT NULL, tier TEXT NOT NULL, watermark TEXT NOT NULL, PRIMARY KEY (downloader_id, tier))"
+            )
+            # 每日流量合计，写库时维护，供下载器信息卡片使用
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS traffic_daily_totals (stat_date TEXT NOT NULL, downloader_id TEXT NOT NULL, uploaded INTEGER NOT NULL DEFAULT 0, downloaded INTEGER NOT NULL DEFAULT 0, cumulative_uploaded INTEGER NOT NULL DEFAULT 0, cumulative_downloaded INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (stat_date, downloader_id))"
+            )
             cursor.execute(
-                "CREATE TABLE IF NOT EXISTS torrents (hash TEXT NOT NULL, name TEXT NOT NULL, save_path TEXT, size INTEGER, progress REAL, state TEXT, sites TEXT, `group` TEXT, details TEXT, downloader_id TEXT NOT NULL, last_seen TEXT NOT NULL, iyuu_last_check TEXT NULL, seeders INTEGER DEFAULT 0, PRIMARY KEY (hash, downloader_id))"
+                "CREATE TABLE IF NOT EXISTS torrents (hash TEXT NOT NULL, name TEXT NOT NULL, save_path TEXT, size INTEGER, progress REAL, state TEXT, sites TEXT, `group` TEXT, details TEXT, downloader_id TEXT NOT NULL, last_seen TEXT NOT NULL, iyuu_last_check TEXT NULL, seeders INTEGER DEFAULT 0, attr_key TEXT, PRIMARY KEY (hash, downloader_id))"
             )
             cursor.execute(
                 "CREATE TABLE IF NOT EXISTS torrent_upload_stats (hash TEXT NOT NULL, downloader_id TEXT NOT NULL, uploaded INTEGER DEFAULT 0, PRIMARY KEY (hash, downloader_id))"
@@ -714,246 +878,434 @@ class DatabaseManager:
         # 同步站点数据
         self.sync_sites_from_json()
 
-    def aggregate_hourly_traffic(self, retention_hours=48):
+    # 流量分层汇总：原始数据 -> 分钟表 -> 5 分钟表 -> 小时表 -> 天表，按下载器记录每层已汇总到的位置（水位线）
+    # (层级, 表名, 时段长度(秒), 汇总到下一层后继续保留的小时数，None 为永久保留)
+    ROLLUP_TIERS = (
+        ("minute", "traffic_stats_minute", 60, 72),
+        ("5minute", "traffic_stats_5minute", 300, 31 * 24),
+        ("hourly", "traffic_stats_hourly", 3600, None),
+        ("daily", "traffic_stats_daily", 86400, None),
+    )
+    # 时段结束后等待迟到的采样写入的时间
+    ROLLUP_GRACE_SECONDS = 120
+    # 与上一个采样间隔超过该值（下载器离线、程序停止）时不跨间隔计算流量
+    ROLLUP_MAX_SAMPLE_GAP = 600
+
+    @staticmethod
+    def _as_datetime(value):
+        if value is None or isinstance(value, datetime):
+            return value
+        return datetime.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def floor_period(value, seconds):
+        """把时间截断到 seconds 长度时段的开头（按本地日期对齐）。"""
+        day_start = value.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = int((value - day_start).total_seconds())
+        return day_start + timedelta(seconds=elapsed - elapsed % seconds)
+
+    def get_rollup_watermarks(self, cursor, downloader_ids=None):
+        """返回 {tier: {downloader_id: 已汇总到的时间}}，该时间之前的数据已写入对应的汇总表。"""
+        cursor.execute("SELECT downloader_id, tier, watermark FROM traffic_rollup_state")
+        watermarks = {tier[0]: {} for tier in self.ROLLUP_TIERS}
+        for row in cursor.fetchall():
+            row = dict(row)
+            if downloader_ids is not None and row["downloader_id"] not in downloader_ids:
+                continue
+            if row["tier"] in watermarks:
+                watermarks[row["tier"]][row["downloader_id"]] = self._as_datetime(row["watermark"])
+        return watermarks
+
+    def get_unrolled_first_time(self, cursor, downloader_id, tier):
+        """返回下载器在比 tier 细的各层（含原始数据）中最早的数据时间，没有数据时返回 None。
+
+        用于 tier 层还没有该下载器水位线的情况：这些数据都还没有汇总到 tier 层。
         """
-        聚合小时流量数据并清理原始数据。
-        
-        此函数是数据聚合策略的核心，它将 traffic_stats 表中的原始数据按小时聚合到 
-        traffic_stats_hourly 表中，然后删除已聚合的原始数据以控制数据库大小。
-        
-        Args:
-            retention_hours (int): 保留原始数据的时间（小时）。
-                                  在此时间之前的原始数据将被聚合和删除。
+        ph = self.get_placeholder()
+        times = [self.raw_traffic.first_time(cursor, downloader_id)]
+        for name, table, _seconds, _retention in self.ROLLUP_TIERS:
+            if name == tier:
+                break
+            cursor.execute(f"SELECT MIN(stat_datetime) AS first_seen FROM {table} WHERE downloader_id = {ph}",
+                           (downloader_id, ))
+            times.append(self._as_datetime(dict(cursor.fetchone())["first_seen"]))
+        times = [t for t in times if t is not None]
+        return min(times) if times else None
+
+    def _set_rollup_watermark(self, cursor, downloader_id, tier, watermark):
+        ph = self.get_placeholder()
+        watermark_str = watermark.strftime("%Y-%m-%d %H:%M:%S")
+        if self.db_type == "mysql":
+            sql = (f"INSERT INTO traffic_rollup_state (downloader_id, tier, watermark) VALUES ({ph}, {ph}, {ph}) "
+                   f"ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)")
+        else:
+            sql = (f"INSERT INTO traffic_rollup_state (downloader_id, tier, watermark) VALUES ({ph}, {ph}, {ph}) "
+                   f"ON CONFLICT (downloader_id, tier) DO UPDATE SET watermark = excluded.watermark")
+        cursor.execute(sql, (downloader_id, tier, watermark_str))
+
+    def _upsert_rollup_rows(self, cursor, table, rows):
+        """写入汇总行；同一时段重复汇总时直接覆盖，保证幂等。"""
+        ph = self.get_placeholder()
+        columns = ("stat_datetime, downloader_id, uploaded, downloaded, avg_upload_speed, avg_download_speed, "
+                   "samples, cumulative_uploaded, cumulative_downloaded")
+        values = ", ".join([ph] * 9)
+        updated = ("uploaded", "downloaded", "avg_upload_speed", "avg_download_speed", "samples",
+                   "cumulative_uploaded", "cumulative_downloaded")
+        if self.db_type == "mysql":
+            sql = (f"INSERT INTO {table} ({columns}) VALUES ({values}) ON DUPLICATE KEY UPDATE "
+                   + ", ".join(f"{c} = VALUES({c})" for c in updated))
+        else:
+            sql = (f"INSERT INTO {table} ({columns}) VALUES ({values}) "
+                   f"ON CONFLICT (stat_datetime, downloader_id) DO UPDATE SET "
+                   + ", ".join(f"{c} = excluded.{c}" for c in updated))
+        cursor.executemany(sql, rows)
+
+    def _summarize_raw_minutes(self, cursor, downloader_id, start, until):
+        """把原始数据 [start, until) 汇总成分钟行。
+
+        每分钟的流量是该分钟最后的累计值减去上一个采样的累计值，分钟之间的流量不会丢失；
+        与上一个采样间隔超过 ROLLUP_MAX_SAMPLE_GAP 时只计分钟内的差值。
         """
-        from datetime import datetime, timedelta
-
-        # 计算聚合和清理的边界时间
-        cutoff_time = datetime.now() - timedelta(hours=retention_hours)
-
-        # 添加特殊日期保护逻辑
-        # 确保不会聚合最近3天的数据，以防止数据丢失
-        # 修改为按日计算，聚合到三天前的00:00:00
-        now = datetime.now()
-        safe_cutoff = (now - timedelta(days=3)).replace(hour=0,
-                                                        minute=0,
-                                                        second=0,
-                                                        microsecond=0)
-        if cutoff_time > safe_cutoff:
-            logging.info(f"为防止数据丢失，调整聚合截止时间为 {safe_cutoff}")
-            cutoff_time = safe_cutoff
-
-        cutoff_time_str = cutoff_time.strftime("%Y-%m-%d %H:%M:%S")
+        minutes = self.raw_traffic.minute_summaries(cursor, downloader_id, start, until)
+        if not minutes:
+            return []
+        prev = self.raw_traffic.last_sample(cursor, downloader_id, before=start)
+
+        max_gap = timedelta(seconds=self.ROLLUP_MAX_SAMPLE_GAP)
+        rows = []
+        for m in minutes:
+            max_ul, max_dl = int(m["max_ul"] or 0), int(m["max_dl"] or 0)
+            base_ul, base_dl = int(m["min_ul"] or 0), int(m["min_dl"] or 0)
+            if prev is not None and m["first_at"] - prev[0] <= max_gap:
+                # 上一个累计值为 0（下载器刚接入）时同样只计分钟内的差值
+                base_ul = prev[1] or base_ul
+                base_dl = prev[2] or base_dl
+            rows.append((
+                m["period"].strftime("%Y-%m-%d %H:%M:%S"),
+                downloader_id,
+                max(0, max_ul - base_ul),
+                max(0, max_dl - base_dl),
+                int(m["avg_ul"] or 0),
+                int(m["avg_dl"] or 0),
+                int(m["samples"] or 0),
+                max_ul,
+                max_dl,
+            ))
+            prev = (m["last_at"], max_ul, max_dl)
+        return rows
+
+    def _summarize_tier_rows(self, cursor, source_table, downloader_id, start, until, seconds):
+        """把下一层 [start, until) 内的汇总行合并成 seconds 长度的时段：流量求和、速度按采样数加权。"""
         ph = self.get_placeholder()
+        cursor.execute(
+            f"SELECT stat_datetime, uploaded, downloaded, avg_upload_speed, avg_download_speed, samples, "
+            f"cumulative_uploaded, cumulative_downloaded FROM {source_table} "
+            f"WHERE downloader_id = {ph} AND stat_datetime >= {ph} AND stat_datetime < {ph}",
+            (downloader_id, start.strftime("%Y-%m-%d %H:%M:%S"), until.strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        periods = {}
+        for row in cursor.fetchall():
+            row = dict(row)
+            period = self.floor_period(self._as_datetime(row["stat_datetime"]), seconds)
+            acc = periods.setdefault(period, [0, 0, 0, 0, 0, 0, 0])
+            samples = int(row["samples"] or 0)
+            acc[0] += int(row["uploaded"] or 0)
+            acc[1] += int(row["downloaded"] or 0)
+            acc[2] += int(row["avg_upload_speed"] or 0) * samples
+            acc[3] += int(row["avg_download_speed"] or 0) * samples
+            acc[4] += samples
+            acc[5] = max(acc[5], int(row["cumulative_uploaded"] or 0))
+            acc[6] = max(acc[6], int(row["cumulative_downloaded"] or 0))
+        return [(
+            period.strftime("%Y-%m-%d %H:%M:%S"),
+            downloader_id,
+            acc[0],
+            acc[1],
+            acc[2] // acc[4] if acc[4] else 0,
+            acc[3] // acc[4] if acc[4] else 0,
+            acc[4],
+            acc[5],
+            acc[6],
+        ) for period, acc in sorted(periods.items())]
+
+    def rollup_traffic(self, downloader_ids=None, retention_hours=48, now=None, pending_since=None):
+        """增量汇总流量数据并清理已汇总的数据。
+
+        按下载器的水位线逐层只处理新结束的时段：原始表 -> 分钟表 -> 5 分钟表 -> 小时表 -> 天表，
+        然后删除已汇总到上一层且超过保留期的数据。没有水位线的层从下一层最早的数据开始汇总。
 
-        conn = None
-        cursor = None
+        Args:
+            downloader_ids: 需要检查的下载器；None 表示原始流量存储中出现过的全部下载器。
+                            已有水位线的下载器总会被检查。
+            retention_hours (int): 原始数据在汇总后继续保留的时间（小时）。
+            pending_since: {downloader_id: 最早一条尚未写入数据库的采样时间}。写库延迟（数据库卡顿、写入慢）时
+                           原始数据只汇总到该时间所在分钟之前，之后写入的采样不会落在水位线以下而被漏掉。
+
+        Returns:
+            dict: 每层写入的行数，以及删除的行数 (deleted)。
+        """
+        now = now or datetime.now()
+        closed_at = now - timedelta(seconds=self.ROLLUP_GRACE_SECONDS)
+        ph = self.get_placeholder()
+        result = {tier[0]: 0 for tier in self.ROLLUP_TIERS}
+        result["deleted"] = 0
 
-        try:
-            conn = self._get_connection()
+        with self.connection() as conn:
             cursor = self._get_cursor(conn)
+            try:
+                watermarks = self.get_rollup_watermarks(cursor)
+                candidates = set()
+                for marks in watermarks.values():
+                    candidates.update(marks)
+                if downloader_ids is None:
+                    candidates.update(self.raw_traffic.downloader_ids(cursor))
+                else:
+                    candidates.update(downloader_ids)
+
+                pending_since = pending_since or {}
+                raw_in_transaction = self.raw_traffic.in_transaction
+                for downloader_id in sorted(candidates):
+                    raw_delete_before = None
+                    raw_closed_at = min(closed_at, pending_since.get(downloader_id, closed_at))
+                    source_table, source_mark, source_retention = None, None, retention_hours
+                    for tier, table, seconds, retention in self.ROLLUP_TIERS:
+                        mark = watermarks[tier].get(downloader_id)
+                        if mark is None:
+                            if source_table is None:
+                                first_seen = self.raw_traffic.first_time(cursor, downloader_id)
+                            else:
+                                cursor.execute(
+                                    f"SELECT MIN(stat_datetime) AS first_seen FROM {source_table} WHERE downloader_id = {ph}",
+                                    (downloader_id, ))
+                                first_seen = self._as_datetime(dict(cursor.fetchone())["first_seen"])
+                            if first_seen is None:
+                                break
+                            mark = self.floor_period(first_seen, seconds)
+
+                        # 每层只汇总下一层已完整的时段
+                        until = self.floor_period(source_mark if source_mark is not None else raw_closed_at, seconds)
+                        if mark < until:
+                            if source_mark is None:
+                                rows = self._summarize_raw_minutes(cursor, downloader_id, mark, until)
+                            else:
+                                rows = self._summarize_tier_rows(cursor, source_table, downloader_id, mark, until,
+                                                                 seconds)
+                            if rows:
+                                self._upsert_rollup_rows(cursor, table, rows)
+                            result[tier] += len(rows)
+                            mark = until
+                            self._set_rollup_watermark(cursor, downloader_id, tier, mark)
+
+                        # 只删除已汇总到本层且超过保留期的下一层数据
+                        if source_retention is not None:
+                            delete_before = min(mark, now - timedelta(hours=source_retention))
+                            if source_table is None:
+                                if raw_in_transaction:
+                                    result["deleted"] += self.raw_traffic.delete_before(cursor, downloader_id,
+                                                                                        delete_before)
+                                else:
+                                    # 段文件在水位线提交后再删除，提交失败时原始采样仍在
+                                    raw_delete_before = delete_before
+                            else:
+                                cursor.execute(
+                                    f"DELETE FROM {source_table} WHERE downloader_id = {ph} AND stat_datetime < {ph}",
+                                    (downloader_id, delete_before.strftime("%Y-%m-%d %H:%M:%S")))
+                                result["deleted"] += max(cursor.rowcount or 0, 0)
 
-            # 开始事务
-            if self.db_type == "postgresql":
-                # PostgreSQL 需要显式开始事务
-                cursor.execute("BEGIN")
-
-            # 根据数据库类型生成时间截断函数
-            if self.db_type == "mysql":
-                time_group_fn = "DATE_FORMAT(stat_datetime, '%Y-%m-%d %H:00:00')"
-            elif self.db_type == "postgresql":
-                time_group_fn = "DATE_TRUNC('hour', stat_datetime)"
-            else:  # sqlite
-                time_group_fn = "STRFTIME('%Y-%m-%d %H:00:00', stat_datetime)"
-
-            # 执行聚合查询：从原始表中按小时分组计算聚合值
-            # 对于累计存储方式，我们需要计算每个时间段的累计值差值作为该时间段的流量
-            if self.db_type == "postgresql":
-                aggregate_query = f"""
-                    SELECT
-                        {time_group_fn} AS hour_group,
-                        downloader_id,
-                        GREATEST(0, (MAX(cumulative_uploaded) - MIN(cumulative_uploaded))::bigint) AS total_uploaded,
-                        GREATEST(0, (MAX(cumulative_downloaded) - MIN(cumulative_downloaded))::bigint) AS total_downloaded,
-                        AVG(upload_speed) AS avg_upload_speed,
-                        AVG(download_speed) AS avg_download_speed,
-                        COUNT(*) AS samples
-                    FROM traffic_stats
-                    WHERE stat_datetime < {ph}
-                    GROUP BY hour_group, downloader_id
-                """
-            elif self.db_type == "mysql":
-                aggregate_query = f"""
-                    SELECT
-                        {time_group_fn} AS hour_group,
-                        downloader_id,
-                        GREATEST(0, MAX(cumulative_uploaded) - MIN(cumulative_uploaded)) AS total_uploaded,
-                        GREATEST(0, MAX(cumulative_downloaded) - MIN(cumulative_downloaded)) AS total_downloaded,
-                        AVG(upload_speed) AS avg_upload_speed,
-                        AVG(download_speed) AS avg_download_speed,
-                        COUNT(*) AS samples
-                    FROM traffic_stats
-                    WHERE stat_datetime < {ph}
-                    GROUP BY hour_group, downloader_id
-                """
-            else:  # SQLite - 使用CASE语句替代GREATEST函数
-                aggregate_query = f"""
-                    SELECT
-                        {time_group_fn} AS hour_group,
-                        downloader_id,
-                        CASE WHEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) > 0 
-                             THEN MAX(cumulative_uploaded) - MIN(cumulative_uploaded) 
-                             ELSE 0 END AS total_uploaded,
-                        CASE WHEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) > 0 
-                             THEN MAX(cumulative_downloaded) - MIN(cumulative_downloaded) 
-                             ELSE 0 END AS total_downloaded,
-                        AVG(upload_speed) AS avg_upload_speed,
-                        AVG(download_speed) AS avg_download_speed,
-                        COUNT(*) AS samples
-                    FROM traffic_stats
-                    WHERE stat_datetime < {ph}
-                    GROUP BY hour_group, downloader_id
-                """
-
-            cursor.execute(aggregate_query, (cutoff_time_str, ))
-            aggregated_rows = cursor.fetchall()
-
-            # 如果没有数据需要聚合，则直接返回
-            if not aggregated_rows:
-                logging.info("没有需要聚合的数据。")
-                conn.commit()
-                return
+                        source_table, source_mark, source_retention = table, mark, retention
 
-            # 批量插入聚合数据到 traffic_stats_hourly 表中
-            # 使用 UPSERT 机制处理重复数据
-            if self.db_type == "mysql":
-                upsert_sql = f"""
-                    INSERT INTO traffic_stats_hourly
-                    (stat_datetime, downloader_id, uploaded, downloaded, avg_upload_speed, avg_download_speed, samples, cumulative_uploaded, cumulative_downloaded)
-                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
-                    ON DUPLICATE KEY UPDATE
-                    uploaded = uploaded + VALUES(uploaded),
-                    downloaded = downloaded + VALUES(downloaded),
-                    avg_upload_speed = ((avg_upload_speed * samples) + (VALUES(avg_upload_speed) * VALUES(samples))) / (samples + VALUES(samples)),
-                    avg_download_speed = ((avg_download_speed * samples) + (VALUES(avg_download_speed) * VALUES(samples))) / (samples + VALUES(samples)),
-                    samples = samples + VALUES(samples),
-                    cumulative_uploaded = GREATEST(cumulative_uploaded, VALUES(cumulative_uploaded)),
-                    cumulative_downloaded = GREATEST(cumulative_downloaded, VALUES(cumulative_downloaded))
-                """
-            elif self.db_type == "postgresql":
-                upsert_sql = f"""
-                    INSERT INTO traffic_stats_hourly
-                    (stat_datetime, downloader_id, uploaded, downloaded, avg_upload_speed, avg_download_speed, samples, cumulative_uploaded, cumulative_downloaded)
-                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
-                    ON CONFLICT (stat_datetime, downloader_id)
-                    DO UPDATE SET
-                    uploaded = traffic_stats_hourly.uploaded + EXCLUDED.uploaded,
-                    downloaded = traffic_stats_hourly.downloaded + EXCLUDED.downloaded,
-                    avg_upload_speed = ((traffic_stats_hourly.avg_upload_speed * traffic_stats_hourly.samples) + (EXCLUDED.avg_upload_speed * EXCLUDED.samples)) / (traffic_stats_hourly.samples + EXCLUDED.samples),
-                    avg_download_speed = ((traffic_stats_hourly.avg_download_speed * traffic_stats_hourly.samples) + (EXCLUDED.avg_download_speed * EXCLUDED.samples)) / (traffic_stats_hourly.samples + EXCLUDED.samples),
-                    samples = traffic_stats_hourly.samples + EXCLUDED.samples,
-                    cumulative_uploaded = GREATEST(traffic_stats_hourly.cumulative_uploaded, EXCLUDED.cumulative_uploaded),
-                    cumulative_downloaded = GREATEST(traffic_stats_hourly.cumulative_downloaded, EXCLUDED.cumulative_downloaded)
-                """
-            else:  # sqlite
-                upsert_sql = f"""
-                    INSERT INTO traffic_stats_hourly
-                    (stat_datetime, downloader_id, uploaded, downloaded, avg_upload_speed, avg_download_speed, samples, cumulative_uploaded, cumulative_downloaded)
-                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
-                    ON CONFLICT (stat_datetime, downloader_id)
-                    DO UPDATE SET
-                    uploaded = traffic_stats_hourly.uploaded + excluded.uploaded,
-                    downloaded = traffic_stats_hourly.downloaded + excluded.downloaded,
-                    avg_upload_speed = ((traffic_stats_hourly.avg_upload_speed * traffic_stats_hourly.samples) + (excluded.avg_upload_speed * excluded.samples)) / (traffic_stats_hourly.samples + excluded.samples),
-                    avg_download_speed = ((traffic_stats_hourly.avg_download_speed * traffic_stats_hourly.samples) + (excluded.avg_download_speed * excluded.samples)) / (traffic_stats_hourly.samples + excluded.samples),
-                    samples = traffic_stats_hourly.samples + excluded.samples,
-                    cumulative_uploaded = MAX(traffic_stats_hourly.cumulative_uploaded, excluded.cumulative_uploaded),
-                    cumulative_downloaded = MAX(traffic_stats_hourly.cumulative_downloaded, excluded.cumulative_downloaded)
-                """
-
-            # 准备插入参数
-            # 对于累计值，我们需要获取每个时间段内最后一个记录的累计值
-            # 重新查询以获取累计值
-            if self.db_type == "mysql":
-                time_group_fn = "DATE_FORMAT(stat_datetime, '%Y-%m-%d %H:00:00')"
-            elif self.db_type == "postgresql":
-                time_group_fn = "DATE_TRUNC('hour', stat_datetime)"
-            else:  # sqlite
-                time_group_fn = "STRFTIME('%Y-%m-%d %H:00:00', stat_datetime)"
-
-            cumulative_query = f"""
-                SELECT
-                    {time_group_fn} AS hour_group,
-                    downloader_id,
-                    MAX(cumulative_uploaded) AS final_cumulative_uploaded,
-                    MAX(cumulative_downloaded) AS final_cumulative_downloaded
-                FROM traffic_stats
-                WHERE stat_datetime < {ph}
-                GROUP BY hour_group, downloader_id
-            """
-
-            cursor.execute(cumulative_query, (cutoff_time_str, ))
-            cumulative_rows = cursor.fetchall()
-
-            # 创建累计值映射字典
-            cumulative_map = {}
-            for row in cumulative_rows:
-                key = (row["hour_group"] if isinstance(row, dict) else row[0],
-                       row["downloader_id"]
-                       if isinstance(row, dict) else row[1])
-                cumulative_map[key] = (
-                    int(row["final_cumulative_uploaded"] if isinstance(
-                        row, dict) else row[2]),
-                    int(row["final_cumulative_downloaded"] if isinstance(
-                        row, dict) else row[3]))
-
-            # 准备插入参数
-            upsert_params = [
-                (row["hour_group"] if isinstance(row, dict) else row[0],
-                 row["downloader_id"] if isinstance(row, dict) else row[1],
-                 int(row["total_uploaded"] if isinstance(row, dict) else row[2]
-                     ),
-                 int(row["total_downloaded"] if isinstance(row, dict
-                                                           ) else row[3]),
-                 int(row["avg_upload_speed"] if isinstance(row, dict
-                                                           ) else row[4]),
-                 int(row["avg_download_speed"] if isinstance(row, dict
-                                                             ) else row[5]),
-                 int(row["samples"] if isinstance(row, dict) else row[6]),
-                 cumulative_map.get(
-                     (row["hour_group"] if isinstance(row, dict) else row[0],
-                      row["downloader_id"]
-                      if isinstance(row, dict) else row[1]), (0, 0))[0],
-                 cumulative_map.get(
-                     (row["hour_group"] if isinstance(row, dict) else row[0],
-                      row["downloader_id"]
-                      if isinstance(row, dict) else row[1]), (0, 0))[1])
-                for row in aggregated_rows
-            ]
-
-            cursor.executemany(upsert_sql, upsert_params)
-
-            # 删除已聚合的原始数据
-            delete_query = f"DELETE FROM traffic_stats WHERE stat_datetime < {ph}"
-            cursor.execute(delete_query, (cutoff_time_str, ))
-
-            # 提交事务
-            conn.commit()
+                    conn.commit()
+                    if raw_delete_before is not None:
+                        result["deleted"] += self.raw_traffic.delete_before(cursor, downloader_id, raw_delete_before)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
 
+        if result["hourly"] or result["daily"]:
             logging.info(
-                f"成功聚合 {len(aggregated_rows)} 条小时数据，并清理了 {cursor.rowcount} 条原始数据。"
+                f"流量汇总完成: 分钟 {result['minute']} 条, 5 分钟 {result['5minute']} 条, "
+                f"小时 {result['hourly']} 条, 天 {result['daily']} 条, 清理 {result['deleted']} 条")
+        return result
+
+    # get_rollup_series 缓存分段的长度（秒），必须能整除一天；天表按 SERIES_CHUNK_DAYS 天分段
+    SERIES_CHUNK_SECONDS = {"minute": 3600, "5minute": 86400, "hourly": 86400}
+    SERIES_CHUNK_DAYS = 32
+
+    def _series_chunks(self, tier, start, end):
+        """把 [start, end) 切分成与固定边界对齐的分段，返回 [(分段开始, 分段结束, 是否完整)]。"""
+        chunk_seconds = self.SERIES_CHUNK_SECONDS.get(tier)
+        if chunk_seconds is None:
+            chunk_start = datetime.fromordinal(start.toordinal() // self.SERIES_CHUNK_DAYS * self.SERIES_CHUNK_DAYS)
+            step = timedelta(days=self.SERIES_CHUNK_DAYS)
+        else:
+            chunk_start = self.floor_period(start, chunk_seconds)
+            step = timedelta(seconds=chunk_seconds)
+        chunks = []
+        while chunk_start < end:
+            chunk_end = chunk_start + step
+            chunks.append((max(chunk_start, start), min(chunk_end, end), chunk_start >= start and chunk_end <= end))
+            chunk_start = chunk_end
+        return chunks
+
+    def get_rollup_series(self, cursor, tier, downloader_ids, start, end):
+        """读取汇总层 tier 在 [start, end) 内的行。
+
+        返回 [(时段开始, downloader_id, 上传量, 下载量, 上传速度×采样数, 下载速度×采样数, 采样数)]。
+        调用方保证 end 不晚于这些下载器在该层的水位线：已汇总的时段不会再变化。结果按与固定边界对齐的分段
+        放入进程内 LRU 缓存，起止时间不同的查询（如随当前时间滑动的范围）也能命中完整的分段；
+        连续未命中的分段合并成一次查询。
+        """
+        table = next(t[1] for t in self.ROLLUP_TIERS if t[0] == tier)
+        ids = tuple(sorted(downloader_ids))
+        if not ids or start >= end:
+            return []
+
+        rows = []
+        missing_runs = []  # 连续未命中的分段
+        for chunk in self._series_chunks(tier, start, end):
+            cached = _rollup_series_cache.get((self._pool_key(), table, ids, chunk[0])) if chunk[2] else None
+            if cached is not None:
+                rows += cached
+            elif missing_runs and missing_runs[-1][-1][1] == chunk[0]:
+                missing_runs[-1].append(chunk)
+            else:
+                missing_runs.append([chunk])
+
+        for run in missing_runs:
+            fetched = self._query_rollup_rows(cursor, table, ids, run[0][0], run[-1][1])
+            fetched.sort(key=lambda r: r[0])
+            times = [r[0] for r in fetched]
+            for chunk_start, chunk_end, complete in run:
+                part = fetched[bisect_left(times, chunk_start):bisect_left(times, chunk_end)]
+                rows += part
+                if complete:
+                    _rollup_series_cache.put((self._pool_key(), table, ids, chunk_start), part, weight=len(part) or 1)
+        return rows
+
+    def _query_rollup_rows(self, cursor, table, ids, start, end):
+        ph = self.get_placeholder()
+        cursor.execute(
+            f"SELECT stat_datetime, downloader_id, uploaded, downloaded, avg_upload_speed, avg_download_speed, "
+            f"samples FROM {table} WHERE stat_datetime >= {ph} AND stat_datetime < {ph} "
+            f"AND downloader_id IN ({', '.join([ph] * len(ids))})",
+            (start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S"), *ids),
+        )
+        rows = []
+        for row in cursor.fetchall():
+            row = dict(row)
+            samples = int(row["samples"] or 0)
+            rows.append((
+                self._as_datetime(row["stat_datetime"]),
+                row["downloader_id"],
+                int(row["uploaded"] or 0),
+                int(row["downloaded"] or 0),
+                int(row["avg_upload_speed"] or 0) * samples,
+                int(row["avg_download_speed"] or 0) * samples,
+                samples,
+            ))
+        return rows
+
+    def get_raw_minute_series(self, cursor, downloader_ids, start, end):
+        """把尚未汇总的原始数据 [start, end) 按分钟汇总，返回格式同 get_rollup_series（不缓存）。"""
+        rows = []
+        for downloader_id in sorted(downloader_ids):
+            for r in self._summarize_raw_minutes(cursor, downloader_id, start, end):
+                rows.append((self._as_datetime(r[0]), r[1], r[2], r[3], r[4] * r[6], r[5] * r[6], r[6]))
+        return rows
+
+    def get_rollup_cache_stats(self):
+        return _rollup_series_cache.stats()
+
+    def get_downloader_traffic_summary(self, cursor, downloader_ids, today=None):
+        """返回 {downloader_id: {"today_ul", "today_dl", "total_ul", "total_dl"}}。
+
+        今日流量按主键读取 traffic_daily_totals 当天的行；累计值取每个下载器最近一天的行
+        （idx_traffic_daily_totals_downloader 上的一次索引查找），与原始表的数据量无关。
+        """
+        ph = self.get_placeholder()
+        ids = sorted(downloader_ids)
+        summary = {d_id: {"today_ul": 0, "today_dl": 0, "total_ul": 0, "total_dl": 0} for d_id in ids}
+        if not ids:
+            return summary
+
+        today_str = (today or datetime.now()).strftime("%Y-%m-%d")
+        cursor.execute(
+            f"SELECT downloader_id, uploaded, downloaded FROM traffic_daily_totals "
+            f"WHERE stat_date = {ph} AND downloader_id IN ({', '.join([ph] * len(ids))})",
+            (today_str, *ids),
+        )
+        for row in cursor.fetchall():
+            row = dict(row)
+            summary[row["downloader_id"]]["today_ul"] = int(row["uploaded"] or 0)
+            summary[row["downloader_id"]]["today_dl"] = int(row["downloaded"] or 0)
+
+        for d_id in ids:
+            cursor.execute(
+                f"SELECT cumulative_uploaded, cumulative_downloaded FROM traffic_daily_totals "
+                f"WHERE downloader_id = {ph} ORDER BY stat_date DESC LIMIT 1",
+                (d_id, ),
             )
-        except Exception as e:
-            # 回滚事务
-            if conn:
+            row = cursor.fetchone()
+            if row is not None:
+                row = dict(row)
+                summary[d_id]["total_ul"] = int(row["cumulative_uploaded"] or 0)
+                summary[d_id]["total_dl"] = int(row["cumulative_downloaded"] or 0)
+        return summary
+
+    def backfill_daily_totals(self):
+        """为还没有 traffic_daily_totals 记录的下载器，用原始流量存储中保留的数据补齐每日合计（启动时执行一次）。"""
+        ph = self.get_placeholder()
+        if self.db_type == "mysql":
+            insert_sql = "INSERT IGNORE INTO traffic_daily_totals"
+            conflict_clause = ""
+        else:
+            insert_sql = "INSERT INTO traffic_daily_totals"
+            conflict_clause = " ON CONFLICT (stat_date, downloader_id) DO NOTHING"
+        until = datetime.now() + timedelta(minutes=1)
+
+        with self.connection() as conn:
+            cursor = self._get_cursor(conn)
+            try:
+                cursor.execute("SELECT DISTINCT downloader_id FROM traffic_daily_totals")
+                known = {dict(r)["downloader_id"] for r in cursor.fetchall()}
+                missing = sorted(self.raw_traffic.downloader_ids(cursor) - known)
+
+                inserted = 0
+                for downloader_id in missing:
+                    first_seen = self.raw_traffic.first_time(cursor, downloader_id)
+                    if first_seen is None:
+                        continue
+                    # 每天累计值（不计全为 0 的采样）的最小/最大值，差值即当天流量
+                    days = {}
+                    for m in self.raw_traffic.minute_summaries(cursor, downloader_id, first_seen, until):
+                        max_ul, max_dl = int(m["max_ul"] or 0), int(m["max_dl"] or 0)
+                        if not (max_ul or max_dl):
+                            continue
+                        min_ul, min_dl = int(m["min_ul"] or 0) or max_ul, int(m["min_dl"] or 0) or max_dl
+                        day = days.setdefault(m["period"].strftime("%Y-%m-%d"), [min_ul, max_ul, min_dl, max_dl])
+                        day[0], day[1] = min(day[0], min_ul), max(day[1], max_ul)
+                        day[2], day[3] = min(day[2], min_dl), max(day[3], max_dl)
+                    rows = [(date_str, downloader_id, max(0, max_ul - min_ul), max(0, max_dl - min_dl), max_ul, max_dl)
+                            for date_str, (min_ul, max_ul, min_dl, max_dl) in sorted(days.items())]
+                    if rows:
+                        cursor.executemany(
+                            f"{insert_sql} (stat_date, downloader_id, uploaded, downloaded, cumulative_uploaded, "
+                            f"cumulative_downloaded) VALUES ({', '.join([ph] * 6)}){conflict_clause}",
+                            rows,
+                        )
+                        inserted += len(rows)
+                conn.commit()
+            except Exception:
                 conn.rollback()
-            logging.error(f"聚合小时流量数据时出错: {e}", exc_info=True)
-            raise
-        finally:
-            # 关闭游标和连接
-            if cursor:
+                raise
+            finally:
                 cursor.close()
-            if conn:
-                conn.close()
+
+        if inserted:
+            logging.info(f"已根据原始流量数据补齐 {inserted} 条每日流量合计。")
+        return inserted
 
 def reconcile_historical_data(db_manager, config):
     """在启动时同步下载器状态到数据库。"""
@@ -963,7 +1315,6 @@ def reconcile_historical_data(db_manager, config):
     logging.info("正在同步下载器状态...")
     conn = db_manager._get_connection()
     cursor = db_manager._get_cursor(conn)
-    ph = db_manager.get_placeholder()
 
     records = []
     current_timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -1010,15 +1361,8 @@ def reconcile_historical_data(db_manager, config):
 
     if records:
         try:
-            sql_insert = (
-                f"INSERT INTO traffic_stats (stat_datetime, downloader_id, uploaded, downloaded, upload_speed, download_speed, cumulative_uploaded, cumulative_downloaded) VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}) ON CONFLICT(stat_datetime, downloader_id) DO UPDATE SET uploaded = EXCLUDED.uploaded, downloaded = EXCLUDED.downloaded, cumulative_uploaded = EXCLUDED.cumulative_uploaded, cumulative_downloaded = EXCLUDED.cumulative_downloaded"
-                if db_manager.db_type == "postgresql" else
-                f"INSERT INTO traffic_stats (stat_datetime, downloader_id, uploaded, downloaded, upload_speed, download_speed, cumulative_uploaded, cumulative_downloaded) VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}) ON DUPLICATE KEY UPDATE uploaded = VALUES(uploaded), downloaded = VALUES(downloaded), cumulative_uploaded = VALUES(cumulative_uploaded), cumulative_downloaded = VALUES(cumulative_downloaded)"
-                if db_manager.db_type == "mysql" else
-                f"INSERT INTO traffic_stats (stat_datetime, downloader_id, uploaded, downloaded, upload_speed, download_speed, cumulative_uploaded, cumulative_downloaded) VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(stat_datetime, downloader_id) DO UPDATE SET uploaded = excluded.uploaded, downloaded = excluded.downloaded, cumulative_uploaded = excluded.cumulative_uploaded, cumulative_downloaded = excluded.cumulative_downloaded"
-            )
-            cursor.executemany(sql_insert, records)
-            logging.info(f"已成功插入 {len(records)} 条初始记录到 traffic_stats。")
+            db_manager.raw_traffic.write(cursor, records)
+            logging.info(f"已成功写入 {len(records)} 条初始流量记录。")
         except Exception as e:
             logging.error(f"插入初始记录失败: {e}")
             conn.rollback()
@@ -51,7 +51,10 @@ class DatabaseMigrationManager:
                         },
                         'primary_key': ['stat_datetime', 'downloader_id'],
                         'engine': 'InnoDB',
-                        'row_format': 'Dynamic'
+                        'row_format': 'Dynamic',
+                        'indexes': [
+                            'CREATE INDEX idx_traffic_stats_downloader_time ON traffic_stats(downloader_id, stat_datetime)'
+                        ]
                     },
                     'traffic_stats_hourly': {
                         'columns': {
@@ -69,6 +72,80 @@ class DatabaseMigrationManager:
                         'engine': 'InnoDB',
                         'row_format': 'Dynamic'
                     },
+                    'traffic_stats_daily': {
+                        'columns': {
+                            'stat_datetime': 'DATETIME NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT DEFAULT 0',
+                            'downloaded': 'BIGINT DEFAULT 0',
+                            'avg_upload_speed': 'BIGINT DEFAULT 0',
+                            'avg_download_speed': 'BIGINT DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id'],
+                        'engine': 'InnoDB',
+                        'row_format': 'Dynamic'
+                    },
+                    'traffic_stats_minute': {
+                        'columns': {
+                            'stat_datetime': 'DATETIME NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT DEFAULT 0',
+                            'downloaded': 'BIGINT DEFAULT 0',
+                            'avg_upload_speed': 'BIGINT DEFAULT 0',
+                            'avg_download_speed': 'BIGINT DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id'],
+                        'engine': 'InnoDB',
+                        'row_format': 'Dynamic'
+                    },
+                    'traffic_stats_5minute': {
+                        'columns': {
+                            'stat_datetime': 'DATETIME NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT DEFAULT 0',
+                            'downloaded': 'BIGINT DEFAULT 0',
+                            'avg_upload_speed': 'BIGINT DEFAULT 0',
+                            'avg_download_speed': 'BIGINT DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id'],
+                        'engine': 'InnoDB',
+                        'row_format': 'Dynamic'
+                    },
+                    'traffic_rollup_state': {
+                        'columns': {
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'tier': 'VARCHAR(16) NOT NULL',
+                            'watermark': 'DATETIME NOT NULL'
+                        },
+                        'primary_key': ['downloader_id', 'tier'],
+                        'engine': 'InnoDB',
+                        'row_format': 'Dynamic'
+                    },
+                    'traffic_daily_totals': {
+                        'columns': {
+                            'stat_date': 'DATE NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'downloaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_date', 'downloader_id'],
+                        'engine': 'InnoDB',
+                        'row_format': 'Dynamic',
+                        'indexes': [
+                            'CREATE INDEX idx_traffic_daily_totals_downloader ON traffic_daily_totals(downloader_id, stat_date)'
+                        ]
+                    },
                     'torrents': {
                         'columns': {
                             'hash': 'VARCHAR(40) NOT NULL',
@@ -83,11 +160,19 @@ class DatabaseMigrationManager:
                             'downloader_id': 'VARCHAR(36) NOT NULL',
                             'last_seen': 'DATETIME NOT NULL',
                             'iyuu_last_check': 'DATETIME NULL',
-                            'seeders': 'INT DEFAULT 0'
+                            'seeders': 'INT DEFAULT 0',
+                            'attr_key': 'VARCHAR(32) NULL'
                         },
                         'primary_key': ['hash', 'downloader_id'],
                         'engine': 'InnoDB',
-                        'row_format': 'Dynamic'
+                        'row_format': 'Dynamic',
+                        'indexes': [
+                            'CREATE INDEX idx_torrents_attr_key ON torrents(attr_key)',
+                            'CREATE INDEX idx_torrents_name_size_sites ON torrents(name(255), size, sites)',
+                            'CREATE INDEX idx_torrents_downloader_seen ON torrents(downloader_id, last_seen)',
+                            'CREATE INDEX idx_torrents_downloader_path ON torrents(downloader_id, save_path(255))',
+                            'CREATE INDEX idx_torrents_save_path ON torrents(save_path(255))'
+                        ]
                     },
                     'torrent_upload_stats': {
                         'columns': {
@@ -157,7 +242,12 @@ class DatabaseMigrationManager:
                         },
                         'primary_key': ['hash', 'torrent_id', 'site_name'],
                         'engine': 'InnoDB',
-                        'row_format': 'DYNAMIC'
+                        'row_format': 'DYNAMIC',
+                        'indexes': [
+                            'CREATE INDEX idx_seed_parameters_hash_updated ON seed_parameters(hash, updated_at)',
+                            'CREATE INDEX idx_seed_parameters_torrent_site ON seed_parameters(torrent_id, site_name)',
+                            'CREATE INDEX idx_seed_parameters_name ON seed_parameters(name(255))'
+                        ]
                     },
                     'batch_enhance_records': {
                         'columns': {
@@ -200,7 +290,10 @@ class DatabaseMigrationManager:
                             'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
                             'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
                         },
-                        'primary_key': ['stat_datetime', 'downloader_id']
+                        'primary_key': ['stat_datetime', 'downloader_id'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_traffic_stats_downloader_time ON traffic_stats(downloader_id, stat_datetime)'
+                        ]
                     },
                     'traffic_stats_hourly': {
                         'columns': {
@@ -216,6 +309,70 @@ class DatabaseMigrationManager:
                         },
                         'primary_key': ['stat_datetime', 'downloader_id']
                     },
+                    'traffic_stats_daily': {
+                        'columns': {
+                            'stat_datetime': 'TIMESTAMP NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT DEFAULT 0',
+                            'downloaded': 'BIGINT DEFAULT 0',
+                            'avg_upload_speed': 'BIGINT DEFAULT 0',
+                            'avg_download_speed': 'BIGINT DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id']
+                    },
+                    'traffic_stats_minute': {
+                        'columns': {
+                            'stat_datetime': 'TIMESTAMP NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT DEFAULT 0',
+                            'downloaded': 'BIGINT DEFAULT 0',
+                            'avg_upload_speed': 'BIGINT DEFAULT 0',
+                            'avg_download_speed': 'BIGINT DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id']
+                    },
+                    'traffic_stats_5minute': {
+                        'columns': {
+                            'stat_datetime': 'TIMESTAMP NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT DEFAULT 0',
+                            'downloaded': 'BIGINT DEFAULT 0',
+                            'avg_upload_speed': 'BIGINT DEFAULT 0',
+                            'avg_download_speed': 'BIGINT DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id']
+                    },
+                    'traffic_rollup_state': {
+                        'columns': {
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'tier': 'VARCHAR(16) NOT NULL',
+                            'watermark': 'TIMESTAMP NOT NULL'
+                        },
+                        'primary_key': ['downloader_id', 'tier']
+                    },
+                    'traffic_daily_totals': {
+                        'columns': {
+                            'stat_date': 'DATE NOT NULL',
+                            'downloader_id': 'VARCHAR(36) NOT NULL',
+                            'uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'downloaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_uploaded': 'BIGINT NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'BIGINT NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_date', 'downloader_id'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_traffic_daily_totals_downloader ON traffic_daily_totals(downloader_id, stat_date)'
+                        ]
+                    },
                     'torrents': {
                         'columns': {
                             'hash': 'VARCHAR(40) NOT NULL',
@@ -230,9 +387,17 @@ class DatabaseMigrationManager:
                             'downloader_id': 'VARCHAR(36) NOT NULL',
                             'last_seen': 'TIMESTAMP NOT NULL',
                             'iyuu_last_check': 'TIMESTAMP NULL',
-                            'seeders': 'INTEGER DEFAULT 0'
+                            'seeders': 'INTEGER DEFAULT 0',
+                            'attr_key': 'VARCHAR(32)'
                         },
-                        'primary_key': ['hash', 'downloader_id']
+                        'primary_key': ['hash', 'downloader_id'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_attr_key ON torrents(attr_key)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_name_size_sites ON torrents(name, size, sites)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_downloader_seen ON torrents(downloader_id, last_seen)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_downloader_path ON torrents(downloader_id, save_path)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_save_path ON torrents(save_path)'
+                        ]
                     },
                     'torrent_upload_stats': {
                         'columns': {
@@ -296,7 +461,12 @@ class DatabaseMigrationManager:
                             'created_at': 'TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP',
                             'updated_at': 'TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP'
                         },
-                        'primary_key': ['hash', 'torrent_id', 'site_name']
+                        'primary_key': ['hash', 'torrent_id', 'site_name'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_seed_parameters_hash_updated ON seed_parameters(hash, updated_at)',
+                            'CREATE INDEX IF NOT EXISTS idx_seed_parameters_torrent_site ON seed_parameters(torrent_id, site_name)',
+                            'CREATE INDEX IF NOT EXISTS idx_seed_parameters_name ON seed_parameters(name)'
+                        ]
                     },
                     'batch_enhance_records': {
                         'columns': {
@@ -337,7 +507,10 @@ class DatabaseMigrationManager:
                             'cumulative_uploaded': 'INTEGER NOT NULL DEFAULT 0',
                             'cumulative_downloaded': 'INTEGER NOT NULL DEFAULT 0'
                         },
-                        'primary_key': ['stat_datetime', 'downloader_id']
+                        'primary_key': ['stat_datetime', 'downloader_id'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_traffic_stats_downloader_time ON traffic_stats(downloader_id, stat_datetime)'
+                        ]
                     },
                     'traffic_stats_hourly': {
                         'columns': {
@@ -353,6 +526,70 @@ class DatabaseMigrationManager:
                         },
                         'primary_key': ['stat_datetime', 'downloader_id']
                     },
+                    'traffic_stats_daily': {
+                        'columns': {
+                            'stat_datetime': 'TEXT NOT NULL',
+                            'downloader_id': 'TEXT NOT NULL',
+                            'uploaded': 'INTEGER DEFAULT 0',
+                            'downloaded': 'INTEGER DEFAULT 0',
+                            'avg_upload_speed': 'INTEGER DEFAULT 0',
+                            'avg_download_speed': 'INTEGER DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'INTEGER NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'INTEGER NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id']
+                    },
+                    'traffic_stats_minute': {
+                        'columns': {
+                            'stat_datetime': 'TEXT NOT NULL',
+                            'downloader_id': 'TEXT NOT NULL',
+                            'uploaded': 'INTEGER DEFAULT 0',
+                            'downloaded': 'INTEGER DEFAULT 0',
+                            'avg_upload_speed': 'INTEGER DEFAULT 0',
+                            'avg_download_speed': 'INTEGER DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'INTEGER NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'INTEGER NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id']
+                    },
+                    'traffic_stats_5minute': {
+                        'columns': {
+                            'stat_datetime': 'TEXT NOT NULL',
+                            'downloader_id': 'TEXT NOT NULL',
+                            'uploaded': 'INTEGER DEFAULT 0',
+                            'downloaded': 'INTEGER DEFAULT 0',
+                            'avg_upload_speed': 'INTEGER DEFAULT 0',
+                            'avg_download_speed': 'INTEGER DEFAULT 0',
+                            'samples': 'INTEGER DEFAULT 0',
+                            'cumulative_uploaded': 'INTEGER NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'INTEGER NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_datetime', 'downloader_id']
+                    },
+                    'traffic_rollup_state': {
+                        'columns': {
+                            'downloader_id': 'TEXT NOT NULL',
+                            'tier': 'TEXT NOT NULL',
+                            'watermark': 'TEXT NOT NULL'
+                        },
+                        'primary_key': ['downloader_id', 'tier']
+                    },
+                    'traffic_daily_totals': {
+                        'columns': {
+                            'stat_date': 'TEXT NOT NULL',
+                            'downloader_id': 'TEXT NOT NULL',
+                            'uploaded': 'INTEGER NOT NULL DEFAULT 0',
+                            'downloaded': 'INTEGER NOT NULL DEFAULT 0',
+                            'cumulative_uploaded': 'INTEGER NOT NULL DEFAULT 0',
+                            'cumulative_downloaded': 'INTEGER NOT NULL DEFAULT 0'
+                        },
+                        'primary_key': ['stat_date', 'downloader_id'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_traffic_daily_totals_downloader ON traffic_daily_totals(downloader_id, stat_date)'
+                        ]
+                    },
                     'torrents': {
                         'columns': {
                             'hash': 'TEXT NOT NULL',
@@ -367,9 +604,17 @@ class DatabaseMigrationManager:
                             'downloader_id': 'TEXT NOT NULL',
                             'last_seen': 'TEXT NOT NULL',
                             'iyuu_last_check': 'TEXT NULL',
-                            'seeders': 'INTEGER DEFAULT 0'
+                            'seeders': 'INTEGER DEFAULT 0',
+                            'attr_key': 'TEXT'
                         },
-                        'primary_key': ['hash', 'downloader_id']
+                        'primary_key': ['hash', 'downloader_id'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_attr_key ON torrents(attr_key)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_name_size_sites ON torrents(name, size, sites)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_downloader_seen ON torrents(downloader_id, last_seen)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_downloader_path ON torrents(downloader_id, save_path)',
+                            'CREATE INDEX IF NOT EXISTS idx_torrents_save_path ON torrents(save_path)'
+                        ]
                     },
                     'torrent_upload_stats': {
                         'columns': {
@@ -433,7 +678,12 @@ class DatabaseMigrationManager:
                             'created_at': 'TEXT NOT NULL',
                             'updated_at': 'TEXT NOT NULL'
                         },
-                        'primary_key': ['hash', 'torrent_id', 'site_name']
+                        'primary_key': ['hash', 'torrent_id', 'site_name'],
+                        'indexes': [
+                            'CREATE INDEX IF NOT EXISTS idx_seed_parameters_hash_updated ON seed_parameters(hash, updated_at)',
+                            'CREATE INDEX IF NOT EXISTS idx_seed_parameters_torrent_site ON seed_parameters(torrent_id, site_name)',
+                            'CREATE INDEX IF NOT EXISTS idx_seed_parameters_name ON seed_parameters(name)'
+                        ]
                     },
                     'batch_enhance_records': {
                         'columns': {
@@ -478,56 +728,64 @@ class DatabaseMigrationManager:
             start_ts = time.time()
 
             # 1. 执行列删除迁移（proxy列）
-            logging.info("迁移阶段: 1/10 删除 proxy 列检查")
+            logging.info("迁移阶段: 1/15 删除 proxy 列检查")
             self._migrate_remove_proxy_column(conn, cursor)
 
             # 2. 执行列添加迁移（passkey列）
-            logging.info("迁移阶段: 2/10 添加 passkey 列检查")
+            logging.info("迁移阶段: 2/15 添加 passkey 列检查")
             self._migrate_add_passkey_column(conn, cursor)
 
             # 3. 执行列添加迁移（seeders列）
-            logging.info("迁移阶段: 3/13 添加 seeders 列检查")
+            logging.info("迁移阶段: 3/15 添加 seeders 列检查")
             self._migrate_add_seeders_column(conn, cursor)
 
-            # 4. 执行列添加迁移（ratio_threshold / seed_speed_limit 列）
-            logging.info("迁移阶段: 4/13 添加 ratio_threshold / seed_speed_limit 列检查")
+            # 4. 执行列添加迁移（attr_key列及索引，需在 Schema 完整性检查之前）
+            logging.info("迁移阶段: 4/15 添加 attr_key 列检查")
+            self._migrate_add_attr_key_column(conn, cursor)
+
+            # 5. 执行列添加迁移（ratio_threshold / seed_speed_limit 列）
+            logging.info("迁移阶段: 5/15 添加 ratio_threshold / seed_speed_limit 列检查")
             self._migrate_add_ratio_limit_columns(conn, cursor)
 
-            # 4. 删除seed_parameters中的save_path/downloader_id列
-            logging.info("迁移阶段: 5/13 删除 seed_parameters.save_path/downloader_id")
+            # 6. 删除seed_parameters中的save_path/downloader_id列
+            logging.info("迁移阶段: 6/15 删除 seed_parameters.save_path/downloader_id")
             self._migrate_remove_seed_parameters_path_fields(conn, cursor)
 
-            # 5. 删除seed_parameters中的is_deleted列
-            logging.info("迁移阶段: 6/13 删除 seed_parameters.is_deleted")
+            # 7. 删除seed_parameters中的is_deleted列
+            logging.info("迁移阶段: 7/15 删除 seed_parameters.is_deleted")
             self._migrate_remove_seed_parameters_is_deleted(conn, cursor)
 
-            # 6. 执行BDInfo字段迁移
-            logging.info("迁移阶段: 7/13 删除 seed_parameters.id")
+            # 8. 删除seed_parameters中的id列
+            logging.info("迁移阶段: 8/15 删除 seed_parameters.id")
             self._migrate_remove_seed_parameters_id(conn, cursor)
 
-            # 7. 执行BDInfo字段迁移
-            logging.info("迁移阶段: 8/13 BDInfo 字段迁移")
+            # 9. 执行BDInfo字段迁移
+            logging.info("迁移阶段: 9/15 BDInfo 字段迁移")
             self.migrate_bdinfo_fields(conn, cursor)
 
-            # 8. 执行MySQL字符集统一迁移
+            # 10. 执行MySQL字符集统一迁移
             if self.db_type == "mysql":
-                logging.info("迁移阶段: 9/13 MySQL 字符集统一")
+                logging.info("迁移阶段: 10/15 MySQL 字符集统一")
                 self._migrate_mysql_collation_unification(conn, cursor)
 
-            # 9. 执行完整的Schema完整性检查
-            logging.info("迁移阶段: 10/13 Schema 完整性检查")
+            # 11. 创建热点查询索引（新建索引后刷新统计信息）
+            logging.info("迁移阶段: 11/15 热点查询索引检查")
+            self._migrate_hot_query_indexes(conn, cursor)
+
+            # 12. 执行完整的Schema完整性检查
+            logging.info("迁移阶段: 12/15 Schema 完整性检查")
             self._ensure_schema_integrity(conn, cursor)
 
-            # 10. 执行复合主键迁移
-            logging.info("迁移阶段: 11/13 复合主键迁移")
+            # 13. 执行复合主键迁移
+            logging.info("迁移阶段: 13/15 复合主键迁移")
             self._migrate_composite_primary_key(conn, cursor)
 
-            # 11. 执行片源平台格式修复迁移
-            logging.info("迁移阶段: 12/13 片源平台格式修复")
+            # 14. 执行片源平台格式修复迁移
+            logging.info("迁移阶段: 14/15 片源平台格式修复")
             self._migrate_source_platform_format(conn, cursor)
 
-            # 12. 执行添加tmdb_link列迁移
-            logging.info("迁移阶段: 13/13 添加 tmdb_link 列")
+            # 15. 执行添加tmdb_link列迁移
+            logging.info("迁移阶段: 15/15 添加 tmdb_link 列")
             self._migrate_add_tmdb_link_column(conn, cursor)
 
             conn.commit()
@@ -1098,6 +1356,87 @@ class DatabaseMigrationManager:
         except Exception as e:
             logging.warning(f"迁移添加seeders列时出错: {e}")
 
+    def _migrate_add_attr_key_column(self, conn, cursor):
+        """迁移：添加torrents表中的attr_key列（5 属性规范化后的 MD5）及其索引
+
+        已有记录的 attr_key 为 NULL，由 DataTracker 在刷新或查询时补全。
+        """
+        try:
+            if not self._table_exists(cursor, 'torrents'):
+                return
+
+            logging.info("检查是否需要添加torrents表中的attr_key列...")
+            if not self._column_exists(cursor, 'torrents', 'attr_key'):
+                logging.info("检测到缺少attr_key列，正在添加...")
+                if self.db_type == "mysql":
+                    cursor.execute("ALTER TABLE torrents ADD COLUMN attr_key VARCHAR(32) NULL")
+                elif self.db_type == "postgresql":
+                    cursor.execute('ALTER TABLE torrents ADD COLUMN attr_key VARCHAR(32)')
+                else:  # SQLite
+                    # 可空且无默认值的列可以直接 ADD COLUMN，无需重建表（重建会丢失复合主键）
+                    cursor.execute('ALTER TABLE torrents ADD COLUMN attr_key TEXT')
+                logging.info(f"✓ 成功添加torrents表中的attr_key列 ({self.db_type.upper()})")
+            else:
+                logging.info("attr_key列已存在，无需迁移")
+
+            if self.db_type == "mysql":
+                index_sql = 'CREATE INDEX idx_torrents_attr_key ON torrents(attr_key)'
+            else:
+                index_sql = 'CREATE INDEX IF NOT EXISTS idx_torrents_attr_key ON torrents(attr_key)'
+            self._ensure_indexes(conn, cursor, 'torrents', [index_sql])
+            conn.commit()
+
+        except Exception as e:
+            logging.warning(f"迁移添加attr_key列时出错: {e}")
+
+    def _get_index_names(self, cursor, table_name: str) -> set:
+        """获取表上现有索引的名称"""
+        if self.db_type == 'mysql':
+            cursor.execute("""
+                SELECT DISTINCT index_name AS name FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = %s
+            """, (table_name,))
+        elif self.db_type == 'postgresql':
+            cursor.execute(
+                "SELECT indexname AS name FROM pg_indexes WHERE schemaname = 'public' AND tablename = %s",
+                (table_name,))
+        else:  # SQLite
+            cursor.execute(f"PRAGMA index_list('{table_name}')")
+        return {row['name'] for row in cursor.fetchall()}
+
+    def _migrate_hot_query_indexes(self, conn, cursor):
+        """迁移：为 torrents / seed_parameters / traffic_stats 的热点查询创建索引
+
+        覆盖按 name+size+sites 的精确匹配和 IYUU 查询、按下载器读取种子与快照标记、
+        按保存路径的路径列表，seed_parameters 按 name、hash、torrent_id+site_name 的查找，
+        以及流量写库时按下载器读取最新一条 traffic_stats。
+        索引定义按数据库类型放在 schema_configs 中（MySQL 的 TEXT 列使用前缀索引）。
+        有新建索引时刷新该表的统计信息，让优化器立即使用新索引。
+        """
+        tables = self.schema_configs.get(self.db_type, {}).get('tables', {})
+        for table_name in ('torrents', 'seed_parameters', 'traffic_stats', 'traffic_daily_totals'):
+            try:
+                indexes = tables.get(table_name, {}).get('indexes')
+                if not indexes or not self._table_exists(cursor, table_name):
+                    continue
+
+                before = self._get_index_names(cursor, table_name)
+                self._ensure_indexes(conn, cursor, table_name, indexes)
+                created = self._get_index_names(cursor, table_name) - before
+                if not created:
+                    continue
+
+                logging.info(f"✓ 已为表 {table_name} 创建索引: {', '.join(sorted(created))}")
+                if self.db_type == 'mysql':
+                    cursor.execute(f"ANALYZE TABLE `{table_name}`")
+                    cursor.fetchall()
+                else:
+                    cursor.execute(f"ANALYZE {table_name}")
+                conn.commit()
+
+            except Exception as e:
+                logging.warning(f"创建表 {table_name} 的热点查询索引时出错: {e}")
+
     def _migrate_add_ratio_limit_columns(self, conn, cursor):
         """迁移：为sites表添加分享率阈值和出种限速列"""
         try:
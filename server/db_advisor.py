@@ -0,0 +1,177 @@
+# db_advisor.py
+"""
+慢查询记录器
+
+DatabaseManager._get_cursor 返回的游标会被包装，execute/executemany 超过阈值的语句按
+“规范化后的 SQL”（折叠空白与 IN/VALUES 占位符列表）汇总次数与耗时。每条慢 SELECT 第一次出现时
+在同一连接上执行一次 EXPLAIN（SQLite 为 EXPLAIN QUERY PLAN），结果与统计一起保存并写入日志，
+新的热点查询缺少索引时可以在上线初期就被发现。
+
+阈值由 DB_SLOW_QUERY_MS 环境变量设置，0 表示关闭。
+"""
+
+import logging
+import re
+import threading
+import time
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_VALUES_LIST_RE = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+_EXPLAINABLE_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """把只有占位符数量不同的语句归为同一条。"""
+    sql = _WHITESPACE_RE.sub(" ", str(sql)).strip()
+    sql = _PLACEHOLDER_LIST_RE.sub("(...)", sql)
+    return _VALUES_LIST_RE.sub(r"\1", sql)
+
+
+class QueryAdvisor:
+    """按规范化 SQL 汇总慢语句（线程安全），最多保留 max_entries 条，超出时淘汰累计耗时最少的一条。"""
+
+    def __init__(self, db_type, threshold_ms=200, max_entries=200):
+        self.db_type = db_type
+        self.threshold = threshold_ms / 1000.0
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def wrap(self, cursor, conn):
+        return AdvisedCursor(cursor, conn, self) if self.enabled else cursor
+
+    def record(self, conn, sql, params, elapsed, many=False):
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            is_new = entry is None
+            if is_new:
+                if len(self._entries) >= self.max_entries:
+                    coldest = min(self._entries, key=lambda k: self._entries[k]["total_ms"])
+                    del self._entries[coldest]
+                entry = self._entries[key] = {
+                    "sql": key,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "executemany": many,
+                    "plan": None,
+                    "last_seen": None,
+                }
+            elapsed_ms = elapsed * 1000
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_seen"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        if not is_new:
+            return
+
+        plan = None
+        if not many and _EXPLAINABLE_RE.match(str(sql)):
+            plan = self._explain(conn, sql, params)
+            with self._lock:
+                if key in self._entries:
+                    self._entries[key]["plan"] = plan
+        plan_text = "\n".join(plan) if plan else "（无）"
+        logging.warning(f"慢查询 ({elapsed * 1000:.0f} ms): {key}\n执行计划:\n{plan_text}")
+
+    def _explain(self, conn, sql, params):
+        """在同一连接上获取执行计划，失败时返回 None，不影响调用方的事务。"""
+        prefix = "EXPLAIN QUERY PLAN " if self.db_type == "sqlite" else "EXPLAIN "
+        # PostgreSQL 事务内语句出错会使整个事务失效，用保存点隔离
+        use_savepoint = self.db_type == "postgresql" and not getattr(conn, "autocommit", False)
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            if use_savepoint:
+                cursor.execute("SAVEPOINT query_advisor_explain")
+            try:
+                if params is None:
+                    cursor.execute(prefix + sql)
+                else:
+                    cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+            except Exception:
+                if use_savepoint:
+                    cursor.execute("ROLLBACK TO SAVEPOINT query_advisor_explain")
+                raise
+            finally:
+                if use_savepoint:
+                    cursor.execute("RELEASE SAVEPOINT query_advisor_explain")
+            columns = [d[0] for d in cursor.description or ()]
+            return [
+                " | ".join(f"{c}={v}" for c, v in zip(columns, tuple(row))) if columns else str(row)
+                for row in rows
+            ]
+        except Exception as e:
+            logging.debug(f"获取执行计划失败: {e}")
+            return None
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    def snapshot(self):
+        """按累计耗时从高到低返回记录的慢语句。"""
+        with self._lock:
+            entries = [dict(e) for e in self._entries.values()]
+        for e in entries:
+            e["avg_ms"] = round(e["total_ms"] / e["count"], 3) if e["count"] else 0.0
+            e["total_ms"] = round(e["total_ms"], 3)
+            e["max_ms"] = round(e["max_ms"], 3)
+        entries.sort(key=lambda e: e["total_ms"], reverse=True)
+        return {"threshold_ms": round(self.threshold * 1000, 3), "queries": entries}
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class AdvisedCursor:
+    """计时的游标代理，其余属性和方法直接转发给原游标。"""
+
+    def __init__(self, cursor, conn, advisor):
+        self._cursor = cursor
+        self._conn = conn
+        self._advisor = advisor
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        if params is None:
+            result = self._cursor.execute(sql, *args, **kwargs)
+        else:
+            result = self._cursor.execute(sql, params, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= self._advisor.threshold:
+            self._advisor.record(self._conn, sql, params, elapsed)
+        # sqlite3 的 execute 返回游标本身，保持链式调用仍经过代理
+        return self if result is self._cursor else result
+
+    def executemany(self, sql, seq_of_params, *args, **kwargs):
+        start = time.perf_counter()
+        result = self._cursor.executemany(sql, seq_of_params, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= self._advisor.threshold:
+            self._advisor.record(self._conn, sql, None, elapsed, many=True)
+        return self if result is self._cursor else result
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
@@ -0,0 +1,331 @@
+# db_pool.py
+"""
+数据库连接池
+
+- MySQL / PostgreSQL：有界连接池，借出时对空闲过久的连接做健康检查，空闲超时的连接会被回收
+- SQLite：按线程缓存连接并启用 WAL 模式，同一线程内嵌套借出复用同一连接
+
+连接归还时会回滚未提交的事务，调用方仍需像以前一样显式 commit()。
+借出次数、等待耗时、超时次数等指标通过 stats() 汇总。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """在 checkout_timeout 内没有等到可用连接。"""
+
+
+class _PoolStats:
+    """连接池运行指标（线程安全）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.evicted = 0
+        self.health_check_failures = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def record_checkout(self, waited):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "evicted": self.evicted,
+                "health_check_failures": self.health_check_failures,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3)
+                if self.checkouts
+                else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """MySQL / PostgreSQL 使用的有界连接池。
+
+    connect: 创建新连接的函数
+    ping: 健康检查函数，连接可用时返回 True
+    """
+
+    def __init__(
+        self,
+        name,
+        connect,
+        ping,
+        max_size=10,
+        idle_timeout=300,
+        checkout_timeout=30,
+        health_check_interval=30,
+    ):
+        self.name = name
+        self._connect = connect
+        self._ping = ping
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._idle = deque()  # (conn, last_used)，右端为最近归还
+        self._size = 0  # 已创建且未关闭的连接数（含借出中的）
+        self._cond = threading.Condition()
+        self._stats = _PoolStats()
+
+    def _create(self):
+        conn = self._connect()
+        self._stats.incr("created")
+        return conn
+
+    def _pop_expired_locked(self):
+        expired = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def _is_healthy(self, conn):
+        try:
+            return bool(self._ping(conn))
+        except Exception:
+            return False
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        conn, last_used = None, None
+        with self._cond:
+            expired = self._pop_expired_locked()
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats.incr("timeouts")
+                    raise PoolTimeoutError(
+                        f"{self.name} 连接池在 {self.checkout_timeout} 秒内没有可用连接（上限 {self.max_size}）"
+                    )
+                self._cond.wait(remaining)
+            if expired:
+                self._cond.notify(len(expired))
+
+        for old in expired:
+            _close_quietly(old)
+        if expired:
+            self._stats.incr("evicted", len(expired))
+
+        try:
+            if conn is None:
+                conn = self._create()
+            elif time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+                logging.info(f"{self.name} 连接池中的连接已失效，重新建立连接。")
+                self._stats.incr("health_check_failures")
+                _close_quietly(conn)
+                conn = self._create()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        self._stats.record_checkout(waited)
+        if waited > 1:
+            logging.warning(f"{self.name} 连接池等待可用连接耗时 {waited:.2f} 秒")
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._stats.incr("discarded")
+            _close_quietly(conn)
+
+    def close_all(self):
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            _close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            size, idle = self._size, len(self._idle)
+        return {
+            "name": self.name,
+            "max_size": self.max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            **self._stats.snapshot(),
+        }
+
+
+class _SQLiteEntry:
+    __slots__ = ("conn", "depth", "last_used", "thread", "closed")
+
+    def __init__(self, conn, thread):
+        self.conn = conn
+        self.depth = 0
+        self.last_used = time.monotonic()
+        self.thread = thread
+        self.closed = False
+
+
+class SQLiteConnectionCache:
+    """SQLite 按线程缓存的连接，首次建立时启用 WAL 模式。"""
+
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, path, idle_timeout=300, timeout=20):
+        self.name = "sqlite"
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._local = threading.local()
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._wal_checked = False
+        self._stats = _PoolStats()
+
+    def _connect(self):
+        # 连接可能被其它线程的回收逻辑关闭，因此关闭同线程检查
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        if not self._wal_checked:
+            try:
+                mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+                if str(mode).lower() != "wal":
+                    logging.warning(f"SQLite 未能切换到 WAL 模式，当前模式: {mode}")
+                self._wal_checked = True
+            except sqlite3.Error as e:
+                logging.warning(f"SQLite 启用 WAL 模式失败，将在下次建立连接时重试: {e}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._stats.incr("created")
+        return conn
+
+    def _sweep_locked(self):
+        """关闭线程已退出或空闲超时的连接，只处理未被借出的连接。"""
+        now = time.monotonic()
+        self._last_sweep = now
+        expired = []
+        for key, entry in list(self._entries.items()):
+            if entry.depth:
+                continue
+            if not entry.thread.is_alive() or now - entry.last_used > self.idle_timeout:
+                entry.closed = True
+                expired.append(entry.conn)
+                del self._entries[key]
+        return expired
+
+    def acquire(self):
+        entry = getattr(self._local, "entry", None)
+        expired = []
+        with self._lock:
+            if entry is not None and entry.closed:
+                entry = None
+            if entry is not None:
+                entry.depth += 1
+            if time.monotonic() - self._last_sweep > self.SWEEP_INTERVAL:
+                expired = self._sweep_locked()
+        for conn in expired:
+            _close_quietly(conn)
+        if expired:
+            self._stats.incr("evicted", len(expired))
+
+        if entry is None:
+            thread = threading.current_thread()
+            entry = _SQLiteEntry(self._connect(), thread)
+            entry.depth = 1
+            self._local.entry = entry
+            with self._lock:
+                self._entries[id(entry)] = entry
+
+        self._stats.record_checkout(0.0)
+        return entry.conn
+
+    def release(self, conn, discard=False):
+        entry = getattr(self._local, "entry", None)
+        if entry is None or entry.conn is not conn:
+            _close_quietly(conn)
+            return
+        with self._lock:
+            entry.depth -= 1
+            entry.last_used = time.monotonic()
+            outermost = entry.depth == 0
+        if not outermost:
+            return
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            with self._lock:
+                entry.closed = True
+                self._entries.pop(id(entry), None)
+            self._local.entry = None
+            self._stats.incr("discarded")
+            _close_quietly(conn)
+
+    def close_all(self):
+        with self._lock:
+            entries = [e for e in self._entries.values() if not e.depth]
+            for entry in entries:
+                entry.closed = True
+                self._entries.pop(id(entry), None)
+        for entry in entries:
+            _close_quietly(entry.conn)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+            in_use = sum(1 for e in self._entries.values() if e.depth)
+        return {
+            "name": self.name,
+            "max_size": None,
+            "size": size,
+            "idle": size - in_use,
+            "in_use": in_use,
+            **self._stats.snapshot(),
+        }
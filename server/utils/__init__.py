@@ -4,6 +4,8 @@
 from .formatters import (
     get_char_type,
     custom_sort_compare,
+    natural_sort_key,
+    torrent_attr_key,
     _extract_core_domain,
     _parse_hostname_from_url,
     _extract_url_from_comment,
@@ -15,6 +17,7 @@ from .formatters import (
     normalize_douban_link,
     normalize_imdb_link,
 )
+from .html_soup import make_soup
 from .title import (
     upload_data_title,
     extract_tags_from_title,
@@ -40,6 +43,7 @@ from .screenshot import (
     _get_smart_screenshot_points,
     _select_well_distributed_events,
 )
+from .image_url_validator import get_image_url_validator
 from .mediainfo import (
     upload_data_mediaInfo,
     upload_data_mediaInfo_async,
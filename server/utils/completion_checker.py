@@ -241,11 +241,10 @@ def _count_local_episodes(local_path: str,
     if proxy_config:
         print(f"使用代理统计集数: {proxy_config['proxy_base_url']}")
         try:
-            import requests
-            response = requests.post(
+            from utils.proxy_client import get_proxy_client
+            response = get_proxy_client().post(
                 f"{proxy_config['proxy_base_url']}/api/media/episode-count",
-                json={"remote_path": remote_path},
-                timeout=180)
+                json={"remote_path": remote_path})
             response.raise_for_status()
             result = response.json()
             if result.get("success"):
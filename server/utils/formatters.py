@@ -2,6 +2,7 @@
 
 import re
 import math
+import hashlib
 from urllib.parse import urlparse
 from functools import cmp_to_key
 from http.cookies import SimpleCookie
@@ -33,6 +34,35 @@ def custom_sort_compare(a, b):
     return len(na) - len(nb)
 
 
+def natural_sort_key(name):
+    """
+    与 custom_sort_compare 排序结果一致的排序键，可预先计算后直接用于 sort(key=...)。
+    每个字符编码为 (类型, 字符) 两个码位，字符串的字典序即等价于逐字符比较，
+    较短的前缀自然排在前面。
+    """
+    lowered = (name or "").lower()
+    return "".join(chr(get_char_type(c)) + c for c in lowered)
+
+
+def torrent_attr_key(name, save_path, size, sites, group):
+    """种子 5 属性 (name, save_path, size, sites, group) 规范化后的 MD5，对应 torrents.attr_key 列。
+
+    用于跨下载器/跨 hash 识别同一条目：名称和路径去除首尾空白，站点和官组再转为小写。
+    """
+    try:
+        size_val = int(size or 0)
+    except Exception:
+        size_val = 0
+    parts = (
+        (name or "").strip(),
+        (save_path or "").strip(),
+        str(size_val),
+        (sites or "").strip().lower(),
+        (group or "").strip().lower(),
+    )
+    return hashlib.md5("\x1f".join(parts).encode("utf-8", "surrogatepass")).hexdigest()
+
+
 def _extract_core_domain(hostname):
     """从完整主机名中提取核心域名部分。"""
     if not hostname:
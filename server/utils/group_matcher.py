@@ -0,0 +1,182 @@
+# utils/group_matcher.py
+"""
+官组名称多模式匹配
+
+DataTracker 刷新种子时需要为每个种子名称识别发布组。逐个官组做子串比较的代价是
+种子数 × 官组数，这里在每次 load_site_maps_from_db 时把官组名称预编译成 Aho-Corasick 自动机，
+每个名称只需扫描一遍即可找出其中出现的全部官组。
+"""
+
+import bisect
+import re
+from collections import deque
+
+_BRACKETS_RE = re.compile(r"\[.*?\]")
+_SEPARATOR = "\x00"
+
+
+class AhoCorasick:
+    """纯 Python 实现的 Aho-Corasick 自动机，一次扫描找出文本中出现的所有模式串。"""
+
+    def __init__(self, patterns):
+        """patterns: 可迭代的 (模式串, 值)，命中时返回对应的值；空模式串会被忽略。"""
+        goto = [{}]
+        out = [[]]
+        for pattern, value in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append([])
+                    goto[state][ch] = nxt
+                state = nxt
+            out[state].append(value)
+
+        # 按 BFS 顺序构建失败指针，并把失败链上的输出合并到当前状态
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(values) for values in out]
+
+    def find_all(self, text):
+        """返回 text 中出现的所有模式串对应的值（按出现位置，可能重复）。"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = []
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+
+class GroupNameMatcher:
+    """按 DataTracker 的官组识别规则匹配种子名称。
+
+    规则：
+    - 名称含 @ 时，对 @ 分隔的每一部分（去掉首尾空格、前导 -、方括号内容）与去掉前导 - 的官组名比较：
+      完全相等为精确匹配；官组名是其子串或其是官组名的子串为部分匹配
+    - 有精确匹配时返回最短的精确匹配，否则返回最长的部分匹配
+    - 以上都没有结果时，返回名称中出现的最长官组名
+    长度相同时按 @ 分段顺序、官组在映射中的顺序取第一个。
+    """
+
+    def __init__(self, group_to_site_map_lower):
+        self._originals = []
+        self._exact = {}
+        clean_patterns = []
+        raw_patterns = []
+        self._empty_clean = []
+        cleans = []
+        for idx, (group_lower, group_info) in enumerate(group_to_site_map_lower.items()):
+            self._originals.append(group_info["original_case"])
+            clean = group_lower.lstrip("-")
+            cleans.append(clean)
+            self._exact.setdefault(clean, []).append(idx)
+            if clean:
+                clean_patterns.append((clean, idx))
+            else:
+                # 空串是任何部分的子串
+                self._empty_clean.append(idx)
+            raw_patterns.append((group_lower, idx))
+
+        self._clean_automaton = AhoCorasick(clean_patterns)
+        self._raw_automaton = AhoCorasick(raw_patterns)
+
+        # “部分是官组名的子串”反向查找：所有官组名拼接成一个字符串后用 str.find 扫描
+        self._joined = _SEPARATOR.join(cleans)
+        self._starts = []
+        offset = 0
+        for clean in cleans:
+            self._starts.append(offset)
+            offset += len(clean) + 1
+
+    def _groups_containing(self, part):
+        """返回去掉前导 - 后包含 part 的官组下标。"""
+        result = []
+        if _SEPARATOR in part:
+            return result
+        joined, starts = self._joined, self._starts
+        pos = joined.find(part)
+        while pos != -1:
+            idx = bisect.bisect_right(starts, pos) - 1
+            result.append(idx)
+            next_start = starts[idx + 1] if idx + 1 < len(starts) else len(joined)
+            pos = joined.find(part, next_start)
+        return result
+
+    def match(self, name):
+        """返回 (官组原始名称, 是否精确匹配)，未识别到时返回 (None, False)。"""
+        originals = self._originals
+        name_lower = name.lower()
+
+        if "@" in name_lower:
+            best_exact = None
+            best_partial = None
+            for part_idx, part in enumerate(name_lower.split("@")):
+                clean_part = part.strip().lstrip("-").strip()
+                clean_part = _BRACKETS_RE.sub("", clean_part).strip()
+                if not clean_part:
+                    continue
+
+                for idx in self._exact.get(clean_part, ()):
+                    key = (len(originals[idx]), part_idx, idx)
+                    if best_exact is None or key < best_exact:
+                        best_exact = key
+                if best_exact is not None:
+                    # 已有精确匹配时部分匹配不会被采用
+                    continue
+
+                candidates = self._clean_automaton.find_all(clean_part)
+                candidates.extend(self._empty_clean)
+                candidates.extend(self._groups_containing(clean_part))
+                for idx in candidates:
+                    key = (-len(originals[idx]), part_idx, idx)
+                    if best_partial is None or key < best_partial:
+                        best_partial = key
+
+            if best_exact is not None:
+                return originals[best_exact[2]], True
+            if best_partial is not None:
+                return originals[best_partial[2]], False
+
+        best = None
+        for idx in self._raw_automaton.find_all(name_lower):
+            key = (-len(originals[idx]), idx)
+            if best is None or key < best:
+                best = key
+        if best is not None:
+            return originals[best[1]], False
+        return None, False
+
+
+class GroupSiteMap(dict):
+    """load_site_maps_from_db 返回的官组映射（官组小写名 -> 信息），附带预编译的匹配器。"""
+
+    matcher = None
+
+
+def get_group_matcher(group_to_site_map_lower):
+    """优先使用映射上预编译的匹配器，普通字典则临时构建一个。"""
+    matcher = getattr(group_to_site_map_lower, "matcher", None)
+    if matcher is None:
+        matcher = GroupNameMatcher(group_to_site_map_lower)
+    return matcher
@@ -0,0 +1,33 @@
+# utils/html_soup.py
+"""
+统一的 HTML 解析入口
+
+详情页、种子列表页以及提取器中的片段清理原来都用 BeautifulSoup(html, "html.parser")，
+html.parser 是 BS4 各后端里最慢的一个（纯 Python 实现）。这里改用 lxml 作为 BS4 的解析后端：
+返回的仍然是 BeautifulSoup 对象，现有的 select/find/get_text 调用不需要修改，
+解析本身交给 libxml2 完成。
+
+- lxml 未安装时退回 html.parser
+- 可以通过环境变量 HTML_PARSER 指定后端（如 html.parser），用于排查个别站点页面在两种后端下解析结果不同的问题
+"""
+
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+
+    _DEFAULT_HTML_PARSER = "lxml"
+except ImportError:
+    _DEFAULT_HTML_PARSER = "html.parser"
+
+HTML_PARSER = os.getenv("HTML_PARSER") or _DEFAULT_HTML_PARSER
+
+
+def make_soup(markup, parser=None):
+    """解析 HTML 文本或片段，返回 BeautifulSoup 对象。
+
+    同一个页面应只解析一次，把得到的 soup 传给后续的标题、简介、MediaInfo 提取使用。
+    """
+    return BeautifulSoup(markup, parser or HTML_PARSER)
@@ -0,0 +1,222 @@
+# utils/image_url_validator.py
+"""
+图片链接（截图）有效性的并发验证与持久化缓存
+
+迁移时原来逐个调用 is_image_url_valid_robust 验证截图链接，每个链接 HEAD 失败还要再 GET 一次，
+十几张截图要串行等待十几次网络请求；同一个种子迁移到不同站点时，同样的图床链接每次都要重新验证。
+
+- validate_many(urls) 并发验证一组链接：线程池总数为 max_workers，同一图床（host）同时进行的请求数
+  不超过 max_per_host，避免对单个图床发起过多请求
+- 验证结果按链接缓存在 DATA_DIR/image_url_cache.json：有效的链接缓存 IMAGE_URL_CACHE_HOURS 小时，
+  失效的链接只缓存 IMAGE_URL_NEGATIVE_CACHE_HOURS 小时（图床偶尔超时不应让链接长期被判为失效）
+- 多个 gunicorn worker 共用同一个缓存文件：写回时在文件锁内先读取磁盘上的条目合并，不会覆盖其它进程的结果
+- get_stats() 返回缓存命中数与实际发起的验证数
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只有单进程写入
+    fcntl = None
+
+from config import DATA_DIR
+
+from .screenshot import is_image_url_valid_robust
+
+# 并发验证的线程数与每个图床的并发上限
+IMAGE_URL_CHECK_WORKERS = int(os.getenv("IMAGE_URL_CHECK_WORKERS", "8"))
+IMAGE_URL_CHECK_PER_HOST = int(os.getenv("IMAGE_URL_CHECK_PER_HOST", "3"))
+# 有效/失效链接的缓存时长（小时），0 表示不缓存
+IMAGE_URL_CACHE_HOURS = float(os.getenv("IMAGE_URL_CACHE_HOURS", "168"))
+IMAGE_URL_NEGATIVE_CACHE_HOURS = float(os.getenv("IMAGE_URL_NEGATIVE_CACHE_HOURS", "1"))
+
+
+class ImageUrlCache:
+    """按链接缓存的图片有效性结果（线程安全）。"""
+
+    def __init__(self, cache_file, ttl_hours=IMAGE_URL_CACHE_HOURS, negative_ttl_hours=IMAGE_URL_NEGATIVE_CACHE_HOURS):
+        self.cache_file = cache_file
+        self.ttl = ttl_hours * 3600
+        self.negative_ttl = negative_ttl_hours * 3600
+        # {url: [验证时间戳, 是否有效]}
+        self._entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _is_fresh(self, entry, now):
+        checked_at, valid = entry
+        return now - checked_at < (self.ttl if valid else self.negative_ttl)
+
+    def _read_entries(self):
+        if not os.path.exists(self.cache_file):
+            return {}
+        with open(self.cache_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("entries", {})
+
+    def _load(self):
+        try:
+            entries = self._read_entries()
+            now = time.time()
+            self._entries = {url: entry for url, entry in entries.items() if self._is_fresh(entry, now)}
+            self._dirty = len(self._entries) != len(entries)
+        except Exception as e:
+            logging.error(f"加载图片链接验证缓存时出错: {e}", exc_info=True)
+            self._entries = {}
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程的写回锁（缓存文件旁的 .lock 文件）。"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.cache_file}.lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def get(self, url):
+        """返回缓存的验证结果；没有缓存或已过期时返回 None。"""
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None or not self._is_fresh(entry, time.time()):
+            return None
+        return entry[1]
+
+    def put(self, url, valid):
+        if (self.ttl if valid else self.negative_ttl) <= 0:
+            return
+        with self._lock:
+            self._entries[url] = [int(time.time()), bool(valid)]
+            self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        """有变化时写回缓存文件，同时清理过期条目（先写临时文件再替换）。
+
+        在文件锁内重新读取磁盘上的条目，与本进程的条目按验证时间合并后再写入，
+        其它进程在本进程加载之后写入的结果不会被覆盖，合并结果也会加载到本进程。
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with self._file_lock():
+                try:
+                    merged = self._read_entries()
+                except ValueError as e:
+                    logging.warning(f"图片链接验证缓存文件损坏，将重新写入: {e}")
+                    merged = {}
+                for url, entry in entries.items():
+                    if url not in merged or merged[url][0] <= entry[0]:
+                        merged[url] = entry
+                now = time.time()
+                merged = {url: entry for url, entry in merged.items() if self._is_fresh(entry, now)}
+                tmp_file = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    json.dump({"entries": merged}, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_file, self.cache_file)
+            with self._lock:
+                # 保留写回期间本进程新增的结果
+                for url, entry in self._entries.items():
+                    if url not in merged or merged[url][0] <= entry[0]:
+                        merged[url] = entry
+                self._entries = merged
+        except Exception as e:
+            logging.error(f"保存图片链接验证缓存时出错: {e}", exc_info=True)
+
+
+class ImageUrlValidator:
+    """并发验证图片链接，结果写入 ImageUrlCache。"""
+
+    def __init__(
+        self,
+        cache,
+        max_workers=IMAGE_URL_CHECK_WORKERS,
+        max_per_host=IMAGE_URL_CHECK_PER_HOST,
+        check=is_image_url_valid_robust,
+    ):
+        self.cache = cache
+        self.max_per_host = max_per_host
+        self.check = check
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-url-check")
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._stats = {"requested": 0, "cache_hits": 0, "checked": 0, "invalid": 0}
+
+    def _host_slot(self, url):
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _check(self, url):
+        with self._host_slot(url):
+            try:
+                valid = bool(self.check(url))
+            except Exception as e:
+                logging.warning(f"验证图片链接时出错: {url} - {e}")
+                valid = False
+        self.cache.put(url, valid)
+        with self._lock:
+            self._stats["checked"] += 1
+            if not valid:
+                self._stats["invalid"] += 1
+        return valid
+
+    def validate_many(self, urls):
+        """验证一组链接，返回 {url: 是否有效}；缓存中已有结果的链接不再发起请求。"""
+        results = {}
+        pending = {}
+        for url in dict.fromkeys(url for url in urls if url):
+            cached = self.cache.get(url)
+            if cached is not None:
+                results[url] = cached
+            else:
+                pending[url] = self._executor.submit(self._check, url)
+        with self._lock:
+            self._stats["requested"] += len(results) + len(pending)
+            self._stats["cache_hits"] += len(results)
+
+        for url, future in pending.items():
+            results[url] = future.result()
+        if pending:
+            self.cache.save()
+        return results
+
+    def is_valid(self, url):
+        return self.validate_many([url]).get(url, False)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, cached_urls=len(self.cache))
+
+
+_validator = None
+_validator_lock = threading.Lock()
+
+
+def get_image_url_validator():
+    """进程内共享的图片链接验证器。"""
+    global _validator
+    with _validator_lock:
+        if _validator is None:
+            _validator = ImageUrlValidator(ImageUrlCache(os.path.join(DATA_DIR, "image_url_cache.json")))
+        return _validator
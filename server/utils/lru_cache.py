@@ -0,0 +1,60 @@
+# utils/lru_cache.py
+"""
+线程安全的 LRU 缓存
+
+按条目“权重”（例如缓存结果的行数）限制总大小，超出时淘汰最久未使用的条目；
+单个条目超过上限时不缓存。
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，max_weight 为所有条目权重之和的上限。"""
+
+    def __init__(self, max_weight):
+        self.max_weight = max_weight
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, weight)
+        self._weight = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, weight=1):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            if weight > self.max_weight:
+                return
+            self._entries[key] = (value, weight)
+            self._weight += weight
+            while self._weight > self.max_weight:
+                _, (_, evicted_weight) = self._entries.popitem(last=False)
+                self._weight -= evicted_weight
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "weight": self._weight,
+                "max_weight": self.max_weight,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -14,7 +14,6 @@ import time
 import random
 import cloudscraper
 import yaml
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from pymediainfo import MediaInfo
 from config import TEMP_DIR, config_manager, GLOBAL_MAPPINGS
@@ -22,6 +21,7 @@ from qbittorrentapi import Client as qbClient
 from transmission_rpc import Client as TrClient
 from utils import ensure_scheme
 from .title import extract_season_episode
+from .html_soup import make_soup
 
 
 def translate_path(downloader_id: str, remote_path: str) -> str:
@@ -446,7 +446,7 @@ def add_torrent_to_downloader(
                         raise  # Re-raise the exception if all retries failed
             details_response.raise_for_status()
 
-            soup = BeautifulSoup(details_response.text, "html.parser")
+            soup = make_soup(details_response.text)
 
             # 检查是否需要使用特殊下载器
             full_download_url = None  # 初始化full_download_url
@@ -4,11 +4,11 @@ import re
 import subprocess
 import sys
 import tempfile
-import requests
 import yaml
 from pymediainfo import MediaInfo
 from config import GLOBAL_MAPPINGS, BDINFO_DIR as DEFAULT_BDINFO_DIR
 from .media_helper import _find_target_video_file, _get_downloader_proxy_config, translate_path
+from .proxy_client import get_proxy_client
 
 
 def _is_windows_platform() -> bool:
@@ -161,11 +161,10 @@ def upload_data_mediaInfo(
             print(f"已提供 content_name，将使用拼接路径: '{remote_path}'")
 
         try:
-            response = requests.post(
+            response = get_proxy_client().post(
                 f"{proxy_config['proxy_base_url']}/api/media/mediainfo",
                 json={"remote_path": remote_path, "content_name": content_name},
-                timeout=300,
-            )  # 5分钟超时
+            )
             response.raise_for_status()
             result = response.json()
             if result.get("success"):
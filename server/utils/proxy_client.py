@@ -0,0 +1,118 @@
+# utils/proxy_client.py
+"""
+下载器代理（proxy.go）的 HTTP 客户端
+
+按代理地址（scheme://host:port）各维护一个 keep-alive 的 requests.Session，每秒一次的统计轮询、
+种子列表、文件检查、截图/MediaInfo、BDInfo 进度轮询等请求复用同一组 TCP 连接，不再每次请求都重新握手。
+响应的 gzip 由 requests 自动协商（proxy.go 的 writeJSONResponse 支持）。
+
+各接口的默认超时集中在 PROXY_ENDPOINT_TIMEOUTS，调用方传入 timeout 时以调用方为准。
+get_stats() 返回每个代理的请求数、失败数与实际新建的连接数，可以据此确认连接是否被复用。
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 建立连接的超时（秒）；读取超时按接口区分
+PROXY_CONNECT_TIMEOUT = 10
+# 读取超时（秒），按路径前缀匹配，最长的前缀优先
+PROXY_ENDPOINT_TIMEOUTS = {
+    "/api/stats/server": 30,
+    "/api/torrents/all": 600,
+    "/api/torrents/upload-limit/batch": 120,
+    "/api/file/check": 30,
+    "/api/file/batch-check": 180,
+    "/api/media/episode-count": 180,
+    "/api/media/mediainfo": 300,
+    "/api/media/screenshot": 600,
+    "/api/media/bdinfo": 10,
+    "/api/media/bdinfo/progress/": 10,
+}
+PROXY_DEFAULT_TIMEOUT = 60
+# 每个代理保留的空闲连接数：统计轮询、种子刷新、BDInfo 轮询等可能同时进行
+PROXY_POOL_MAXSIZE = 8
+
+_ENDPOINT_PREFIXES = sorted(PROXY_ENDPOINT_TIMEOUTS, key=len, reverse=True)
+
+
+def endpoint_timeout(path):
+    """返回接口的 (连接超时, 读取超时)。"""
+    for prefix in _ENDPOINT_PREFIXES:
+        if path.startswith(prefix):
+            return PROXY_CONNECT_TIMEOUT, PROXY_ENDPOINT_TIMEOUTS[prefix]
+    return PROXY_CONNECT_TIMEOUT, PROXY_DEFAULT_TIMEOUT
+
+
+class ProxyClient:
+    """按代理地址复用会话的客户端（线程安全）。"""
+
+    def __init__(self, pool_maxsize=PROXY_POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._stats = {}
+
+    def _session(self, base_url):
+        with self._lock:
+            session = self._sessions.get(base_url)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[base_url] = session
+                self._stats[base_url] = {"requests": 0, "errors": 0}
+            return session
+
+    def request(self, method, url, timeout=None, **kwargs):
+        parts = urlsplit(url)
+        base_url = f"{parts.scheme}://{parts.netloc}"
+        session = self._session(base_url)
+        if timeout is None:
+            timeout = endpoint_timeout(parts.path)
+        try:
+            return session.request(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._stats[base_url]["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats[base_url]["requests"] += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self):
+        """每个代理的请求数、失败数、新建连接数与连接复用率。"""
+        with self._lock:
+            items = [(base_url, session, dict(self._stats[base_url])) for base_url, session in self._sessions.items()]
+        result = {}
+        for base_url, session, stats in items:
+            # 每个会话只访问一个代理，其连接池里的连接都属于该代理
+            pools = session.get_adapter(base_url).poolmanager.pools
+            connections = sum(pools[key].num_connections for key in pools.keys())
+            stats["connections"] = connections
+            stats["reuse_ratio"] = round(1 - connections / stats["requests"], 3) if stats["requests"] else 0.0
+            result[base_url] = stats
+        return result
+
+
+_proxy_client = None
+_proxy_client_lock = threading.Lock()
+
+
+def get_proxy_client():
+    """进程内共享的代理客户端。"""
+    global _proxy_client
+    if _proxy_client is None:
+        with _proxy_client_lock:
+            if _proxy_client is None:
+                _proxy_client = ProxyClient()
+    return _proxy_client
@@ -11,6 +11,7 @@ import time
 import random
 from config import TEMP_DIR, config_manager
 from .media_helper import _find_target_video_file, _convert_pixhost_url_to_direct
+from .proxy_client import get_proxy_client
 
 
 _MEDIA_EXECUTABLE_ENV_MAP = {
@@ -584,10 +585,9 @@ def upload_data_screenshot(source_info, save_path, torrent_name=None, downloader
     if use_proxy and proxy_config:
         print(f"使用代理处理截图: {proxy_config['proxy_base_url']}")
         try:
-            response = requests.post(
+            response = get_proxy_client().post(
                 f"{proxy_config['proxy_base_url']}/api/media/screenshot",
                 json={"remote_path": full_video_path, "content_name": content_name},
-                timeout=600,
             )
             response.raise_for_status()
             result = response.json()
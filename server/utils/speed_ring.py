@@ -0,0 +1,276 @@
+"""
+跨进程实时速度环形缓冲区
+DataTracker（background_runner 进程）写入，gunicorn 各 worker 只读映射同一个文件，
+实时速度接口因此无需访问数据库。
+
+文件布局（小端）：
+- 头部: magic, version, capacity, slots, head(已写入的样本总数), slots_seq
+- 下载器槽位表: slots 个定长的下载器 ID
+- 样本区: capacity 个样本，每个样本含 seq、时间戳以及每个槽位的上传/下载速度、标志位、轮询耗时
+
+只有一个写者，读者通过每条记录的序号（seqlock）判断是否读到了写入中的数据，全程无锁。
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PTSR"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sIIIQQ")
+_HEADER_SIZE = 64
+_SLOT_ID = struct.Struct("<I36s")
+_SAMPLE_HEAD = struct.Struct("<Qd")
+_SAMPLE_SLOT = struct.Struct("<qqII")
+
+FLAG_PRESENT = 0x1
+FLAG_LATE = 0x2
+LATENCY_NONE = 0xFFFFFFFF
+
+DEFAULT_CAPACITY = 300
+DEFAULT_SLOTS = 32
+
+
+def _layout(capacity: int, slots: int) -> Tuple[int, int, int]:
+    """返回 (槽位表偏移, 样本区偏移, 单个样本大小)。"""
+    slot_table_offset = _HEADER_SIZE
+    samples_offset = slot_table_offset + slots * _SLOT_ID.size
+    sample_size = _SAMPLE_HEAD.size + slots * _SAMPLE_SLOT.size
+    return slot_table_offset, samples_offset, sample_size
+
+
+class SpeedRingWriter:
+    """环形缓冲区写者，仅由 DataTracker 线程调用。"""
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY, slots: int = DEFAULT_SLOTS):
+        self.path = path
+        self.capacity = capacity
+        self.slots = slots
+        self._slot_table_offset, self._samples_offset, self._sample_size = _layout(capacity, slots)
+        self._slot_index: Dict[str, int] = {}
+        self._overflow_warned = False
+        self._head = 0
+        self._slots_seq = 0
+
+        total_size = self._samples_offset + capacity * self._sample_size
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # 先写临时文件再原子替换，读者不会映射到尺寸不一致的文件
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, total_size)
+            self._mm = mmap.mmap(fd, total_size)
+        finally:
+            os.close(fd)
+        _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, capacity, slots, 0, 0)
+        os.replace(tmp_path, path)
+        logger.info(f"实时速度环形缓冲区已创建: {path} (容量 {capacity} 秒, {slots} 个下载器槽位)")
+
+    def _write_header(self):
+        _HEADER.pack_into(
+            self._mm, 0, MAGIC, VERSION, self.capacity, self.slots, self._head, self._slots_seq
+        )
+
+    def _get_slot(self, downloader_id: str) -> Optional[int]:
+        slot = self._slot_index.get(downloader_id)
+        if slot is not None:
+            return slot
+        if len(self._slot_index) >= self.slots:
+            if not self._overflow_warned:
+                logger.warning(f"实时速度环形缓冲区槽位已满（{self.slots}），忽略下载器 {downloader_id}")
+                self._overflow_warned = True
+            return None
+
+        encoded = downloader_id.encode("utf-8")[:36]
+        slot = len(self._slot_index)
+        self._slots_seq += 1  # 奇数：槽位表写入中
+        self._write_header()
+        _SLOT_ID.pack_into(
+            self._mm, self._slot_table_offset + slot * _SLOT_ID.size, len(encoded), encoded
+        )
+        self._slots_seq += 1
+        self._write_header()
+        self._slot_index[downloader_id] = slot
+        return slot
+
+    def publish(self, timestamp: datetime, speeds: Dict[str, dict]):
+        """写入一个样本。speeds 格式与 DataTracker.latest_speeds 相同。"""
+        slot_values = {}
+        for downloader_id, data in speeds.items():
+            slot = self._get_slot(downloader_id)
+            if slot is None:
+                continue
+            flags = FLAG_PRESENT | (FLAG_LATE if data.get("late") else 0)
+            latency = data.get("poll_latency_ms")
+            latency = LATENCY_NONE if latency is None else min(int(latency), LATENCY_NONE - 1)
+            slot_values[slot] = (
+                int(data.get("upload_speed", 0) or 0),
+                int(data.get("download_speed", 0) or 0),
+                flags,
+                latency,
+            )
+
+        seq = self._head
+        offset = self._samples_offset + (seq % self.capacity) * self._sample_size
+        # seqlock：写入期间序号为奇数，写完后为 2*seq+2
+        _SAMPLE_HEAD.pack_into(self._mm, offset, 2 * seq + 1, timestamp.timestamp())
+        slot_offset = offset + _SAMPLE_HEAD.size
+        for slot in range(self.slots):
+            values = slot_values.get(slot, (0, 0, 0, LATENCY_NONE))
+            _SAMPLE_SLOT.pack_into(self._mm, slot_offset + slot * _SAMPLE_SLOT.size, *values)
+        _SAMPLE_HEAD.pack_into(self._mm, offset, 2 * seq + 2, timestamp.timestamp())
+
+        self._head = seq + 1
+        self._write_header()
+
+    def close(self):
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+
+
+class SpeedRingReader:
+    """环形缓冲区读者，可在任意进程中使用，写者重建文件后会自动重新映射。"""
+
+    MAX_RETRIES = 3
+
+    def __init__(self, path: str, stale_seconds: float = 10.0):
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self._mm = None
+        self._inode = None
+        self._lock = threading.Lock()
+
+    def _ensure_mapped(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return False
+        if self._mm is not None and st.st_ino == self._inode:
+            return True
+
+        self._close()
+        try:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._inode = st.st_ino
+        except (OSError, ValueError) as e:
+            logger.debug(f"映射实时速度环形缓冲区失败: {e}")
+            self._close()
+            return False
+
+        magic, version, capacity, slots, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._close()
+            return False
+        self._capacity = capacity
+        self._slots = slots
+        self._slot_table_offset, self._samples_offset, self._sample_size = _layout(capacity, slots)
+        return True
+
+    def _close(self):
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except Exception:
+                pass
+        self._mm = None
+        self._inode = None
+
+    def _read_slot_ids(self) -> Optional[List[Optional[str]]]:
+        for _ in range(self.MAX_RETRIES):
+            seq_before = _HEADER.unpack_from(self._mm, 0)[5]
+            if seq_before % 2:
+                continue
+            ids = []
+            for slot in range(self._slots):
+                length, raw = _SLOT_ID.unpack_from(
+                    self._mm, self._slot_table_offset + slot * _SLOT_ID.size
+                )
+                ids.append(raw[:length].decode("utf-8", errors="ignore") if length else None)
+            if _HEADER.unpack_from(self._mm, 0)[5] == seq_before:
+                return ids
+        return None
+
+    def _read_sample(self, seq: int, slot_ids: List[Optional[str]]):
+        offset = self._samples_offset + (seq % self._capacity) * self._sample_size
+        for _ in range(self.MAX_RETRIES):
+            marker, ts = _SAMPLE_HEAD.unpack_from(self._mm, offset)
+            if marker != 2 * seq + 2:
+                return None  # 已被覆盖或写入中
+            raw = self._mm[offset + _SAMPLE_HEAD.size : offset + self._sample_size]
+            if _SAMPLE_HEAD.unpack_from(self._mm, offset)[0] != marker:
+                continue
+            speeds = {}
+            for slot, downloader_id in enumerate(slot_ids):
+                if not downloader_id:
+                    continue
+                ul, dl, flags, latency = _SAMPLE_SLOT.unpack_from(raw, slot * _SAMPLE_SLOT.size)
+                if not flags & FLAG_PRESENT:
+                    continue
+                speeds[downloader_id] = {
+                    "upload_speed": ul,
+                    "download_speed": dl,
+                    "late": bool(flags & FLAG_LATE),
+                    "poll_latency_ms": None if latency == LATENCY_NONE else latency,
+                }
+            return {"timestamp": datetime.fromtimestamp(ts), "speeds": speeds}
+        return None
+
+    def read_recent(self, seconds: int) -> Optional[List[dict]]:
+        """读取最近 seconds 个样本（按时间升序），格式与 recent_speeds_buffer 相同。
+
+        缓冲区不存在或写者已停止更新（超过 stale_seconds）时返回 None。
+        """
+        with self._lock:
+            if not self._ensure_mapped():
+                return None
+            head = _HEADER.unpack_from(self._mm, 0)[4]
+            if head == 0:
+                return []
+            slot_ids = self._read_slot_ids()
+            if slot_ids is None:
+                return None
+
+            count = max(0, min(seconds, self._capacity - 1, head))
+            samples = []
+            for seq in range(head - count, head):
+                sample = self._read_sample(seq, slot_ids)
+                if sample is not None:
+                    samples.append(sample)
+
+        if samples and time.time() - samples[-1]["timestamp"].timestamp() > self.stale_seconds:
+            return None
+        return samples
+
+    def read_latest(self) -> Optional[dict]:
+        """读取最新一个样本的各下载器速度，无可用数据时返回 None。"""
+        samples = self.read_recent(1)
+        if not samples:
+            return None
+        return samples[-1]["speeds"]
+
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_speed_ring_reader() -> SpeedRingReader:
+    """获取当前进程共享的环形缓冲区读者。"""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            from config import SPEED_RING_FILE
+
+            _reader = SpeedRingReader(SPEED_RING_FILE)
+        return _reader
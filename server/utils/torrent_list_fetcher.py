@@ -2,7 +2,6 @@
 
 import os
 import cloudscraper
-from bs4 import BeautifulSoup
 import time
 import urllib3
 import re
@@ -10,6 +9,8 @@ import copy
 import json
 from loguru import logger
 
+from .html_soup import make_soup
+
 # 禁用 SSL 警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -180,7 +181,7 @@ class TorrentListFetcher:
         """
         从HTML内容中精确解析种子列表
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content)
         torrents = []
 
         # 1. 定位主表格
@@ -0,0 +1,83 @@
+"""
+DataTracker 运行指标的跨进程共享
+DataTracker 运行在 background_runner 进程中，gunicorn worker 里的 services.data_tracker_thread 始终为 None，
+轮询耗时等指标只存在于 DataTracker 进程的内存里。这里由 DataTracker 定期把指标写入一个小的 JSON 文件
+（与实时速度环形缓冲区一样默认放在 /dev/shm），各 worker 读取该文件返回给统计接口。
+
+文件内容为 {"updated_at": 写入时间戳, "sections": {名称: 指标}}，先写临时文件再替换，读者不会读到写了一半的内容。
+只有一个写者；读者按文件的 (inode, mtime) 缓存解析结果。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TrackerMetricsWriter:
+    """指标写者，仅由 DataTracker 调用。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sections: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, **sections):
+        """更新给定的指标分区并写回文件，未给出的分区保留上次的值。"""
+        with self._lock:
+            self._sections.update(sections)
+            payload = {"updated_at": time.time(), "sections": self._sections}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+
+class TrackerMetricsReader:
+    """指标读者，文件未变化时直接返回缓存的解析结果。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stamp = None
+        self._payload: dict = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        stamp = (st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            if stamp != self._stamp:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._payload = json.load(f)
+                    self._stamp = stamp
+                except (OSError, ValueError) as e:
+                    logger.warning(f"读取 DataTracker 指标文件失败: {e}")
+                    return {}
+            return self._payload
+
+    def read(self, section: str) -> Optional[dict]:
+        """返回指定分区的指标；DataTracker 尚未写入时返回 None。"""
+        return self._load().get("sections", {}).get(section)
+
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_tracker_metrics_reader() -> TrackerMetricsReader:
+    """获取当前进程共享的指标读者。"""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            from config import TRACKER_METRICS_FILE
+
+            _reader = TrackerMetricsReader(TRACKER_METRICS_FILE)
+        return _reader